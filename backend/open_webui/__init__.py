@@ -99,5 +99,23 @@ def dev(
     )
 
 
+@app.command()
+def reindex_chats():
+    """Rebuild the chat search index from the stored chats."""
+    import open_webui.config  # runs the database migrations
+    from open_webui.models.chats import Chats
+
+    typer.echo(f"Indexed {Chats.reindex_chats()} chats")
+
+
+@app.command()
+def rebuild_credit_usage():
+    """Recompute the credit usage statistics from the credit logs."""
+    import open_webui.config  # runs the database migrations
+    from open_webui.models.credits import CreditUsage
+
+    typer.echo(f"Aggregated {CreditUsage.rebuild()} credit logs")
+
+
 if __name__ == "__main__":
     app()
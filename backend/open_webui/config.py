@@ -3,6 +3,8 @@ import logging
 import os
 import shutil
 import base64
+import threading
+import time
 import redis
 
 from datetime import datetime
@@ -233,6 +235,15 @@ class PersistentConfig(Generic[T]):
 
 
 class AppConfig:
+    """
+    Application config backed by PersistentConfig entries.
+
+    Reads are plain lookups in the local snapshot. When Redis is configured,
+    writes bump a version counter, and a background thread polls that counter
+    every REDIS_CONFIG_SYNC_INTERVAL seconds and reloads all keys from Redis
+    in a single pipeline when another node changed the config.
+    """
+
     _redis: Union[redis.Redis, redis.cluster.RedisCluster] = None
     _redis_key_prefix: str
 
@@ -244,6 +255,7 @@ class AppConfig:
         redis_sentinels: Optional[list] = [],
         redis_cluster: Optional[bool] = False,
         redis_key_prefix: str = "open-webui",
+        redis_sync_interval: float = 1.0,
     ):
         if redis_url:
             super().__setattr__("_redis_key_prefix", redis_key_prefix)
@@ -258,10 +270,21 @@ class AppConfig:
             )
 
         super().__setattr__("_state", {})
+        super().__setattr__("_sync_interval", redis_sync_interval)
+        super().__setattr__("_sync_lock", threading.Lock())
+        super().__setattr__("_sync_pid", None)
+        super().__setattr__("_synced_version", None)
+        super().__setattr__(
+            "_stats", {"hits": 0, "invalidations": 0, "reloads": 0}
+        )
 
     def __setattr__(self, key, value):
         if isinstance(value, PersistentConfig):
             self._state[key] = value
+
+            if self._redis and self._sync_pid is not None:
+                # Registered after the initial sync, pick up the shared value
+                self._reload_from_redis([key])
         else:
             self._state[key].value = value
             self._state[key].save()
@@ -270,28 +293,92 @@ class AppConfig:
                 redis_key = f"{self._redis_key_prefix}:config:{key}"
                 self._redis.set(redis_key, json.dumps(self._state[key].value))
 
+                version = self._redis.incr(self._version_key)
+                with self._sync_lock:
+                    # Only adopt the version if nobody else changed the config meanwhile
+                    if (
+                        self._synced_version is not None
+                        and version == self._synced_version + 1
+                    ):
+                        super().__setattr__("_synced_version", version)
+
     def __getattr__(self, key):
         if key not in self._state:
             raise AttributeError(f"Config key '{key}' not found")
 
-        # If Redis is available, check for an updated value
-        if self._redis:
-            redis_key = f"{self._redis_key_prefix}:config:{key}"
-            redis_value = self._redis.get(redis_key)
+        if self._redis and self._sync_pid != os.getpid():
+            self._start_sync()
 
-            if redis_value is not None:
-                try:
-                    decoded_value = json.loads(redis_value)
+        self._stats["hits"] += 1
+        return self._state[key].value
 
-                    # Update the in-memory value if different
-                    if self._state[key].value != decoded_value:
-                        self._state[key].value = decoded_value
-                        log.info(f"Updated {key} from Redis: {decoded_value}")
+    @property
+    def _version_key(self) -> str:
+        return f"{self._redis_key_prefix}:config:version"
 
-                except json.JSONDecodeError:
-                    log.error(f"Invalid JSON format in Redis for {key}: {redis_value}")
+    def get_stats(self) -> dict:
+        return dict(self._stats)
 
-        return self._state[key].value
+    def _start_sync(self):
+        with self._sync_lock:
+            if self._sync_pid == os.getpid():
+                return
+            # Worker processes forked after import need their own sync thread
+            super().__setattr__("_sync_pid", os.getpid())
+            super().__setattr__("_synced_version", None)
+
+        try:
+            self._sync()
+        except Exception as e:
+            log.warning(f"Failed to sync config from Redis: {e}")
+
+        threading.Thread(
+            target=self._sync_loop, name="config-redis-sync", daemon=True
+        ).start()
+
+    def _sync_loop(self):
+        while True:
+            time.sleep(self._sync_interval)
+            try:
+                self._sync()
+            except Exception as e:
+                log.warning(f"Failed to sync config from Redis: {e}")
+
+    def _sync(self):
+        version = self._redis.get(self._version_key)
+        version = int(version) if version is not None else 0
+
+        if version == self._synced_version:
+            return
+
+        if self._synced_version is not None:
+            self._stats["invalidations"] += 1
+
+        self._reload_from_redis(list(self._state.keys()))
+        with self._sync_lock:
+            super().__setattr__("_synced_version", version)
+
+    def _reload_from_redis(self, keys: list[str]):
+        pipe = self._redis.pipeline()
+        for key in keys:
+            pipe.get(f"{self._redis_key_prefix}:config:{key}")
+        redis_values = pipe.execute()
+        self._stats["reloads"] += 1
+
+        for key, redis_value in zip(keys, redis_values):
+            if redis_value is None:
+                continue
+
+            try:
+                decoded_value = json.loads(redis_value)
+
+                # Update the in-memory value if different
+                if self._state[key].value != decoded_value:
+                    self._state[key].value = decoded_value
+                    log.info(f"Updated {key} from Redis: {decoded_value}")
+
+            except json.JSONDecodeError:
+                log.error(f"Invalid JSON format in Redis for {key}: {redis_value}")
 
 
 ####################################
@@ -920,6 +1007,18 @@ AZURE_STORAGE_ENDPOINT = os.environ.get("AZURE_STORAGE_ENDPOINT", None)
 AZURE_STORAGE_CONTAINER_NAME = os.environ.get("AZURE_STORAGE_CONTAINER_NAME", None)
 AZURE_STORAGE_KEY = os.environ.get("AZURE_STORAGE_KEY", None)
 
+# Size of the chunks uploads are read, hashed and sent to remote storage in.
+# Rounded to a multiple of 256 KiB (GCS) and at least 5 MiB (S3 multipart).
+try:
+    STORAGE_UPLOAD_CHUNK_SIZE = int(
+        os.environ.get("STORAGE_UPLOAD_CHUNK_SIZE", str(8 * 1024 * 1024))
+    )
+except Exception:
+    STORAGE_UPLOAD_CHUNK_SIZE = 8 * 1024 * 1024
+STORAGE_UPLOAD_CHUNK_SIZE = max(
+    STORAGE_UPLOAD_CHUNK_SIZE // (256 * 1024) * (256 * 1024), 5 * 1024 * 1024
+)
+
 ####################################
 # File Upload DIR
 ####################################
@@ -935,6 +1034,14 @@ UPLOAD_DIR.mkdir(parents=True, exist_ok=True)
 CACHE_DIR = DATA_DIR / "cache"
 CACHE_DIR.mkdir(parents=True, exist_ok=True)
 
+# Local copies of files in remote storage (s3, gcs, azure), 0 to disable
+STORAGE_CACHE_DIR = os.environ.get("STORAGE_CACHE_DIR", f"{CACHE_DIR}/storage")
+
+try:
+    STORAGE_CACHE_MAX_SIZE_MB = int(os.environ.get("STORAGE_CACHE_MAX_SIZE_MB", "2048"))
+except ValueError:
+    STORAGE_CACHE_MAX_SIZE_MB = 2048
+
 
 ####################################
 # DIRECT CONNECTIONS
@@ -2897,6 +3004,41 @@ RAG_EMBEDDING_PREFIX_FIELD_NAME = os.environ.get(
     "RAG_EMBEDDING_PREFIX_FIELD_NAME", None
 )
 
+# Cache of embeddings by content hash: "sqlite" (local disk), "memory" or "" (off)
+RAG_EMBEDDING_CACHE_BACKEND = os.environ.get(
+    "RAG_EMBEDDING_CACHE_BACKEND", "sqlite"
+).lower()
+
+RAG_EMBEDDING_CACHE_DIR = os.environ.get(
+    "RAG_EMBEDDING_CACHE_DIR", f"{CACHE_DIR}/embeddings"
+)
+
+try:
+    RAG_EMBEDDING_CACHE_MAX_SIZE_MB = int(
+        os.environ.get("RAG_EMBEDDING_CACHE_MAX_SIZE_MB", "1024")
+    )
+except ValueError:
+    RAG_EMBEDDING_CACHE_MAX_SIZE_MB = 1024
+
+# Requests in flight per embedding engine and URL
+try:
+    RAG_EMBEDDING_CONCURRENCY = int(os.environ.get("RAG_EMBEDDING_CONCURRENCY", "4"))
+except ValueError:
+    RAG_EMBEDDING_CONCURRENCY = 4
+
+# Estimated tokens per embedding request, 0 to pack by RAG_EMBEDDING_BATCH_SIZE only
+try:
+    RAG_EMBEDDING_BATCH_MAX_TOKENS = int(
+        os.environ.get("RAG_EMBEDDING_BATCH_MAX_TOKENS", "0")
+    )
+except ValueError:
+    RAG_EMBEDDING_BATCH_MAX_TOKENS = 0
+
+try:
+    RAG_EMBEDDING_MAX_RETRIES = int(os.environ.get("RAG_EMBEDDING_MAX_RETRIES", "5"))
+except ValueError:
+    RAG_EMBEDDING_MAX_RETRIES = 5
+
 RAG_RERANKING_ENGINE = PersistentConfig(
     "RAG_RERANKING_ENGINE",
     "rag.reranking_engine",
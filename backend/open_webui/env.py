@@ -362,10 +362,85 @@ ENABLE_REALTIME_CHAT_SAVE = (
     os.environ.get("ENABLE_REALTIME_CHAT_SAVE", "False").lower() == "true"
 )
 
+# Realtime chat saves are buffered per message and written behind the stream.
+# A pending message is flushed once it has been dirty for the interval (seconds)
+# or has accumulated the byte budget, and always when the response ends.
+# An interval of 0 writes every update through immediately.
+try:
+    REALTIME_CHAT_SAVE_FLUSH_INTERVAL = float(
+        os.environ.get("REALTIME_CHAT_SAVE_FLUSH_INTERVAL", "1.0")
+    )
+except Exception:
+    REALTIME_CHAT_SAVE_FLUSH_INTERVAL = 1.0
+
+try:
+    REALTIME_CHAT_SAVE_FLUSH_BYTES = int(
+        os.environ.get("REALTIME_CHAT_SAVE_FLUSH_BYTES", "65536")
+    )
+except Exception:
+    REALTIME_CHAT_SAVE_FLUSH_BYTES = 65536
+
 ENABLE_QUERIES_CACHE = os.environ.get("ENABLE_QUERIES_CACHE", "False").lower() == "true"
 
 RAG_SYSTEM_CONTEXT = os.environ.get("RAG_SYSTEM_CONTEXT", "False").lower() == "true"
 
+# Number of per-collection BM25 indexes kept in memory for hybrid search
+try:
+    BM25_INDEX_CACHE_SIZE = int(os.environ.get("BM25_INDEX_CACHE_SIZE", "32"))
+except Exception:
+    BM25_INDEX_CACHE_SIZE = 32
+
+# Credit balances are always updated synchronously. With a flush interval
+# (seconds) the credit_log entries are queued and inserted in batches once the
+# interval has passed or the batch size is reached. 0 inserts them with the
+# balance update.
+try:
+    CREDIT_LOG_FLUSH_INTERVAL = float(os.environ.get("CREDIT_LOG_FLUSH_INTERVAL", "0"))
+except Exception:
+    CREDIT_LOG_FLUSH_INTERVAL = 0.0
+
+try:
+    CREDIT_LOG_FLUSH_SIZE = int(os.environ.get("CREDIT_LOG_FLUSH_SIZE", "500"))
+except Exception:
+    CREDIT_LOG_FLUSH_SIZE = 500
+
+# Seconds a cached credit balance is trusted by the pre-flight credit check
+# before it is read from the database again, and seconds an unsettled credit
+# reservation is held before it expires (e.g. after a crashed request)
+try:
+    CREDIT_BALANCE_CACHE_TTL = int(os.environ.get("CREDIT_BALANCE_CACHE_TTL", "300"))
+except Exception:
+    CREDIT_BALANCE_CACHE_TTL = 300
+
+try:
+    CREDIT_RESERVATION_TTL = int(os.environ.get("CREDIT_RESERVATION_TTL", "900"))
+except Exception:
+    CREDIT_RESERVATION_TTL = 900
+
+# Seconds model prices stay cached for billing. Changes made on this instance
+# apply at once, changes made by other instances after at most this long.
+try:
+    MODEL_PRICE_CACHE_TTL = int(os.environ.get("MODEL_PRICE_CACHE_TTL", "60"))
+except Exception:
+    MODEL_PRICE_CACHE_TTL = 60
+
+# Seconds the filters resolved for a model stay cached: which filters are
+# active, their loaded modules, admin valves and the valves of each user.
+# Saving any function or user valves clears the cache of this instance; a
+# filter enabled, edited or reconfigured through another instance runs with
+# its old code and valves for at most this long.
+try:
+    FILTER_PIPELINE_CACHE_TTL = int(os.environ.get("FILTER_PIPELINE_CACHE_TTL", "60"))
+except Exception:
+    FILTER_PIPELINE_CACHE_TTL = 60
+
+# Seconds the user valves of tools stay cached. Tools themselves are checked
+# against their version on every request.
+try:
+    TOOL_USER_VALVES_CACHE_TTL = int(os.environ.get("TOOL_USER_VALVES_CACHE_TTL", "60"))
+except Exception:
+    TOOL_USER_VALVES_CACHE_TTL = 60
+
 ####################################
 # REDIS
 ####################################
@@ -394,6 +469,16 @@ try:
 except ValueError:
     REDIS_SOCKET_CONNECT_TIMEOUT = None
 
+# Maximum delay (seconds) before a config change made on another node is seen.
+# Each node keeps a local config snapshot and polls a Redis version counter.
+REDIS_CONFIG_SYNC_INTERVAL = os.environ.get("REDIS_CONFIG_SYNC_INTERVAL", "1")
+try:
+    REDIS_CONFIG_SYNC_INTERVAL = float(REDIS_CONFIG_SYNC_INTERVAL)
+    if REDIS_CONFIG_SYNC_INTERVAL <= 0:
+        REDIS_CONFIG_SYNC_INTERVAL = 1.0
+except ValueError:
+    REDIS_CONFIG_SYNC_INTERVAL = 1.0
+
 ####################################
 # UVICORN WORKERS
 ####################################
@@ -670,6 +755,24 @@ try:
 except ValueError:
     WEBSOCKET_REDIS_LOCK_TIMEOUT = 60
 
+# Seconds a session looked up in the Redis session pool is reused locally (0 = off)
+websocket_session_pool_cache_ttl = os.environ.get(
+    "WEBSOCKET_SESSION_POOL_CACHE_TTL", "0"
+)
+
+try:
+    WEBSOCKET_SESSION_POOL_CACHE_TTL = float(websocket_session_pool_cache_ttl)
+except ValueError:
+    WEBSOCKET_SESSION_POOL_CACHE_TTL = 0.0
+
+# Number of stored Yjs updates after which a document's log is merged into one
+ydoc_compaction_threshold = os.environ.get("YDOC_COMPACTION_THRESHOLD", "200")
+
+try:
+    YDOC_COMPACTION_THRESHOLD = int(ydoc_compaction_threshold)
+except ValueError:
+    YDOC_COMPACTION_THRESHOLD = 200
+
 WEBSOCKET_SENTINEL_HOSTS = os.environ.get("WEBSOCKET_SENTINEL_HOSTS", "")
 WEBSOCKET_SENTINEL_PORT = os.environ.get("WEBSOCKET_SENTINEL_PORT", "26379")
 WEBSOCKET_SERVER_LOGGING = (
@@ -690,6 +793,16 @@ try:
 except ValueError:
     WEBSOCKET_SERVER_PING_INTERVAL = 25
 
+# Chat completion events of the same message emitted within this window (ms)
+# are sent as a single socket frame. 0 emits every event immediately.
+WEBSOCKET_EVENT_COALESCE_WINDOW_MS = os.environ.get(
+    "WEBSOCKET_EVENT_COALESCE_WINDOW_MS", "0"
+)
+try:
+    WEBSOCKET_EVENT_COALESCE_WINDOW_MS = int(WEBSOCKET_EVENT_COALESCE_WINDOW_MS)
+except ValueError:
+    WEBSOCKET_EVENT_COALESCE_WINDOW_MS = 0
+
 
 REQUESTS_VERIFY = os.environ.get("REQUESTS_VERIFY", "True").lower() == "true"
 
@@ -741,6 +854,66 @@ AIOHTTP_CLIENT_SESSION_TOOL_SERVER_SSL = (
     os.environ.get("AIOHTTP_CLIENT_SESSION_TOOL_SERVER_SSL", "True").lower() == "true"
 )
 
+# Cached OpenAPI tool server specs: seconds a spec is used before it is
+# revalidated with the server, and up to which age a stale spec is still
+# served while it is revalidated in the background (0 to wait instead)
+try:
+    TOOL_SERVER_SPEC_CACHE_TTL = int(
+        os.environ.get("TOOL_SERVER_SPEC_CACHE_TTL", "300")
+    )
+except ValueError:
+    TOOL_SERVER_SPEC_CACHE_TTL = 300
+
+try:
+    TOOL_SERVER_SPEC_STALE_TTL = int(
+        os.environ.get("TOOL_SERVER_SPEC_STALE_TTL", "3600")
+    )
+except ValueError:
+    TOOL_SERVER_SPEC_STALE_TTL = 3600
+
+# Shared client sessions to model providers: most concurrent connections per
+# upstream host (0 for no limit), seconds an idle connection is kept and DNS
+# results cached. With a limit, requests beyond it wait for a free connection
+# and the wait counts against AIOHTTP_CLIENT_TIMEOUT.
+try:
+    AIOHTTP_CLIENT_POOL_SIZE = int(os.environ.get("AIOHTTP_CLIENT_POOL_SIZE", "0"))
+except ValueError:
+    AIOHTTP_CLIENT_POOL_SIZE = 0
+
+try:
+    AIOHTTP_CLIENT_KEEPALIVE_TIMEOUT = float(
+        os.environ.get("AIOHTTP_CLIENT_KEEPALIVE_TIMEOUT", "30")
+    )
+except ValueError:
+    AIOHTTP_CLIENT_KEEPALIVE_TIMEOUT = 30.0
+
+try:
+    AIOHTTP_CLIENT_DNS_CACHE_TTL = int(
+        os.environ.get("AIOHTTP_CLIENT_DNS_CACHE_TTL", "300")
+    )
+except ValueError:
+    AIOHTTP_CLIENT_DNS_CACHE_TTL = 300
+
+# Pooled MCP server sessions: seconds an unused session is kept open, between
+# pings of idle sessions and tool lists are cached (unless the server
+# notifies changes)
+try:
+    MCP_SESSION_IDLE_TIMEOUT = int(os.environ.get("MCP_SESSION_IDLE_TIMEOUT", "600"))
+except ValueError:
+    MCP_SESSION_IDLE_TIMEOUT = 600
+
+try:
+    MCP_SESSION_KEEPALIVE_INTERVAL = int(
+        os.environ.get("MCP_SESSION_KEEPALIVE_INTERVAL", "60")
+    )
+except ValueError:
+    MCP_SESSION_KEEPALIVE_INTERVAL = 60
+
+try:
+    MCP_TOOL_SPECS_CACHE_TTL = int(os.environ.get("MCP_TOOL_SPECS_CACHE_TTL", "300"))
+except ValueError:
+    MCP_TOOL_SPECS_CACHE_TTL = 300
+
 
 ####################################
 # SENTENCE TRANSFORMERS
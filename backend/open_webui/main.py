@@ -55,9 +55,10 @@ from starsessions import (
 )
 from starsessions.stores.redis import RedisStore
 
-from open_webui.models.credits import Credits
+from open_webui.models.credits import CreditBalances, CreditLogQueue, Credits
 from open_webui.utils import logger
 from open_webui.utils.audit import AuditLevel, AuditLoggingMiddleware
+from open_webui.utils.credit.image import prefetch_image_sizes
 from open_webui.utils.credit.utils import is_free_request, check_credit_by_user_id
 from open_webui.utils.logger import start_logger
 from open_webui.socket.main import (
@@ -495,6 +496,7 @@ from open_webui.env import (
     REDIS_URL,
     REDIS_CLUSTER,
     REDIS_KEY_PREFIX,
+    REDIS_CONFIG_SYNC_INTERVAL,
     REDIS_SENTINEL_HOSTS,
     REDIS_SENTINEL_PORT,
     GLOBAL_LOG_LEVEL,
@@ -524,6 +526,7 @@ from open_webui.env import (
     AIOHTTP_CLIENT_SESSION_SSL,
     ENABLE_STAR_SESSIONS_MIDDLEWARE,
     ENABLE_PUBLIC_ACTIVE_USERS_COUNT,
+    ENABLE_REALTIME_CHAT_SAVE,
     # Admin Account Runtime Creation
     WEBUI_ADMIN_EMAIL,
     WEBUI_ADMIN_PASSWORD,
@@ -545,6 +548,7 @@ from open_webui.utils.chat import (
 from open_webui.utils.embeddings import generate_embeddings
 from open_webui.utils.lazy_loader import LazyStateProxy
 from open_webui.utils.middleware import process_chat_payload, process_chat_response
+from open_webui.utils.chat_buffer import ChatMessageBuffer
 from open_webui.utils.access_control import has_access
 
 from open_webui.utils.auth import (
@@ -566,6 +570,10 @@ from open_webui.utils.oauth import (
 )
 from open_webui.utils.security_headers import SecurityHeadersMiddleware
 from open_webui.utils.redis import get_redis_connection
+from open_webui.utils.file_status import FileStatusEvents
+from open_webui.utils.client_sessions import ClientSessions
+from open_webui.utils.mcp.pool import MCPSessions
+from open_webui.utils.tools import ToolServerSpecs
 
 from open_webui.tasks import (
     redis_task_command_listener,
@@ -662,12 +670,30 @@ async def lifespan(app: FastAPI):
             redis_task_command_listener(app)
         )
 
+    file_status_listener = FileStatusEvents.start(app.state.redis)
+    if file_status_listener is not None:
+        app.state.file_status_listener = file_status_listener
+
     if THREAD_POOL_SIZE and THREAD_POOL_SIZE > 0:
         limiter = anyio.to_thread.current_default_thread_limiter()
         limiter.total_tokens = THREAD_POOL_SIZE
 
     asyncio.create_task(periodic_usage_pool_cleanup())
 
+    if ENABLE_REALTIME_CHAT_SAVE:
+        app.state.chat_message_flush_task = asyncio.create_task(
+            ChatMessageBuffer.periodic_flush()
+        )
+
+    if CreditLogQueue.enabled:
+        app.state.credit_log_flush_task = asyncio.create_task(
+            CreditLogQueue.periodic_flush()
+        )
+
+    app.state.tool_server_refresh_task = asyncio.create_task(
+        ToolServerSpecs.periodic_refresh()
+    )
+
     # Removed: Startup model detection
     # Models will be fetched on-demand when user accesses the model list
     # This improves startup time and avoids connection errors for unavailable endpoints
@@ -679,6 +705,24 @@ async def lifespan(app: FastAPI):
     if hasattr(app.state, "redis_task_command_listener"):
         app.state.redis_task_command_listener.cancel()
 
+    if hasattr(app.state, "file_status_listener"):
+        app.state.file_status_listener.cancel()
+
+    if hasattr(app.state, "chat_message_flush_task"):
+        app.state.chat_message_flush_task.cancel()
+        ChatMessageBuffer.flush_all()
+
+    if hasattr(app.state, "credit_log_flush_task"):
+        app.state.credit_log_flush_task.cancel()
+        CreditLogQueue.flush()
+
+    if hasattr(app.state, "tool_server_refresh_task"):
+        app.state.tool_server_refresh_task.cancel()
+
+    # Connections to model providers and MCP servers, opened on first use
+    await ClientSessions.close()
+    await MCPSessions.close()
+
 
 app = FastAPI(
     title="Open WebUI",
@@ -702,6 +746,7 @@ app.state.config = AppConfig(
     redis_sentinels=get_sentinels_from_env(REDIS_SENTINEL_HOSTS, REDIS_SENTINEL_PORT),
     redis_cluster=REDIS_CLUSTER,
     redis_key_prefix=REDIS_KEY_PREFIX,
+    redis_sync_interval=REDIS_CONFIG_SYNC_INTERVAL,
 )
 app.state.redis = None
 
@@ -890,10 +935,10 @@ app.state.EXTERNAL_PWA_MANIFEST_URL = EXTERNAL_PWA_MANIFEST_URL
 app.state.USER_COUNT = None
 
 app.state.TOOLS = {}
-app.state.TOOL_CONTENTS = {}
+app.state.TOOL_VERSIONS = {}
 
 app.state.FUNCTIONS = {}
-app.state.FUNCTION_CONTENTS = {}
+app.state.FUNCTION_VERSIONS = {}
 
 ########################################
 #
@@ -1680,7 +1725,12 @@ async def chat_completion(
     form_data: dict,
     user=Depends(get_verified_user),
 ):
-    check_credit_by_user_id(user_id=user.id, form_data=form_data)
+    credit_reservation_id = check_credit_by_user_id(
+        user_id=user.id, form_data=form_data
+    )
+    if credit_reservation_id:
+        # Billed request: read the image sizes off the request path
+        prefetch_image_sizes(form_data.get("messages"))
 
     log.info(f"[DEBUG] chat_completion called, original stream={form_data.get('stream')}")
     # Debug: Log reasoning_effort from frontend
@@ -1773,6 +1823,7 @@ async def chat_completion(
             "variables": form_data.get("variables", {}),
             "model": model,
             "direct": model_item.get("direct", False),
+            "credit_reservation_id": credit_reservation_id,
             "params": {
                 "stream_delta_chunk_size": stream_delta_chunk_size,
                 "reasoning_tags": reasoning_tags,
@@ -1824,6 +1875,7 @@ async def chat_completion(
 
     except Exception as e:
         log.debug(f"Error processing chat metadata: {e}")
+        CreditBalances.settle(user.id, credit_reservation_id)
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail=str(e),
@@ -1862,6 +1914,7 @@ async def chat_completion(
             )
         except asyncio.CancelledError:
             log.info("Chat processing was cancelled")
+            CreditBalances.settle(user.id, credit_reservation_id)
             try:
                 event_emitter = get_event_emitter(metadata)
                 await asyncio.shield(
@@ -1875,6 +1928,7 @@ async def chat_completion(
                 raise  # re-raise to ensure proper task cancellation handling
         except Exception as e:
             log.error(f"[DEBUG PROCESS_CHAT] Error processing chat payload: {e}", exc_info=True)
+            CreditBalances.settle(user.id, credit_reservation_id)
             if metadata.get("chat_id") and metadata.get("message_id"):
                 # Update the chat message with the error
                 try:
@@ -2251,7 +2305,7 @@ async def get_current_usage(user=Depends(get_verified_user)):
             )
 
         return {
-            "model_ids": get_models_in_use(),
+            "model_ids": await get_models_in_use(),
             "user_count": Users.get_active_user_count(),
         }
     except HTTPException:
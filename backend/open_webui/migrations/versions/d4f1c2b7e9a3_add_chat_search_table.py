@@ -0,0 +1,178 @@
+"""Add chat_search table
+
+Revision ID: d4f1c2b7e9a3
+Revises: a1b2c3d4e5f6
+Create Date: 2026-10-18 10:12:41.118203
+
+"""
+
+import json
+import logging
+import time
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+from open_webui.migrations.util import get_existing_tables
+
+log = logging.getLogger(__name__)
+
+# revision identifiers, used by Alembic.
+revision: str = "d4f1c2b7e9a3"
+down_revision: Union[str, None] = "a1b2c3d4e5f6"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+BATCH_SIZE = 500
+
+SQLITE_FTS_TRIGGERS = [
+    """
+    CREATE TRIGGER IF NOT EXISTS chat_search_ai AFTER INSERT ON chat_search BEGIN
+        INSERT INTO chat_search_fts(rowid, content) VALUES (new.id, new.content);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS chat_search_ad AFTER DELETE ON chat_search BEGIN
+        INSERT INTO chat_search_fts(chat_search_fts, rowid, content)
+        VALUES ('delete', old.id, old.content);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS chat_search_au AFTER UPDATE OF content ON chat_search BEGIN
+        INSERT INTO chat_search_fts(chat_search_fts, rowid, content)
+        VALUES ('delete', old.id, old.content);
+        INSERT INTO chat_search_fts(rowid, content) VALUES (new.id, new.content);
+    END
+    """,
+]
+
+
+def get_search_content(title, chat) -> str:
+    # Same text as open_webui.models.chats.get_chat_search_content
+    if isinstance(chat, str):
+        try:
+            chat = json.loads(chat)
+        except Exception:
+            chat = {}
+    if not isinstance(chat, dict):
+        chat = {}
+
+    messages = (chat.get("history") or {}).get("messages") or {}
+    messages = list(messages.values()) if messages else chat.get("messages") or []
+
+    parts = [title or ""]
+    for message in messages:
+        if isinstance(message, dict) and isinstance(message.get("content"), str):
+            parts.append(message["content"])
+    return "\n".join(parts).replace("\x00", "").lower()
+
+
+def upgrade() -> None:
+    if "chat_search" not in get_existing_tables():
+        op.create_table(
+            "chat_search",
+            sa.Column("id", sa.Integer(), primary_key=True, autoincrement=True),
+            sa.Column("chat_id", sa.Text(), nullable=False, unique=True),
+            sa.Column("user_id", sa.Text(), nullable=False),
+            sa.Column("content", sa.Text(), nullable=False),
+            sa.Column("updated_at", sa.BigInteger(), nullable=False),
+            sa.Index("ix_chat_search_user_id", "user_id"),
+        )
+
+    connection = op.get_bind()
+    dialect_name = connection.dialect.name
+
+    # Backfill from the existing chats
+    chat_table = sa.Table(
+        "chat",
+        sa.MetaData(),
+        sa.Column("id", sa.Text()),
+        sa.Column("user_id", sa.Text()),
+        sa.Column("title", sa.Text()),
+        sa.Column("chat", sa.JSON()),
+    )
+    chat_search_table = sa.Table(
+        "chat_search",
+        sa.MetaData(),
+        sa.Column("chat_id", sa.Text()),
+        sa.Column("user_id", sa.Text()),
+        sa.Column("content", sa.Text()),
+        sa.Column("updated_at", sa.BigInteger()),
+    )
+
+    now = int(time.time())
+    last_id = ""
+    while True:
+        rows = connection.execute(
+            sa.select(
+                chat_table.c.id,
+                chat_table.c.user_id,
+                chat_table.c.title,
+                chat_table.c.chat,
+            )
+            .where(chat_table.c.id > last_id)
+            .where(chat_table.c.id.not_in(sa.select(chat_search_table.c.chat_id)))
+            .order_by(chat_table.c.id)
+            .limit(BATCH_SIZE)
+        ).fetchall()
+        if not rows:
+            break
+
+        connection.execute(
+            chat_search_table.insert(),
+            [
+                {
+                    "chat_id": id,
+                    "user_id": user_id,
+                    "content": get_search_content(title, chat),
+                    "updated_at": now,
+                }
+                for id, user_id, title, chat in rows
+            ],
+        )
+        last_id = rows[-1][0]
+
+    if dialect_name == "sqlite":
+        # External content FTS5 index with the trigram tokenizer (SQLite 3.34+),
+        # which answers substring queries like the LIKE scans it replaces.
+        try:
+            connection.execute(
+                sa.text(
+                    "CREATE VIRTUAL TABLE IF NOT EXISTS chat_search_fts USING fts5("
+                    "content, content='chat_search', content_rowid='id', "
+                    "tokenize='trigram')"
+                )
+            )
+        except Exception as e:
+            log.warning(f"FTS5 trigram index unavailable, chat search will scan: {e}")
+            return
+
+        for trigger in SQLITE_FTS_TRIGGERS:
+            connection.execute(sa.text(trigger))
+        connection.execute(
+            sa.text("INSERT INTO chat_search_fts(chat_search_fts) VALUES ('rebuild')")
+        )
+
+    elif dialect_name == "postgresql":
+        try:
+            with connection.begin_nested():
+                connection.execute(sa.text("CREATE EXTENSION IF NOT EXISTS pg_trgm"))
+                connection.execute(
+                    sa.text(
+                        "CREATE INDEX IF NOT EXISTS ix_chat_search_content_trgm "
+                        "ON chat_search USING gin (content gin_trgm_ops)"
+                    )
+                )
+        except Exception as e:
+            log.warning(f"pg_trgm unavailable, chat search will scan: {e}")
+
+
+def downgrade() -> None:
+    connection = op.get_bind()
+    if connection.dialect.name == "sqlite":
+        for name in ["chat_search_ai", "chat_search_ad", "chat_search_au"]:
+            connection.execute(sa.text(f"DROP TRIGGER IF EXISTS {name}"))
+        connection.execute(sa.text("DROP TABLE IF EXISTS chat_search_fts"))
+
+    op.drop_table("chat_search")
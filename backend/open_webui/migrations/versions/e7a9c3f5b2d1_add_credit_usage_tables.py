@@ -0,0 +1,142 @@
+"""Add credit usage rollup tables
+
+Revision ID: e7a9c3f5b2d1
+Revises: d4f1c2b7e9a3
+Create Date: 2026-10-18 14:36:08.502917
+
+"""
+
+import json
+from decimal import Decimal
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+from open_webui.migrations.util import get_existing_tables
+
+# revision identifiers, used by Alembic.
+revision: str = "e7a9c3f5b2d1"
+down_revision: Union[str, None] = "d4f1c2b7e9a3"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+BATCH_SIZE = 1000
+
+TABLES = [("credit_usage_hourly", 3600), ("credit_usage_daily", 86400)]
+
+
+def get_usage(detail):
+    # Same as open_webui.models.credits.get_credit_log_usage
+    if isinstance(detail, str):
+        try:
+            detail = json.loads(detail)
+        except Exception:
+            return None
+    if not isinstance(detail, dict):
+        return None
+    usage = detail.get("usage") or {}
+    if usage.get("total_price") is None:
+        return None
+    model = (detail.get("api_params") or {}).get("model")
+    if not model:
+        return None
+    return (
+        (model.get("id") if isinstance(model, dict) else None) or "",
+        int(usage.get("prompt_tokens") or 0),
+        int(usage.get("completion_tokens") or 0),
+        int(usage.get("total_tokens") or 0),
+        Decimal(str(usage["total_price"])),
+    )
+
+
+def upgrade() -> None:
+    existing_tables = get_existing_tables()
+    for name, _ in TABLES:
+        if name in existing_tables:
+            continue
+        op.create_table(
+            name,
+            sa.Column("bucket", sa.BigInteger(), primary_key=True),
+            sa.Column("user_id", sa.String(), primary_key=True),
+            sa.Column("model_id", sa.String(), primary_key=True),
+            sa.Column("prompt_tokens", sa.BigInteger(), nullable=False),
+            sa.Column("completion_tokens", sa.BigInteger(), nullable=False),
+            sa.Column("total_tokens", sa.BigInteger(), nullable=False),
+            sa.Column("cost", sa.Numeric(precision=24, scale=12), nullable=False),
+            sa.Column("request_count", sa.BigInteger(), nullable=False),
+        )
+
+    # Backfill from the existing credit logs
+    connection = op.get_bind()
+    credit_log_table = sa.Table(
+        "credit_log",
+        sa.MetaData(),
+        sa.Column("id", sa.String()),
+        sa.Column("user_id", sa.String()),
+        sa.Column("created_at", sa.BigInteger()),
+        sa.Column("detail", sa.JSON()),
+    )
+
+    totals = {name: {} for name, _ in TABLES}
+    last_id = ""
+    while True:
+        rows = connection.execute(
+            sa.select(
+                credit_log_table.c.id,
+                credit_log_table.c.user_id,
+                credit_log_table.c.created_at,
+                credit_log_table.c.detail,
+            )
+            .where(credit_log_table.c.id > last_id)
+            .order_by(credit_log_table.c.id)
+            .limit(BATCH_SIZE)
+        ).fetchall()
+        if not rows:
+            break
+
+        for _, user_id, created_at, detail in rows:
+            usage = get_usage(detail)
+            if usage is None or created_at is None:
+                continue
+            model_id, *values = usage
+            for name, size in TABLES:
+                key = (created_at // size * size, user_id, model_id)
+                total = totals[name].setdefault(key, [0, 0, 0, Decimal(0), 0])
+                for i, value in enumerate([*values, 1]):
+                    total[i] += value
+        last_id = rows[-1][0]
+
+    for name, _ in TABLES:
+        table = sa.Table(
+            name,
+            sa.MetaData(),
+            sa.Column("bucket", sa.BigInteger()),
+            sa.Column("user_id", sa.String()),
+            sa.Column("model_id", sa.String()),
+            sa.Column("prompt_tokens", sa.BigInteger()),
+            sa.Column("completion_tokens", sa.BigInteger()),
+            sa.Column("total_tokens", sa.BigInteger()),
+            sa.Column("cost", sa.Numeric(precision=24, scale=12)),
+            sa.Column("request_count", sa.BigInteger()),
+        )
+        rows = [
+            {
+                "bucket": bucket,
+                "user_id": user_id,
+                "model_id": model_id,
+                "prompt_tokens": total[0],
+                "completion_tokens": total[1],
+                "total_tokens": total[2],
+                "cost": total[3],
+                "request_count": total[4],
+            }
+            for (bucket, user_id, model_id), total in totals[name].items()
+        ]
+        for i in range(0, len(rows), BATCH_SIZE):
+            connection.execute(table.insert(), rows[i : i + BATCH_SIZE])
+
+
+def downgrade() -> None:
+    for name, _ in TABLES:
+        op.drop_table(name)
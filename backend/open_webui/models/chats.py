@@ -16,15 +16,15 @@ from sqlalchemy import (
     Boolean,
     Column,
     ForeignKey,
+    Integer,
     String,
     Text,
     JSON,
     Index,
     UniqueConstraint,
 )
-from sqlalchemy import or_, func, select, and_, text
+from sqlalchemy import or_, func, select, and_, text, table, literal_column
 from sqlalchemy.sql import exists
-from sqlalchemy.sql.expression import bindparam
 
 ####################
 # Chat DB Schema
@@ -66,6 +66,34 @@ class Chat(Base):
     )
 
 
+class ChatSearch(Base):
+    """
+    Lowercased title and message text of a chat, kept in sync on every chat
+    write. SQLite indexes it with an FTS5 trigram table (chat_search_fts,
+    maintained by triggers), PostgreSQL with a pg_trgm GIN index, so that
+    substring searches don't have to parse every chat blob.
+    """
+
+    __tablename__ = "chat_search"
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    chat_id = Column(Text, nullable=False, unique=True)
+    user_id = Column(Text, nullable=False, index=True)
+    content = Column(Text, nullable=False)
+    updated_at = Column(BigInteger, nullable=False)
+
+
+def get_chat_search_content(title: Optional[str], chat: dict) -> str:
+    messages = (chat.get("history") or {}).get("messages") or {}
+    messages = list(messages.values()) if messages else chat.get("messages") or []
+
+    parts = [title or ""]
+    for message in messages:
+        if isinstance(message, dict) and isinstance(message.get("content"), str):
+            parts.append(message["content"])
+    return sanitize_text_for_db("\n".join(parts)).lower()
+
+
 class ChatModel(BaseModel):
     model_config = ConfigDict(from_attributes=True)
 
@@ -254,6 +282,78 @@ class ChatStatsExport(BaseModel):
 
 
 class ChatTable:
+    _has_search_fts: Optional[bool] = None
+
+    def _index_chat(self, db: Session, chat: Chat) -> None:
+        """Add or refresh the search index entry of `chat` in the current transaction."""
+        content = get_chat_search_content(chat.title, chat.chat or {})
+        entry = db.query(ChatSearch).filter_by(chat_id=chat.id).first()
+        if entry is None:
+            db.add(
+                ChatSearch(
+                    chat_id=chat.id,
+                    user_id=chat.user_id,
+                    content=content,
+                    updated_at=int(time.time()),
+                )
+            )
+        elif entry.content != content:
+            # Unchanged text (status, metadata updates) leaves the index alone
+            entry.content = content
+            entry.updated_at = int(time.time())
+
+    def _uses_search_fts(self, db: Session) -> bool:
+        if ChatTable._has_search_fts is None:
+            ChatTable._has_search_fts = db.bind.dialect.name == "sqlite" and bool(
+                db.execute(
+                    text(
+                        "SELECT 1 FROM sqlite_master "
+                        "WHERE type = 'table' AND name = 'chat_search_fts'"
+                    )
+                ).first()
+            )
+        return ChatTable._has_search_fts
+
+    def reindex_chats(self, batch_size: int = 500) -> int:
+        """Rebuild the search index of all chats, returns the number of chats indexed."""
+        count = 0
+        last_id = ""
+        with get_db_context() as db:
+            db.query(ChatSearch).delete()
+            db.commit()
+
+            while True:
+                chats = (
+                    db.query(Chat)
+                    .filter(Chat.id > last_id)
+                    .order_by(Chat.id)
+                    .limit(batch_size)
+                    .all()
+                )
+                if not chats:
+                    break
+
+                now = int(time.time())
+                db.add_all(
+                    [
+                        ChatSearch(
+                            chat_id=chat.id,
+                            user_id=chat.user_id,
+                            content=get_chat_search_content(
+                                chat.title, chat.chat or {}
+                            ),
+                            updated_at=now,
+                        )
+                        for chat in chats
+                    ]
+                )
+                db.commit()
+                db.expunge_all()
+
+                count += len(chats)
+                last_id = chats[-1].id
+        return count
+
     def _clean_null_bytes(self, obj):
         """Recursively remove null bytes from strings in dict/list structures."""
         return sanitize_data_for_db(obj)
@@ -304,6 +404,7 @@ class ChatTable:
 
             chat_item = Chat(**chat.model_dump())
             db.add(chat_item)
+            self._index_chat(db, chat_item)
             db.commit()
             db.refresh(chat_item)
             return ChatModel.model_validate(chat_item) if chat_item else None
@@ -347,6 +448,18 @@ class ChatTable:
                 chats.append(Chat(**chat.model_dump()))
 
             db.add_all(chats)
+            now = int(time.time())
+            db.add_all(
+                [
+                    ChatSearch(
+                        chat_id=chat.id,
+                        user_id=chat.user_id,
+                        content=get_chat_search_content(chat.title, chat.chat),
+                        updated_at=now,
+                    )
+                    for chat in chats
+                ]
+            )
             db.commit()
             return [ChatModel.model_validate(chat) for chat in chats]
 
@@ -364,6 +477,7 @@ class ChatTable:
                 )
 
                 chat_item.updated_at = int(time.time())
+                self._index_chat(db, chat_item)
 
                 db.commit()
                 db.refresh(chat_item)
@@ -428,26 +542,36 @@ class ChatTable:
     def upsert_message_to_chat_by_id_and_message_id(
         self, id: str, message_id: str, message: dict
     ) -> Optional[ChatModel]:
+        return self.upsert_messages_to_chat_by_id(id, {message_id: message})
+
+    def upsert_messages_to_chat_by_id(
+        self, id: str, messages: dict[str, dict]
+    ) -> Optional[ChatModel]:
+        """
+        Merge several message updates into a chat with a single read and write.
+        The last message in `messages` becomes the chat's current message.
+        """
         chat = self.get_chat_by_id(id)
         if chat is None:
             return None
 
-        # Sanitize message content for null characters before upserting
-        if isinstance(message.get("content"), str):
-            message["content"] = sanitize_text_for_db(message["content"])
-
         chat = chat.chat
         history = chat.get("history", {})
 
-        if message_id in history.get("messages", {}):
-            history["messages"][message_id] = {
-                **history["messages"][message_id],
-                **message,
-            }
-        else:
-            history["messages"][message_id] = message
+        for message_id, message in messages.items():
+            # Sanitize message content for null characters before upserting
+            if isinstance(message.get("content"), str):
+                message["content"] = sanitize_text_for_db(message["content"])
+
+            if message_id in history.get("messages", {}):
+                history["messages"][message_id] = {
+                    **history["messages"][message_id],
+                    **message,
+                }
+            else:
+                history["messages"][message_id] = message
 
-        history["currentId"] = message_id
+            history["currentId"] = message_id
 
         chat["history"] = history
         return self.update_chat_by_id(id, chat)
@@ -900,6 +1024,25 @@ class ChatTable:
             )
             return [ChatModel.model_validate(chat) for chat in all_chats]
 
+    def _get_chat_ids_by_search_text(self, db: Session, user_id: str, search_text: str):
+        """Subquery of the ids of the user's chats whose title or messages contain `search_text`."""
+        query = select(ChatSearch.chat_id).where(ChatSearch.user_id == user_id)
+
+        # Trigrams need at least three characters, shorter terms scan the user's entries
+        if self._uses_search_fts(db) and len(search_text) >= 3:
+            # A quoted phrase of trigrams matches the text as a substring
+            match = '"' + search_text.replace('"', '""') + '"'
+            return query.where(
+                ChatSearch.id.in_(
+                    select(literal_column("rowid"))
+                    .select_from(table("chat_search_fts"))
+                    .where(text("chat_search_fts MATCH :match").bindparams(match=match))
+                )
+            )
+
+        # pg_trgm indexes LIKE '%...%' on PostgreSQL
+        return query.where(ChatSearch.content.contains(search_text))
+
     def get_chats_by_user_id_and_search_text(
         self,
         user_id: str,
@@ -993,24 +1136,16 @@ class ChatTable:
 
             query = query.order_by(Chat.updated_at.desc())
 
-            # Check if the database dialect is either 'sqlite' or 'postgresql'
-            dialect_name = db.bind.dialect.name
-            if dialect_name == "sqlite":
-                # SQLite case: using JSON1 extension for JSON searching
-                sqlite_content_sql = (
-                    "EXISTS ("
-                    "    SELECT 1 "
-                    "    FROM json_each(Chat.chat, '$.messages') AS message "
-                    "    WHERE LOWER(message.value->>'content') LIKE '%' || :content_key || '%'"
-                    ")"
-                )
-                sqlite_content_clause = text(sqlite_content_sql)
+            if search_text:
                 query = query.filter(
-                    or_(
-                        Chat.title.ilike(bindparam("title_key")), sqlite_content_clause
-                    ).params(title_key=f"%{search_text}%", content_key=search_text)
+                    Chat.id.in_(
+                        self._get_chat_ids_by_search_text(db, user_id, search_text)
+                    )
                 )
 
+            # Check if the database dialect is either 'sqlite' or 'postgresql'
+            dialect_name = db.bind.dialect.name
+            if dialect_name == "sqlite":
                 # Check if there are any tags to filter, it should have all the tags
                 if "none" in tag_ids:
                     query = query.filter(
@@ -1042,33 +1177,6 @@ class ChatTable:
                     )
 
             elif dialect_name == "postgresql":
-                # PostgreSQL doesn't allow null bytes in text. We filter those out by checking
-                # the JSON representation for \u0000 before attempting text extraction
-
-                # Safety filter: JSON field must not contain \u0000
-                query = query.filter(text("Chat.chat::text NOT LIKE '%\\\\u0000%'"))
-
-                # Safety filter: title must not contain actual null bytes
-                query = query.filter(text("Chat.title::text NOT LIKE '%\\x00%'"))
-
-                postgres_content_sql = """
-                EXISTS (
-                    SELECT 1
-                    FROM json_array_elements(Chat.chat->'messages') AS message
-                    WHERE json_typeof(message->'content') = 'string'
-                    AND LOWER(message->>'content') LIKE '%' || :content_key || '%'
-                )
-                """
-
-                postgres_content_clause = text(postgres_content_sql)
-
-                query = query.filter(
-                    or_(
-                        Chat.title.ilike(bindparam("title_key")),
-                        postgres_content_clause,
-                    )
-                ).params(title_key=f"%{search_text}%", content_key=search_text.lower())
-
                 # Check if there are any tags to filter, it should have all the tags
                 if "none" in tag_ids:
                     query = query.filter(
@@ -1319,6 +1427,7 @@ class ChatTable:
     def delete_chat_by_id(self, id: str, db: Optional[Session] = None) -> bool:
         try:
             with get_db_context(db) as db:
+                db.query(ChatSearch).filter_by(chat_id=id).delete()
                 db.query(Chat).filter_by(id=id).delete()
                 db.commit()
 
@@ -1331,6 +1440,7 @@ class ChatTable:
     ) -> bool:
         try:
             with get_db_context(db) as db:
+                db.query(ChatSearch).filter_by(chat_id=id, user_id=user_id).delete()
                 db.query(Chat).filter_by(id=id, user_id=user_id).delete()
                 db.commit()
 
@@ -1345,6 +1455,7 @@ class ChatTable:
             with get_db_context(db) as db:
                 self.delete_shared_chats_by_user_id(user_id, db=db)
 
+                db.query(ChatSearch).filter_by(user_id=user_id).delete()
                 db.query(Chat).filter_by(user_id=user_id).delete()
                 db.commit()
 
@@ -1357,6 +1468,13 @@ class ChatTable:
     ) -> bool:
         try:
             with get_db_context(db) as db:
+                db.query(ChatSearch).filter(
+                    ChatSearch.chat_id.in_(
+                        select(Chat.id).where(
+                            Chat.user_id == user_id, Chat.folder_id == folder_id
+                        )
+                    )
+                ).delete(synchronize_session=False)
                 db.query(Chat).filter_by(user_id=user_id, folder_id=folder_id).delete()
                 db.commit()
 
@@ -1,13 +1,35 @@
+import asyncio
+import atexit
+import logging
+import threading
 import time
 import uuid
+from contextlib import contextmanager
 from decimal import Decimal
 from typing import List, Optional, Tuple
 
 from fastapi import HTTPException
 from pydantic import BaseModel, ConfigDict, Field
-from sqlalchemy import JSON, BigInteger, Column, Numeric, String, or_
+from sqlalchemy import (
+    JSON,
+    BigInteger,
+    Column,
+    Numeric,
+    String,
+    func,
+    or_,
+    select,
+    update,
+)
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
 
 from open_webui.env import (
+    CREDIT_LOG_FLUSH_INTERVAL,
+    CREDIT_LOG_FLUSH_SIZE,
+    CREDIT_BALANCE_CACHE_TTL,
+    CREDIT_RESERVATION_TTL,
+    REDIS_KEY_PREFIX,
     REDIS_URL,
     REDIS_SENTINEL_HOSTS,
     REDIS_SENTINEL_PORT,
@@ -16,6 +38,8 @@ from open_webui.env import (
 from open_webui.internal.db import Base, get_db
 from open_webui.utils.redis import get_redis_connection, get_sentinels_from_env
 
+log = logging.getLogger(__name__)
+
 
 ####################
 # User Credit DB Schema
@@ -68,6 +92,32 @@ class RedemptionCode(Base):
     received_at = Column(BigInteger, index=True, nullable=True)
 
 
+class CreditUsageHourly(Base):
+    __tablename__ = "credit_usage_hourly"
+
+    bucket = Column(BigInteger, primary_key=True)
+    user_id = Column(String, primary_key=True)
+    model_id = Column(String, primary_key=True)
+    prompt_tokens = Column(BigInteger, nullable=False, default=0)
+    completion_tokens = Column(BigInteger, nullable=False, default=0)
+    total_tokens = Column(BigInteger, nullable=False, default=0)
+    cost = Column(Numeric(precision=24, scale=12), nullable=False, default=0)
+    request_count = Column(BigInteger, nullable=False, default=0)
+
+
+class CreditUsageDaily(Base):
+    __tablename__ = "credit_usage_daily"
+
+    bucket = Column(BigInteger, primary_key=True)
+    user_id = Column(String, primary_key=True)
+    model_id = Column(String, primary_key=True)
+    prompt_tokens = Column(BigInteger, nullable=False, default=0)
+    completion_tokens = Column(BigInteger, nullable=False, default=0)
+    total_tokens = Column(BigInteger, nullable=False, default=0)
+    cost = Column(Numeric(precision=24, scale=12), nullable=False, default=0)
+    request_count = Column(BigInteger, nullable=False, default=0)
+
+
 ####################
 # Forms
 ####################
@@ -146,6 +196,17 @@ class SetCreditForm(BaseModel):
     detail: SetCreditFormDetail
 
 
+class CreditUsageModel(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+    user_id: str
+    model_id: str
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+    total_tokens: int = 0
+    cost: Decimal = Field(default_factory=lambda: Decimal("0"))
+    request_count: int = 0
+
+
 class TradeTicketModel(BaseModel):
     model_config = ConfigDict(from_attributes=True)
     id: str = Field(default_factory=lambda: uuid.uuid4().hex)
@@ -214,45 +275,520 @@ class CreditsTable:
         except Exception:
             return []
 
-    def set_credit_by_user_id(self, form_data: SetCreditForm) -> CreditModel:
-        credit_model = self.init_credit_by_user_id(user_id=form_data.user_id)
-        log = CreditLogModel(
-            user_id=form_data.user_id,
-            credit=form_data.credit,
-            detail=form_data.detail.model_dump(),
+    def _update_credit(
+        self, db: Session, user_id: str, values: dict
+    ) -> Optional[CreditModel]:
+        """
+        Update the credit row of a user and return it as updated, in the
+        transaction of `db`. Returns None if the user has no credit row.
+        """
+        statement = (
+            update(Credit)
+            .where(Credit.user_id == user_id)
+            .values(**values)
+            .execution_options(synchronize_session=False)
         )
-        with get_db() as db:
-            db.add(CreditLog(**log.model_dump()))
-            db.query(Credit).filter(Credit.user_id == credit_model.user_id).update(
-                {"credit": form_data.credit, "updated_at": int(time.time())},
-                synchronize_session=False,
-            )
-            db.commit()
-        return self.get_credit_by_user_id(user_id=form_data.user_id)
+        columns = [
+            Credit.id,
+            Credit.user_id,
+            Credit.credit,
+            Credit.updated_at,
+            Credit.created_at,
+        ]
+        if db.bind.dialect.update_returning:
+            row = db.execute(statement.returning(*columns)).first()
+        else:
+            # The updated row stays locked until the transaction ends
+            row = None
+            if db.execute(statement).rowcount:
+                row = db.execute(
+                    select(*columns).where(Credit.user_id == user_id)
+                ).first()
+        return CreditModel.model_validate(dict(row._mapping)) if row else None
+
+    def _apply_credit(
+        self, db: Session, user_id: str, values: dict, initial_credit
+    ) -> CreditModel:
+        """Update a user's credit, creating the row with `initial_credit` if missing."""
+        credit_model = self._update_credit(db, user_id, values)
+        if credit_model is not None:
+            return credit_model
+
+        credit_model = CreditModel(user_id=user_id, credit=initial_credit)
+        try:
+            with db.begin_nested():
+                db.add(Credit(**credit_model.model_dump()))
+            return credit_model
+        except IntegrityError:
+            # Created by a concurrent request in the meantime
+            return self._update_credit(db, user_id, values)
+
+    def set_credit_by_user_id(self, form_data: SetCreditForm) -> CreditModel:
+        with CreditBalances.writing(form_data.user_id):
+            with get_db() as db:
+                credit_model = self._apply_credit(
+                    db,
+                    form_data.user_id,
+                    {"credit": form_data.credit, "updated_at": int(time.time())},
+                    initial_credit=form_data.credit,
+                )
+                log_model = CreditLogModel(
+                    user_id=form_data.user_id,
+                    credit=credit_model.credit,
+                    detail=form_data.detail.model_dump(),
+                )
+                db.add(CreditLog(**log_model.model_dump()))
+                db.commit()
+            CreditBalances.set(form_data.user_id, credit_model.credit)
+        return credit_model
 
     def add_credit_by_user_id(self, form_data: AddCreditForm) -> Optional[CreditModel]:
-        credit_model = self.init_credit_by_user_id(user_id=form_data.user_id)
-        log = CreditLogModel(
-            user_id=form_data.user_id,
-            credit=credit_model.credit + form_data.amount,
-            detail=form_data.detail.model_dump(),
-        )
-        with get_db() as db:
-            db.add(CreditLog(**log.model_dump()))
-            db.query(Credit).filter(Credit.user_id == form_data.user_id).update(
-                {
-                    "credit": Credit.credit + form_data.amount,
-                    "updated_at": int(time.time()),
-                },
-                synchronize_session=False,
-            )
-            db.commit()
-        return self.get_credit_by_user_id(form_data.user_id)
+        """
+        Add `amount` to a user's balance with a single UPDATE ... RETURNING and
+        record the resulting balance in credit_log and its usage in the
+        CreditUsage rollups, in one transaction (or through CreditLogQueue when
+        CREDIT_LOG_FLUSH_INTERVAL is set). The
+        change is written through to CreditBalances.
+        """
+        from open_webui.config import CREDIT_DEFAULT_CREDIT
+
+        with CreditBalances.writing(form_data.user_id):
+            with get_db() as db:
+                credit_model = self._apply_credit(
+                    db,
+                    form_data.user_id,
+                    {
+                        "credit": Credit.credit + form_data.amount,
+                        "updated_at": int(time.time()),
+                    },
+                    initial_credit=Decimal(CREDIT_DEFAULT_CREDIT.value)
+                    + form_data.amount,
+                )
+                log_model = CreditLogModel(
+                    user_id=form_data.user_id,
+                    credit=credit_model.credit,
+                    detail=form_data.detail.model_dump(),
+                )
+                if not CreditLogQueue.enabled:
+                    db.add(CreditLog(**log_model.model_dump()))
+                    CreditUsage.add_logs(db, [log_model])
+                db.commit()
+            CreditBalances.add(form_data.user_id, form_data.amount)
+
+        if CreditLogQueue.enabled:
+            CreditLogQueue.add(log_model)
+        return credit_model
 
 
 Credits = CreditsTable()
 
 
+class CreditLogWriteQueue:
+    """
+    Batches credit_log inserts across requests. Entries are written once the
+    oldest one has waited `flush_interval` seconds or `flush_size` entries are
+    queued; a failed write keeps them for the next attempt. Balances are not
+    affected, they are updated before an entry is queued.
+    """
+
+    def __init__(self, flush_interval: float, flush_size: int):
+        self.flush_interval = flush_interval
+        self.flush_size = max(flush_size, 1)
+
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._logs: list[CreditLogModel] = []
+        self._oldest: Optional[float] = None
+        self.stats = {"queued": 0, "flushes": 0, "flush_errors": 0, "written": 0}
+
+    @property
+    def enabled(self) -> bool:
+        return self.flush_interval > 0
+
+    def add(self, log_model: CreditLogModel) -> None:
+        with self._lock:
+            self._logs.append(log_model)
+            if self._oldest is None:
+                self._oldest = time.monotonic()
+            self.stats["queued"] += 1
+            due = len(self._logs) >= self.flush_size
+
+        if due:
+            self.flush()
+
+    def flush(self) -> bool:
+        """Insert the queued entries, returns False if the write failed."""
+        with self._flush_lock:
+            with self._lock:
+                batch, self._logs = self._logs, []
+                self._oldest = None
+
+            if not batch:
+                return True
+
+            try:
+                with get_db() as db:
+                    db.bulk_insert_mappings(
+                        CreditLog, [log_model.model_dump() for log_model in batch]
+                    )
+                    CreditUsage.add_logs(db, batch)
+                    db.commit()
+            except Exception as e:
+                log.exception(f"Error writing {len(batch)} credit logs: {e}")
+                with self._lock:
+                    self._logs = batch + self._logs
+                    self._oldest = time.monotonic()
+                    self.stats["flush_errors"] += 1
+                return False
+
+            with self._lock:
+                self.stats["flushes"] += 1
+                self.stats["written"] += len(batch)
+            return True
+
+    def flush_due(self) -> None:
+        with self._lock:
+            due = (
+                self._oldest is not None
+                and time.monotonic() - self._oldest >= self.flush_interval
+            )
+        if due:
+            self.flush()
+
+    async def periodic_flush(self) -> None:
+        if not self.enabled:
+            return
+
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            try:
+                await asyncio.to_thread(self.flush_due)
+            except Exception as e:
+                log.exception(f"Error in periodic credit log flush: {e}")
+
+
+CreditLogQueue = CreditLogWriteQueue(
+    flush_interval=CREDIT_LOG_FLUSH_INTERVAL, flush_size=CREDIT_LOG_FLUSH_SIZE
+)
+
+atexit.register(CreditLogQueue.flush)
+
+
+# Holds `amount` for the user if the balance minus the current holds covers
+# `required`; expired holds are dropped on the way. Returns nil on a cache miss.
+CREDIT_RESERVE_SCRIPT = """
+local balance = redis.call('GET', KEYS[1])
+if not balance then
+    return nil
+end
+local now = tonumber(ARGV[1])
+local reserved = 0
+local entries = redis.call('HGETALL', KEYS[2])
+for i = 1, #entries, 2 do
+    local amount, expires_at = string.match(entries[i + 1], '^([^|]+)|(.+)$')
+    if tonumber(expires_at) <= now then
+        redis.call('HDEL', KEYS[2], entries[i])
+    else
+        reserved = reserved + tonumber(amount)
+    end
+end
+local available = tonumber(balance) - reserved
+if available <= 0 or available < tonumber(ARGV[2]) then
+    return {0, tostring(available)}
+end
+redis.call('HSET', KEYS[2], ARGV[3], ARGV[4] .. '|' .. ARGV[5])
+redis.call('EXPIRE', KEYS[2], ARGV[6])
+return {1, tostring(available)}
+"""
+
+# Caches a balance loaded from the database, unless a balance change started
+# or ended since the load began (the generation moved) or is still in flight.
+CREDIT_LOAD_SCRIPT = """
+local writes = redis.call('HMGET', KEYS[2], 'pending', 'generation')
+if tonumber(writes[1] or '0') > 0 or (writes[2] or '0') ~= ARGV[1] then
+    return 0
+end
+redis.call('SET', KEYS[1], ARGV[2], 'EX', ARGV[3], 'NX')
+return 1
+"""
+
+CREDIT_INCR_SCRIPT = """
+if redis.call('EXISTS', KEYS[1]) == 1 then
+    return redis.call('INCRBYFLOAT', KEYS[1], ARGV[1])
+end
+return nil
+"""
+
+
+class CreditBalanceCache:
+    """
+    Per-user credit balances for the pre-flight credit check, kept in Redis
+    when it is configured and in process otherwise.
+
+    CreditsTable writes every ledger change through (`add` for deltas, `set`
+    for absolute balances); a missing or expired entry is loaded from the
+    database once. Changes are wrapped in `writing`, and a balance loaded
+    while one was in flight is not cached, as it may or may not include it. `reserve` holds the estimated cost of a request against
+    the balance minus the holds of the requests still running, so parallel
+    requests cannot spend the same credit twice; `settle` drops the hold once
+    the actual cost is in the ledger. Holds expire after `reservation_ttl`.
+    """
+
+    def __init__(self, ttl: int, reservation_ttl: int, key_prefix: str):
+        self.ttl = max(ttl, 1)
+        self.reservation_ttl = max(reservation_ttl, 1)
+        self.key_prefix = key_prefix
+
+        self._lock = threading.Lock()
+        self._balances: dict[str, Tuple[Decimal, float]] = {}
+        self._reservations: dict[str, dict[str, Tuple[Decimal, float]]] = {}
+        # Balance changes in flight and a generation bumped as they start and
+        # end, per user
+        self._writes: dict[str, Tuple[int, int]] = {}
+        self._redis = None
+        self._redis_loaded = False
+        self.stats = {"hits": 0, "misses": 0, "reserved": 0, "rejected": 0}
+
+    def _get_redis(self):
+        if not self._redis_loaded:
+            self._redis_loaded = True
+            try:
+                self._redis = get_redis_connection(
+                    redis_url=REDIS_URL,
+                    redis_sentinels=get_sentinels_from_env(
+                        REDIS_SENTINEL_HOSTS, REDIS_SENTINEL_PORT
+                    ),
+                    redis_cluster=REDIS_CLUSTER,
+                )
+            except Exception as e:
+                log.warning(f"Credit balance cache falls back to memory: {e}")
+        return self._redis
+
+    def _keys(self, user_id: str) -> Tuple[str, str]:
+        # Same hash slot for both keys so the reserve script works on clusters
+        prefix = f"{self.key_prefix}:credit:{{{user_id}}}"
+        return f"{prefix}:balance", f"{prefix}:reserved"
+
+    def _writes_key(self, user_id: str) -> str:
+        return f"{self.key_prefix}:credit:{{{user_id}}}:writes"
+
+    def _load(self, user_id: str) -> Decimal:
+        return Credits.init_credit_by_user_id(user_id=user_id).credit
+
+    def _count_write(self, user_id: str, pending: int) -> None:
+        with self._lock:
+            count, generation = self._writes.get(user_id, (0, 0))
+            self._writes[user_id] = (count + pending, generation + 1)
+        redis = self._get_redis()
+        if redis is not None:
+            key = self._writes_key(user_id)
+            try:
+                pipe = redis.pipeline(transaction=False)
+                pipe.hincrby(key, "pending", pending)
+                pipe.hincrby(key, "generation", 1)
+                # Forgets the changes of crashed workers
+                pipe.expire(key, max(self.ttl, self.reservation_ttl))
+                pipe.execute()
+            except Exception as e:
+                log.warning(f"Error tracking credit balance of {user_id}: {e}")
+                self.invalidate(user_id)
+
+    @contextmanager
+    def writing(self, user_id: str):
+        """Mark a balance change as in flight, until it is written through."""
+        self._count_write(user_id, 1)
+        try:
+            yield
+        finally:
+            self._count_write(user_id, -1)
+
+    def _get_generation(self, user_id: str, redis) -> Tuple[int, Optional[str]]:
+        with self._lock:
+            generation = self._writes.get(user_id, (0, 0))[1]
+        if redis is None:
+            return generation, None
+        return generation, redis.hget(self._writes_key(user_id), "generation") or "0"
+
+    def _cache_loaded(
+        self, user_id: str, credit: Decimal, generation: Tuple[int, Optional[str]]
+    ) -> None:
+        """Cache a loaded balance, unless a change was in flight meanwhile."""
+        redis = self._get_redis()
+        if generation[1] is not None and redis is not None:
+            redis.eval(
+                CREDIT_LOAD_SCRIPT,
+                2,
+                self._keys(user_id)[0],
+                self._writes_key(user_id),
+                generation[1],
+                format(credit, "f"),
+                self.ttl,
+            )
+
+        with self._lock:
+            if self._writes.get(user_id, (0, 0)) != (0, generation[0]):
+                return
+            cached = self._balances.get(user_id)
+            if cached is None or cached[1] <= time.monotonic():
+                self._balances[user_id] = (credit, time.monotonic() + self.ttl)
+
+    def set(self, user_id: str, credit: Decimal) -> None:
+        """Store the balance of a user, as committed to the database."""
+        with self._lock:
+            self._balances[user_id] = (Decimal(credit), time.monotonic() + self.ttl)
+        redis = self._get_redis()
+        if redis is not None:
+            try:
+                redis.set(self._keys(user_id)[0], format(credit, "f"), ex=self.ttl)
+            except Exception as e:
+                log.warning(f"Error caching credit balance of {user_id}: {e}")
+
+    def add(self, user_id: str, amount: Decimal) -> None:
+        """Apply a committed balance change to the cached balance, if any."""
+        with self._lock:
+            cached = self._balances.get(user_id)
+            if cached is not None:
+                self._balances[user_id] = (cached[0] + Decimal(amount), cached[1])
+        redis = self._get_redis()
+        if redis is not None:
+            try:
+                redis.eval(
+                    CREDIT_INCR_SCRIPT, 1, self._keys(user_id)[0], format(amount, "f")
+                )
+            except Exception as e:
+                log.warning(f"Error caching credit balance of {user_id}: {e}")
+                self.invalidate(user_id)
+
+    def invalidate(self, user_id: str) -> None:
+        with self._lock:
+            self._balances.pop(user_id, None)
+        redis = self._get_redis()
+        if redis is not None:
+            try:
+                redis.delete(self._keys(user_id)[0])
+            except Exception as e:
+                log.warning(f"Error invalidating credit balance of {user_id}: {e}")
+
+    def _reserve_local(
+        self, user_id: str, amount: Decimal, required: Decimal
+    ) -> Tuple[Optional[bool], Optional[str]]:
+        now = time.monotonic()
+        with self._lock:
+            cached = self._balances.get(user_id)
+            if cached is None or cached[1] <= now:
+                return None, None
+
+            reservations = self._reservations.setdefault(user_id, {})
+            for reservation_id, (_, expires_at) in list(reservations.items()):
+                if expires_at <= now:
+                    del reservations[reservation_id]
+            available = cached[0] - sum(
+                (reserved for reserved, _ in reservations.values()), Decimal(0)
+            )
+            if available <= 0 or available < required:
+                return False, None
+
+            reservation_id = uuid.uuid4().hex
+            reservations[reservation_id] = (amount, now + self.reservation_ttl)
+            return True, reservation_id
+
+    def _reserve_redis(
+        self, redis, user_id: str, amount: Decimal, required: Decimal
+    ) -> Tuple[Optional[bool], Optional[str]]:
+        reservation_id = uuid.uuid4().hex
+        now = time.time()
+        result = redis.eval(
+            CREDIT_RESERVE_SCRIPT,
+            2,
+            *self._keys(user_id),
+            now,
+            format(required, "f"),
+            reservation_id,
+            format(amount, "f"),
+            now + self.reservation_ttl,
+            self.reservation_ttl,
+        )
+        if result is None:
+            return None, None
+        if not int(result[0]):
+            return False, None
+        return True, reservation_id
+
+    def reserve(
+        self, user_id: str, amount: Decimal, minimum_credit: Decimal = Decimal(0)
+    ) -> Tuple[bool, Optional[str]]:
+        """
+        Hold `amount` of the user's credit. Returns (False, None) if the
+        available balance is not positive or below `amount` or
+        `minimum_credit`, otherwise (True, reservation id).
+        """
+        amount = max(Decimal(amount), Decimal(0))
+        required = max(amount, Decimal(minimum_credit))
+
+        redis = self._get_redis()
+        credit = None
+        for attempt in range(3):
+            ok, reservation_id = None, None
+            if redis is not None:
+                try:
+                    ok, reservation_id = self._reserve_redis(
+                        redis, user_id, amount, required
+                    )
+                except Exception as e:
+                    log.warning(f"Error reserving credit of {user_id}: {e}")
+                    redis = None
+            if redis is None:
+                ok, reservation_id = self._reserve_local(user_id, amount, required)
+
+            if ok is not None:
+                with self._lock:
+                    self.stats["hits" if attempt == 0 else "misses"] += 1
+                    self.stats["reserved" if ok else "rejected"] += 1
+                return ok, reservation_id
+
+            # Not cached: load the balance, cached unless it changed meanwhile
+            try:
+                generation = self._get_generation(user_id, redis)
+                credit = self._load(user_id)
+                self._cache_loaded(user_id, credit, generation)
+            except HTTPException:
+                raise
+            except Exception as e:
+                log.warning(f"Error caching credit balance of {user_id}: {e}")
+                redis = None
+
+        if credit is None:
+            raise HTTPException(status_code=500, detail="credit initialize failed")
+
+        # Kept from the cache by concurrent changes: check the loaded balance,
+        # without a hold
+        ok = credit > 0 and credit >= required
+        with self._lock:
+            self.stats["misses"] += 1
+            self.stats["reserved" if ok else "rejected"] += 1
+        return ok, None
+
+    def settle(self, user_id: str, reservation_id: Optional[str]) -> None:
+        """Drop a hold, once the actual cost of its request is in the ledger."""
+        if not reservation_id:
+            return
+        with self._lock:
+            self._reservations.get(user_id, {}).pop(reservation_id, None)
+        redis = self._get_redis()
+        if redis is not None:
+            try:
+                redis.hdel(self._keys(user_id)[1], reservation_id)
+            except Exception as e:
+                log.warning(f"Error settling credit reservation of {user_id}: {e}")
+
+
+CreditBalances = CreditBalanceCache(
+    ttl=CREDIT_BALANCE_CACHE_TTL,
+    reservation_ttl=CREDIT_RESERVATION_TTL,
+    key_prefix=REDIS_KEY_PREFIX,
+)
+
+
 class TradeTicketTable:
     def insert_new_ticket(
         self, id: str, user_id: str, amount: float, detail: dict
@@ -378,6 +914,231 @@ class CreditLogTable:
 CreditLogs = CreditLogTable()
 
 
+USAGE_COLUMNS = [
+    "prompt_tokens",
+    "completion_tokens",
+    "total_tokens",
+    "cost",
+    "request_count",
+]
+
+
+def get_credit_log_usage(
+    detail: Optional[dict],
+) -> Optional[Tuple[str, int, int, int, Decimal]]:
+    """
+    Model id, prompt, completion and total tokens and cost of a credit_log
+    entry, None if it is not a billed request (e.g. a top-up).
+    """
+    if not isinstance(detail, dict):
+        return None
+    usage = detail.get("usage") or {}
+    if usage.get("total_price") is None:
+        return None
+    model = (detail.get("api_params") or {}).get("model")
+    if not model:
+        return None
+    return (
+        (model.get("id") if isinstance(model, dict) else None) or "",
+        int(usage.get("prompt_tokens") or 0),
+        int(usage.get("completion_tokens") or 0),
+        int(usage.get("total_tokens") or 0),
+        Decimal(str(usage["total_price"])),
+    )
+
+
+def split_usage_range(start_time: int, end_time: int) -> List[Tuple[object, int, int]]:
+    """
+    Split [start_time, end_time) into whole days, whole hours and the partial
+    hours at both ends, as (source, start, end) with the rollup table or
+    CreditLog for the partial hours.
+    """
+    hour_start = -(-start_time // 3600) * 3600
+    hour_end = end_time // 3600 * 3600
+    if hour_start >= hour_end:
+        ranges = [(CreditLog, start_time, end_time)]
+    else:
+        day_start = -(-hour_start // 86400) * 86400
+        day_end = hour_end // 86400 * 86400
+        ranges = [(CreditLog, start_time, hour_start)]
+        if day_start < day_end:
+            ranges += [
+                (CreditUsageHourly, hour_start, day_start),
+                (CreditUsageDaily, day_start, day_end),
+                (CreditUsageHourly, day_end, hour_end),
+            ]
+        else:
+            ranges.append((CreditUsageHourly, hour_start, hour_end))
+        ranges.append((CreditLog, hour_end, end_time))
+    return [(source, start, end) for source, start, end in ranges if start < end]
+
+
+class CreditUsageTable:
+    """
+    Hourly and daily totals of the billed requests in credit_log per user and
+    model. They are updated in the transaction that inserts the entries, so
+    the statistics read a few rows per bucket instead of every entry.
+    """
+
+    BUCKETS = [(CreditUsageHourly, 3600), (CreditUsageDaily, 86400)]
+
+    def add_logs(self, db: Session, logs: List[CreditLogModel]) -> None:
+        """Add credit_log entries to the rollups, in the transaction of `db`."""
+        self._add_rows(db, [(log.user_id, log.created_at, log.detail) for log in logs])
+
+    def _add_rows(self, db: Session, rows: List[Tuple[str, int, dict]]) -> None:
+        usages = []
+        for user_id, created_at, detail in rows:
+            usage = get_credit_log_usage(detail)
+            if usage is not None:
+                usages.append((user_id, created_at, usage))
+        if not usages:
+            return
+
+        for table, size in self.BUCKETS:
+            totals = {}
+            for user_id, created_at, (model_id, *values) in usages:
+                key = (created_at // size * size, user_id, model_id)
+                total = totals.setdefault(key, [0, 0, 0, Decimal(0), 0])
+                for i, value in enumerate([*values, 1]):
+                    total[i] += value
+            self._upsert(
+                db,
+                table,
+                [
+                    {
+                        "bucket": bucket,
+                        "user_id": user_id,
+                        "model_id": model_id,
+                        **dict(zip(USAGE_COLUMNS, total)),
+                    }
+                    for (bucket, user_id, model_id), total in totals.items()
+                ],
+            )
+
+    def _upsert(self, db: Session, table, rows: List[dict]) -> None:
+        dialect = db.bind.dialect.name
+        if dialect in ("sqlite", "postgresql"):
+            if dialect == "sqlite":
+                from sqlalchemy.dialects.sqlite import insert
+            else:
+                from sqlalchemy.dialects.postgresql import insert
+
+            statement = insert(table)
+            statement = statement.on_conflict_do_update(
+                index_elements=[table.bucket, table.user_id, table.model_id],
+                set_={
+                    column: getattr(table, column) + statement.excluded[column]
+                    for column in USAGE_COLUMNS
+                },
+            )
+            db.execute(statement, rows)
+            return
+
+        for row in rows:
+            key = (
+                (table.bucket == row["bucket"])
+                & (table.user_id == row["user_id"])
+                & (table.model_id == row["model_id"])
+            )
+            increments = {
+                column: getattr(table, column) + row[column] for column in USAGE_COLUMNS
+            }
+            if db.execute(update(table).where(key).values(**increments)).rowcount:
+                continue
+            try:
+                with db.begin_nested():
+                    db.add(table(**row))
+            except IntegrityError:
+                db.execute(update(table).where(key).values(**increments))
+
+    def get_usage_by_time(
+        self, start_time: int, end_time: int, user_ids: Optional[List[str]] = None
+    ) -> List[CreditUsageModel]:
+        """Usage per user and model of the billed requests in [start_time, end_time)."""
+        totals = {}
+
+        def add(user_id, model_id, values):
+            total = totals.setdefault((user_id, model_id), [0, 0, 0, Decimal(0), 0])
+            for i, value in enumerate(values):
+                total[i] += value or 0
+
+        with get_db() as db:
+            for source, start, end in split_usage_range(start_time, end_time):
+                if source is CreditLog:
+                    query = db.query(
+                        CreditLog.user_id, CreditLog.created_at, CreditLog.detail
+                    ).filter(CreditLog.created_at >= start, CreditLog.created_at < end)
+                    if user_ids:
+                        query = query.filter(CreditLog.user_id.in_(user_ids))
+                    for user_id, _, detail in query:
+                        usage = get_credit_log_usage(detail)
+                        if usage is not None:
+                            add(user_id, usage[0], [*usage[1:], 1])
+                    continue
+
+                query = (
+                    db.query(
+                        source.user_id,
+                        source.model_id,
+                        *[func.sum(getattr(source, c)) for c in USAGE_COLUMNS],
+                    )
+                    .filter(source.bucket >= start, source.bucket < end)
+                    .group_by(source.user_id, source.model_id)
+                )
+                if user_ids:
+                    query = query.filter(source.user_id.in_(user_ids))
+                for user_id, model_id, *values in query:
+                    add(user_id, model_id, values)
+
+        return [
+            CreditUsageModel(
+                user_id=user_id,
+                model_id=model_id,
+                **dict(zip(USAGE_COLUMNS, total)),
+            )
+            for (user_id, model_id), total in totals.items()
+        ]
+
+    def rebuild(self, batch_size: int = 1000) -> int:
+        """Recompute the rollups from credit_log, returns the number of entries read."""
+        count = 0
+        last_id = ""
+        with get_db() as db:
+            for table, _ in self.BUCKETS:
+                db.query(table).delete()
+
+            while True:
+                rows = (
+                    db.query(
+                        CreditLog.id,
+                        CreditLog.user_id,
+                        CreditLog.created_at,
+                        CreditLog.detail,
+                    )
+                    .filter(CreditLog.id > last_id)
+                    .order_by(CreditLog.id)
+                    .limit(batch_size)
+                    .all()
+                )
+                if not rows:
+                    break
+                self._add_rows(
+                    db,
+                    [
+                        (user_id, created_at, detail)
+                        for _, user_id, created_at, detail in rows
+                    ],
+                )
+                count += len(rows)
+                last_id = rows[-1][0]
+            db.commit()
+        return count
+
+
+CreditUsage = CreditUsageTable()
+
+
 class RedemptionCodeTable:
     def get_code(self, code: str) -> Optional[RedemptionCodeModel]:
         try:
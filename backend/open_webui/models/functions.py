@@ -103,6 +103,13 @@ class FunctionValves(BaseModel):
 
 
 class FunctionsTable:
+    # Bumped on every write (including user valves) so that caches of
+    # function modules and valves can tell they are stale
+    version = 0
+
+    def _changed(self) -> None:
+        self.version += 1
+
     def insert_new_function(
         self,
         user_id: str,
@@ -125,6 +132,7 @@ class FunctionsTable:
                 result = Function(**function.model_dump())
                 db.add(result)
                 db.commit()
+                self._changed()
                 db.refresh(result)
                 if result:
                     return FunctionModel.model_validate(result)
@@ -176,6 +184,7 @@ class FunctionsTable:
                         db.delete(func)
 
                 db.commit()
+                self._changed()
 
                 return [
                     FunctionModel.model_validate(func)
@@ -195,6 +204,12 @@ class FunctionsTable:
         except Exception:
             return None
 
+    def get_function_updated_at_by_id(
+        self, id: str, db: Optional[Session] = None
+    ) -> Optional[int]:
+        with get_db_context(db) as db:
+            return db.query(Function.updated_at).filter_by(id=id).scalar()
+
     def get_functions(
         self, active_only=False, include_valves=False, db: Optional[Session] = None
     ) -> list[FunctionModel | FunctionWithValvesModel]:
@@ -298,6 +313,7 @@ class FunctionsTable:
                 function.valves = valves
                 function.updated_at = int(time.time())
                 db.commit()
+                self._changed()
                 db.refresh(function)
                 return self.get_function_by_id(id, db=db)
             except Exception:
@@ -318,6 +334,7 @@ class FunctionsTable:
 
                     function.updated_at = int(time.time())
                     db.commit()
+                    self._changed()
                     db.refresh(function)
                     return self.get_function_by_id(id, db=db)
                 else:
@@ -361,6 +378,7 @@ class FunctionsTable:
 
             # Update the user settings in the database
             Users.update_user_by_id(user_id, {"settings": user_settings}, db=db)
+            self._changed()
 
             return user_settings["functions"]["valves"][id]
         except Exception as e:
@@ -381,6 +399,7 @@ class FunctionsTable:
                     }
                 )
                 db.commit()
+                self._changed()
                 return self.get_function_by_id(id, db=db)
             except Exception:
                 return None
@@ -395,6 +414,7 @@ class FunctionsTable:
                     }
                 )
                 db.commit()
+                self._changed()
                 return True
             except Exception:
                 return None
@@ -404,6 +424,7 @@ class FunctionsTable:
             try:
                 db.query(Function).filter_by(id=id).delete()
                 db.commit()
+                self._changed()
 
                 return True
             except Exception:
@@ -197,6 +197,12 @@ class ModelForm(BaseModel):
 
 
 class ModelsTable:
+    # Bumped on every write so that caches of model data can tell they are stale
+    version = 0
+
+    def _changed(self) -> None:
+        self.version += 1
+
     def insert_new_model(
         self, form_data: ModelForm, user_id: str, db: Optional[Session] = None
     ) -> Optional[ModelModel]:
@@ -213,6 +219,7 @@ class ModelsTable:
                 result = Model(**model.model_dump())
                 db.add(result)
                 db.commit()
+                self._changed()
                 db.refresh(result)
 
                 if result:
@@ -438,6 +445,7 @@ class ModelsTable:
                     }
                 )
                 db.commit()
+                self._changed()
 
                 return self.get_model_by_id(id, db=db)
             except Exception:
@@ -453,6 +461,7 @@ class ModelsTable:
                 result = db.query(Model).filter_by(id=id).update(data)
 
                 db.commit()
+                self._changed()
 
                 model = db.get(Model, id)
                 db.refresh(model)
@@ -466,6 +475,7 @@ class ModelsTable:
             with get_db_context(db) as db:
                 db.query(Model).filter_by(id=id).delete()
                 db.commit()
+                self._changed()
 
                 return True
         except Exception:
@@ -476,6 +486,7 @@ class ModelsTable:
             with get_db_context(db) as db:
                 db.query(Model).delete()
                 db.commit()
+                self._changed()
 
                 return True
         except Exception:
@@ -519,6 +530,7 @@ class ModelsTable:
                         db.delete(model)
 
                 db.commit()
+                self._changed()
 
                 return [
                     ModelModel.model_validate(model) for model in db.query(Model).all()
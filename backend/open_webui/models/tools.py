@@ -114,6 +114,13 @@ class ToolValves(BaseModel):
 
 
 class ToolsTable:
+    # Bumped on every write (including user valves) so that caches of tools
+    # and their valves can tell they are stale
+    version = 0
+
+    def _changed(self) -> None:
+        self.version += 1
+
     def insert_new_tool(
         self,
         user_id: str,
@@ -136,6 +143,7 @@ class ToolsTable:
                 result = Tool(**tool.model_dump())
                 db.add(result)
                 db.commit()
+                self._changed()
                 db.refresh(result)
                 if result:
                     return ToolModel.model_validate(result)
@@ -155,6 +163,34 @@ class ToolsTable:
         except Exception:
             return None
 
+    def get_tool_updated_at_by_id(
+        self, id: str, db: Optional[Session] = None
+    ) -> Optional[int]:
+        with get_db_context(db) as db:
+            return db.query(Tool.updated_at).filter_by(id=id).scalar()
+
+    def get_tools_by_ids(
+        self, ids: list[str], db: Optional[Session] = None
+    ) -> list[ToolResponse]:
+        """Tools of `ids` without their content and specs, in one query."""
+        if not ids:
+            return []
+        with get_db_context(db) as db:
+            rows = (
+                db.query(
+                    Tool.id,
+                    Tool.user_id,
+                    Tool.name,
+                    Tool.meta,
+                    Tool.access_control,
+                    Tool.updated_at,
+                    Tool.created_at,
+                )
+                .filter(Tool.id.in_(ids))
+                .all()
+            )
+            return [ToolResponse.model_validate(dict(row._mapping)) for row in rows]
+
     def get_tools(self, db: Optional[Session] = None) -> list[ToolUserModel]:
         with get_db_context(db) as db:
             all_tools = db.query(Tool).order_by(Tool.updated_at.desc()).all()
@@ -212,6 +248,7 @@ class ToolsTable:
                     {"valves": valves, "updated_at": int(time.time())}
                 )
                 db.commit()
+                self._changed()
                 return self.get_tool_by_id(id, db=db)
         except Exception:
             return None
@@ -253,6 +290,7 @@ class ToolsTable:
 
             # Update the user settings in the database
             Users.update_user_by_id(user_id, {"settings": user_settings}, db=db)
+            self._changed()
 
             return user_settings["tools"]["valves"][id]
         except Exception as e:
@@ -270,6 +308,7 @@ class ToolsTable:
                     {**updated, "updated_at": int(time.time())}
                 )
                 db.commit()
+                self._changed()
 
                 tool = db.query(Tool).get(id)
                 db.refresh(tool)
@@ -282,6 +321,7 @@ class ToolsTable:
             with get_db_context(db) as db:
                 db.query(Tool).filter_by(id=id).delete()
                 db.commit()
+                self._changed()
 
                 return True
         except Exception:
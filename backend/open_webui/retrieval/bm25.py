@@ -0,0 +1,607 @@
+"""
+Persistent, incrementally maintained BM25 indexes for hybrid search.
+
+Hybrid search used to rebuild a `BM25Retriever` from every document of a
+collection on each query. `BM25Index` keeps the term statistics of a
+collection instead and is updated as documents are inserted into or deleted
+from the vector DB. Scores match `rank_bm25.BM25Okapi`, the scorer behind
+`BM25Retriever`, with the same whitespace tokenization.
+
+Indexes are persisted under CACHE_DIR/bm25, a snapshot and a journal of
+updates per collection and text variant (plain or enriched with metadata),
+and kept in an in-memory LRU cache. A collection without a persisted index
+is built from the vector DB on first use.
+"""
+
+import logging
+import math
+import os
+import pickle
+import re
+import threading
+import time
+from array import array
+from collections import Counter, OrderedDict
+from contextlib import contextmanager
+from typing import Callable, Optional
+
+import numpy as np
+
+try:
+    import fcntl
+except ImportError:  # Windows, writes are only serialized within a process
+    fcntl = None
+
+from open_webui.config import CACHE_DIR
+from open_webui.env import (
+    BM25_INDEX_CACHE_SIZE,
+    REDIS_CLUSTER,
+    REDIS_KEY_PREFIX,
+    REDIS_SENTINEL_HOSTS,
+    REDIS_SENTINEL_PORT,
+    REDIS_URL,
+)
+from open_webui.utils.redis import get_redis_connection, get_sentinels_from_env
+
+log = logging.getLogger(__name__)
+
+BM25_INDEX_DIR = f"{CACHE_DIR}/bm25"
+
+# BM25Okapi defaults of rank_bm25
+K1 = 1.5
+B = 0.75
+EPSILON = 0.25
+
+
+def tokenize(text: str) -> list[str]:
+    # Same as langchain's default BM25 preprocessing
+    return text.split()
+
+
+def get_enriched_text(text: str, metadata: dict) -> str:
+    metadata_parts = [text]
+
+    # Add filename (repeat twice for extra weight in BM25 scoring)
+    if metadata.get("name"):
+        filename = metadata["name"]
+        filename_tokens = filename.replace("_", " ").replace("-", " ").replace(".", " ")
+        metadata_parts.append(
+            f"Filename: {filename} {filename_tokens} {filename_tokens}"
+        )
+
+    # Add title if available
+    if metadata.get("title"):
+        metadata_parts.append(f"Title: {metadata['title']}")
+
+    # Add document section headings if available (from markdown splitter)
+    if metadata.get("headings") and isinstance(metadata["headings"], list):
+        headings = " > ".join(str(h) for h in metadata["headings"])
+        metadata_parts.append(f"Section: {headings}")
+
+    # Add source URL/path if available
+    if metadata.get("source"):
+        metadata_parts.append(f"Source: {metadata['source']}")
+
+    # Add snippet for web search results
+    if metadata.get("snippet"):
+        metadata_parts.append(f"Snippet: {metadata['snippet']}")
+
+    return " ".join(metadata_parts)
+
+
+class BM25Index:
+    """
+    BM25 statistics of one collection, updatable one document at a time.
+
+    Documents get consecutive slot numbers. Postings are `array`s of slot
+    numbers and term frequencies so that the index pickles and loads quickly
+    and is scored with numpy without copying. Deleted slots are tombstoned
+    and reclaimed once they make up a quarter of the index.
+    """
+
+    def __init__(self):
+        self.ids: list[Optional[str]] = []
+        self.texts: list[Optional[str]] = []
+        self.metadatas: list[Optional[dict]] = []
+        self.lengths = array("I")
+        self.alive = bytearray()
+        # term -> (slots, term frequencies)
+        self.postings: dict[str, tuple[array, array]] = {}
+        # term -> number of live documents containing it
+        self.document_frequencies: dict[str, int] = {}
+        self.total_length = 0
+        self.size = 0
+        self._init_derived()
+
+    def _init_derived(self):
+        self.slots = {id: slot for slot, id in enumerate(self.ids) if id is not None}
+        self._idf = None
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        del state["slots"], state["_idf"]
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._init_derived()
+
+    def __len__(self):
+        return self.size
+
+    def add(self, ids: list[str], texts: list[str], metadatas: list[dict]):
+        for id, text, metadata in zip(ids, texts, metadatas):
+            if id in self.slots:
+                self._remove(self.slots[id])
+
+            slot = len(self.ids)
+            frequencies = Counter(tokenize(text))
+            length = sum(frequencies.values())
+
+            self.ids.append(id)
+            self.texts.append(text)
+            self.metadatas.append(metadata or {})
+            self.lengths.append(length)
+            self.alive.append(1)
+            self.slots[id] = slot
+            self.total_length += length
+            self.size += 1
+
+            for term, frequency in frequencies.items():
+                postings = self.postings.get(term)
+                if postings is None:
+                    postings = self.postings[term] = (array("I"), array("I"))
+                postings[0].append(slot)
+                postings[1].append(frequency)
+                self.document_frequencies[term] = (
+                    self.document_frequencies.get(term, 0) + 1
+                )
+        self._idf = None
+
+    def _remove(self, slot: int):
+        for term in set(tokenize(self.texts[slot])):
+            self.document_frequencies[term] -= 1
+            if not self.document_frequencies[term]:
+                del self.document_frequencies[term]
+                del self.postings[term]
+
+        del self.slots[self.ids[slot]]
+        self.total_length -= self.lengths[slot]
+        self.size -= 1
+        self.alive[slot] = 0
+        self.ids[slot] = self.texts[slot] = self.metadatas[slot] = None
+
+    def delete(self, ids: Optional[list[str]] = None, filter: Optional[dict] = None):
+        """Delete documents by id and/or by metadata equality. Returns the count."""
+        slots = {self.slots[id] for id in (ids or []) if id in self.slots}
+        if filter:
+            slots.update(
+                slot
+                for slot, metadata in enumerate(self.metadatas)
+                if metadata is not None
+                and all(metadata.get(key) == value for key, value in filter.items())
+            )
+
+        for slot in slots:
+            self._remove(slot)
+        if slots:
+            self._idf = None
+            if len(self.ids) - self.size > len(self.ids) // 4:
+                self._compact()
+        return len(slots)
+
+    def _compact(self):
+        live = [slot for slot in range(len(self.ids)) if self.alive[slot]]
+        ids = [self.ids[slot] for slot in live]
+        texts = [self.texts[slot] for slot in live]
+        metadatas = [self.metadatas[slot] for slot in live]
+        self.__init__()
+        self.add(ids, texts, metadatas)
+
+    def _get_idf(self) -> dict[str, float]:
+        if self._idf is None:
+            corpus_size = self.size
+            idf = {}
+            negative_terms = []
+            for term, frequency in self.document_frequencies.items():
+                value = math.log(corpus_size - frequency + 0.5) - math.log(
+                    frequency + 0.5
+                )
+                idf[term] = value
+                if value < 0:
+                    negative_terms.append(term)
+
+            # Terms in more than half of the documents get a small positive idf
+            average_idf = sum(idf.values()) / len(idf) if idf else 0
+            for term in negative_terms:
+                idf[term] = EPSILON * average_idf
+            self._idf = idf
+        return self._idf
+
+    def search(self, query: str, k: int) -> list[tuple[float, str, dict]]:
+        """Top `k` (score, text, metadata) of documents sharing a term with the query."""
+        if not self.size:
+            return []
+
+        idf = self._get_idf()
+        average_length = self.total_length / self.size
+        lengths = np.frombuffer(self.lengths, dtype=np.uint32)
+        scores = np.zeros(len(self.ids))
+        matched = np.zeros(len(self.ids), dtype=bool)
+
+        for term in tokenize(query):
+            postings = self.postings.get(term)
+            if postings is None:
+                continue
+            slots = np.frombuffer(postings[0], dtype=np.uint32)
+            frequencies = np.frombuffer(postings[1], dtype=np.uint32).astype(float)
+            # A term occurs at most once per slot in its postings
+            scores[slots] += idf[term] * (
+                frequencies
+                * (K1 + 1)
+                / (frequencies + K1 * (1 - B + B * lengths[slots] / average_length))
+            )
+            matched[slots] = True
+
+        matched &= np.frombuffer(self.alive, dtype=np.uint8).astype(bool)
+        candidates = np.flatnonzero(matched)
+        if len(candidates) > k:
+            candidates = candidates[np.argpartition(-scores[candidates], k - 1)[:k]]
+        candidates = candidates[np.argsort(-scores[candidates], kind="stable")]
+
+        return [
+            (float(scores[slot]), self.texts[slot], self.metadatas[slot])
+            for slot in candidates
+        ]
+
+
+class LoadedIndex:
+    """An index as read from its snapshot and the journal of that snapshot."""
+
+    def __init__(self, index: BM25Index, generation: int, version, mtime: int):
+        self.index = index
+        self.generation = generation
+        # Version of the collection the index is current with (with Redis)
+        self.version = version
+        self.mtime = mtime
+        # Bytes of the journal applied to the index
+        self.offset = 0
+
+
+class BM25IndexCache:
+    """
+    LRU cache of the persisted indexes, keyed by (collection, enriched).
+
+    An index is persisted as a snapshot and a journal of the updates made
+    since, so that an update appends a record instead of rewriting the whole
+    index. The journal is folded into a new snapshot once it grows to half
+    the size of the snapshot. Workers sharing the data directory replay the
+    records they have not seen on their next query, and writes are
+    serialized by a lock file per index.
+
+    With Redis, every write also bumps a version key per index. Nodes that do
+    not share the data directory see the version change and rebuild their
+    index from the vector DB.
+    """
+
+    def __init__(self, directory: str = BM25_INDEX_DIR, max_size: int = 32):
+        self.directory = directory
+        self.max_size = max_size
+        self._lock = threading.RLock()
+        self._key_locks: dict = {}
+        self._indexes: OrderedDict = OrderedDict()
+        self._redis = None
+        self._redis_loaded = False
+
+    def _path(self, collection_name: str, enriched: bool) -> str:
+        name = re.sub(r"[^A-Za-z0-9_.-]", "_", collection_name)
+        return os.path.join(
+            self.directory, f"{name}.{'enriched' if enriched else 'plain'}.pkl"
+        )
+
+    def _journal_path(self, key, generation: int) -> str:
+        return f"{self._path(*key)}.{generation}.journal"
+
+    @staticmethod
+    def _mtime(path: str) -> Optional[int]:
+        try:
+            return os.stat(path).st_mtime_ns
+        except FileNotFoundError:
+            return None
+
+    @staticmethod
+    def _remove_file(path: str):
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+    @contextmanager
+    def _locked(self, key):
+        """Hold the write lock of an index, across threads and processes."""
+        with self._lock:
+            lock = self._key_locks.setdefault(key, threading.Lock())
+        with lock:
+            os.makedirs(self.directory, exist_ok=True)
+            with open(f"{self._path(*key)}.lock", "a+b") as f:
+                if fcntl is not None:
+                    fcntl.flock(f, fcntl.LOCK_EX)
+                yield
+
+    def _get_redis(self):
+        if not self._redis_loaded:
+            self._redis_loaded = True
+            try:
+                self._redis = get_redis_connection(
+                    redis_url=REDIS_URL,
+                    redis_sentinels=get_sentinels_from_env(
+                        REDIS_SENTINEL_HOSTS, REDIS_SENTINEL_PORT
+                    ),
+                    redis_cluster=REDIS_CLUSTER,
+                )
+            except Exception as e:
+                log.warning(f"BM25 indexes are not versioned across nodes: {e}")
+        return self._redis
+
+    def _version_key(self, key) -> str:
+        collection_name, enriched = key
+        variant = "enriched" if enriched else "plain"
+        return f"{REDIS_KEY_PREFIX}:bm25:{collection_name}:{variant}"
+
+    def _get_version(self, key) -> Optional[int]:
+        redis = self._get_redis()
+        if redis is None:
+            return None
+        try:
+            return int(redis.get(self._version_key(key)) or 0)
+        except Exception as e:
+            log.warning(f"Failed to get the version of BM25 index {key}: {e}")
+            return None
+
+    def _bump_version(self, key) -> Optional[int]:
+        redis = self._get_redis()
+        if redis is None:
+            return None
+        try:
+            return int(redis.incr(self._version_key(key)))
+        except Exception as e:
+            log.warning(f"Failed to bump the version of BM25 index {key}: {e}")
+            return None
+
+    def _is_current(self, key, loaded: LoadedIndex) -> bool:
+        version = self._get_version(key)
+        return version is None or loaded.version == version
+
+    def _remember(self, key, loaded: LoadedIndex):
+        self._indexes[key] = loaded
+        self._indexes.move_to_end(key)
+        while len(self._indexes) > self.max_size:
+            self._indexes.popitem(last=False)
+
+    def _load(self, key) -> Optional[LoadedIndex]:
+        """The current index of `key`, or None if it was never built."""
+        path = self._path(*key)
+        mtime = self._mtime(path)
+        if mtime is None:
+            self._indexes.pop(key, None)
+            return None
+
+        loaded = self._indexes.get(key)
+        if loaded is None or loaded.mtime != mtime:
+            try:
+                with open(path, "rb") as f:
+                    snapshot = pickle.load(f)
+                loaded = LoadedIndex(
+                    snapshot["index"],
+                    snapshot["generation"],
+                    snapshot["version"],
+                    mtime,
+                )
+            except Exception as e:
+                log.warning(f"Discarding unreadable BM25 index {path}: {e}")
+                self._drop(key)
+                return None
+
+        self._replay(key, loaded)
+        self._remember(key, loaded)
+        return loaded
+
+    def _replay(self, key, loaded: LoadedIndex):
+        """Apply the journal records written since the index was read."""
+        try:
+            f = open(self._journal_path(key, loaded.generation), "rb")
+        except FileNotFoundError:
+            return
+
+        with f:
+            f.seek(loaded.offset)
+            while True:
+                try:
+                    version, operation, args = pickle.load(f)
+                except Exception:
+                    # End of the journal, or a record still being written
+                    break
+                self._apply(loaded.index, operation, args)
+                loaded.version = version
+                loaded.offset = f.tell()
+
+    @staticmethod
+    def _apply(index: BM25Index, operation: str, args: tuple):
+        if operation == "add":
+            index.add(*args)
+        elif operation == "delete":
+            index.delete(*args)
+
+    def _write(self, key, loaded: LoadedIndex, operation: str, args: tuple, version):
+        """Apply an update to a loaded index and append it to its journal."""
+        self._apply(loaded.index, operation, args)
+        loaded.version = version
+
+        journal_path = self._journal_path(key, loaded.generation)
+        record = pickle.dumps(
+            (version, operation, args), protocol=pickle.HIGHEST_PROTOCOL
+        )
+        with open(journal_path, "ab") as f:
+            # Drop a record left incomplete by a crashed writer
+            if f.tell() > loaded.offset:
+                f.truncate(loaded.offset)
+            f.write(record)
+        loaded.offset += len(record)
+
+        if loaded.offset > os.path.getsize(self._path(*key)) // 2:
+            self._save(key, loaded)
+
+    def _save(self, key, loaded: LoadedIndex):
+        """Write a snapshot of the index, starting a new journal."""
+        path = self._path(*key)
+        os.makedirs(self.directory, exist_ok=True)
+        previous_journal = self._journal_path(key, loaded.generation)
+
+        loaded.generation = time.time_ns()
+        loaded.offset = 0
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "wb") as f:
+            pickle.dump(
+                {
+                    "generation": loaded.generation,
+                    "version": loaded.version,
+                    "index": loaded.index,
+                },
+                f,
+                protocol=pickle.HIGHEST_PROTOCOL,
+            )
+        os.replace(tmp_path, path)
+        self._remove_file(previous_journal)
+
+        loaded.mtime = self._mtime(path)
+        self._remember(key, loaded)
+
+    def _build(self, key, loader: Callable) -> Optional[BM25Index]:
+        # Updates made after this are either loaded or bump the version again
+        version = self._get_version(key)
+        result = loader()
+        if not result or not result.documents or not result.documents[0]:
+            return None
+
+        index = BM25Index()
+        texts = result.documents[0]
+        metadatas = [metadata or {} for metadata in result.metadatas[0]]
+        if key[1]:
+            texts = [
+                get_enriched_text(text, metadata)
+                for text, metadata in zip(texts, metadatas)
+            ]
+        index.add(result.ids[0], texts, metadatas)
+
+        with self._lock:
+            self._save(key, LoadedIndex(index, 0, version, 0))
+        log.info(f"Built BM25 index of {key[0]} ({len(index)} documents)")
+        return index
+
+    def get(
+        self, collection_name: str, enriched: bool, loader: Callable
+    ) -> Optional[BM25Index]:
+        """
+        Return the index of a collection, building it from `loader()` (a vector
+        DB `GetResult`) if none exists. Returns None if the collection is empty.
+        """
+        key = (collection_name, enriched)
+        with self._lock:
+            loaded = self._load(key)
+        if loaded is not None and self._is_current(key, loaded):
+            return loaded.index
+
+        # Updates wait for the build, so that none of them is lost
+        with self._locked(key):
+            with self._lock:
+                loaded = self._load(key)
+            if loaded is not None:
+                if self._is_current(key, loaded):
+                    return loaded.index
+                log.info(f"BM25 index of {collection_name} was updated elsewhere")
+                with self._lock:
+                    self._drop(key)
+            return self._build(key, loader)
+
+    def _update(self, collection_name: str, operation: str, get_args: Callable):
+        for enriched in (False, True):
+            key = (collection_name, enriched)
+            with self._locked(key):
+                version = self._bump_version(key)
+                with self._lock:
+                    loaded = self._load(key)
+                    if loaded is None:
+                        # Built from the vector DB, including this update, on
+                        # first use
+                        continue
+                    if version is not None and loaded.version != version - 1:
+                        # Updated on another node, rebuilt on next use
+                        self._drop(key)
+                        continue
+
+                    args = get_args(enriched)
+                    if args is None:
+                        self._drop(key)
+                    else:
+                        self._write(key, loaded, operation, args, version)
+
+    def add(self, collection_name: str, items: list[dict]):
+        """Add vector DB items ({"id", "text", "metadata"}) to existing indexes."""
+        ids = [item["id"] for item in items]
+        metadatas = [item.get("metadata") or {} for item in items]
+        texts = [item["text"] for item in items]
+
+        def get_args(enriched: bool) -> tuple:
+            if enriched:
+                return (
+                    ids,
+                    [
+                        get_enriched_text(text, metadata)
+                        for text, metadata in zip(texts, metadatas)
+                    ],
+                    metadatas,
+                )
+            return (ids, texts, metadatas)
+
+        self._update(collection_name, "add", get_args)
+
+    def delete(
+        self,
+        collection_name: str,
+        ids: Optional[list[str]] = None,
+        filter: Optional[dict] = None,
+    ):
+        if filter and any(
+            str(name).startswith("$") or isinstance(value, (dict, list))
+            for name, value in filter.items()
+        ):
+            # Not a plain equality filter, rebuild on next use
+            self._update(collection_name, "delete", lambda enriched: None)
+        else:
+            self._update(collection_name, "delete", lambda enriched: (ids, filter))
+
+    def _drop(self, key):
+        self._indexes.pop(key, None)
+        path = self._path(*key)
+        self._remove_file(path)
+        prefix = os.path.basename(path)
+        if os.path.isdir(self.directory):
+            for filename in os.listdir(self.directory):
+                if filename.startswith(prefix) and filename.endswith(".journal"):
+                    self._remove_file(os.path.join(self.directory, filename))
+
+    def drop(self, collection_name: str):
+        """Forget the indexes of a deleted or rebuilt collection."""
+        self._update(collection_name, "drop", lambda enriched: None)
+
+    def reset(self):
+        with self._lock:
+            self._indexes.clear()
+            if os.path.isdir(self.directory):
+                for filename in os.listdir(self.directory):
+                    # Lock files stay, other workers may hold them
+                    if not filename.endswith(".lock"):
+                        self._remove_file(os.path.join(self.directory, filename))
+
+
+BM25Indexes = BM25IndexCache(max_size=BM25_INDEX_CACHE_SIZE)
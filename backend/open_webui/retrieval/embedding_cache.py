@@ -0,0 +1,328 @@
+"""
+Content-hash cache of embeddings.
+
+Embeddings are keyed by (engine, model, prefix, sha256(text)), so a chunk that
+was embedded before with the same embedding config (re-adding a file to
+another knowledge base, reindexing, shared boilerplate) is not sent to the
+provider again. The embedding function returned by `get_embedding_function`
+is wrapped with `with_embedding_cache`, which looks up every input text and
+only embeds the misses.
+
+Backends are pluggable: "sqlite" stores vectors in a SQLite file on local
+disk (shared by the workers of a host), "memory" keeps them in the process.
+Both evict the least recently used entries once RAG_EMBEDDING_CACHE_MAX_SIZE_MB
+is exceeded.
+"""
+
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from array import array
+from collections import OrderedDict
+from typing import Optional
+
+from open_webui.config import (
+    RAG_EMBEDDING_CACHE_BACKEND,
+    RAG_EMBEDDING_CACHE_DIR,
+    RAG_EMBEDDING_CACHE_MAX_SIZE_MB,
+)
+
+log = logging.getLogger(__name__)
+
+# SQLite limits the number of bound parameters per statement
+SQLITE_BATCH_SIZE = 500
+
+
+def encode_vector(vector: list[float]) -> bytes:
+    return array("d", vector).tobytes()
+
+
+def decode_vector(value: bytes) -> list[float]:
+    vector = array("d")
+    vector.frombytes(value)
+    return vector.tolist()
+
+
+class EmbeddingCacheBackend(ABC):
+    """
+    Storage of the cached embeddings, keyed by EmbeddingCache.get_key and
+    bounded by `max_size`.
+    """
+
+    def __init__(self, max_size: int):
+        self.max_size = max_size
+        self.evictions = 0
+
+    @abstractmethod
+    def get_many(self, keys: list[str]) -> dict[str, list[float]]:
+        """Return the cached vectors of the keys that are cached."""
+        pass
+
+    @abstractmethod
+    def set_many(self, vectors: dict[str, list[float]]) -> None:
+        """Store vectors, evicting the least recently used once over max_size."""
+        pass
+
+    @abstractmethod
+    def clear(self) -> None:
+        """Drop all cached vectors."""
+        pass
+
+
+class MemoryEmbeddingCache(EmbeddingCacheBackend):
+    def __init__(self, max_size: int):
+        super().__init__(max_size)
+        self._lock = threading.Lock()
+        self._entries: OrderedDict[str, bytes] = OrderedDict()
+        self.size = 0
+
+    def get_many(self, keys: list[str]) -> dict[str, list[float]]:
+        result = {}
+        with self._lock:
+            for key in keys:
+                value = self._entries.get(key)
+                if value is not None:
+                    self._entries.move_to_end(key)
+                    result[key] = decode_vector(value)
+        return result
+
+    def set_many(self, vectors: dict[str, list[float]]) -> None:
+        with self._lock:
+            for key, vector in vectors.items():
+                value = encode_vector(vector)
+                previous = self._entries.pop(key, None)
+                if previous is not None:
+                    self.size -= len(previous)
+                self._entries[key] = value
+                self.size += len(value)
+
+            while self.size > self.max_size and self._entries:
+                _, value = self._entries.popitem(last=False)
+                self.size -= len(value)
+                self.evictions += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self.size = 0
+
+
+class SQLiteEmbeddingCache(EmbeddingCacheBackend):
+    """
+    Vectors in a local SQLite file. Access times are kept per entry; when the
+    stored vectors outgrow `max_size`, the least recently used ones are
+    deleted until 90% of it is left.
+    """
+
+    def __init__(self, path: str, max_size: int):
+        super().__init__(max_size)
+        self.path = path
+        self._lock = threading.Lock()
+        self._connection = None
+        self._pid = None
+
+    @property
+    def connection(self) -> sqlite3.Connection:
+        # Connections must not be shared with forked workers
+        if self._connection is None or self._pid != os.getpid():
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            connection = sqlite3.connect(
+                self.path, timeout=30, check_same_thread=False, isolation_level=None
+            )
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS embedding_cache ("
+                "key TEXT PRIMARY KEY, vector BLOB NOT NULL, "
+                "size INTEGER NOT NULL, accessed_at REAL NOT NULL)"
+            )
+            connection.execute(
+                "CREATE INDEX IF NOT EXISTS embedding_cache_accessed_at "
+                "ON embedding_cache (accessed_at)"
+            )
+            self._connection = connection
+            self._pid = os.getpid()
+        return self._connection
+
+    def get_many(self, keys: list[str]) -> dict[str, list[float]]:
+        result = {}
+        now = time.time()
+        with self._lock:
+            for i in range(0, len(keys), SQLITE_BATCH_SIZE):
+                batch = keys[i : i + SQLITE_BATCH_SIZE]
+                placeholders = ",".join("?" * len(batch))
+                rows = self.connection.execute(
+                    f"SELECT key, vector FROM embedding_cache WHERE key IN ({placeholders})",
+                    batch,
+                ).fetchall()
+                if rows:
+                    self.connection.execute(
+                        f"UPDATE embedding_cache SET accessed_at = ? WHERE key IN ({','.join('?' * len(rows))})",
+                        [now, *[key for key, _ in rows]],
+                    )
+                for key, value in rows:
+                    result[key] = decode_vector(value)
+        return result
+
+    def set_many(self, vectors: dict[str, list[float]]) -> None:
+        now = time.time()
+        rows = []
+        for key, vector in vectors.items():
+            value = encode_vector(vector)
+            rows.append((key, value, len(value), now))
+
+        with self._lock:
+            self.connection.execute("BEGIN")
+            try:
+                self.connection.executemany(
+                    "INSERT OR REPLACE INTO embedding_cache (key, vector, size, accessed_at) "
+                    "VALUES (?, ?, ?, ?)",
+                    rows,
+                )
+                self._evict()
+                self.connection.execute("COMMIT")
+            except Exception:
+                self.connection.execute("ROLLBACK")
+                raise
+
+    def _evict(self):
+        (size,) = self.connection.execute(
+            "SELECT COALESCE(SUM(size), 0) FROM embedding_cache"
+        ).fetchone()
+        if size <= self.max_size:
+            return
+
+        excess = size - int(self.max_size * 0.9)
+        while excess > 0:
+            rows = self.connection.execute(
+                "SELECT key, size FROM embedding_cache ORDER BY accessed_at LIMIT 500"
+            ).fetchall()
+            if not rows:
+                break
+
+            evicted = []
+            for key, entry_size in rows:
+                if excess <= 0:
+                    break
+                evicted.append(key)
+                excess -= entry_size
+
+            self.connection.execute(
+                f"DELETE FROM embedding_cache WHERE key IN ({','.join('?' * len(evicted))})",
+                evicted,
+            )
+            self.evictions += len(evicted)
+
+    def clear(self) -> None:
+        with self._lock:
+            self.connection.execute("DELETE FROM embedding_cache")
+
+
+class EmbeddingCache:
+    def __init__(self, backend: EmbeddingCacheBackend):
+        self.backend = backend
+        self.stats = {"hits": 0, "misses": 0}
+
+    @staticmethod
+    def get_key(engine: str, model: str, prefix: Optional[str], text: str) -> str:
+        text_hash = hashlib.sha256(text.encode("utf-8")).hexdigest()
+        return hashlib.sha256(
+            json.dumps([engine, model, prefix, text_hash]).encode("utf-8")
+        ).hexdigest()
+
+    def get_stats(self) -> dict:
+        return {**self.stats, "evictions": self.backend.evictions}
+
+    async def embed(self, texts: list[str], engine, model, prefix, embed):
+        """
+        Embeddings of `texts`, calling `embed(missing_texts)` only for the texts
+        that are not cached yet.
+        """
+        keys = [self.get_key(engine, model, prefix, text) for text in texts]
+        try:
+            cached = await asyncio.to_thread(self.backend.get_many, list(set(keys)))
+        except Exception as e:
+            log.warning(f"Embedding cache lookup failed: {e}")
+            cached = {}
+
+        # Identical texts in one request are embedded once
+        missing = {key: text for key, text in zip(keys, texts) if key not in cached}
+        self.stats["hits"] += len(texts) - len(missing)
+        self.stats["misses"] += len(missing)
+
+        if not missing:
+            return [cached[key] for key in keys]
+
+        embeddings = await embed(list(missing.values()))
+        if not isinstance(embeddings, list) or len(embeddings) != len(missing):
+            if not cached:
+                # Same result as without the cache
+                return embeddings
+            raise ValueError("Embedding provider returned an unexpected result")
+
+        computed = dict(zip(missing.keys(), embeddings))
+        vectors = {key: vector for key, vector in computed.items() if vector}
+        if vectors:
+            try:
+                await asyncio.to_thread(self.backend.set_many, vectors)
+            except Exception as e:
+                log.warning(f"Embedding cache write failed: {e}")
+
+        return [cached[key] if key in cached else computed[key] for key in keys]
+
+
+def get_embedding_cache() -> Optional[EmbeddingCache]:
+    max_size = RAG_EMBEDDING_CACHE_MAX_SIZE_MB * 1024 * 1024
+    try:
+        if RAG_EMBEDDING_CACHE_BACKEND == "sqlite":
+            return EmbeddingCache(
+                SQLiteEmbeddingCache(
+                    os.path.join(RAG_EMBEDDING_CACHE_DIR, "embeddings.db"), max_size
+                )
+            )
+        elif RAG_EMBEDDING_CACHE_BACKEND == "memory":
+            return EmbeddingCache(MemoryEmbeddingCache(max_size))
+    except Exception as e:
+        log.warning(f"Embedding cache disabled, failed to open backend: {e}")
+    return None
+
+
+EMBEDDING_CACHE = get_embedding_cache()
+
+
+def with_embedding_cache(embedding_function, engine: str, model: str):
+    """Wrap an async `(query, prefix=None, user=None)` embedding function."""
+    if EMBEDDING_CACHE is None:
+        return embedding_function
+
+    async def cached_embedding_function(query, prefix=None, user=None):
+        if isinstance(query, list):
+            return await EMBEDDING_CACHE.embed(
+                query,
+                engine,
+                model,
+                prefix,
+                lambda texts: embedding_function(texts, prefix=prefix, user=user),
+            )
+
+        embeddings = await EMBEDDING_CACHE.embed(
+            [query],
+            engine,
+            model,
+            prefix,
+            lambda texts: _embed_single(embedding_function, texts[0], prefix, user),
+        )
+        return embeddings[0] if isinstance(embeddings, list) else embeddings
+
+    return cached_embedding_function
+
+
+async def _embed_single(embedding_function, text, prefix, user):
+    embedding = await embedding_function(text, prefix=prefix, user=user)
+    return [embedding] if embedding else embedding
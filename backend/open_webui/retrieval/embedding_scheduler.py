@@ -0,0 +1,271 @@
+"""
+Scheduling of embedding requests to remote providers.
+
+`get_embedding_function` used to send every batch of a document at once.
+Requests now go through `EmbeddingScheduler`, which
+
+* limits the number of requests in flight per (engine, url) to
+  RAG_EMBEDDING_CONCURRENCY, across all documents processed by the worker,
+* packs batches by estimated tokens (RAG_EMBEDDING_BATCH_MAX_TOKENS) as well
+  as by RAG_EMBEDDING_BATCH_SIZE items,
+* retries rate limited requests, waiting for the provider's Retry-After (or
+  an exponential backoff) before any further request to that provider,
+* keeps throughput statistics (chunks/s, tokens/s) per provider.
+
+Embedding functions run on different event loops (documents are processed
+with `asyncio.run` in worker threads), so the limiter and the backoff state
+use thread-safe primitives instead of asyncio ones.
+"""
+
+import asyncio
+import logging
+import random
+import threading
+import time
+from email.utils import parsedate_to_datetime
+from typing import Awaitable, Callable, Optional
+
+from open_webui.config import (
+    RAG_EMBEDDING_BATCH_MAX_TOKENS,
+    RAG_EMBEDDING_CONCURRENCY,
+    RAG_EMBEDDING_MAX_RETRIES,
+)
+
+log = logging.getLogger(__name__)
+
+
+class EmbeddingRateLimitError(Exception):
+    def __init__(self, retry_after: Optional[float] = None):
+        super().__init__(
+            f"Rate limited by embedding provider (retry after {retry_after})"
+        )
+        self.retry_after = retry_after
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Seconds to wait from a Retry-After header (delay-seconds or HTTP-date)."""
+    if not value:
+        return None
+    try:
+        return max(float(value), 0.0)
+    except ValueError:
+        pass
+    try:
+        return max(parsedate_to_datetime(value).timestamp() - time.time(), 0.0)
+    except (TypeError, ValueError):
+        return None
+
+
+def estimate_tokens(text: str) -> int:
+    # Roughly four characters per token for the common BPE vocabularies
+    return len(text) // 4 + 1
+
+
+def pack_batches(
+    texts: list[str], max_items: int, max_tokens: int = 0
+) -> list[list[str]]:
+    """
+    Split `texts` into consecutive batches of at most `max_items` texts and,
+    if `max_tokens` is set, at most `max_tokens` estimated tokens. A single
+    text above the token budget gets a batch of its own.
+    """
+    max_items = max(int(max_items or 1), 1)
+    batches = []
+    batch = []
+    batch_tokens = 0
+
+    for text in texts:
+        tokens = estimate_tokens(text)
+        if batch and (
+            len(batch) >= max_items
+            or (max_tokens > 0 and batch_tokens + tokens > max_tokens)
+        ):
+            batches.append(batch)
+            batch = []
+            batch_tokens = 0
+        batch.append(text)
+        batch_tokens += tokens
+
+    if batch:
+        batches.append(batch)
+    return batches
+
+
+class _Provider:
+    def __init__(self, concurrency: int):
+        self.slots = threading.BoundedSemaphore(max(concurrency, 1))
+        self.lock = threading.Lock()
+        # Monotonic time before which no request is sent (rate limit backoff)
+        self.blocked_until = 0.0
+        self.stats = {
+            "requests": 0,
+            "chunks": 0,
+            "tokens": 0,
+            "retries": 0,
+            "rate_limited": 0,
+            "failures": 0,
+            "seconds": 0.0,
+        }
+
+
+class EmbeddingScheduler:
+    def __init__(
+        self,
+        concurrency: int = 4,
+        max_retries: int = 5,
+        backoff_base: float = 1.0,
+        backoff_max: float = 60.0,
+    ):
+        self.concurrency = concurrency
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+
+        self._lock = threading.Lock()
+        self._providers: dict[tuple, _Provider] = {}
+
+    def _get_provider(self, key: tuple) -> _Provider:
+        with self._lock:
+            provider = self._providers.get(key)
+            if provider is None:
+                provider = self._providers[key] = _Provider(self.concurrency)
+            return provider
+
+    async def _acquire(self, provider: _Provider):
+        while True:
+            delay = provider.blocked_until - time.monotonic()
+            if delay > 0:
+                await asyncio.sleep(delay)
+                continue
+            if provider.slots.acquire(blocking=False):
+                return
+            await asyncio.sleep(0.05)
+
+    async def call(
+        self,
+        key: tuple,
+        send: Callable[[], Awaitable],
+        texts: list[str],
+    ):
+        """
+        Send one request for `texts` within the provider's concurrency limit,
+        retrying it when it is rate limited. Returns None if it keeps failing.
+        """
+        provider = self._get_provider(key)
+
+        for attempt in range(self.max_retries + 1):
+            await self._acquire(provider)
+            try:
+                result = await send()
+            except EmbeddingRateLimitError as e:
+                delay = e.retry_after
+                if delay is None:
+                    delay = min(
+                        self.backoff_base * 2**attempt, self.backoff_max
+                    ) * random.uniform(0.5, 1.0)
+                with provider.lock:
+                    provider.stats["rate_limited"] += 1
+                    provider.blocked_until = max(
+                        provider.blocked_until, time.monotonic() + delay
+                    )
+                    if attempt < self.max_retries:
+                        provider.stats["retries"] += 1
+                if attempt < self.max_retries:
+                    log.warning(
+                        f"Embedding provider {key[0]} rate limited, retrying in {delay:.1f}s "
+                        f"(retry {attempt + 1}/{self.max_retries})"
+                    )
+                continue
+            finally:
+                provider.slots.release()
+
+            with provider.lock:
+                provider.stats["requests"] += 1
+                if result is None:
+                    provider.stats["failures"] += 1
+                else:
+                    provider.stats["chunks"] += len(texts)
+                    provider.stats["tokens"] += sum(estimate_tokens(t) for t in texts)
+            return result
+
+        with provider.lock:
+            provider.stats["failures"] += 1
+        log.error(f"Embedding provider {key[0]} still rate limited, giving up")
+        return None
+
+    async def run(
+        self,
+        key: tuple,
+        batches: list[list[str]],
+        send: Callable[[list[str]], Awaitable],
+        concurrent: bool = True,
+    ) -> list:
+        """Embed `batches` and return their results in order."""
+        start = time.monotonic()
+
+        if concurrent:
+            results = await asyncio.gather(
+                *[
+                    self.call(key, lambda batch=batch: send(batch), batch)
+                    for batch in batches
+                ]
+            )
+        else:
+            results = []
+            for batch in batches:
+                results.append(
+                    await self.call(key, lambda batch=batch: send(batch), batch)
+                )
+
+        elapsed = time.monotonic() - start
+        provider = self._get_provider(key)
+        with provider.lock:
+            provider.stats["seconds"] += elapsed
+
+        chunks = sum(len(batch) for batch in batches)
+        tokens = sum(estimate_tokens(text) for batch in batches for text in batch)
+        log.info(
+            f"Embedded {chunks} chunks (~{tokens} tokens) in {len(batches)} batches "
+            f"with {key[0]} in {elapsed:.2f}s: {chunks / max(elapsed, 1e-9):.1f} chunks/s, "
+            f"{tokens / max(elapsed, 1e-9):.0f} tokens/s"
+        )
+        return results
+
+    def get_stats(self) -> dict:
+        """Cumulative statistics per (engine, url), with average throughput."""
+        stats = {}
+        with self._lock:
+            providers = dict(self._providers)
+        for key, provider in providers.items():
+            with provider.lock:
+                provider_stats = dict(provider.stats)
+            seconds = provider_stats["seconds"]
+            provider_stats["chunks_per_second"] = (
+                provider_stats["chunks"] / seconds if seconds else 0.0
+            )
+            provider_stats["tokens_per_second"] = (
+                provider_stats["tokens"] / seconds if seconds else 0.0
+            )
+            stats[key] = provider_stats
+        return stats
+
+    def get_totals(self) -> dict:
+        """Cumulative counters summed over all providers."""
+        totals = {}
+        with self._lock:
+            providers = list(self._providers.values())
+        for provider in providers:
+            with provider.lock:
+                for name, value in provider.stats.items():
+                    totals[name] = totals.get(name, 0) + value
+        return totals
+
+
+EMBEDDING_SCHEDULER = EmbeddingScheduler(
+    concurrency=RAG_EMBEDDING_CONCURRENCY,
+    max_retries=RAG_EMBEDDING_MAX_RETRIES,
+)
+
+
+def pack_embedding_batches(texts: list[str], batch_size: int) -> list[list[str]]:
+    return pack_batches(texts, batch_size, RAG_EMBEDDING_BATCH_MAX_TOKENS)
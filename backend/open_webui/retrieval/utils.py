@@ -16,7 +16,6 @@ from langchain_classic.retrievers import (
     ContextualCompressionRetriever,
     EnsembleRetriever,
 )
-from langchain_community.retrievers import BM25Retriever
 from langchain_core.documents import Document
 
 from open_webui.config import VECTOR_DB
@@ -31,6 +30,14 @@ from open_webui.models.chats import Chats
 from open_webui.models.notes import Notes
 
 from open_webui.retrieval.vector.main import GetResult
+from open_webui.retrieval.bm25 import BM25Index, BM25Indexes, get_enriched_text
+from open_webui.retrieval.embedding_cache import with_embedding_cache
+from open_webui.retrieval.embedding_scheduler import (
+    EMBEDDING_SCHEDULER,
+    EmbeddingRateLimitError,
+    pack_embedding_batches,
+    parse_retry_after,
+)
 from open_webui.utils.access_control import has_access
 from open_webui.utils.headers import include_user_info_headers
 from open_webui.utils.misc import get_message_list
@@ -175,46 +182,37 @@ def get_doc(collection_name: str, user: UserModel = None):
 
 
 def get_enriched_texts(collection_result: GetResult) -> list[str]:
-    enriched_texts = []
-    for idx, text in enumerate(collection_result.documents[0]):
-        metadata = collection_result.metadatas[0][idx]
-        metadata_parts = [text]
-
-        # Add filename (repeat twice for extra weight in BM25 scoring)
-        if metadata.get("name"):
-            filename = metadata["name"]
-            filename_tokens = (
-                filename.replace("_", " ").replace("-", " ").replace(".", " ")
-            )
-            metadata_parts.append(
-                f"Filename: {filename} {filename_tokens} {filename_tokens}"
-            )
-
-        # Add title if available
-        if metadata.get("title"):
-            metadata_parts.append(f"Title: {metadata['title']}")
-
-        # Add document section headings if available (from markdown splitter)
-        if metadata.get("headings") and isinstance(metadata["headings"], list):
-            headings = " > ".join(str(h) for h in metadata["headings"])
-            metadata_parts.append(f"Section: {headings}")
-
-        # Add source URL/path if available
-        if metadata.get("source"):
-            metadata_parts.append(f"Source: {metadata['source']}")
+    return [
+        get_enriched_text(text, collection_result.metadatas[0][idx])
+        for idx, text in enumerate(collection_result.documents[0])
+    ]
 
-        # Add snippet for web search results
-        if metadata.get("snippet"):
-            metadata_parts.append(f"Snippet: {metadata['snippet']}")
 
-        enriched_texts.append(" ".join(metadata_parts))
+class BM25IndexRetriever(BaseRetriever):
+    index: Any
+    k: int
 
-    return enriched_texts
+    def _get_relevant_documents(
+        self, query: str, *, run_manager: CallbackManagerForRetrieverRun
+    ) -> list[Document]:
+        return [
+            Document(metadata=metadata, page_content=text)
+            for _, text, metadata in self.index.search(query, self.k)
+        ]
+
+
+def get_bm25_index(collection_name: str, enable_enriched_texts: bool = False):
+    """Cached BM25 index of a collection, built from the vector DB on first use."""
+    return BM25Indexes.get(
+        collection_name,
+        enable_enriched_texts,
+        loader=lambda: VECTOR_DB_CLIENT.get(collection_name=collection_name),
+    )
 
 
 async def query_doc_with_hybrid_search(
     collection_name: str,
-    collection_result: GetResult,
+    collection_result: Optional[GetResult],
     query: str,
     embedding_function,
     k: int,
@@ -223,39 +221,30 @@ async def query_doc_with_hybrid_search(
     r: float,
     hybrid_bm25_weight: float,
     enable_enriched_texts: bool = False,
+    bm25_index: Optional[BM25Index] = None,
 ) -> dict:
     try:
-        # First check if collection_result has the required attributes
-        if (
-            not collection_result
-            or not hasattr(collection_result, "documents")
-            or not hasattr(collection_result, "metadatas")
-        ):
-            log.warning(f"query_doc_with_hybrid_search:no_docs {collection_name}")
-            return {"documents": [], "metadatas": [], "distances": []}
+        if bm25_index is None and collection_result:
+            # No maintained index passed, index the given documents for this query
+            bm25_index = BM25Index()
+            if collection_result.documents and collection_result.documents[0]:
+                bm25_index.add(
+                    collection_result.ids[0],
+                    (
+                        get_enriched_texts(collection_result)
+                        if enable_enriched_texts
+                        else collection_result.documents[0]
+                    ),
+                    collection_result.metadatas[0],
+                )
 
-        # Now safely check the documents content after confirming attributes exist
-        if (
-            not collection_result.documents
-            or len(collection_result.documents) == 0
-            or not collection_result.documents[0]
-        ):
+        if not bm25_index:
             log.warning(f"query_doc_with_hybrid_search:no_docs {collection_name}")
             return {"documents": [], "metadatas": [], "distances": []}
 
         log.debug(f"query_doc_with_hybrid_search:doc {collection_name}")
 
-        bm25_texts = (
-            get_enriched_texts(collection_result)
-            if enable_enriched_texts
-            else collection_result.documents[0]
-        )
-
-        bm25_retriever = BM25Retriever.from_texts(
-            texts=bm25_texts,
-            metadatas=collection_result.metadatas[0],
-        )
-        bm25_retriever.k = k
+        bm25_retriever = BM25IndexRetriever(index=bm25_index, k=k)
 
         vector_search_retriever = VectorSearchRetriever(
             collection_name=collection_name,
@@ -474,20 +463,20 @@ async def query_collection_with_hybrid_search(
 ) -> dict:
     results = []
     error = False
-    # Fetch collection data once per collection sequentially
-    # Avoid fetching the same data multiple times later
-    collection_results = {}
+    # Load the BM25 index once per collection; collections are only fetched
+    # from the vector DB when no index was built for them yet
+    bm25_indexes = {}
     for collection_name in collection_names:
         try:
             log.debug(
-                f"query_collection_with_hybrid_search:VECTOR_DB_CLIENT.get:collection {collection_name}"
+                f"query_collection_with_hybrid_search:get_bm25_index:collection {collection_name}"
             )
-            collection_results[collection_name] = VECTOR_DB_CLIENT.get(
-                collection_name=collection_name
+            bm25_indexes[collection_name] = await asyncio.to_thread(
+                get_bm25_index, collection_name, enable_enriched_texts
             )
         except Exception as e:
             log.exception(f"Failed to fetch collection {collection_name}: {e}")
-            collection_results[collection_name] = None
+            bm25_indexes[collection_name] = None
 
     log.info(
         f"Starting hybrid search for {len(queries)} queries in {len(collection_names)} collections..."
@@ -497,7 +486,7 @@ async def query_collection_with_hybrid_search(
         try:
             result = await query_doc_with_hybrid_search(
                 collection_name=collection_name,
-                collection_result=collection_results[collection_name],
+                collection_result=None,
                 query=query,
                 embedding_function=embedding_function,
                 k=k,
@@ -506,6 +495,7 @@ async def query_collection_with_hybrid_search(
                 r=r,
                 hybrid_bm25_weight=hybrid_bm25_weight,
                 enable_enriched_texts=enable_enriched_texts,
+                bm25_index=bm25_indexes[collection_name],
             )
             return result, None
         except Exception as e:
@@ -513,11 +503,11 @@ async def query_collection_with_hybrid_search(
             return None, e
 
     # Prepare tasks for all collections and queries
-    # Avoid running any tasks for collections that failed to fetch data (have assigned None)
+    # Avoid running any tasks for collections that failed to load or are empty (have assigned None)
     tasks = [
         (collection_name, query)
         for collection_name in collection_names
-        if collection_results[collection_name] is not None
+        if bm25_indexes[collection_name] is not None
         for query in queries
     ]
 
@@ -608,6 +598,10 @@ async def agenerate_openai_batch_embeddings(
             async with session.post(
                 f"{url}/embeddings", headers=headers, json=form_data
             ) as r:
+                if r.status == 429:
+                    raise EmbeddingRateLimitError(
+                        parse_retry_after(r.headers.get("Retry-After"))
+                    )
                 r.raise_for_status()
                 data = await r.json()
 
@@ -635,6 +629,8 @@ async def agenerate_openai_batch_embeddings(
                     return [item["embedding"] for item in data["data"]]
                 else:
                     raise Exception("Something went wrong :/")
+    except EmbeddingRateLimitError:
+        raise
     except Exception as e:
         log.exception(f"Error generating openai batch embeddings: {e}")
         return None
@@ -718,6 +714,10 @@ async def agenerate_azure_openai_batch_embeddings(
             trust_env=True, timeout=aiohttp.ClientTimeout(total=AIOHTTP_CLIENT_TIMEOUT)
         ) as session:
             async with session.post(full_url, headers=headers, json=form_data) as r:
+                if r.status == 429:
+                    raise EmbeddingRateLimitError(
+                        parse_retry_after(r.headers.get("Retry-After"))
+                    )
                 r.raise_for_status()
                 data = await r.json()
 
@@ -742,6 +742,8 @@ async def agenerate_azure_openai_batch_embeddings(
                     return [item["embedding"] for item in data["data"]]
                 else:
                     raise Exception("Something went wrong :/")
+    except EmbeddingRateLimitError:
+        raise
     except Exception as e:
         log.exception(f"Error generating azure openai batch embeddings: {e}")
         return None
@@ -819,6 +821,10 @@ async def agenerate_ollama_batch_embeddings(
                 json=form_data,
                 ssl=AIOHTTP_CLIENT_SESSION_SSL,
             ) as r:
+                if r.status == 429:
+                    raise EmbeddingRateLimitError(
+                        parse_retry_after(r.headers.get("Retry-After"))
+                    )
                 r.raise_for_status()
                 data = await r.json()
 
@@ -837,6 +843,8 @@ async def agenerate_ollama_batch_embeddings(
                     return data["embeddings"]
                 else:
                     raise Exception("Something went wrong :/")
+    except EmbeddingRateLimitError:
+        raise
     except Exception as e:
         log.exception(f"Error generating ollama batch embeddings: {e}")
         return None
@@ -867,7 +875,9 @@ def get_embedding_function(
                 prefix,
             )
 
-        return async_embedding_function
+        return with_embedding_cache(
+            async_embedding_function, embedding_engine, embedding_model
+        )
     elif embedding_engine in ["ollama", "openai", "azure_openai"]:
         embedding_function = lambda query, prefix=None, user=None: generate_embeddings(
             engine=embedding_engine,
@@ -880,33 +890,23 @@ def get_embedding_function(
             azure_api_version=azure_api_version,
         )
 
+        # Concurrency limits and rate limit backoff are shared per provider
+        scheduler_key = (embedding_engine, url)
+
         async def async_embedding_function(query, prefix=None, user=None):
             if isinstance(query, list):
-                # Create batches
-                batches = [
-                    query[i : i + embedding_batch_size]
-                    for i in range(0, len(query), embedding_batch_size)
-                ]
+                batches = pack_embedding_batches(query, embedding_batch_size)
 
-                if enable_async:
-                    log.debug(
-                        f"generate_multiple_async: Processing {len(batches)} batches in parallel"
-                    )
-                    # Execute all batches in parallel
-                    tasks = [
-                        embedding_function(batch, prefix=prefix, user=user)
-                        for batch in batches
-                    ]
-                    batch_results = await asyncio.gather(*tasks)
-                else:
-                    log.debug(
-                        f"generate_multiple_async: Processing {len(batches)} batches sequentially"
-                    )
-                    batch_results = []
-                    for batch in batches:
-                        batch_results.append(
-                            await embedding_function(batch, prefix=prefix, user=user)
-                        )
+                log.debug(
+                    f"generate_multiple_async: Processing {len(batches)} batches "
+                    f"{'in parallel' if enable_async else 'sequentially'}"
+                )
+                batch_results = await EMBEDDING_SCHEDULER.run(
+                    scheduler_key,
+                    batches,
+                    lambda batch: embedding_function(batch, prefix=prefix, user=user),
+                    concurrent=enable_async,
+                )
 
                 # Flatten results
                 embeddings = []
@@ -915,13 +915,19 @@ def get_embedding_function(
                         embeddings.extend(batch_embeddings)
 
                 log.debug(
-                    f"generate_multiple_async: Generated {len(embeddings)} embeddings from {len(batches)} parallel batches"
+                    f"generate_multiple_async: Generated {len(embeddings)} embeddings from {len(batches)} batches"
                 )
                 return embeddings
             else:
-                return await embedding_function(query, prefix, user)
+                return await EMBEDDING_SCHEDULER.call(
+                    scheduler_key,
+                    lambda: embedding_function(query, prefix, user),
+                    [query],
+                )
 
-        return async_embedding_function
+        return with_embedding_cache(
+            async_embedding_function, embedding_engine, embedding_model
+        )
     else:
         raise ValueError(f"Unknown embedding engine: {embedding_engine}")
 
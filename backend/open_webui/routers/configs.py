@@ -15,6 +15,7 @@ from open_webui.utils.tools import (
     get_tool_server_data,
     get_tool_server_url,
     set_tool_servers,
+    ToolServerSpecs,
 )
 from open_webui.utils.mcp.client import MCPClient
 from open_webui.models.oauth_sessions import OAuthSessions
@@ -186,6 +187,8 @@ async def set_tool_servers_config(
         connection.model_dump() for connection in form_data.TOOL_SERVER_CONNECTIONS
     ]
 
+    # Fetch the specs again, e.g. when a server was saved to pick up its changes
+    ToolServerSpecs.clear()
     await set_tool_servers(request)
 
     for connection in request.app.state.config.TOOL_SERVER_CONNECTIONS:
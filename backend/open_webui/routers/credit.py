@@ -21,6 +21,7 @@ from open_webui.env import (
     REDIS_CLUSTER,
 )
 from open_webui.models.credits import (
+    CreditUsage,
     TradeTicketModel,
     TradeTickets,
     CreditLogSimpleModel,
@@ -246,17 +247,19 @@ async def get_statistics(
                 "user_payment_stats_x": [],
                 "user_payment_stats_y": [],
             }
-    else:
-        users = Users.get_users()["users"]
-        user_map = {user.id: user.name for user in users}
 
     # load credit data
-    logs = CreditLogs.get_log_by_time(
+    usages = CreditUsage.get_usage_by_time(
         form_data.start_time, form_data.end_time, user_ids
     )
     trade_logs = TradeTickets.get_ticket_by_time(
         form_data.start_time, form_data.end_time, user_ids
     )
+    if not form_data.query:
+        users = Users.get_users_by_user_ids(
+            user_ids=list({usage.user_id for usage in usages})
+        )
+        user_map = {user.id: user.name for user in users}
 
     # build graph data
     total_tokens = 0
@@ -265,24 +268,17 @@ async def get_statistics(
     model_token_pie = defaultdict(int)
     user_cost_pie = defaultdict(int)
     user_token_pie = defaultdict(int)
-    for log in logs:
-        if not log.detail.usage or log.detail.usage.total_price is None:
-            continue
-
-        model = log.detail.api_params.model
-        if not model:
-            continue
-
-        total_tokens += log.detail.usage.total_tokens
-        total_credit += log.detail.usage.total_price
+    for usage in usages:
+        total_tokens += usage.total_tokens
+        total_credit += usage.cost
 
-        model_key = log.detail.api_params.model.id
-        model_cost_pie[model_key] += log.detail.usage.total_price
-        model_token_pie[model_key] += log.detail.usage.total_tokens
+        model_key = usage.model_id or None
+        model_cost_pie[model_key] += usage.cost
+        model_token_pie[model_key] += usage.total_tokens
 
-        user_key = f"{log.user_id}:{user_map.get(log.user_id, log.user_id)}"
-        user_cost_pie[user_key] += log.detail.usage.total_price
-        user_token_pie[user_key] += log.detail.usage.total_tokens
+        user_key = f"{usage.user_id}:{user_map.get(usage.user_id, usage.user_id)}"
+        user_cost_pie[user_key] += usage.cost
+        user_token_pie[user_key] += usage.total_tokens
 
     # build trade data
     total_payment = 0
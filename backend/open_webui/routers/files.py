@@ -1,7 +1,9 @@
 import logging
 import os
+import re
 import uuid
 import json
+import time
 from pathlib import Path
 from typing import Optional
 from urllib.parse import quote
@@ -20,11 +22,12 @@ from fastapi import (
     Query,
 )
 
-from fastapi.responses import FileResponse, StreamingResponse
+from fastapi.responses import FileResponse, Response, StreamingResponse
 from sqlalchemy.orm import Session
 from open_webui.internal.db import get_session, SessionLocal
 
 from open_webui.constants import ERROR_MESSAGES
+from open_webui.retrieval.bm25 import BM25Indexes
 from open_webui.retrieval.vector.factory import VECTOR_DB_CLIENT
 
 from open_webui.models.channels import Channels
@@ -43,11 +46,12 @@ from open_webui.models.groups import Groups
 from open_webui.routers.retrieval import ProcessFileForm, process_file
 from open_webui.routers.audio import transcribe
 
-from open_webui.storage.provider import Storage
+from open_webui.storage.provider import LocalStorageProvider, Storage
 
 
 from open_webui.utils.auth import get_admin_user, get_verified_user
 from open_webui.utils.access_control import has_access
+from open_webui.utils.file_status import FILE_STATUS_POLL_INTERVAL, FileStatusEvents
 from open_webui.utils.misc import strict_match_mime_type
 from pydantic import BaseModel
 
@@ -173,14 +177,16 @@ def process_uploaded_file(
 
         except Exception as e:
             log.error(f"Error processing file: {file_item.id}")
+            error = str(e.detail) if hasattr(e, "detail") else str(e)
             Files.update_file_data_by_id(
                 file_item.id,
                 {
                     "status": "failed",
-                    "error": str(e.detail) if hasattr(e, "detail") else str(e),
+                    "error": error,
                 },
                 db=db_session,
             )
+            FileStatusEvents.publish(file_item.id, "failed", error)
 
     if db:
         _process_handler(db)
@@ -259,7 +265,7 @@ def upload_file_handler(
         id = str(uuid.uuid4())
         name = filename
         filename = f"{id}_{filename}"
-        contents, file_path = Storage.upload_file(
+        file_path, file_digest, file_size = Storage.upload_file_stream(
             file.file,
             filename,
             {
@@ -283,7 +289,8 @@ def upload_file_handler(
                     "meta": {
                         "name": name,
                         "content_type": file.content_type,
-                        "size": len(contents),
+                        "size": file_size,
+                        "sha256": file_digest,
                         "data": file_metadata,
                     },
                 }
@@ -427,6 +434,7 @@ async def delete_all_files(
         try:
             Storage.delete_all_files()
             VECTOR_DB_CLIENT.reset()
+            BM25Indexes.reset()
         except Exception as e:
             log.exception(e)
             log.error("Error deleting files")
@@ -497,30 +505,37 @@ async def get_file_process_status(
 
             async def event_stream(file_id):
                 # NOTE: We intentionally do NOT capture the request's db session here.
-                # Each poll creates its own short-lived session to avoid holding a
-                # connection for hours. A WebSocket push would be more efficient.
-                for _ in range(MAX_FILE_PROCESSING_DURATION):
-                    file_item = Files.get_file_by_id(file_id)  # Creates own session
-                    if file_item:
-                        data = file_item.model_dump().get("data", {})
-                        status = data.get("status")
-
-                        if status:
-                            event = {"status": status}
-                            if status == "failed":
-                                event["error"] = data.get("error")
+                # Status changes are pushed by FileStatusEvents, the file is only read
+                # (with its own short-lived session) on subscribe and when no event
+                # arrived for FILE_STATUS_POLL_INTERVAL seconds.
+                deadline = time.monotonic() + MAX_FILE_PROCESSING_DURATION
+                async with FileStatusEvents.subscribe(file_id) as events:
+                    event = None
+                    while time.monotonic() < deadline:
+                        if event is None:
+                            file_item = Files.get_file_by_id(file_id)
+                            if not file_item:
+                                yield f"data: {json.dumps({'status': 'not_found'})}\n\n"
+                                break
 
-                            yield f"data: {json.dumps(event)}\n\n"
-                            if status in ("completed", "failed"):
+                            data = file_item.data or {}
+                            if not data.get("status"):
+                                # Legacy
                                 break
-                        else:
-                            # Legacy
+                            event = {"status": data["status"]}
+                            if event["status"] == "failed":
+                                event["error"] = data.get("error")
+
+                        yield f"data: {json.dumps(event)}\n\n"
+                        if event["status"] in ("completed", "failed"):
                             break
-                    else:
-                        yield f"data: {json.dumps({'status': 'not_found'})}\n\n"
-                        break
 
-                    await asyncio.sleep(1)
+                        try:
+                            event = await asyncio.wait_for(
+                                events.get(), timeout=FILE_STATUS_POLL_INTERVAL
+                            )
+                        except asyncio.TimeoutError:
+                            event = None
 
             return StreamingResponse(
                 event_stream(file.id),
@@ -619,9 +634,58 @@ async def update_file_data_content_by_id(
 ############################
 
 
+def parse_range_header(
+    range_header: Optional[str],
+) -> Optional[tuple[Optional[int], Optional[int]]]:
+    """Start and end of a single byte range, None for other or invalid ranges."""
+    match = re.fullmatch(r"\s*bytes=(\d*)-(\d*)\s*", range_header or "")
+    if not match or match.groups() == ("", ""):
+        return None
+    start, end = match.groups()
+    return int(start) if start else None, int(end) if end else None
+
+
+def get_file_range_response(
+    file_path: str,
+    range_header: Optional[str],
+    headers: dict,
+    media_type: Optional[str] = None,
+) -> Optional[Response]:
+    """
+    Stream the requested range of a file in remote storage, without
+    downloading the whole file. None if there is no single byte range to
+    serve or the file is local, FileResponse handles ranges of local files.
+    """
+    if isinstance(Storage, LocalStorageProvider):
+        return None
+    requested_range = parse_range_header(range_header)
+    if requested_range is None:
+        return None
+
+    byte_range, size, chunks = Storage.get_file_range(file_path, *requested_range)
+    if byte_range is None:
+        return Response(
+            status_code=status.HTTP_416_RANGE_NOT_SATISFIABLE,
+            headers={"Content-Range": f"bytes */{size}"},
+        )
+    start, end = byte_range
+    return StreamingResponse(
+        chunks,
+        status_code=status.HTTP_206_PARTIAL_CONTENT,
+        media_type=media_type,
+        headers={
+            **headers,
+            "Accept-Ranges": "bytes",
+            "Content-Range": f"bytes {start}-{end}/{size}",
+            "Content-Length": str(end - start + 1),
+        },
+    )
+
+
 @router.get("/{id}/content")
 async def get_file_content_by_id(
     id: str,
+    request: Request,
     user=Depends(get_verified_user),
     attachment: bool = Query(False),
     db: Session = Depends(get_session),
@@ -641,42 +705,45 @@ async def get_file_content_by_id(
         or has_access_to_file(id, "read", user, db=db)
     ):
         try:
+            # Handle Unicode filenames
+            content_type = file.meta.get("content_type")
+            filename = file.meta.get("name", file.filename)
+            encoded_filename = quote(filename)  # RFC5987 encoding
+            headers = {}
+
+            if attachment:
+                headers["Content-Disposition"] = (
+                    f"attachment; filename*=UTF-8''{encoded_filename}"
+                )
+            else:
+                if content_type == "application/pdf" or filename.lower().endswith(
+                    ".pdf"
+                ):
+                    headers["Content-Disposition"] = (
+                        f"inline; filename*=UTF-8''{encoded_filename}"
+                    )
+                    content_type = "application/pdf"
+                elif content_type and content_type.startswith("image/"):
+                    # Serve images inline so they render in <img> tags
+                    headers["Content-Disposition"] = (
+                        f"inline; filename*=UTF-8''{encoded_filename}"
+                    )
+                elif content_type != "text/plain":
+                    headers["Content-Disposition"] = (
+                        f"attachment; filename*=UTF-8''{encoded_filename}"
+                    )
+
+            response = get_file_range_response(
+                file.path, request.headers.get("range"), headers, content_type
+            )
+            if response is not None:
+                return response
+
             file_path = Storage.get_file(file.path)
             file_path = Path(file_path)
 
             # Check if the file already exists in the cache
             if file_path.is_file():
-                # Handle Unicode filenames
-                filename = file.meta.get("name", file.filename)
-                encoded_filename = quote(filename)  # RFC5987 encoding
-
-                content_type = file.meta.get("content_type")
-                filename = file.meta.get("name", file.filename)
-                encoded_filename = quote(filename)
-                headers = {}
-
-                if attachment:
-                    headers["Content-Disposition"] = (
-                        f"attachment; filename*=UTF-8''{encoded_filename}"
-                    )
-                else:
-                    if content_type == "application/pdf" or filename.lower().endswith(
-                        ".pdf"
-                    ):
-                        headers["Content-Disposition"] = (
-                            f"inline; filename*=UTF-8''{encoded_filename}"
-                        )
-                        content_type = "application/pdf"
-                    elif content_type and content_type.startswith("image/"):
-                        # Serve images inline so they render in <img> tags
-                        headers["Content-Disposition"] = (
-                            f"inline; filename*=UTF-8''{encoded_filename}"
-                        )
-                    elif content_type != "text/plain":
-                        headers["Content-Disposition"] = (
-                            f"attachment; filename*=UTF-8''{encoded_filename}"
-                        )
-
                 return FileResponse(file_path, headers=headers, media_type=content_type)
 
             else:
@@ -751,7 +818,10 @@ async def get_html_file_content_by_id(
 
 @router.get("/{id}/content/{file_name}")
 async def get_file_content_by_id(
-    id: str, user=Depends(get_verified_user), db: Session = Depends(get_session)
+    id: str,
+    request: Request,
+    user=Depends(get_verified_user),
+    db: Session = Depends(get_session),
 ):
     file = Files.get_file_by_id(id, db=db)
 
@@ -776,6 +846,12 @@ async def get_file_content_by_id(
         }
 
         if file_path:
+            response = get_file_range_response(
+                file_path, request.headers.get("range"), headers
+            )
+            if response is not None:
+                return response
+
             file_path = Storage.get_file(file_path)
             file_path = Path(file_path)
 
@@ -836,6 +912,7 @@ async def delete_file_by_id(
             try:
                 Storage.delete_file(file.path)
                 VECTOR_DB_CLIENT.delete(collection_name=f"file-{id}")
+                BM25Indexes.drop(f"file-{id}")
             except Exception as e:
                 log.exception(e)
                 log.error("Error deleting files")
@@ -32,6 +32,7 @@ from open_webui.env import (
 
 from open_webui.utils.auth import get_admin_user, get_verified_user
 from open_webui.utils.access_control import has_access
+from open_webui.utils.client_sessions import ClientSessions
 
 try:
     from open_webui.utils.credit.usage import CreditDeduct
@@ -56,7 +57,7 @@ async def send_get_request(url: str, key: str = None, config: dict = None) -> di
     """
     timeout = aiohttp.ClientTimeout(total=AIOHTTP_CLIENT_TIMEOUT_MODEL_LIST)
     try:
-        async with aiohttp.ClientSession(timeout=timeout, trust_env=True) as session:
+        async with ClientSessions.get(url, timeout=timeout) as session:
             headers = {"Content-Type": "application/json"}
 
             # Determine authentication method based on config
@@ -1253,7 +1254,7 @@ async def generate_chat_completion(
             global_tool_call_index = 0  # CRITICAL: Track tool call index across stream chunks for parallel tool calls
 
             try:
-                async with aiohttp.ClientSession(timeout=timeout, trust_env=True) as session:
+                async with ClientSessions.get(gemini_url, timeout=timeout) as session:
                     async with session.post(gemini_url, json=gemini_payload, headers=headers) as response:
                         log.info(f"Gemini Stream Response Status: {response.status}")
                         log.info(f"Gemini Stream Response Headers: {response.headers}")
@@ -1544,7 +1545,7 @@ async def generate_chat_completion(
     # Non-streaming response
     try:
         timeout = aiohttp.ClientTimeout(total=300)
-        async with aiohttp.ClientSession(timeout=timeout, trust_env=True) as session:
+        async with ClientSessions.get(gemini_url, timeout=timeout) as session:
             async with session.post(gemini_url, json=gemini_payload, headers=headers) as response:
                 log.info(f"Gemini Chat Response Status: {response.status}")
                 if response.status != 200:
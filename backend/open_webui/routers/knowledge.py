@@ -18,6 +18,7 @@ from open_webui.models.knowledge import (
     KnowledgeUserResponse,
 )
 from open_webui.models.files import Files, FileModel, FileMetadataResponse
+from open_webui.retrieval.bm25 import BM25Indexes
 from open_webui.retrieval.vector.factory import VECTOR_DB_CLIENT
 from open_webui.routers.retrieval import (
     process_file,
@@ -297,6 +298,7 @@ async def reindex_knowledge_files(
                     VECTOR_DB_CLIENT.delete_collection(
                         collection_name=knowledge_base.id
                     )
+                    BM25Indexes.drop(knowledge_base.id)
             except Exception as e:
                 log.error(f"Error deleting collection {knowledge_base.id}: {str(e)}")
                 continue  # Skip, don't raise
@@ -635,6 +637,7 @@ def update_file_from_knowledge_by_id(
     VECTOR_DB_CLIENT.delete(
         collection_name=knowledge.id, filter={"file_id": form_data.file_id}
     )
+    BM25Indexes.delete(knowledge.id, filter={"file_id": form_data.file_id})
 
     # Add content to the vector database
     try:
@@ -708,10 +711,12 @@ def remove_file_from_knowledge_by_id(
         VECTOR_DB_CLIENT.delete(
             collection_name=knowledge.id, filter={"file_id": form_data.file_id}
         )  # Remove by file_id first
+        BM25Indexes.delete(knowledge.id, filter={"file_id": form_data.file_id})
 
         VECTOR_DB_CLIENT.delete(
             collection_name=knowledge.id, filter={"hash": file.hash}
         )  # Remove by hash as well in case of duplicates
+        BM25Indexes.delete(knowledge.id, filter={"hash": file.hash})
     except Exception as e:
         log.debug("This was most likely caused by bypassing embedding processing")
         log.debug(e)
@@ -723,6 +728,7 @@ def remove_file_from_knowledge_by_id(
             file_collection = f"file-{form_data.file_id}"
             if VECTOR_DB_CLIENT.has_collection(collection_name=file_collection):
                 VECTOR_DB_CLIENT.delete_collection(collection_name=file_collection)
+                BM25Indexes.drop(file_collection)
         except Exception as e:
             log.debug("This was most likely caused by bypassing embedding processing")
             log.debug(e)
@@ -801,6 +807,7 @@ async def delete_knowledge_by_id(
     # Clean up vector DB
     try:
         VECTOR_DB_CLIENT.delete_collection(collection_name=id)
+        BM25Indexes.drop(id)
     except Exception as e:
         log.debug(e)
         pass
@@ -840,6 +847,7 @@ async def reset_knowledge_by_id(
 
     try:
         VECTOR_DB_CLIENT.delete_collection(collection_name=id)
+        BM25Indexes.drop(id)
     except Exception as e:
         log.debug(e)
         pass
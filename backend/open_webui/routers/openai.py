@@ -64,6 +64,7 @@ from open_webui.utils.heartbeat import HeartbeatStreamWrapper
 from open_webui.utils.auth import get_admin_user, get_verified_user
 from open_webui.utils.access_control import has_access
 from open_webui.utils.headers import include_user_info_headers
+from open_webui.utils.client_sessions import ClientSessions
 
 
 log = logging.getLogger(__name__)
@@ -1473,7 +1474,7 @@ async def _safe_response_json(response: aiohttp.ClientResponse):
 async def send_get_request(url, key=None, user: UserModel = None, timeout_seconds=None):
     timeout = aiohttp.ClientTimeout(total=timeout_seconds or AIOHTTP_CLIENT_TIMEOUT_MODEL_LIST)
     try:
-        async with aiohttp.ClientSession(timeout=timeout, trust_env=True) as session:
+        async with ClientSessions.get(url, timeout=timeout) as session:
             headers = {
                 **({"Authorization": f"Bearer {key}"} if key else {}),
             }
@@ -1577,7 +1578,7 @@ async def send_get_request_with_fallback(
     tried_urls = []
 
     try:
-        async with aiohttp.ClientSession(timeout=timeout, trust_env=True) as session:
+        async with ClientSessions.get(base_url, timeout=timeout) as session:
             headers = {
                 **({"Authorization": f"Bearer {key}"} if key else {}),
             }
@@ -1632,7 +1633,8 @@ async def cleanup_response(
     session: Optional[aiohttp.ClientSession],
 ):
     if response:
-        response.close()
+        # Returns the connection to the pool once the body was read
+        response.release()
     if session:
         await session.close()
 
@@ -2403,9 +2405,8 @@ async def get_models(
 
         r = None
         # Use a shorter timeout (3 seconds) for model list to avoid UI blocking
-        async with aiohttp.ClientSession(
-            trust_env=True,
-            timeout=aiohttp.ClientTimeout(total=3),
+        async with ClientSessions.get(
+            url, timeout=aiohttp.ClientTimeout(total=3)
         ) as session:
             try:
                 headers, cookies = await get_headers_and_cookies(
@@ -2490,9 +2491,8 @@ async def verify_connection(
 
     api_config = form_data.config or {}
 
-    async with aiohttp.ClientSession(
-        trust_env=True,
-        timeout=aiohttp.ClientTimeout(total=AIOHTTP_CLIENT_TIMEOUT_MODEL_LIST),
+    async with ClientSessions.get(
+        url, timeout=aiohttp.ClientTimeout(total=AIOHTTP_CLIENT_TIMEOUT_MODEL_LIST)
     ) as session:
         try:
             headers, cookies = await get_headers_and_cookies(
@@ -3311,8 +3311,8 @@ async def generate_chat_completion(
     responses_enable_thinking_injected = use_responses_api and payload_dict.get("enable_thinking") is True
 
     try:
-        session = aiohttp.ClientSession(
-            trust_env=True, timeout=aiohttp.ClientTimeout(total=AIOHTTP_CLIENT_TIMEOUT)
+        session = ClientSessions.get(
+            request_url, timeout=aiohttp.ClientTimeout(total=AIOHTTP_CLIENT_TIMEOUT)
         )
 
         r = await session.request(
@@ -3351,8 +3351,8 @@ async def generate_chat_completion(
                 thinking_fallback_triggered = True  # Mark that thinking was disabled
                 retry_payload = json.dumps(payload_dict)
 
-                session = aiohttp.ClientSession(
-                    trust_env=True, timeout=aiohttp.ClientTimeout(total=AIOHTTP_CLIENT_TIMEOUT)
+                session = ClientSessions.get(
+                    request_url, timeout=aiohttp.ClientTimeout(total=AIOHTTP_CLIENT_TIMEOUT)
                 )
                 r = await session.request(
                     method="POST",
@@ -3394,8 +3394,8 @@ async def generate_chat_completion(
                 responses_thinking_fallback_triggered = True
                 retry_payload = json.dumps(payload_dict)
 
-                session = aiohttp.ClientSession(
-                    trust_env=True, timeout=aiohttp.ClientTimeout(total=AIOHTTP_CLIENT_TIMEOUT)
+                session = ClientSessions.get(
+                    request_url, timeout=aiohttp.ClientTimeout(total=AIOHTTP_CLIENT_TIMEOUT)
                 )
                 r = await session.request(
                     method="POST",
@@ -3434,9 +3434,8 @@ async def generate_chat_completion(
                     _set_web_search_tool_type(payload_dict, tool_type)
                     retry_payload = json.dumps(payload_dict)
 
-                    session = aiohttp.ClientSession(
-                        trust_env=True,
-                        timeout=aiohttp.ClientTimeout(total=AIOHTTP_CLIENT_TIMEOUT)
+                    session = ClientSessions.get(
+                        request_url, timeout=aiohttp.ClientTimeout(total=AIOHTTP_CLIENT_TIMEOUT)
                     )
                     r = await session.request(
                         method="POST",
@@ -3474,9 +3473,8 @@ async def generate_chat_completion(
                 _remove_native_web_search_tools(payload_dict)
                 retry_payload = json.dumps(payload_dict)
 
-                session = aiohttp.ClientSession(
-                    trust_env=True,
-                    timeout=aiohttp.ClientTimeout(total=AIOHTTP_CLIENT_TIMEOUT)
+                session = ClientSessions.get(
+                    request_url, timeout=aiohttp.ClientTimeout(total=AIOHTTP_CLIENT_TIMEOUT)
                 )
                 r = await session.request(
                     method="POST",
@@ -3510,8 +3508,8 @@ async def generate_chat_completion(
                 payload_dict.pop("tool_choice", None)
                 retry_payload = json.dumps(payload_dict)
                 
-                session = aiohttp.ClientSession(
-                    trust_env=True, timeout=aiohttp.ClientTimeout(total=AIOHTTP_CLIENT_TIMEOUT)
+                session = ClientSessions.get(
+                    request_url, timeout=aiohttp.ClientTimeout(total=AIOHTTP_CLIENT_TIMEOUT)
                 )
                 r = await session.request(
                     method="POST",
@@ -3644,9 +3642,8 @@ async def generate_chat_completion(
                             step,
                             compat_budget,
                         )
-                        session = aiohttp.ClientSession(
-                            trust_env=True,
-                            timeout=aiohttp.ClientTimeout(total=AIOHTTP_CLIENT_TIMEOUT),
+                        session = ClientSessions.get(
+                            request_url, timeout=aiohttp.ClientTimeout(total=AIOHTTP_CLIENT_TIMEOUT)
                         )
                         r = await session.request(
                             method="POST",
@@ -3788,9 +3785,8 @@ async def generate_chat_completion(
                     retry_payload = json.dumps(retry_payload_dict)
 
                     # Create new session and retry
-                    session = aiohttp.ClientSession(
-                        trust_env=True,
-                        timeout=aiohttp.ClientTimeout(total=AIOHTTP_CLIENT_TIMEOUT),
+                    session = ClientSessions.get(
+                        request_url, timeout=aiohttp.ClientTimeout(total=AIOHTTP_CLIENT_TIMEOUT)
                     )
                     r = await session.request(
                         method="POST",
@@ -3910,7 +3906,7 @@ async def embeddings(request: Request, form_data: dict, user):
         request, url, key, api_config, user=user
     )
     try:
-        session = aiohttp.ClientSession(trust_env=True)
+        session = ClientSessions.get(url)
         r = await session.request(
             method="POST",
             url=f"{url}/embeddings",
@@ -4000,7 +3996,7 @@ async def proxy(path: str, request: Request, user=Depends(get_verified_user)):
         else:
             request_url = f"{url}/{path}"
 
-        session = aiohttp.ClientSession(trust_env=True)
+        session = ClientSessions.get(request_url)
         r = await session.request(
             method=request.method,
             url=request_url,
@@ -77,7 +77,9 @@ from open_webui.retrieval.web.sougou import search_sougou
 from open_webui.retrieval.web.firecrawl import search_firecrawl
 from open_webui.retrieval.web.external import search_external
 
+from open_webui.retrieval.bm25 import BM25Indexes
 from open_webui.retrieval.utils import (
+    get_bm25_index,
     get_content_from_url,
     get_embedding_function,
     get_reranking_function,
@@ -95,6 +97,7 @@ from open_webui.utils.misc import (
 from open_webui.utils.auth import get_admin_user, get_verified_user
 from open_webui.utils.lazy_loader import LazyStateProxy
 from open_webui.utils.access_control import has_permission
+from open_webui.utils.file_status import FileStatusEvents
 
 from open_webui.config import (
     ENV,
@@ -1525,6 +1528,7 @@ def save_docs_to_vector_db(
 
             if overwrite:
                 VECTOR_DB_CLIENT.delete_collection(collection_name=collection_name)
+                BM25Indexes.drop(collection_name)
                 log.info(f"deleting existing collection {collection_name}")
             elif add is False:
                 log.info(
@@ -1589,6 +1593,7 @@ def save_docs_to_vector_db(
             collection_name=collection_name,
             items=items,
         )
+        BM25Indexes.add(collection_name, items)
 
         log.info(f"added {len(items)} items to collection {collection_name}")
         return True
@@ -1635,6 +1640,7 @@ def process_file(
                     VECTOR_DB_CLIENT.delete_collection(
                         collection_name=f"file-{file.id}"
                     )
+                    BM25Indexes.drop(f"file-{file.id}")
                 except:
                     # Audio file upload pipeline
                     pass
@@ -1765,6 +1771,7 @@ def process_file(
             if request.app.state.config.BYPASS_EMBEDDING_AND_RETRIEVAL:
                 Files.update_file_data_by_id(file.id, {"status": "completed"}, db=db)
                 Files.update_file_hash_by_id(file.id, hash, db=db)
+                FileStatusEvents.publish(file.id, "completed")
                 return {
                     "status": True,
                     "collection_name": None,
@@ -1802,6 +1809,7 @@ def process_file(
                             db=db,
                         )
                         Files.update_file_hash_by_id(file.id, hash, db=db)
+                        FileStatusEvents.publish(file.id, "completed")
 
                         return {
                             "status": True,
@@ -1823,6 +1831,7 @@ def process_file(
             )
             # Clear the hash so the file can be re-uploaded after fixing the issue
             Files.update_file_hash_by_id(file.id, None, db=db)
+            FileStatusEvents.publish(file.id, "failed", str(e))
 
             if "No pandoc was found" in str(e):
                 raise HTTPException(
@@ -2413,6 +2422,7 @@ class QueryDocForm(BaseModel):
     k_reranker: Optional[int] = None
     r: Optional[float] = None
     hybrid: Optional[bool] = None
+    hybrid_bm25_weight: Optional[float] = None
 
 
 @router.post("/query/doc")
@@ -2425,13 +2435,15 @@ async def query_doc_handler(
         if request.app.state.config.ENABLE_RAG_HYBRID_SEARCH and (
             form_data.hybrid is None or form_data.hybrid
         ):
-            collection_results = {}
-            collection_results[form_data.collection_name] = VECTOR_DB_CLIENT.get(
-                collection_name=form_data.collection_name
+            enable_enriched_texts = (
+                request.app.state.config.ENABLE_RAG_HYBRID_SEARCH_ENRICHED_TEXTS
+            )
+            bm25_index = await asyncio.to_thread(
+                get_bm25_index, form_data.collection_name, enable_enriched_texts
             )
             return await query_doc_with_hybrid_search(
                 collection_name=form_data.collection_name,
-                collection_result=collection_results[form_data.collection_name],
+                collection_result=None,
                 query=form_data.query,
                 embedding_function=lambda query, prefix: request.app.state.EMBEDDING_FUNCTION(
                     query, prefix=prefix, user=user
@@ -2458,7 +2470,8 @@ async def query_doc_handler(
                     if form_data.hybrid_bm25_weight
                     else request.app.state.config.HYBRID_BM25_WEIGHT
                 ),
-                user=user,
+                enable_enriched_texts=enable_enriched_texts,
+                bm25_index=bm25_index,
             )
         else:
             query_embedding = await request.app.state.EMBEDDING_FUNCTION(
@@ -2581,8 +2594,9 @@ def delete_entries_from_collection(
 
             VECTOR_DB_CLIENT.delete(
                 collection_name=form_data.collection_name,
-                metadata={"hash": hash},
+                filter={"hash": hash},
             )
+            BM25Indexes.delete(form_data.collection_name, filter={"hash": hash})
             return {"status": True}
         else:
             return {"status": False}
@@ -2594,6 +2608,7 @@ def delete_entries_from_collection(
 @router.post("/reset/db")
 def reset_vector_db(user=Depends(get_admin_user), db: Session = Depends(get_session)):
     VECTOR_DB_CLIENT.reset()
+    BM25Indexes.reset()
     Knowledges.delete_all_knowledge(db=db)
 
 
@@ -25,6 +25,7 @@ from open_webui.utils.plugin import (
     load_tool_module_by_id,
     replace_imports,
     get_tool_module_from_cache,
+    set_tool_module,
 )
 from open_webui.utils.tools import get_tool_specs
 from open_webui.utils.auth import get_admin_user, get_verified_user
@@ -337,10 +338,9 @@ async def create_new_tools(
             )
             form_data.meta.manifest = frontmatter
 
-            TOOLS = request.app.state.TOOLS
-            TOOLS[form_data.id] = tool_module
+            set_tool_module(request, form_data.id, tool_module, form_data.content)
 
-            specs = get_tool_specs(TOOLS[form_data.id])
+            specs = get_tool_specs(tool_module)
             tools = Tools.insert_new_tool(user.id, form_data, specs, db=db)
 
             tool_cache_dir = CACHE_DIR / "tools" / form_data.id
@@ -439,10 +439,9 @@ async def update_tools_by_id(
         tool_module, frontmatter = load_tool_module_by_id(id, content=form_data.content)
         form_data.meta.manifest = frontmatter
 
-        TOOLS = request.app.state.TOOLS
-        TOOLS[id] = tool_module
+        set_tool_module(request, id, tool_module, form_data.content)
 
-        specs = get_tool_specs(TOOLS[id])
+        specs = get_tool_specs(tool_module)
 
         updated = {
             **form_data.model_dump(exclude={"id"}),
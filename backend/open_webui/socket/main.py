@@ -7,11 +7,11 @@ import sys
 import time
 from typing import Dict, Set
 from redis import asyncio as aioredis
-import pycrdt as Y
 
 from open_webui.models.users import Users, UserNameResponse
 from open_webui.models.channels import Channels
 from open_webui.models.chats import Chats
+from open_webui.models.files import Files
 from open_webui.models.notes import Notes, NoteUpdateForm
 from open_webui.utils.redis import (
     get_sentinels_from_env,
@@ -29,6 +29,7 @@ from open_webui.env import (
     WEBSOCKET_REDIS_URL,
     WEBSOCKET_REDIS_CLUSTER,
     WEBSOCKET_REDIS_LOCK_TIMEOUT,
+    WEBSOCKET_SESSION_POOL_CACHE_TTL,
     WEBSOCKET_SENTINEL_PORT,
     WEBSOCKET_SENTINEL_HOSTS,
     REDIS_KEY_PREFIX,
@@ -37,9 +38,18 @@ from open_webui.env import (
     WEBSOCKET_SERVER_PING_INTERVAL,
     WEBSOCKET_SERVER_LOGGING,
     WEBSOCKET_SERVER_ENGINEIO_LOGGING,
+    WEBSOCKET_EVENT_COALESCE_WINDOW_MS,
+    CHAT_RESPONSE_STREAM_DELTA_CHUNK_SIZE,
 )
 from open_webui.utils.auth import decode_token
-from open_webui.socket.utils import RedisDict, RedisLock, YdocManager
+from open_webui.socket.utils import (
+    AsyncLocalDict,
+    AsyncRedisDict,
+    RedisDict,
+    RedisLock,
+    YdocManager,
+)
+from open_webui.utils.chat_buffer import ChatMessageBuffer
 from open_webui.tasks import create_task, stop_item_tasks
 from open_webui.utils.redis import get_redis_connection
 from open_webui.utils.access_control import has_access, get_users_with_access
@@ -126,13 +136,14 @@ if WEBSOCKET_MANAGER == "redis":
         redis_cluster=WEBSOCKET_REDIS_CLUSTER,
     )
 
-    SESSION_POOL = RedisDict(
+    SESSION_POOL = AsyncRedisDict(
         f"{REDIS_KEY_PREFIX}:session_pool",
         redis_url=WEBSOCKET_REDIS_URL,
         redis_sentinels=redis_sentinels,
         redis_cluster=WEBSOCKET_REDIS_CLUSTER,
+        cache_ttl=WEBSOCKET_SESSION_POOL_CACHE_TTL,
     )
-    USAGE_POOL = RedisDict(
+    USAGE_POOL = AsyncRedisDict(
         f"{REDIS_KEY_PREFIX}:usage_pool",
         redis_url=WEBSOCKET_REDIS_URL,
         redis_sentinels=redis_sentinels,
@@ -152,8 +163,8 @@ if WEBSOCKET_MANAGER == "redis":
 else:
     MODELS = {}
 
-    SESSION_POOL = {}
-    USAGE_POOL = {}
+    SESSION_POOL = AsyncLocalDict()
+    USAGE_POOL = AsyncLocalDict()
 
     aquire_func = release_func = renew_func = lambda: True
 
@@ -192,25 +203,29 @@ async def periodic_usage_pool_cleanup():
                 raise Exception("Unable to renew usage pool cleanup lock.")
 
             now = int(time.time())
-            send_usage = False
-            for model_id, connections in list(USAGE_POOL.items()):
+            updated_models = {}
+            removed_models = []
+            for model_id, connections in await USAGE_POOL.items():
                 # Creating a list of sids to remove if they have timed out
                 expired_sids = [
                     sid
                     for sid, details in connections.items()
                     if now - details["updated_at"] > TIMEOUT_DURATION
                 ]
+                if not expired_sids:
+                    continue
 
                 for sid in expired_sids:
                     del connections[sid]
 
                 if not connections:
                     log.debug(f"Cleaning up model {model_id} from usage pool")
-                    del USAGE_POOL[model_id]
+                    removed_models.append(model_id)
                 else:
-                    USAGE_POOL[model_id] = connections
+                    updated_models[model_id] = connections
 
-                send_usage = True
+            # Only models that changed are written back, in a single pipeline
+            await USAGE_POOL.update_many(updated_models, deleted_keys=removed_models)
             await asyncio.sleep(TIMEOUT_DURATION)
     finally:
         release_func()
@@ -222,14 +237,14 @@ app = socketio.ASGIApp(
 )
 
 
-def get_models_in_use():
+async def get_models_in_use():
     # List models that are currently in use
-    models_in_use = list(USAGE_POOL.keys())
+    models_in_use = list(await USAGE_POOL.keys())
     return models_in_use
 
 
-def get_user_id_from_session_pool(sid):
-    user = SESSION_POOL.get(sid)
+async def get_user_id_from_session_pool(sid):
+    user = await SESSION_POOL.get(sid)
     if user:
         return user["id"]
     return None
@@ -244,18 +259,12 @@ def get_session_ids_from_room(room):
     return [session_id[0] for session_id in active_session_ids]
 
 
-def get_user_ids_from_room(room):
+async def get_user_ids_from_room(room):
     active_session_ids = get_session_ids_from_room(room)
 
-    active_user_ids = list(
-        set(
-            [
-                SESSION_POOL.get(session_id)["id"]
-                for session_id in active_session_ids
-                if SESSION_POOL.get(session_id) is not None
-            ]
-        )
-    )
+    # One HMGET for the whole room
+    sessions = await SESSION_POOL.mget_many(active_session_ids)
+    active_user_ids = list(set([user["id"] for user in sessions.values()]))
     return active_user_ids
 
 
@@ -293,16 +302,19 @@ async def enter_room_for_users(room: str, user_ids: list[str]):
 
 @sio.on("usage")
 async def usage(sid, data):
-    if sid in SESSION_POOL:
+    if await SESSION_POOL.contains(sid):
         model_id = data["model"]
         # Record the timestamp for the last update
         current_time = int(time.time())
 
         # Store the new usage data and task
-        USAGE_POOL[model_id] = {
-            **(USAGE_POOL[model_id] if model_id in USAGE_POOL else {}),
-            sid: {"updated_at": current_time},
-        }
+        await USAGE_POOL.set(
+            model_id,
+            {
+                **(await USAGE_POOL.get(model_id, {})),
+                sid: {"updated_at": current_time},
+            },
+        )
 
 
 @sio.event
@@ -315,8 +327,8 @@ async def connect(sid, environ, auth):
             user = Users.get_user_by_id(data["id"])
 
         if user:
-            SESSION_POOL[sid] = user.model_dump(
-                exclude=["date_of_birth", "bio", "gender"]
+            await SESSION_POOL.set(
+                sid, user.model_dump(exclude=["date_of_birth", "bio", "gender"])
             )
             await sio.enter_room(sid, f"user:{user.id}")
 
@@ -336,14 +348,17 @@ async def user_join(sid, data):
     if not user:
         return
 
-    SESSION_POOL[sid] = user.model_dump(
-        exclude=[
-            "profile_image_url",
-            "profile_banner_image_url",
-            "date_of_birth",
-            "bio",
-            "gender",
-        ]
+    await SESSION_POOL.set(
+        sid,
+        user.model_dump(
+            exclude=[
+                "profile_image_url",
+                "profile_banner_image_url",
+                "date_of_birth",
+                "bio",
+                "gender",
+            ]
+        ),
     )
 
     await sio.enter_room(sid, f"user:{user.id}")
@@ -359,7 +374,7 @@ async def user_join(sid, data):
 
 @sio.on("heartbeat")
 async def heartbeat(sid, data):
-    user = SESSION_POOL.get(sid)
+    user = await SESSION_POOL.get(sid)
     if user:
         Users.update_last_active_by_id(user["id"])
 
@@ -416,6 +431,41 @@ async def join_note(sid, data):
     await sio.enter_room(sid, f"note:{note.id}")
 
 
+@sio.on("join-file")
+async def join_file(sid, data):
+    auth = data["auth"] if "auth" in data else None
+    if not auth or "token" not in auth:
+        return
+
+    token_data = decode_token(auth["token"])
+    if token_data is None or "id" not in token_data:
+        return
+
+    user = Users.get_user_by_id(token_data["id"])
+    if not user:
+        return
+
+    file = Files.get_file_by_id(data["file_id"])
+    if not file:
+        log.error(f"File {data['file_id']} not found for user {user.id}")
+        return
+
+    # Imported here, the routers import this module
+    from open_webui.routers.files import has_access_to_file
+
+    if (
+        user.role != "admin"
+        and user.id != file.user_id
+        and not has_access_to_file(file.id, "read", user)
+    ):
+        log.error(f"User {user.id} does not have access to file {data['file_id']}")
+        return
+
+    # Processing status is pushed to the room as "file:status" events
+    log.debug(f"Joining file {file.id} for user {user.id}")
+    await sio.enter_room(sid, f"file:{file.id}")
+
+
 @sio.on("events:channel")
 async def channel_events(sid, data):
     room = f"channel:{data['channel_id']}"
@@ -431,7 +481,7 @@ async def channel_events(sid, data):
     event_data = data["data"]
     event_type = event_data["type"]
 
-    user = SESSION_POOL.get(sid)
+    user = await SESSION_POOL.get(sid)
 
     if not user:
         return
@@ -454,7 +504,7 @@ async def channel_events(sid, data):
 @sio.on("ydoc:document:join")
 async def ydoc_document_join(sid, data):
     """Handle user joining a document"""
-    user = SESSION_POOL.get(sid)
+    user = await SESSION_POOL.get(sid)
 
     try:
         document_id = data["document_id"]
@@ -490,19 +540,13 @@ async def ydoc_document_join(sid, data):
 
         active_session_ids = get_session_ids_from_room(f"doc_{document_id}")
 
-        # Get the Yjs document state
-        ydoc = Y.Doc()
-        updates = await YDOC_MANAGER.get_updates(document_id)
-        for update in updates:
-            ydoc.apply_update(bytes(update))
-
-        # Encode the entire document state as an update
-        state_update = ydoc.get_update()
+        # Snapshot and tail of the update log, merged into a single update
+        state_update = await YDOC_MANAGER.get_state(document_id)
         await sio.emit(
             "ydoc:document:state",
             {
                 "document_id": document_id,
-                "state": list(state_update),  # Convert bytes to list for JSON
+                "state": state_update,  # Sent as a binary attachment
                 "sessions": active_session_ids,
             },
             room=sid,
@@ -566,20 +610,14 @@ async def yjs_document_state(sid, data):
             log.warning(f"Document {document_id} not found")
             return
 
-        # Get the Yjs document state
-        ydoc = Y.Doc()
-        updates = await YDOC_MANAGER.get_updates(document_id)
-        for update in updates:
-            ydoc.apply_update(bytes(update))
-
-        # Encode the entire document state as an update
-        state_update = ydoc.get_update()
+        # Snapshot and tail of the update log, merged into a single update
+        state_update = await YDOC_MANAGER.get_state(document_id)
 
         await sio.emit(
             "ydoc:document:state",
             {
                 "document_id": document_id,
-                "state": list(state_update),  # Convert bytes to list for JSON
+                "state": state_update,  # Sent as a binary attachment
                 "sessions": active_session_ids,
             },
             room=sid,
@@ -624,7 +662,7 @@ async def yjs_document_update(sid, data):
         async def debounced_save():
             await asyncio.sleep(0.5)
             await document_save_handler(
-                document_id, data.get("data", {}), SESSION_POOL.get(sid)
+                document_id, data.get("data", {}), await SESSION_POOL.get(sid)
             )
 
         if data.get("data"):
@@ -689,134 +727,251 @@ async def yjs_awareness_update(sid, data):
 
 @sio.event
 async def disconnect(sid):
-    if sid in SESSION_POOL:
-        user = SESSION_POOL[sid]
-        del SESSION_POOL[sid]
+    if await SESSION_POOL.delete(sid):
         await YDOC_MANAGER.remove_user_from_all_documents(sid)
     else:
         pass
         # print(f"Unknown session ID {sid} disconnected")
 
 
-def get_event_emitter(request_info, update_db=True):
-    async def __event_emitter__(event_data):
-        user_id = request_info["user_id"]
-        chat_id = request_info["chat_id"]
-        message_id = request_info["message_id"]
+def save_event_to_db(request_info, event_data):
+    """Apply the side effects of a chat event to the stored message."""
+    chat_id = request_info.get("chat_id", "")
+    if not request_info.get("message_id") or chat_id.startswith("local:"):
+        return
 
-        await sio.emit(
-            "events",
+    if "type" in event_data and event_data["type"] == "status":
+        Chats.add_message_status_to_chat_by_id_and_message_id(
+            request_info["chat_id"],
+            request_info["message_id"],
+            event_data.get("data", {}),
+        )
+
+    if event_data.get("type") in ["message", "replace"]:
+        # Content is rewritten below, write buffered stream updates first
+        ChatMessageBuffer.flush(request_info["chat_id"], request_info["message_id"])
+
+    if "type" in event_data and event_data["type"] == "message":
+        message = Chats.get_message_by_id_and_message_id(
+            request_info["chat_id"],
+            request_info["message_id"],
+        )
+
+        if message:
+            content = message.get("content", "")
+            content += event_data.get("data", {}).get("content", "")
+
+            Chats.upsert_message_to_chat_by_id_and_message_id(
+                request_info["chat_id"],
+                request_info["message_id"],
+                {
+                    "content": content,
+                },
+            )
+
+    if "type" in event_data and event_data["type"] == "replace":
+        content = event_data.get("data", {}).get("content", "")
+
+        Chats.upsert_message_to_chat_by_id_and_message_id(
+            request_info["chat_id"],
+            request_info["message_id"],
             {
-                "chat_id": chat_id,
-                "message_id": message_id,
-                "data": event_data,
+                "content": content,
             },
-            room=f"user:{user_id}",
         )
-        if (
-            update_db
-            and message_id
-            and not request_info.get("chat_id", "").startswith("local:")
-        ):
 
-            if "type" in event_data and event_data["type"] == "status":
-                Chats.add_message_status_to_chat_by_id_and_message_id(
-                    request_info["chat_id"],
-                    request_info["message_id"],
-                    event_data.get("data", {}),
-                )
+    if "type" in event_data and event_data["type"] == "embeds":
+        message = Chats.get_message_by_id_and_message_id(
+            request_info["chat_id"],
+            request_info["message_id"],
+        )
 
-            if "type" in event_data and event_data["type"] == "message":
-                message = Chats.get_message_by_id_and_message_id(
-                    request_info["chat_id"],
-                    request_info["message_id"],
-                )
+        embeds = event_data.get("data", {}).get("embeds", [])
+        embeds.extend(message.get("embeds", []))
 
-                if message:
-                    content = message.get("content", "")
-                    content += event_data.get("data", {}).get("content", "")
-
-                    Chats.upsert_message_to_chat_by_id_and_message_id(
-                        request_info["chat_id"],
-                        request_info["message_id"],
-                        {
-                            "content": content,
-                        },
-                    )
-
-            if "type" in event_data and event_data["type"] == "replace":
-                content = event_data.get("data", {}).get("content", "")
-
-                Chats.upsert_message_to_chat_by_id_and_message_id(
-                    request_info["chat_id"],
-                    request_info["message_id"],
-                    {
-                        "content": content,
-                    },
-                )
+        Chats.upsert_message_to_chat_by_id_and_message_id(
+            request_info["chat_id"],
+            request_info["message_id"],
+            {
+                "embeds": embeds,
+            },
+        )
 
-            if "type" in event_data and event_data["type"] == "embeds":
-                message = Chats.get_message_by_id_and_message_id(
-                    request_info["chat_id"],
-                    request_info["message_id"],
-                )
+    if "type" in event_data and event_data["type"] == "files":
+        message = Chats.get_message_by_id_and_message_id(
+            request_info["chat_id"],
+            request_info["message_id"],
+        )
 
-                embeds = event_data.get("data", {}).get("embeds", [])
-                embeds.extend(message.get("embeds", []))
+        files = event_data.get("data", {}).get("files", [])
+        files.extend(message.get("files", []))
 
-                Chats.upsert_message_to_chat_by_id_and_message_id(
-                    request_info["chat_id"],
-                    request_info["message_id"],
-                    {
-                        "embeds": embeds,
-                    },
-                )
+        Chats.upsert_message_to_chat_by_id_and_message_id(
+            request_info["chat_id"],
+            request_info["message_id"],
+            {
+                "files": files,
+            },
+        )
 
-            if "type" in event_data and event_data["type"] == "files":
-                message = Chats.get_message_by_id_and_message_id(
-                    request_info["chat_id"],
-                    request_info["message_id"],
-                )
+    if event_data.get("type") in ["source", "citation"]:
+        data = event_data.get("data", {})
+        if data.get("type") == None:
+            message = Chats.get_message_by_id_and_message_id(
+                request_info["chat_id"],
+                request_info["message_id"],
+            )
 
-                files = event_data.get("data", {}).get("files", [])
-                files.extend(message.get("files", []))
+            sources = message.get("sources", [])
+            sources.append(data)
 
-                Chats.upsert_message_to_chat_by_id_and_message_id(
-                    request_info["chat_id"],
-                    request_info["message_id"],
-                    {
-                        "files": files,
-                    },
-                )
+            Chats.upsert_message_to_chat_by_id_and_message_id(
+                request_info["chat_id"],
+                request_info["message_id"],
+                {
+                    "sources": sources,
+                },
+            )
 
-            if event_data.get("type") in ["source", "citation"]:
-                data = event_data.get("data", {})
-                if data.get("type") == None:
-                    message = Chats.get_message_by_id_and_message_id(
-                        request_info["chat_id"],
-                        request_info["message_id"],
-                    )
-
-                    sources = message.get("sources", [])
-                    sources.append(data)
-
-                    Chats.upsert_message_to_chat_by_id_and_message_id(
-                        request_info["chat_id"],
-                        request_info["message_id"],
-                        {
-                            "sources": sources,
-                        },
-                    )
 
-    if (
+class ChatEventEmitter:
+    """
+    Event emitter for a single chat message that coalesces socket frames.
+
+    Events emitted within WEBSOCKET_EVENT_COALESCE_WINDOW_MS are sent as one
+    `chat:events` frame, in order. Consecutive content snapshots
+    (`chat:completion` events that only carry `content`) collapse into the
+    latest one. Delta events (`delta=True`) are additionally thinned to every
+    `stream_delta_chunk_size`-th event (CHAT_RESPONSE_STREAM_DELTA_CHUNK_SIZE);
+    any other event flushes the pending delta first so ordering is kept.
+    """
+
+    def __init__(self, request_info, update_db=True):
+        self.request_info = request_info
+        self.update_db = update_db
+        self.window = max(WEBSOCKET_EVENT_COALESCE_WINDOW_MS, 0) / 1000
+        self.delta_chunk_size = max(
+            CHAT_RESPONSE_STREAM_DELTA_CHUNK_SIZE,
+            int(request_info.get("params", {}).get("stream_delta_chunk_size") or 1),
+        )
+
+        self._delta_count = 0
+        self._pending_delta = None
+        self._frame = []
+        self._flush_task = None
+        self._emit_lock = asyncio.Lock()
+
+    @staticmethod
+    def _is_content_snapshot(event_data):
+        data = event_data.get("data")
+        return (
+            event_data.get("type") == "chat:completion"
+            and isinstance(data, dict)
+            and data.keys() == {"content"}
+        )
+
+    @staticmethod
+    def _is_done(event_data):
+        data = event_data.get("data")
+        return isinstance(data, dict) and bool(data.get("done"))
+
+    async def __call__(self, event_data, delta=False):
+        if delta:
+            self._delta_count += 1
+            self._pending_delta = event_data
+            if self._delta_count >= self.delta_chunk_size:
+                await self._flush_delta()
+            return
+
+        await self._flush_delta()
+        await self._enqueue(event_data)
+
+    async def _flush_delta(self):
+        if self._pending_delta is not None:
+            event_data = self._pending_delta
+            self._pending_delta = None
+            self._delta_count = 0
+            await self._enqueue(event_data)
+
+    async def _enqueue(self, event_data):
+        if self.update_db:
+            save_event_to_db(self.request_info, event_data)
+
+        if (
+            self._frame
+            and self._is_content_snapshot(event_data)
+            and self._is_content_snapshot(self._frame[-1])
+        ):
+            self._frame[-1] = event_data
+        else:
+            self._frame.append(event_data)
+
+        if self.window <= 0 or self._is_done(event_data):
+            await self._emit_frame()
+        elif self._flush_task is None:
+            self._flush_task = asyncio.create_task(self._emit_frame_later())
+
+    async def _emit_frame_later(self):
+        await asyncio.sleep(self.window)
+        self._flush_task = None
+        await self._emit_frame()
+
+    async def _emit_frame(self):
+        async with self._emit_lock:
+            frame, self._frame = self._frame, []
+            if not frame:
+                return
+
+            await sio.emit(
+                "events",
+                {
+                    "chat_id": self.request_info["chat_id"],
+                    "message_id": self.request_info["message_id"],
+                    "data": (
+                        frame[0]
+                        if len(frame) == 1
+                        else {"type": "chat:events", "data": {"events": frame}}
+                    ),
+                },
+                room=f"user:{self.request_info['user_id']}",
+            )
+
+    async def flush(self):
+        """Send everything that is still pending, e.g. at the end of a stream."""
+        await self._flush_delta()
+        await self._emit_frame()
+
+
+def get_event_emitter(request_info, update_db=True, coalesce=False):
+    if not (
         "user_id" in request_info
         and "chat_id" in request_info
         and "message_id" in request_info
     ):
-        return __event_emitter__
-    else:
         return None
 
+    if coalesce:
+        return ChatEventEmitter(request_info, update_db=update_db)
+
+    async def __event_emitter__(event_data):
+        user_id = request_info["user_id"]
+        chat_id = request_info["chat_id"]
+        message_id = request_info["message_id"]
+
+        await sio.emit(
+            "events",
+            {
+                "chat_id": chat_id,
+                "message_id": message_id,
+                "data": event_data,
+            },
+            room=f"user:{user_id}",
+        )
+        if update_db:
+            save_event_to_db(request_info, event_data)
+
+    return __event_emitter__
+
 
 def get_event_call(request_info):
     async def __event_caller__(event_data):
@@ -1,10 +1,15 @@
+import base64
 import json
+import logging
+import time
 import uuid
 from open_webui.utils.redis import get_redis_connection
-from open_webui.env import REDIS_KEY_PREFIX
+from open_webui.env import REDIS_KEY_PREFIX, YDOC_COMPACTION_THRESHOLD
 from typing import Optional, List, Tuple
 import pycrdt as Y
 
+log = logging.getLogger(__name__)
+
 
 class RedisLock:
     def __init__(
@@ -117,26 +122,232 @@ class RedisDict:
         return self[key]
 
 
+class AsyncRedisDict:
+    """
+    Asyncio-native counterpart of `RedisDict` for use in socket handlers.
+
+    Batch reads and writes go through `HMGET` and pipelines so that resolving
+    many keys costs a single round-trip. With `cache_ttl` > 0 values read or
+    written through this instance are kept locally for that many seconds;
+    only found values are cached, misses always go to Redis.
+    """
+
+    def __init__(
+        self, name, redis_url, redis_sentinels=[], redis_cluster=False, cache_ttl=0
+    ):
+        self.name = name
+        self.redis = get_redis_connection(
+            redis_url,
+            redis_sentinels,
+            redis_cluster=redis_cluster,
+            async_mode=True,
+            decode_responses=True,
+        )
+        self.cache_ttl = cache_ttl
+        self._cache = {}
+
+    def _cache_get(self, key):
+        entry = self._cache.get(key)
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if expires_at < time.monotonic():
+            self._cache.pop(key, None)
+            return None
+        return entry
+
+    def _cache_set(self, key, value):
+        if self.cache_ttl > 0:
+            self._cache[key] = (time.monotonic() + self.cache_ttl, value)
+
+    async def get(self, key, default=None):
+        entry = self._cache_get(key)
+        if entry is not None:
+            return entry[1]
+
+        value = await self.redis.hget(self.name, key)
+        if value is None:
+            return default
+        value = json.loads(value)
+        self._cache_set(key, value)
+        return value
+
+    async def mget_many(self, keys) -> dict:
+        """Return a {key: value} dict of the given keys that exist."""
+        result = {}
+        missing = []
+        for key in dict.fromkeys(keys):
+            entry = self._cache_get(key)
+            if entry is not None:
+                result[key] = entry[1]
+            else:
+                missing.append(key)
+
+        if missing:
+            values = await self.redis.hmget(self.name, missing)
+            for key, value in zip(missing, values):
+                if value is None:
+                    continue
+                value = json.loads(value)
+                self._cache_set(key, value)
+                result[key] = value
+        return result
+
+    async def set(self, key, value):
+        await self.redis.hset(self.name, key, json.dumps(value))
+        self._cache_set(key, value)
+
+    async def set_many(self, mapping: dict):
+        if not mapping:
+            return
+        await self.redis.hset(
+            self.name, mapping={k: json.dumps(v) for k, v in mapping.items()}
+        )
+        for key, value in mapping.items():
+            self._cache_set(key, value)
+
+    async def delete(self, key) -> bool:
+        self._cache.pop(key, None)
+        return await self.redis.hdel(self.name, key) > 0
+
+    async def delete_many(self, keys) -> int:
+        keys = list(keys)
+        if not keys:
+            return 0
+        for key in keys:
+            self._cache.pop(key, None)
+        return await self.redis.hdel(self.name, *keys)
+
+    async def update_many(self, mapping: dict, deleted_keys=()):
+        """Write `mapping` and delete `deleted_keys` in one pipeline."""
+        deleted_keys = list(deleted_keys)
+        if not mapping and not deleted_keys:
+            return
+
+        pipe = self.redis.pipeline()
+        if deleted_keys:
+            pipe.hdel(self.name, *deleted_keys)
+        if mapping:
+            pipe.hset(self.name, mapping={k: json.dumps(v) for k, v in mapping.items()})
+        await pipe.execute()
+
+        for key in deleted_keys:
+            self._cache.pop(key, None)
+        for key, value in mapping.items():
+            self._cache_set(key, value)
+
+    async def contains(self, key) -> bool:
+        if self._cache_get(key) is not None:
+            return True
+        return await self.redis.hexists(self.name, key)
+
+    async def keys(self):
+        return await self.redis.hkeys(self.name)
+
+    async def items(self):
+        return [
+            (k, json.loads(v)) for k, v in (await self.redis.hgetall(self.name)).items()
+        ]
+
+    async def clear(self):
+        self._cache.clear()
+        await self.redis.delete(self.name)
+
+
+class AsyncLocalDict:
+    """In-process implementation of the `AsyncRedisDict` interface."""
+
+    def __init__(self):
+        self._data = {}
+
+    async def get(self, key, default=None):
+        return self._data.get(key, default)
+
+    async def mget_many(self, keys) -> dict:
+        return {key: self._data[key] for key in keys if key in self._data}
+
+    async def set(self, key, value):
+        self._data[key] = value
+
+    async def set_many(self, mapping: dict):
+        self._data.update(mapping)
+
+    async def delete(self, key) -> bool:
+        return self._data.pop(key, None) is not None
+
+    async def delete_many(self, keys) -> int:
+        return sum(self._data.pop(key, None) is not None for key in list(keys))
+
+    async def update_many(self, mapping: dict, deleted_keys=()):
+        for key in deleted_keys:
+            self._data.pop(key, None)
+        self._data.update(mapping)
+
+    async def contains(self, key) -> bool:
+        return key in self._data
+
+    async def keys(self):
+        return list(self._data.keys())
+
+    async def items(self):
+        return list(self._data.items())
+
+    async def clear(self):
+        self._data.clear()
+
+
+def encode_ydoc_update(update: bytes) -> str:
+    return base64.b64encode(update).decode("ascii")
+
+
+def decode_ydoc_update(value) -> bytes:
+    if isinstance(value, bytes):
+        value = value.decode("ascii")
+    if value.startswith("["):
+        # Updates stored before the base64 encoding as a JSON list of ints
+        return bytes(json.loads(value))
+    return base64.b64decode(value)
+
+
 class YdocManager:
+    """
+    Keeps the Yjs update log and the connected users of collaborative documents.
+
+    Updates are stored base64 encoded. Once a document's log grows past
+    `compaction_threshold` entries it is merged into a single snapshot update,
+    so the log is always one snapshot followed by the updates received since.
+    """
+
     def __init__(
         self,
         redis=None,
         redis_key_prefix: str = f"{REDIS_KEY_PREFIX}:ydoc:documents",
+        compaction_threshold: int = YDOC_COMPACTION_THRESHOLD,
     ):
         self._updates = {}
         self._users = {}
         self._redis = redis
         self._redis_key_prefix = redis_key_prefix
+        self._compaction_threshold = compaction_threshold
 
     async def append_to_updates(self, document_id: str, update: bytes):
         document_id = document_id.replace(":", "_")
+        update = bytes(update)
+
         if self._redis:
             redis_key = f"{self._redis_key_prefix}:{document_id}:updates"
-            await self._redis.rpush(redis_key, json.dumps(list(update)))
+            length = await self._redis.rpush(redis_key, encode_ydoc_update(update))
         else:
             if document_id not in self._updates:
                 self._updates[document_id] = []
             self._updates[document_id].append(update)
+            length = len(self._updates[document_id])
+
+        if 0 < self._compaction_threshold < length:
+            try:
+                await self.compact(document_id)
+            except Exception as e:
+                log.error(f"Error compacting document {document_id}: {e}")
 
     async def get_updates(self, document_id: str) -> List[bytes]:
         document_id = document_id.replace(":", "_")
@@ -144,10 +355,51 @@ class YdocManager:
         if self._redis:
             redis_key = f"{self._redis_key_prefix}:{document_id}:updates"
             updates = await self._redis.lrange(redis_key, 0, -1)
-            return [bytes(json.loads(update)) for update in updates]
+            return [decode_ydoc_update(update) for update in updates]
         else:
             return self._updates.get(document_id, [])
 
+    async def get_state(self, document_id: str) -> bytes:
+        """The whole document as a single update: the snapshot merged with the tail."""
+        updates = await self.get_updates(document_id)
+        if not updates:
+            return Y.Doc().get_update()
+        if len(updates) == 1:
+            return updates[0]
+        return Y.merge_updates(*updates)
+
+    async def compact(self, document_id: str):
+        """Replace the stored update log of a document by one merged update."""
+        document_id = document_id.replace(":", "_")
+
+        if self._redis:
+            redis_key = f"{self._redis_key_prefix}:{document_id}:updates"
+            lock_key = f"{self._redis_key_prefix}:{document_id}:compaction"
+
+            # Another worker compacting the same log would trim it twice
+            if not await self._redis.set(lock_key, "1", nx=True, ex=30):
+                return
+            try:
+                updates = await self._redis.lrange(redis_key, 0, -1)
+                if len(updates) < 2:
+                    return
+                snapshot = Y.merge_updates(
+                    *[decode_ydoc_update(update) for update in updates]
+                )
+
+                # Updates appended meanwhile stay in place after the snapshot
+                pipe = self._redis.pipeline()
+                pipe.ltrim(redis_key, len(updates), -1)
+                pipe.lpush(redis_key, encode_ydoc_update(snapshot))
+                await pipe.execute()
+            finally:
+                await self._redis.delete(lock_key)
+        else:
+            updates = self._updates.get(document_id, [])
+            if len(updates) < 2:
+                return
+            self._updates[document_id] = [Y.merge_updates(*updates)]
+
     async def document_exists(self, document_id: str) -> bool:
         document_id = document_id.replace(":", "_")
 
@@ -0,0 +1,208 @@
+"""
+Read-through disk cache of files in remote storage.
+
+The S3, GCS and Azure providers download an object whenever a local path is
+needed for it (processing, content views, RAG reloads). With the cache, an
+object is downloaded once per version: cached files are named after the
+object key and the ETag the provider reports, so an overwritten object is
+fetched again and its old copy dropped. The least recently used files are
+removed once STORAGE_CACHE_MAX_SIZE_MB is exceeded, and concurrent reads of
+an object that is not cached yet wait for a single download.
+
+The directory can be shared by the workers of a host: files are moved into
+place once complete, and a file downloaded by another worker is used as is.
+"""
+
+import hashlib
+import logging
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+from typing import Callable, Optional
+
+from open_webui.config import (
+    STORAGE_CACHE_DIR,
+    STORAGE_CACHE_MAX_SIZE_MB,
+    STORAGE_PROVIDER,
+)
+
+log = logging.getLogger(__name__)
+
+TEMP_PREFIX = ".download-"
+
+
+class StorageCache:
+    def __init__(self, cache_dir: str, max_size: int):
+        self.cache_dir = cache_dir
+        self.max_size = max_size
+        self._lock = threading.Lock()
+        # File name -> size, least recently used first
+        self._entries: OrderedDict[str, int] = OrderedDict()
+        self._downloads: dict[str, threading.Event] = {}
+        self.size = 0
+        self.stats = {"hits": 0, "misses": 0, "evictions": 0, "bytes_downloaded": 0}
+
+        os.makedirs(cache_dir, exist_ok=True)
+        self._load()
+
+    @staticmethod
+    def get_key_prefix(key: str) -> str:
+        return hashlib.sha256(key.encode("utf-8")).hexdigest()[:32]
+
+    @classmethod
+    def get_name(cls, key: str, etag: str) -> str:
+        etag_hash = hashlib.sha256(etag.encode("utf-8")).hexdigest()[:16]
+        # Keep the extension, file types are guessed from it
+        return f"{cls.get_key_prefix(key)}.{etag_hash}{os.path.splitext(key)[1]}"
+
+    def _load(self) -> None:
+        """Index the files left by previous runs, oldest download first."""
+        files = []
+        for entry in os.scandir(self.cache_dir):
+            if not entry.is_file():
+                continue
+            if entry.name.startswith(TEMP_PREFIX):
+                # Interrupted download
+                self._unlink(entry.path)
+                continue
+            stat = entry.stat()
+            files.append((stat.st_mtime, entry.name, stat.st_size))
+
+        for _, name, size in sorted(files):
+            self._entries[name] = size
+            self.size += size
+        with self._lock:
+            self._evict()
+
+    def get_stats(self) -> dict:
+        return {**self.stats, "size": self.size, "files": len(self._entries)}
+
+    def get_cached(self, key: str, etag: str) -> Optional[str]:
+        """Path of the cached copy of `key` at version `etag`, None if not cached."""
+        name = self.get_name(key, etag)
+        with self._lock:
+            return self._lookup(name)
+
+    def get(self, key: str, etag: str, download: Callable[[str], None]) -> str:
+        """
+        Path of the cached copy of object `key` at version `etag`. On a miss,
+        `download(path)` is called once to write the object to `path`.
+        """
+        name = self.get_name(key, etag)
+        while True:
+            with self._lock:
+                path = self._lookup(name)
+                if path is not None:
+                    return path
+                event = self._downloads.get(name)
+                if event is None:
+                    event = threading.Event()
+                    self._downloads[name] = event
+                    self.stats["misses"] += 1
+                    break
+            # Another thread is downloading the object, use its copy
+            event.wait()
+
+        try:
+            path = os.path.join(self.cache_dir, name)
+            fd, temp_path = tempfile.mkstemp(dir=self.cache_dir, prefix=TEMP_PREFIX)
+            os.close(fd)
+            try:
+                download(temp_path)
+                os.replace(temp_path, path)
+            except Exception:
+                self._unlink(temp_path)
+                raise
+
+            size = os.path.getsize(path)
+            with self._lock:
+                self._add(name, size)
+                self.stats["bytes_downloaded"] += size
+            return path
+        finally:
+            with self._lock:
+                self._downloads.pop(name, None)
+            event.set()
+
+    def invalidate(self, key: str) -> None:
+        """Remove the cached copies of every version of `key`."""
+        prefix = self.get_key_prefix(key) + "."
+        with self._lock:
+            for name in [name for name in self._entries if name.startswith(prefix)]:
+                self._remove(name)
+        # Copies downloaded by other workers
+        for entry in os.scandir(self.cache_dir):
+            if entry.name.startswith(prefix):
+                self._unlink(entry.path)
+
+    def clear(self) -> None:
+        with self._lock:
+            for name in list(self._entries):
+                self._remove(name)
+        for entry in os.scandir(self.cache_dir):
+            if entry.is_file() and not entry.name.startswith(TEMP_PREFIX):
+                self._unlink(entry.path)
+
+    def _lookup(self, name: str) -> Optional[str]:
+        path = os.path.join(self.cache_dir, name)
+        if name in self._entries:
+            if os.path.isfile(path):
+                self._entries.move_to_end(name)
+                self.stats["hits"] += 1
+                return path
+            # Evicted by another worker
+            self._remove(name)
+        elif os.path.isfile(path):
+            # Downloaded by another worker
+            self._add(name, os.path.getsize(path))
+            self.stats["hits"] += 1
+            return path
+        return None
+
+    def _add(self, name: str, size: int) -> None:
+        # Older versions of the object are not read anymore
+        prefix = name.split(".", 1)[0] + "."
+        for other in [n for n in self._entries if n.startswith(prefix) and n != name]:
+            self._remove(other)
+
+        if name in self._entries:
+            self.size -= self._entries[name]
+        self._entries[name] = size
+        self._entries.move_to_end(name)
+        self.size += size
+        self._evict()
+
+    def _evict(self) -> None:
+        # The most recent file is kept even if it is larger than the cache
+        while self.size > self.max_size and len(self._entries) > 1:
+            name = next(iter(self._entries))
+            self._remove(name)
+            self.stats["evictions"] += 1
+
+    def _remove(self, name: str) -> None:
+        self.size -= self._entries.pop(name, 0)
+        # Open handles (e.g. a response being sent) keep reading the file
+        self._unlink(os.path.join(self.cache_dir, name))
+
+    @staticmethod
+    def _unlink(path: str) -> None:
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            log.warning(f"Failed to remove cached file {path}: {e}")
+
+
+def get_storage_cache() -> Optional[StorageCache]:
+    if STORAGE_PROVIDER == "local" or STORAGE_CACHE_MAX_SIZE_MB <= 0:
+        return None
+    try:
+        return StorageCache(STORAGE_CACHE_DIR, STORAGE_CACHE_MAX_SIZE_MB * 1024 * 1024)
+    except Exception as e:
+        log.warning(f"Storage cache disabled, failed to open {STORAGE_CACHE_DIR}: {e}")
+    return None
+
+
+STORAGE_CACHE = get_storage_cache()
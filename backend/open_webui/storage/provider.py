@@ -1,12 +1,14 @@
+import hashlib
 import os
 import shutil
 import json
 import logging
 import re
 from abc import ABC, abstractmethod
-from typing import BinaryIO, Tuple, Dict
+from typing import BinaryIO, Dict, Iterator, Optional, Tuple
 
 import boto3
+from boto3.s3.transfer import TransferConfig
 from botocore.config import Config
 from botocore.exceptions import ClientError
 from open_webui.config import (
@@ -25,18 +27,53 @@ from open_webui.config import (
     AZURE_STORAGE_CONTAINER_NAME,
     AZURE_STORAGE_KEY,
     STORAGE_PROVIDER,
+    STORAGE_UPLOAD_CHUNK_SIZE,
     UPLOAD_DIR,
 )
 from google.cloud import storage
 from google.cloud.exceptions import GoogleCloudError, NotFound
 from open_webui.constants import ERROR_MESSAGES
+from open_webui.storage.cache import STORAGE_CACHE
 from azure.identity import DefaultAzureCredential
 from azure.storage.blob import BlobServiceClient
+from azure.core import MatchConditions
 from azure.core.exceptions import ResourceNotFoundError
 
 
 log = logging.getLogger(__name__)
 
+# Bytes read at a time when streaming a range of a file
+READ_CHUNK_SIZE = 256 * 1024
+
+
+def resolve_range(
+    start: Optional[int], end: Optional[int], size: int
+) -> Optional[Tuple[int, int]]:
+    """
+    First and last byte (inclusive) of an HTTP byte range in a file of `size`
+    bytes. `start=None` selects the last `end` bytes, `end=None` reads to the
+    end of the file. None if the range can't be satisfied.
+    """
+    if start is None:
+        if not end:
+            return None
+        return max(size - end, 0), size - 1
+    if start >= size or (end is not None and end < start):
+        return None
+    return start, size - 1 if end is None else min(end, size - 1)
+
+
+def read_file_range(file_path: str, start: int, end: int) -> Iterator[bytes]:
+    with open(file_path, "rb") as f:
+        f.seek(start)
+        remaining = end - start + 1
+        while remaining > 0:
+            chunk = f.read(min(READ_CHUNK_SIZE, remaining))
+            if not chunk:
+                break
+            remaining -= len(chunk)
+            yield chunk
+
 
 class StorageProvider(ABC):
     @abstractmethod
@@ -49,6 +86,31 @@ class StorageProvider(ABC):
     ) -> Tuple[bytes, str]:
         pass
 
+    def upload_file_stream(
+        self, file: BinaryIO, filename: str, tags: Dict[str, str]
+    ) -> Tuple[str, str, int]:
+        """
+        Store `file`, read in chunks of STORAGE_UPLOAD_CHUNK_SIZE. Returns the
+        file path, the SHA-256 hex digest and the size of the contents.
+        """
+        contents, file_path = self.upload_file(file, filename, tags)
+        return file_path, hashlib.sha256(contents).hexdigest(), len(contents)
+
+    def get_file_range(
+        self, file_path: str, start: Optional[int], end: Optional[int]
+    ) -> Tuple[Optional[Tuple[int, int]], int, Iterator[bytes]]:
+        """
+        Part of a file, selected as in an HTTP range (see `resolve_range`).
+        Returns the first and last byte of the range, None if it can't be
+        satisfied, the size of the file and the chunks of the range.
+        """
+        local_file_path = self.get_file(file_path)
+        size = os.path.getsize(local_file_path)
+        byte_range = resolve_range(start, end, size)
+        if byte_range is None:
+            return None, size, iter(())
+        return byte_range, size, read_file_range(local_file_path, *byte_range)
+
     @abstractmethod
     def delete_all_files(self) -> None:
         pass
@@ -71,6 +133,28 @@ class LocalStorageProvider(StorageProvider):
             f.write(contents)
         return contents, file_path
 
+    @staticmethod
+    def upload_file_stream(
+        file: BinaryIO, filename: str, tags: Dict[str, str]
+    ) -> Tuple[str, str, int]:
+        """Writes the file to local storage chunk by chunk, hashing it on the way."""
+        file_path = f"{UPLOAD_DIR}/{filename}"
+        sha256 = hashlib.sha256()
+        size = 0
+        try:
+            with open(file_path, "wb") as f:
+                while chunk := file.read(STORAGE_UPLOAD_CHUNK_SIZE):
+                    sha256.update(chunk)
+                    f.write(chunk)
+                    size += len(chunk)
+            if not size:
+                raise ValueError(ERROR_MESSAGES.EMPTY_CONTENT)
+        except Exception:
+            if os.path.isfile(file_path):
+                os.remove(file_path)
+            raise
+        return file_path, sha256.hexdigest(), size
+
     @staticmethod
     def get_file(file_path: str) -> str:
         """Handles downloading of the file from local storage."""
@@ -103,7 +187,66 @@ class LocalStorageProvider(StorageProvider):
             log.warning(f"Directory {UPLOAD_DIR} not found in local storage.")
 
 
-class S3StorageProvider(StorageProvider):
+class RemoteStorageProvider(StorageProvider):
+    """
+    Base of the providers that store files remotely. Local copies are read
+    through STORAGE_CACHE, keyed by object key and ETag, or downloaded to the
+    upload dir on every access if the cache is disabled.
+    """
+
+    @abstractmethod
+    def _get_version(self, key: str) -> Tuple[str, int]:
+        """ETag and size of the object `key`."""
+        pass
+
+    @abstractmethod
+    def _download(self, key: str, local_file_path: str) -> None:
+        """Download the object `key` to `local_file_path`."""
+        pass
+
+    @abstractmethod
+    def _read_range(self, key: str, etag: str, start: int, end: int) -> Iterator[bytes]:
+        """Bytes `start` to `end` (inclusive) of the object `key` at version `etag`."""
+        pass
+
+    def _get_local_file(self, key: str) -> str:
+        if STORAGE_CACHE is None:
+            local_file_path = f"{UPLOAD_DIR}/{key.split('/')[-1]}"
+            self._download(key, local_file_path)
+            return local_file_path
+
+        etag, _ = self._get_version(key)
+        return STORAGE_CACHE.get(
+            key, etag, lambda local_file_path: self._download(key, local_file_path)
+        )
+
+    def _get_range(
+        self, key: str, start: Optional[int], end: Optional[int]
+    ) -> Tuple[Optional[Tuple[int, int]], int, Iterator[bytes]]:
+        etag, size = self._get_version(key)
+        byte_range = resolve_range(start, end, size)
+        if byte_range is None:
+            return None, size, iter(())
+
+        cached_file_path = (
+            STORAGE_CACHE.get_cached(key, etag) if STORAGE_CACHE else None
+        )
+        if cached_file_path:
+            return byte_range, size, read_file_range(cached_file_path, *byte_range)
+        return byte_range, size, self._read_range(key, etag, *byte_range)
+
+    @staticmethod
+    def _invalidate(key: str) -> None:
+        if STORAGE_CACHE is not None:
+            STORAGE_CACHE.invalidate(key)
+
+    @staticmethod
+    def _invalidate_all() -> None:
+        if STORAGE_CACHE is not None:
+            STORAGE_CACHE.clear()
+
+
+class S3StorageProvider(RemoteStorageProvider):
     def __init__(self):
         config = Config(
             s3={
@@ -137,6 +280,11 @@ class S3StorageProvider(StorageProvider):
 
         self.bucket_name = S3_BUCKET_NAME
         self.key_prefix = S3_KEY_PREFIX if S3_KEY_PREFIX else ""
+        # Files above one chunk are sent as multipart uploads
+        self.transfer_config = TransferConfig(
+            multipart_threshold=STORAGE_UPLOAD_CHUNK_SIZE,
+            multipart_chunksize=STORAGE_UPLOAD_CHUNK_SIZE,
+        )
 
     @staticmethod
     def sanitize_tag_value(s: str) -> str:
@@ -147,10 +295,24 @@ class S3StorageProvider(StorageProvider):
         self, file: BinaryIO, filename: str, tags: Dict[str, str]
     ) -> Tuple[bytes, str]:
         """Handles uploading of the file to S3 storage."""
-        _, file_path = LocalStorageProvider.upload_file(file, filename, tags)
+        contents, file_path = LocalStorageProvider.upload_file(file, filename, tags)
+        return contents, self._upload_to_s3(file_path, filename, tags)
+
+    def upload_file_stream(
+        self, file: BinaryIO, filename: str, tags: Dict[str, str]
+    ) -> Tuple[str, str, int]:
+        """Handles uploading of the file to S3 storage, as a multipart upload if large."""
+        file_path, digest, size = LocalStorageProvider.upload_file_stream(
+            file, filename, tags
+        )
+        return self._upload_to_s3(file_path, filename, tags), digest, size
+
+    def _upload_to_s3(self, file_path: str, filename: str, tags: Dict[str, str]) -> str:
         s3_key = os.path.join(self.key_prefix, filename)
         try:
-            self.s3_client.upload_file(file_path, self.bucket_name, s3_key)
+            self.s3_client.upload_file(
+                file_path, self.bucket_name, s3_key, Config=self.transfer_config
+            )
             if S3_ENABLE_TAGGING and tags:
                 sanitized_tags = {
                     self.sanitize_tag_value(k): self.sanitize_tag_value(v)
@@ -166,23 +328,44 @@ class S3StorageProvider(StorageProvider):
                     Key=s3_key,
                     Tagging=tagging,
                 )
-            return (
-                open(file_path, "rb").read(),
-                f"s3://{self.bucket_name}/{s3_key}",
-            )
+            return f"s3://{self.bucket_name}/{s3_key}"
         except ClientError as e:
             raise RuntimeError(f"Error uploading file to S3: {e}")
 
     def get_file(self, file_path: str) -> str:
         """Handles downloading of the file from S3 storage."""
         try:
-            s3_key = self._extract_s3_key(file_path)
-            local_file_path = self._get_local_file_path(s3_key)
-            self.s3_client.download_file(self.bucket_name, s3_key, local_file_path)
-            return local_file_path
+            return self._get_local_file(self._extract_s3_key(file_path))
         except ClientError as e:
             raise RuntimeError(f"Error downloading file from S3: {e}")
 
+    def get_file_range(
+        self, file_path: str, start: Optional[int], end: Optional[int]
+    ) -> Tuple[Optional[Tuple[int, int]], int, Iterator[bytes]]:
+        """Handles reading part of the file from S3 storage."""
+        try:
+            return self._get_range(self._extract_s3_key(file_path), start, end)
+        except ClientError as e:
+            raise RuntimeError(f"Error downloading file from S3: {e}")
+
+    def _get_version(self, key: str) -> Tuple[str, int]:
+        response = self.s3_client.head_object(Bucket=self.bucket_name, Key=key)
+        return response["ETag"], response["ContentLength"]
+
+    def _download(self, key: str, local_file_path: str) -> None:
+        self.s3_client.download_file(
+            self.bucket_name, key, local_file_path, Config=self.transfer_config
+        )
+
+    def _read_range(self, key: str, etag: str, start: int, end: int) -> Iterator[bytes]:
+        response = self.s3_client.get_object(
+            Bucket=self.bucket_name,
+            Key=key,
+            Range=f"bytes={start}-{end}",
+            IfMatch=etag,
+        )
+        yield from response["Body"].iter_chunks(READ_CHUNK_SIZE)
+
     def delete_file(self, file_path: str) -> None:
         """Handles deletion of the file from S3 storage."""
         try:
@@ -190,6 +373,7 @@ class S3StorageProvider(StorageProvider):
             self.s3_client.delete_object(Bucket=self.bucket_name, Key=s3_key)
         except ClientError as e:
             raise RuntimeError(f"Error deleting file from S3: {e}")
+        self._invalidate(s3_key)
 
         # Always delete from local storage
         LocalStorageProvider.delete_file(file_path)
@@ -209,6 +393,7 @@ class S3StorageProvider(StorageProvider):
                     )
         except ClientError as e:
             raise RuntimeError(f"Error deleting all files from S3: {e}")
+        self._invalidate_all()
 
         # Always delete from local storage
         LocalStorageProvider.delete_all_files()
@@ -217,11 +402,8 @@ class S3StorageProvider(StorageProvider):
     def _extract_s3_key(self, full_file_path: str) -> str:
         return "/".join(full_file_path.split("//")[1].split("/")[1:])
 
-    def _get_local_file_path(self, s3_key: str) -> str:
-        return f"{UPLOAD_DIR}/{s3_key.split('/')[-1]}"
-
 
-class GCSStorageProvider(StorageProvider):
+class GCSStorageProvider(RemoteStorageProvider):
     def __init__(self):
         self.bucket_name = GCS_BUCKET_NAME
 
@@ -241,10 +423,22 @@ class GCSStorageProvider(StorageProvider):
     ) -> Tuple[bytes, str]:
         """Handles uploading of the file to GCS storage."""
         contents, file_path = LocalStorageProvider.upload_file(file, filename, tags)
+        return contents, self._upload_to_gcs(file_path, filename)
+
+    def upload_file_stream(
+        self, file: BinaryIO, filename: str, tags: Dict[str, str]
+    ) -> Tuple[str, str, int]:
+        """Handles uploading of the file to GCS storage, as a resumable upload in chunks."""
+        file_path, digest, size = LocalStorageProvider.upload_file_stream(
+            file, filename, tags
+        )
+        return self._upload_to_gcs(file_path, filename), digest, size
+
+    def _upload_to_gcs(self, file_path: str, filename: str) -> str:
         try:
-            blob = self.bucket.blob(filename)
+            blob = self.bucket.blob(filename, chunk_size=STORAGE_UPLOAD_CHUNK_SIZE)
             blob.upload_from_filename(file_path)
-            return contents, "gs://" + self.bucket_name + "/" + filename
+            return "gs://" + self.bucket_name + "/" + filename
         except GoogleCloudError as e:
             raise RuntimeError(f"Error uploading file to GCS: {e}")
 
@@ -252,14 +446,39 @@ class GCSStorageProvider(StorageProvider):
         """Handles downloading of the file from GCS storage."""
         try:
             filename = file_path.removeprefix("gs://").split("/")[1]
-            local_file_path = f"{UPLOAD_DIR}/{filename}"
-            blob = self.bucket.get_blob(filename)
-            blob.download_to_filename(local_file_path)
+            return self._get_local_file(filename)
+        except NotFound as e:
+            raise RuntimeError(f"Error downloading file from GCS: {e}")
 
-            return local_file_path
+    def get_file_range(
+        self, file_path: str, start: Optional[int], end: Optional[int]
+    ) -> Tuple[Optional[Tuple[int, int]], int, Iterator[bytes]]:
+        """Handles reading part of the file from GCS storage."""
+        try:
+            filename = file_path.removeprefix("gs://").split("/")[1]
+            return self._get_range(filename, start, end)
         except NotFound as e:
             raise RuntimeError(f"Error downloading file from GCS: {e}")
 
+    def _get_version(self, key: str) -> Tuple[str, int]:
+        blob = self.bucket.get_blob(key)
+        if blob is None:
+            raise NotFound(f"{key} not found in bucket {self.bucket_name}")
+        return blob.etag, blob.size
+
+    def _download(self, key: str, local_file_path: str) -> None:
+        self.bucket.blob(key).download_to_filename(local_file_path)
+
+    def _read_range(self, key: str, etag: str, start: int, end: int) -> Iterator[bytes]:
+        # One request per chunk, the client has no streaming download
+        blob = self.bucket.blob(key)
+        for offset in range(start, end + 1, STORAGE_UPLOAD_CHUNK_SIZE):
+            yield blob.download_as_bytes(
+                start=offset,
+                end=min(offset + STORAGE_UPLOAD_CHUNK_SIZE - 1, end),
+                if_etag_match=etag,
+            )
+
     def delete_file(self, file_path: str) -> None:
         """Handles deletion of the file from GCS storage."""
         try:
@@ -268,6 +487,7 @@ class GCSStorageProvider(StorageProvider):
             blob.delete()
         except NotFound as e:
             raise RuntimeError(f"Error deleting file from GCS: {e}")
+        self._invalidate(filename)
 
         # Always delete from local storage
         LocalStorageProvider.delete_file(file_path)
@@ -282,12 +502,13 @@ class GCSStorageProvider(StorageProvider):
 
         except NotFound as e:
             raise RuntimeError(f"Error deleting all files from GCS: {e}")
+        self._invalidate_all()
 
         # Always delete from local storage
         LocalStorageProvider.delete_all_files()
 
 
-class AzureStorageProvider(StorageProvider):
+class AzureStorageProvider(RemoteStorageProvider):
     def __init__(self):
         self.endpoint = AZURE_STORAGE_ENDPOINT
         self.container_name = AZURE_STORAGE_CONTAINER_NAME
@@ -296,13 +517,19 @@ class AzureStorageProvider(StorageProvider):
         if storage_key:
             # Configure using the Azure Storage Account Endpoint and Key
             self.blob_service_client = BlobServiceClient(
-                account_url=self.endpoint, credential=storage_key
+                account_url=self.endpoint,
+                credential=storage_key,
+                max_single_put_size=STORAGE_UPLOAD_CHUNK_SIZE,
+                max_block_size=STORAGE_UPLOAD_CHUNK_SIZE,
             )
         else:
             # Configure using the Azure Storage Account Endpoint and DefaultAzureCredential
             # If the key is not configured, then the DefaultAzureCredential will be used to support Managed Identity authentication
             self.blob_service_client = BlobServiceClient(
-                account_url=self.endpoint, credential=DefaultAzureCredential()
+                account_url=self.endpoint,
+                credential=DefaultAzureCredential(),
+                max_single_put_size=STORAGE_UPLOAD_CHUNK_SIZE,
+                max_block_size=STORAGE_UPLOAD_CHUNK_SIZE,
             )
         self.container_client = self.blob_service_client.get_container_client(
             self.container_name
@@ -320,18 +547,55 @@ class AzureStorageProvider(StorageProvider):
         except Exception as e:
             raise RuntimeError(f"Error uploading file to Azure Blob Storage: {e}")
 
+    def upload_file_stream(
+        self, file: BinaryIO, filename: str, tags: Dict[str, str]
+    ) -> Tuple[str, str, int]:
+        """Handles uploading of the file to Azure Blob Storage, staged in blocks."""
+        file_path, digest, size = LocalStorageProvider.upload_file_stream(
+            file, filename, tags
+        )
+        try:
+            blob_client = self.container_client.get_blob_client(filename)
+            with open(file_path, "rb") as data:
+                blob_client.upload_blob(data, length=size, overwrite=True)
+            return f"{self.endpoint}/{self.container_name}/{filename}", digest, size
+        except Exception as e:
+            raise RuntimeError(f"Error uploading file to Azure Blob Storage: {e}")
+
     def get_file(self, file_path: str) -> str:
         """Handles downloading of the file from Azure Blob Storage."""
         try:
-            filename = file_path.split("/")[-1]
-            local_file_path = f"{UPLOAD_DIR}/{filename}"
-            blob_client = self.container_client.get_blob_client(filename)
-            with open(local_file_path, "wb") as download_file:
-                download_file.write(blob_client.download_blob().readall())
-            return local_file_path
+            return self._get_local_file(file_path.split("/")[-1])
         except ResourceNotFoundError as e:
             raise RuntimeError(f"Error downloading file from Azure Blob Storage: {e}")
 
+    def get_file_range(
+        self, file_path: str, start: Optional[int], end: Optional[int]
+    ) -> Tuple[Optional[Tuple[int, int]], int, Iterator[bytes]]:
+        """Handles reading part of the file from Azure Blob Storage."""
+        try:
+            return self._get_range(file_path.split("/")[-1], start, end)
+        except ResourceNotFoundError as e:
+            raise RuntimeError(f"Error downloading file from Azure Blob Storage: {e}")
+
+    def _get_version(self, key: str) -> Tuple[str, int]:
+        properties = self.container_client.get_blob_client(key).get_blob_properties()
+        return properties.etag, properties.size
+
+    def _download(self, key: str, local_file_path: str) -> None:
+        blob_client = self.container_client.get_blob_client(key)
+        with open(local_file_path, "wb") as download_file:
+            blob_client.download_blob().readinto(download_file)
+
+    def _read_range(self, key: str, etag: str, start: int, end: int) -> Iterator[bytes]:
+        blob_client = self.container_client.get_blob_client(key)
+        yield from blob_client.download_blob(
+            offset=start,
+            length=end - start + 1,
+            etag=etag,
+            match_condition=MatchConditions.IfNotModified,
+        ).chunks()
+
     def delete_file(self, file_path: str) -> None:
         """Handles deletion of the file from Azure Blob Storage."""
         try:
@@ -340,6 +604,7 @@ class AzureStorageProvider(StorageProvider):
             blob_client.delete_blob()
         except ResourceNotFoundError as e:
             raise RuntimeError(f"Error deleting file from Azure Blob Storage: {e}")
+        self._invalidate(filename)
 
         # Always delete from local storage
         LocalStorageProvider.delete_file(file_path)
@@ -352,6 +617,7 @@ class AzureStorageProvider(StorageProvider):
                 self.container_client.delete_blob(blob.name)
         except Exception as e:
             raise RuntimeError(f"Error deleting all files from Azure Blob Storage: {e}")
+        self._invalidate_all()
 
         # Always delete from local storage
         LocalStorageProvider.delete_all_files()
@@ -0,0 +1,79 @@
+from types import SimpleNamespace
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+import open_webui.retrieval.utils as retrieval_utils
+from open_webui.retrieval.bm25 import BM25IndexCache
+from open_webui.retrieval.vector.main import GetResult, SearchResult
+from open_webui.routers import retrieval
+from open_webui.utils.auth import get_verified_user
+
+DOCUMENTS = {
+    "1": "the ferry leaves at noon",
+    "2": "trains run every hour",
+    "3": "the museum opens at nine",
+}
+
+
+class VectorDB:
+    def get(self, collection_name):
+        return GetResult(
+            ids=[list(DOCUMENTS)],
+            documents=[list(DOCUMENTS.values())],
+            metadatas=[[{"source": id} for id in DOCUMENTS]],
+        )
+
+    def search(self, collection_name, vectors, limit):
+        ids = list(DOCUMENTS)[:limit]
+        return SearchResult(
+            ids=[ids],
+            documents=[[DOCUMENTS[id] for id in ids]],
+            metadatas=[[{"source": id} for id in ids]],
+            distances=[[0.5] * len(ids)],
+        )
+
+
+@pytest.fixture
+def client(tmp_path, monkeypatch):
+    monkeypatch.setattr(retrieval_utils, "VECTOR_DB_CLIENT", VectorDB())
+    monkeypatch.setattr(
+        retrieval_utils, "BM25Indexes", BM25IndexCache(directory=str(tmp_path))
+    )
+
+    async def embedding_function(query, prefix=None, user=None):
+        return [1.0, 0.0]
+
+    def reranking_function(query, documents, user=None):
+        # Documents sharing more words with the query rank first
+        words = set(query.split())
+        return [len(words & set(doc.page_content.split())) for doc in documents]
+
+    app = FastAPI()
+    app.include_router(retrieval.router, prefix="/api/v1/retrieval")
+    app.state.config = SimpleNamespace(
+        ENABLE_RAG_HYBRID_SEARCH=True,
+        ENABLE_RAG_HYBRID_SEARCH_ENRICHED_TEXTS=False,
+        TOP_K=3,
+        TOP_K_RERANKER=3,
+        RELEVANCE_THRESHOLD=0.0,
+        HYBRID_BM25_WEIGHT=0.5,
+    )
+    app.state.EMBEDDING_FUNCTION = embedding_function
+    app.state.RERANKING_FUNCTION = reranking_function
+    app.dependency_overrides[get_verified_user] = lambda: SimpleNamespace(id="u1")
+    return TestClient(app)
+
+
+def test_query_doc_hybrid(client):
+    response = client.post(
+        "/api/v1/retrieval/query/doc",
+        json={"collection_name": "file-1", "query": "when does the ferry leave"},
+    )
+    assert response.status_code == 200
+    result = response.json()
+    assert result["documents"][0][0] == DOCUMENTS["1"]
+    assert result["metadatas"][0][0]["source"] == "1"
+    # Every document was found, by BM25 or by the vector search
+    assert sorted(result["documents"][0]) == sorted(DOCUMENTS.values())
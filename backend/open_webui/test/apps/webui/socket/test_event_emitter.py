@@ -0,0 +1,88 @@
+import asyncio
+
+import pytest
+
+from open_webui.socket import main as socket_main
+
+
+class FakeSocketServer:
+    def __init__(self):
+        self.frames = []
+
+    async def emit(self, event, data, room=None):
+        self.frames.append(data["data"])
+
+
+@pytest.fixture
+def sio(monkeypatch):
+    fake = FakeSocketServer()
+    monkeypatch.setattr(socket_main, "sio", fake)
+    return fake
+
+
+def get_emitter(monkeypatch, window_ms, params=None):
+    monkeypatch.setattr(socket_main, "WEBSOCKET_EVENT_COALESCE_WINDOW_MS", window_ms)
+    return socket_main.get_event_emitter(
+        {
+            "user_id": "user",
+            "chat_id": "local:chat",
+            "message_id": "message",
+            "params": params or {},
+        },
+        coalesce=True,
+    )
+
+
+def snapshot(content):
+    return {"type": "chat:completion", "data": {"content": content}}
+
+
+@pytest.mark.asyncio
+async def test_events_within_window_are_sent_as_one_frame(sio, monkeypatch):
+    emitter = get_emitter(monkeypatch, 20)
+
+    await emitter(snapshot("a"), delta=True)
+    await emitter({"type": "status", "data": {"description": "searching"}})
+    await emitter(snapshot("ab"), delta=True)
+    await emitter(snapshot("abc"), delta=True)
+    await emitter({"type": "source", "data": {"name": "doc"}})
+
+    assert sio.frames == []
+    await asyncio.sleep(0.05)
+
+    assert sio.frames == [
+        {
+            "type": "chat:events",
+            "data": {
+                "events": [
+                    snapshot("a"),
+                    {"type": "status", "data": {"description": "searching"}},
+                    snapshot("abc"),
+                    {"type": "source", "data": {"name": "doc"}},
+                ]
+            },
+        }
+    ]
+
+
+@pytest.mark.asyncio
+async def test_done_event_flushes_immediately(sio, monkeypatch):
+    emitter = get_emitter(monkeypatch, 1000)
+
+    await emitter(snapshot("a"), delta=True)
+    await emitter({"type": "chat:completion", "data": {"done": True}})
+
+    assert len(sio.frames) == 1
+    assert sio.frames[0]["data"]["events"][-1]["data"] == {"done": True}
+
+
+@pytest.mark.asyncio
+async def test_delta_events_are_thinned_without_window(sio, monkeypatch):
+    emitter = get_emitter(monkeypatch, 0, {"stream_delta_chunk_size": 3})
+
+    for i in range(7):
+        await emitter(snapshot("x" * (i + 1)), delta=True)
+    assert sio.frames == [snapshot("xxx"), snapshot("xxxxxx")]
+
+    await emitter.flush()
+    assert sio.frames[-1] == snapshot("xxxxxxx")
@@ -0,0 +1,133 @@
+import pytest
+
+from open_webui.socket import main as socket_main
+from open_webui.socket import utils as socket_utils
+from open_webui.socket.utils import AsyncRedisDict
+
+
+class FakePipeline:
+    def __init__(self, redis):
+        self.redis = redis
+        self.commands = []
+
+    def hdel(self, *args):
+        self.commands.append(("hdel", args, {}))
+        return self
+
+    def hset(self, *args, **kwargs):
+        self.commands.append(("hset", args, kwargs))
+        return self
+
+    async def execute(self):
+        self.redis.round_trips += 1
+        results = []
+        for name, args, kwargs in self.commands:
+            results.append(getattr(self.redis, f"_{name}")(*args, **kwargs))
+        return results
+
+
+class FakeAsyncRedis:
+    def __init__(self):
+        self.hashes = {}
+        self.round_trips = 0
+
+    def _hash(self, name):
+        return self.hashes.setdefault(name, {})
+
+    def _hset(self, name, key=None, value=None, mapping=None):
+        data = dict(mapping or {})
+        if key is not None:
+            data[key] = value
+        self._hash(name).update(data)
+        return len(data)
+
+    def _hdel(self, name, *keys):
+        return sum(self._hash(name).pop(key, None) is not None for key in keys)
+
+    async def hget(self, name, key):
+        self.round_trips += 1
+        return self._hash(name).get(key)
+
+    async def hmget(self, name, keys):
+        self.round_trips += 1
+        return [self._hash(name).get(key) for key in keys]
+
+    async def hset(self, name, key=None, value=None, mapping=None):
+        self.round_trips += 1
+        return self._hset(name, key, value, mapping)
+
+    async def hdel(self, name, *keys):
+        self.round_trips += 1
+        return self._hdel(name, *keys)
+
+    async def hexists(self, name, key):
+        self.round_trips += 1
+        return key in self._hash(name)
+
+    async def hgetall(self, name):
+        self.round_trips += 1
+        return dict(self._hash(name))
+
+    def pipeline(self):
+        return FakePipeline(self)
+
+
+@pytest.fixture
+def redis(monkeypatch):
+    fake = FakeAsyncRedis()
+    monkeypatch.setattr(socket_utils, "get_redis_connection", lambda *a, **kw: fake)
+    return fake
+
+
+@pytest.mark.asyncio
+async def test_room_resolution_is_one_round_trip(redis, monkeypatch):
+    pool = AsyncRedisDict("session_pool", redis_url="redis://")
+    await pool.set_many({f"sid-{i}": {"id": f"user-{i % 10}"} for i in range(1000)})
+
+    sids = [f"sid-{i}" for i in range(1000)] + ["gone"]
+    monkeypatch.setattr(socket_main, "SESSION_POOL", pool)
+    monkeypatch.setattr(socket_main, "get_session_ids_from_room", lambda room: sids)
+
+    redis.round_trips = 0
+    user_ids = await socket_main.get_user_ids_from_room("channel:test")
+
+    assert sorted(user_ids) == [f"user-{i}" for i in range(10)]
+    assert redis.round_trips == 1
+
+
+@pytest.mark.asyncio
+async def test_local_read_cache(redis, monkeypatch):
+    pool = AsyncRedisDict("session_pool", redis_url="redis://", cache_ttl=5)
+    await pool.set("a", {"id": "user"})
+    redis.round_trips = 0
+
+    assert await pool.get("a") == {"id": "user"}
+    assert await pool.mget_many(["a"]) == {"a": {"id": "user"}}
+    assert redis.round_trips == 0
+
+    # Misses are not cached
+    assert await pool.get("b") is None
+    await redis.hset("session_pool", "b", '{"id": "other"}')
+    assert await pool.get("b") == {"id": "other"}
+
+    # Expired entries are read again
+    now = socket_utils.time.monotonic()
+    monkeypatch.setattr(socket_utils.time, "monotonic", lambda: now + 10)
+    redis.round_trips = 0
+    assert await pool.get("a") == {"id": "user"}
+    assert redis.round_trips == 1
+
+    assert await pool.delete("a")
+    assert not await pool.contains("a")
+
+
+@pytest.mark.asyncio
+async def test_usage_pool_update_many(redis):
+    pool = AsyncRedisDict("usage_pool", redis_url="redis://")
+    await pool.set_many({"m1": {"s1": 1}, "m2": {"s2": 2}})
+    redis.round_trips = 0
+
+    await pool.update_many({"m1": {"s3": 3}}, deleted_keys=["m2"])
+
+    assert redis.round_trips == 1
+    assert dict(await pool.items()) == {"m1": {"s3": 3}}
@@ -0,0 +1,110 @@
+import json
+
+import pycrdt as Y
+import pytest
+
+from open_webui.socket.utils import YdocManager
+
+
+class FakePipeline:
+    def __init__(self, redis):
+        self.redis = redis
+        self.commands = []
+
+    def ltrim(self, *args):
+        self.commands.append(("ltrim", args))
+        return self
+
+    def lpush(self, *args):
+        self.commands.append(("lpush", args))
+        return self
+
+    async def execute(self):
+        return [await getattr(self.redis, name)(*args) for name, args in self.commands]
+
+
+class FakeAsyncRedis:
+    def __init__(self):
+        self.data = {}
+
+    async def rpush(self, key, value):
+        self.data.setdefault(key, []).append(value)
+        return len(self.data[key])
+
+    async def lpush(self, key, value):
+        self.data.setdefault(key, []).insert(0, value)
+        return len(self.data[key])
+
+    async def lrange(self, key, start, end):
+        values = self.data.get(key, [])
+        return list(values[start:] if end == -1 else values[start : end + 1])
+
+    async def ltrim(self, key, start, end):
+        self.data[key] = self.data.get(key, [])[start:]
+
+    async def set(self, key, value, nx=False, ex=None):
+        if nx and key in self.data:
+            return None
+        self.data[key] = value
+        return True
+
+    async def delete(self, key):
+        return self.data.pop(key, None) is not None
+
+    def pipeline(self):
+        return FakePipeline(self)
+
+
+def record_updates(count):
+    doc = Y.Doc()
+    text = doc.get("text", type=Y.Text)
+    updates = []
+    doc.observe(lambda event: updates.append(event.update))
+    for i in range(count):
+        text += f"{i},"
+    return updates, str(text)
+
+
+def state_text(state: bytes) -> str:
+    doc = Y.Doc()
+    doc.apply_update(state)
+    return str(doc.get("text", type=Y.Text))
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("redis", [None, FakeAsyncRedis()])
+async def test_compaction_keeps_document_state(redis):
+    manager = YdocManager(redis=redis, redis_key_prefix="docs", compaction_threshold=10)
+    updates, expected = record_updates(25)
+
+    for update in updates:
+        # The frontend sends updates as lists of ints
+        await manager.append_to_updates("note:1", list(update))
+
+    # One snapshot followed by the updates received since the last compaction
+    assert len(await manager.get_updates("note:1")) == 5
+    assert state_text(await manager.get_state("note:1")) == expected
+
+
+@pytest.mark.asyncio
+async def test_updates_are_stored_compactly_and_legacy_entries_decode():
+    redis = FakeAsyncRedis()
+    manager = YdocManager(redis=redis, redis_key_prefix="docs", compaction_threshold=0)
+    updates, expected = record_updates(3)
+
+    redis.data["docs:note_1:updates"] = [json.dumps(list(updates[0]))]
+    for update in updates[1:]:
+        await manager.append_to_updates("note:1", update)
+
+    stored = redis.data["docs:note_1:updates"][1:]
+    assert all(
+        len(value) < len(json.dumps(list(update)))
+        for value, update in zip(stored, updates[1:])
+    )
+    assert state_text(await manager.get_state("note:1")) == expected
+
+
+@pytest.mark.asyncio
+async def test_empty_document_state():
+    manager = YdocManager(compaction_threshold=10)
+    assert await manager.get_state("note:missing") == b"\x00\x00"
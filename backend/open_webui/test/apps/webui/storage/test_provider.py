@@ -1,3 +1,4 @@
+import hashlib
 import io
 import os
 import boto3
@@ -74,6 +75,20 @@ class TestLocalStorageProvider:
         with pytest.raises(ValueError):
             self.Storage.upload_file(self.file_bytesio_empty, self.filename)
 
+    def test_upload_file_stream(self, monkeypatch, tmp_path):
+        upload_dir = mock_upload_dir(monkeypatch, tmp_path)
+        monkeypatch.setattr(provider, "STORAGE_UPLOAD_CHUNK_SIZE", 4)
+        file_path, digest, size = self.Storage.upload_file_stream(
+            io.BytesIO(self.file_content), self.filename, {}
+        )
+        assert (upload_dir / self.filename).read_bytes() == self.file_content
+        assert file_path == str(upload_dir / self.filename)
+        assert digest == hashlib.sha256(self.file_content).hexdigest()
+        assert size == len(self.file_content)
+        with pytest.raises(ValueError):
+            self.Storage.upload_file_stream(io.BytesIO(), self.filename_extra, {})
+        assert not (upload_dir / self.filename_extra).exists()
+
     def test_get_file(self, monkeypatch, tmp_path):
         upload_dir = mock_upload_dir(monkeypatch, tmp_path)
         file_path = str(upload_dir / self.filename)
@@ -0,0 +1,111 @@
+"""
+Benchmark for the BM25 side of hybrid search.
+
+Compares the query latency of rebuilding a `BM25Retriever` from the whole
+collection on every query (the previous path, excluding the time spent
+pulling the documents out of the vector DB) with querying a maintained
+`BM25Index`. Also reports the one-off cost of building, persisting and
+loading the index, and checks that both paths return the same top-k scores
+(documents with equal scores may be ordered differently).
+
+Usage (from the backend directory):
+
+    python -m open_webui.test.benchmarks.bm25
+    python -m open_webui.test.benchmarks.bm25 --chunks 50000 --queries 20
+"""
+
+import argparse
+import random
+import tempfile
+import time
+
+from langchain_community.retrievers import BM25Retriever
+
+from open_webui.retrieval.bm25 import BM25Index, BM25IndexCache
+from open_webui.retrieval.vector.main import GetResult
+
+
+def build_corpus(chunks: int, words_per_chunk: int, seed: int = 0):
+    rng = random.Random(seed)
+    vocabulary = [f"term{i}" for i in range(20_000)]
+    # Zipf-like term distribution, as in natural text
+    weights = [1 / (rank + 1) for rank in range(len(vocabulary))]
+
+    texts = [
+        " ".join(rng.choices(vocabulary, weights=weights, k=words_per_chunk))
+        for _ in range(chunks)
+    ]
+    queries = [
+        " ".join(rng.choices(vocabulary[50:5000], k=rng.randint(2, 6)))
+        for _ in range(100)
+    ]
+    return texts, queries
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--chunks", type=int, default=50_000)
+    parser.add_argument("--words", type=int, default=120)
+    parser.add_argument("--queries", type=int, default=10)
+    parser.add_argument("--k", type=int, default=10)
+    args = parser.parse_args()
+
+    texts, queries = build_corpus(args.chunks, args.words)
+    queries = queries[: args.queries]
+    ids = [str(i) for i in range(len(texts))]
+    metadatas = [{"file_id": f"file-{i % 50}", "chunk": i} for i in range(len(texts))]
+
+    start = time.perf_counter()
+    for query in queries:
+        retriever = BM25Retriever.from_texts(texts=texts, metadatas=metadatas)
+        retriever.k = args.k
+        retriever.invoke(query)
+    rebuild_time = (time.perf_counter() - start) / len(queries)
+
+    with tempfile.TemporaryDirectory() as directory:
+        cache = BM25IndexCache(directory=directory)
+        loader = lambda: GetResult(ids=[ids], documents=[texts], metadatas=[metadatas])
+
+        start = time.perf_counter()
+        cache.get("collection", False, loader)
+        build_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        index = BM25IndexCache(directory=directory).get("collection", False, loader)
+        load_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        cache.add(
+            "collection",
+            [{"id": "new", "text": texts[0], "metadata": {"file_id": "new"}}],
+        )
+        update_time = time.perf_counter() - start
+
+        index = cache.get("collection", False, loader)
+        index.delete(ids=["new"])
+
+    start = time.perf_counter()
+    indexed = [index.search(query, args.k) for query in queries]
+    query_time = (time.perf_counter() - start) / len(queries)
+
+    scores_match = True
+    for query, results in zip(queries, indexed):
+        expected = sorted(retriever.vectorizer.get_scores(query.split()), reverse=True)
+        expected = [score for score in expected[: args.k] if score > 0]
+        scores = [score for score, _, _ in results]
+        scores_match &= len(expected) == len(scores) and all(
+            abs(a - b) < 1e-9 for a, b in zip(expected, scores)
+        )
+
+    print(f"chunks:                {len(texts)}")
+    print(f"rebuild per query:     {rebuild_time * 1000:.1f} ms")
+    print(f"indexed per query:     {query_time * 1000:.2f} ms")
+    print(f"speedup:               {rebuild_time / max(query_time, 1e-9):.0f}x")
+    print(f"index build + persist: {build_time * 1000:.0f} ms (once)")
+    print(f"index load from disk:  {load_time * 1000:.0f} ms (per worker)")
+    print(f"add one chunk:         {update_time * 1000:.0f} ms")
+    print(f"top-{args.k} scores match:    {scores_match}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,143 @@
+"""
+Benchmark for serializing content blocks while a response streams.
+
+Replays a chat completion stream through the same block bookkeeping the
+streaming loop in `utils/middleware.py` performs and serializes the blocks
+after every delta, once with the full serializer and once with the
+incremental one. Both outputs are compared on every delta.
+
+Usage (from the backend directory):
+
+    python -m open_webui.test.benchmarks.content_blocks
+    python -m open_webui.test.benchmarks.content_blocks --stream recorded.txt
+
+`--stream` accepts a recorded SSE body (one `data: {...}` line per chunk).
+Without it, a deterministic 20k-token reasoning + answer stream is replayed.
+"""
+
+import argparse
+import json
+import random
+import time
+
+from open_webui.utils.content_blocks import (
+    ContentBlockSerializer,
+    serialize_content_blocks,
+)
+
+WORDS = [
+    "the",
+    "model",
+    "considers",
+    "whether",
+    "a",
+    "value",
+    "<",
+    "&",
+    "token",
+    "so",
+    "that",
+    "`x`",
+    "list",
+    "index",
+]
+
+
+def build_stream(tokens: int = 20_000, seed: int = 0) -> list[str]:
+    rng = random.Random(seed)
+    lines = []
+
+    def chunk(delta):
+        return "data: " + json.dumps({"choices": [{"delta": delta}]})
+
+    reasoning_tokens = int(tokens * 0.6)
+    for i in range(tokens):
+        token = rng.choice(WORDS)
+        token = f"{token}\n" if rng.random() < 0.05 else f"{token} "
+        if i < reasoning_tokens:
+            lines.append(chunk({"reasoning_content": token}))
+        else:
+            lines.append(chunk({"content": token}))
+    lines.append("data: [DONE]")
+    return lines
+
+
+def load_stream(path: str) -> list[str]:
+    with open(path, "r", encoding="utf-8") as f:
+        return [line.rstrip("\n") for line in f if line.strip()]
+
+
+def replay(lines: list[str], on_delta) -> tuple[float, int]:
+    content_blocks = [{"type": "text", "content": ""}]
+    deltas = 0
+
+    start = time.perf_counter()
+    for line in lines:
+        if not line.startswith("data:"):
+            continue
+        data = line[len("data:") :].strip()
+        if data == "[DONE]":
+            break
+
+        delta = json.loads(data)["choices"][0].get("delta", {})
+        reasoning_content = delta.get("reasoning_content")
+        value = delta.get("content")
+
+        if reasoning_content:
+            if content_blocks[-1]["type"] != "reasoning":
+                content_blocks.append(
+                    {
+                        "type": "reasoning",
+                        "start_tag": "<think>",
+                        "end_tag": "</think>",
+                        "attributes": {"type": "reasoning_content"},
+                        "content": "",
+                    }
+                )
+            content_blocks[-1]["content"] += reasoning_content
+            on_delta(content_blocks)
+            deltas += 1
+
+        if value:
+            if content_blocks[-1]["type"] == "reasoning":
+                content_blocks[-1]["duration"] = 12
+                content_blocks.append({"type": "text", "content": ""})
+            content_blocks[-1]["content"] = content_blocks[-1]["content"] + value
+            on_delta(content_blocks)
+            deltas += 1
+
+    return time.perf_counter() - start, deltas
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--stream", help="recorded SSE stream to replay")
+    parser.add_argument("--tokens", type=int, default=20_000)
+    args = parser.parse_args()
+
+    lines = load_stream(args.stream) if args.stream else build_stream(args.tokens)
+
+    serializer = ContentBlockSerializer()
+
+    def verify(content_blocks):
+        expected = serialize_content_blocks(content_blocks)
+        assert serializer.serialize(content_blocks) == expected, "outputs differ"
+
+    replay(lines, verify)
+
+    full_time, deltas = replay(lines, serialize_content_blocks)
+    incremental_time, _ = replay(lines, ContentBlockSerializer().serialize)
+
+    print(f"deltas:      {deltas}")
+    print(
+        f"full:        {full_time:.3f}s ({full_time / max(deltas, 1) * 1e6:.1f} us/delta)"
+    )
+    print(
+        f"incremental: {incremental_time:.3f}s "
+        f"({incremental_time / max(deltas, 1) * 1e6:.1f} us/delta)"
+    )
+    print(f"speedup:     {full_time / max(incremental_time, 1e-9):.1f}x")
+
+
+if __name__ == "__main__":
+    main()
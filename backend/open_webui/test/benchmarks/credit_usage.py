@@ -0,0 +1,135 @@
+"""
+Benchmark for the token accounting of streamed completions.
+
+Feeds the same SSE stream to the previous per-chunk path (parse the line,
+validate a `ChatCompletionChunk`, encode the delta with tiktoken) and to
+`CreditDeduct` in streaming mode (buffer the delta text, encode it once),
+with and without a provider `usage` in the final chunk, and reports the
+overhead per chunk. Needs the tiktoken encoding of the default encoding
+model (downloaded on first use) and the app database for the model lookup.
+
+Usage (from the backend directory):
+
+    python -m open_webui.test.benchmarks.credit_usage
+    python -m open_webui.test.benchmarks.credit_usage --chunks 10000
+"""
+
+import argparse
+import json
+import random
+import time
+from types import SimpleNamespace
+
+from open_webui.config import (
+    USAGE_CALCULATE_MODEL_PREFIX_TO_REMOVE,
+    USAGE_DEFAULT_ENCODING_MODEL,
+)
+from open_webui.utils.credit.models import ChatCompletionChunk, CompletionUsage
+from open_webui.utils.credit.usage import CreditDeduct, calculator
+
+MODEL_ID = "gpt-4o"
+BODY = {"messages": [{"role": "user", "content": "Write a long story."}]}
+
+
+def build_stream(chunks: int, with_usage: bool, seed: int = 0) -> list[bytes]:
+    rng = random.Random(seed)
+    words = ["the", "quick", "brown", "fox", "jumps", "over", "lazy", "dog", "."]
+    lines = []
+    for i in range(chunks):
+        content = " " + " ".join(rng.choices(words, k=rng.randint(1, 3)))
+        chunk = {
+            "id": "chatcmpl-benchmark",
+            "object": "chat.completion.chunk",
+            "model": MODEL_ID,
+            "choices": [{"index": 0, "delta": {"content": content}}],
+        }
+        lines.append(f"data: {json.dumps(chunk)}\n\n".encode())
+    if with_usage:
+        chunk = {
+            "id": "chatcmpl-benchmark",
+            "choices": [],
+            "usage": {"prompt_tokens": 12, "completion_tokens": chunks * 2},
+        }
+        lines.append(f"data: {json.dumps(chunk)}\n\n".encode())
+    lines.append(b"data: [DONE]\n\n")
+    return lines
+
+
+def run_previous(stream: list[bytes]) -> CompletionUsage:
+    """The per-chunk accounting CreditDeduct did before buffering."""
+    usage = CompletionUsage(prompt_tokens=0, completion_tokens=0, total_tokens=0)
+    for line in stream:
+        text = line.decode("utf-8").strip().lstrip("data: ")
+        if text.startswith("[DONE]") or not text:
+            continue
+        response = ChatCompletionChunk.model_validate(json.loads(text))
+        is_official_usage, chunk_usage = calculator.calculate_usage(
+            cached_usage=usage,
+            model_id=MODEL_ID,
+            messages=BODY["messages"],
+            response=response,
+            model_prefix_to_remove=USAGE_CALCULATE_MODEL_PREFIX_TO_REMOVE.value,
+            default_model_for_encoding=USAGE_DEFAULT_ENCODING_MODEL.value,
+        )
+        if is_official_usage:
+            usage = chunk_usage
+            continue
+        usage.prompt_tokens = chunk_usage.prompt_tokens
+        usage.completion_tokens += chunk_usage.completion_tokens
+        usage.total_tokens = usage.prompt_tokens + usage.completion_tokens
+    return usage
+
+
+def run_buffered(stream: list[bytes]) -> CompletionUsage:
+    credit_deduct = CreditDeduct(
+        user=SimpleNamespace(id="benchmark", name="benchmark"),
+        model_id=MODEL_ID,
+        body=BODY,
+        is_stream=True,
+    )
+    # Not used as a context manager: nothing is charged
+    for line in stream:
+        credit_deduct.run(line)
+    credit_deduct.finalize_stream_usage()
+    return credit_deduct.usage
+
+
+def measure(fn, stream, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        usage = fn(stream)
+        best = min(best, time.perf_counter() - start)
+    return best, usage
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--chunks", type=int, default=10_000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    # Load the encoder outside of the measurements
+    calculator.get_encoder(MODEL_ID, default_model_for_encoding=MODEL_ID)
+
+    print(f"chunks: {args.chunks}")
+    for with_usage in [False, True]:
+        stream = build_stream(args.chunks, with_usage)
+        previous_time, previous_usage = measure(run_previous, stream, args.repeat)
+        buffered_time, buffered_usage = measure(run_buffered, stream, args.repeat)
+
+        label = "provider usage" if with_usage else "calculated usage"
+        print(f"\n{label}:")
+        print(
+            f"  per-chunk path:  {previous_time * 1e6 / len(stream):.1f} us/chunk "
+            f"({previous_usage.completion_tokens} completion tokens)"
+        )
+        print(
+            f"  buffered path:   {buffered_time * 1e6 / len(stream):.1f} us/chunk "
+            f"({buffered_usage.completion_tokens} completion tokens)"
+        )
+        print(f"  speedup:         {previous_time / max(buffered_time, 1e-9):.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+from open_webui import config as config_module
+from open_webui.config import AppConfig, PersistentConfig
+
+
+class FakePipeline:
+    def __init__(self, redis):
+        self.redis = redis
+        self.commands = []
+
+    def get(self, key):
+        self.commands.append(key)
+
+    def execute(self):
+        self.redis.round_trips += 1
+        return [self.redis.data.get(key) for key in self.commands]
+
+
+class FakeRedis:
+    def __init__(self):
+        self.data = {}
+        self.round_trips = 0
+
+    def get(self, key):
+        self.round_trips += 1
+        return self.data.get(key)
+
+    def set(self, key, value):
+        self.round_trips += 1
+        self.data[key] = value
+
+    def incr(self, key):
+        self.round_trips += 1
+        self.data[key] = str(int(self.data.get(key, 0)) + 1)
+        return int(self.data[key])
+
+    def pipeline(self):
+        return FakePipeline(self)
+
+
+def make_config(monkeypatch, redis):
+    monkeypatch.setattr(config_module, "get_redis_connection", lambda *a, **k: redis)
+    monkeypatch.setattr(PersistentConfig, "save", lambda self: None)
+    monkeypatch.setattr(AppConfig, "_sync_loop", lambda self: None)
+
+    app_config = AppConfig(redis_url="redis://localhost", redis_key_prefix="test")
+    app_config.WEBUI_NAME = PersistentConfig("WEBUI_NAME", "ui.name", "Open WebUI")
+    app_config.ENABLE_SIGNUP = PersistentConfig("ENABLE_SIGNUP", "ui.signup", True)
+    return app_config
+
+
+def test_reads_are_served_from_snapshot(monkeypatch):
+    redis = FakeRedis()
+    redis.data["test:config:WEBUI_NAME"] = '"Shared"'
+    app_config = make_config(monkeypatch, redis)
+
+    assert app_config.WEBUI_NAME == "Shared"
+    round_trips = redis.round_trips
+
+    for _ in range(100):
+        assert app_config.WEBUI_NAME == "Shared"
+        assert app_config.ENABLE_SIGNUP is True
+
+    assert redis.round_trips == round_trips
+    assert app_config.get_stats()["hits"] == 201
+
+
+def test_remote_changes_invalidate_snapshot(monkeypatch):
+    redis = FakeRedis()
+    app_config = make_config(monkeypatch, redis)
+    assert app_config.ENABLE_SIGNUP is True
+
+    # Another node writes a value and bumps the version
+    redis.data["test:config:ENABLE_SIGNUP"] = "false"
+    redis.incr("test:config:version")
+    app_config._sync()
+
+    assert app_config.ENABLE_SIGNUP is False
+    assert app_config.get_stats()["invalidations"] == 1
+
+
+def test_local_writes_do_not_trigger_reload(monkeypatch):
+    redis = FakeRedis()
+    app_config = make_config(monkeypatch, redis)
+    assert app_config.WEBUI_NAME == "Open WebUI"
+
+    app_config.WEBUI_NAME = "Renamed"
+    app_config._sync()
+
+    assert app_config.WEBUI_NAME == "Renamed"
+    assert redis.data["test:config:WEBUI_NAME"] == '"Renamed"'
+    assert app_config.get_stats()["invalidations"] == 0
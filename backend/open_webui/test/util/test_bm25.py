@@ -0,0 +1,140 @@
+import os
+import random
+import threading
+
+import pytest
+from rank_bm25 import BM25Okapi
+
+from open_webui.retrieval.bm25 import BM25Index, BM25IndexCache
+from open_webui.retrieval.vector.main import GetResult
+
+WORDS = ["alpha", "beta", "gamma", "delta", "epsilon", "zeta", "eta", "theta"]
+
+
+def build_corpus(size, seed=0):
+    rng = random.Random(seed)
+    return [
+        " ".join(rng.choice(WORDS) for _ in range(rng.randint(3, 20)))
+        for _ in range(size)
+    ]
+
+
+def test_scores_match_bm25_okapi():
+    corpus = build_corpus(200)
+    okapi = BM25Okapi([text.split() for text in corpus])
+
+    index = BM25Index()
+    index.add([str(i) for i in range(len(corpus))], corpus, [{}] * len(corpus))
+
+    for query in ["alpha", "beta gamma", "theta theta eta", "unknown alpha"]:
+        expected = okapi.get_scores(query.split())
+        for score, text, _ in index.search(query, k=len(corpus)):
+            assert score == pytest.approx(expected[corpus.index(text)])
+
+
+def test_incremental_updates_match_a_fresh_index():
+    corpus = build_corpus(100)
+    ids = [str(i) for i in range(len(corpus))]
+    metadatas = [{"file_id": f"file-{i % 4}"} for i in range(len(corpus))]
+
+    index = BM25Index()
+    index.add(ids[:60], corpus[:60], metadatas[:60])
+    index.add(ids[60:], corpus[60:], metadatas[60:])
+    assert index.delete(filter={"file_id": "file-1"}) == 25
+    assert index.delete(ids=["0", "0", "missing"]) == 1
+
+    remaining = [
+        i for i in range(len(corpus)) if metadatas[i]["file_id"] != "file-1" and i
+    ]
+    fresh = BM25Index()
+    fresh.add(
+        [ids[i] for i in remaining],
+        [corpus[i] for i in remaining],
+        [metadatas[i] for i in remaining],
+    )
+
+    assert index.search("alpha delta", k=10) == fresh.search("alpha delta", k=10)
+    assert index.total_length == fresh.total_length
+    assert index.document_frequencies == fresh.document_frequencies
+    assert len(index) == len(fresh)
+
+
+def test_cache_persists_and_applies_updates(tmp_path):
+    corpus = build_corpus(10)
+    loads = []
+
+    def loader():
+        loads.append(1)
+        return GetResult(
+            ids=[[str(i) for i in range(len(corpus))]],
+            documents=[corpus],
+            metadatas=[[{"name": "notes.txt"}] * len(corpus)],
+        )
+
+    cache = BM25IndexCache(directory=str(tmp_path), max_size=1)
+    assert len(cache.get("kb", False, loader)) == 10
+    assert len(cache.get("kb", True, loader)) == 10
+    assert len(loads) == 2
+
+    cache.add("kb", [{"id": "new", "text": "omega", "metadata": {"hash": "h"}}])
+    cache.delete("kb", filter={"hash": "h"})
+    cache.add("kb", [{"id": "other", "text": "omega", "metadata": {}}])
+
+    # A new cache (another worker) reads the persisted indexes
+    other = BM25IndexCache(directory=str(tmp_path))
+    plain = other.get("kb", False, loader)
+    enriched = other.get("kb", True, loader)
+    assert len(loads) == 2
+    assert [text for _, text, _ in plain.search("omega", k=5)] == ["omega"]
+    assert "Filename: notes.txt" in enriched.search("alpha", k=1)[0][1]
+
+    other.drop("kb")
+    assert other.get("kb", False, lambda: None) is None
+
+
+def test_updates_during_a_build_are_kept(tmp_path):
+    cache = BM25IndexCache(directory=str(tmp_path))
+    building = threading.Event()
+
+    def loader():
+        building.set()
+        # The chunk saved meanwhile is not part of the loaded collection
+        adding.join(0.2)
+        return GetResult(ids=[["a"]], documents=[["alpha"]], metadatas=[[{}]])
+
+    def add():
+        building.wait()
+        cache.add("kb", [{"id": "b", "text": "beta", "metadata": {}}])
+
+    adding = threading.Thread(target=add)
+    adding.start()
+    index = cache.get("kb", False, loader)
+    adding.join()
+    assert [text for _, text, _ in index.search("beta", k=1)] == ["beta"]
+
+
+def test_updates_are_journaled(tmp_path):
+    corpus = build_corpus(50)
+
+    def loader():
+        return GetResult(
+            ids=[[str(i) for i in range(len(corpus))]],
+            documents=[corpus],
+            metadatas=[[{}] * len(corpus)],
+        )
+
+    cache = BM25IndexCache(directory=str(tmp_path))
+    other = BM25IndexCache(directory=str(tmp_path))
+    cache.get("kb", False, loader)
+    assert len(other.get("kb", False, loader)) == 50
+
+    path = cache._path("kb", False)
+    mtime = os.stat(path).st_mtime_ns
+    cache.add("kb", [{"id": "new", "text": "omega", "metadata": {}}])
+    other.delete("kb", ids=["0"])
+
+    # Both workers see both updates, the snapshot was not rewritten
+    assert os.stat(path).st_mtime_ns == mtime
+    for index in (cache.get("kb", False, loader), other.get("kb", False, loader)):
+        assert len(index) == 50
+        assert index.search("omega", k=1)[0][1] == "omega"
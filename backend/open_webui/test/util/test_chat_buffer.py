@@ -0,0 +1,73 @@
+import pytest
+
+from open_webui.utils import chat_buffer
+from open_webui.utils.chat_buffer import ChatMessageWriteBuffer
+
+
+class FakeChats:
+    def __init__(self):
+        self.writes = []
+        self.fail = False
+
+    def upsert_messages_to_chat_by_id(self, id, messages):
+        if self.fail:
+            raise RuntimeError("database unavailable")
+        self.writes.append((id, {k: dict(v) for k, v in messages.items()}))
+
+    def upsert_message_to_chat_by_id_and_message_id(self, id, message_id, message):
+        self.upsert_messages_to_chat_by_id(id, {message_id: message})
+
+
+@pytest.fixture
+def chats(monkeypatch):
+    fake = FakeChats()
+    monkeypatch.setattr(chat_buffer, "Chats", fake)
+    return fake
+
+
+def test_updates_are_coalesced_until_close(chats):
+    buffer = ChatMessageWriteBuffer(flush_interval=60, flush_bytes=1_000_000)
+
+    for i in range(1, 100):
+        buffer.upsert("chat", "message", {"content": "x" * i})
+
+    assert chats.writes == []
+
+    assert buffer.close("chat", "message")
+    assert chats.writes == [("chat", {"message": {"content": "x" * 99}})]
+    assert buffer.stats["flushes"] == 1
+    assert buffer.stats["updates"] == 99
+
+
+def test_byte_budget_counts_growth(chats):
+    buffer = ChatMessageWriteBuffer(flush_interval=60, flush_bytes=100)
+
+    for i in range(1, 251):
+        buffer.upsert("chat", "message", {"content": "x" * i})
+
+    assert [len(w[1]["message"]["content"]) for w in chats.writes] == [100, 200]
+
+
+def test_failed_flush_keeps_updates(chats):
+    buffer = ChatMessageWriteBuffer(flush_interval=60, flush_bytes=1_000_000)
+    buffer.upsert("chat", "message", {"content": "a", "usage": {"total": 1}})
+
+    chats.fail = True
+    assert not buffer.close("chat", "message")
+    assert buffer.stats["flush_errors"] == 1
+
+    buffer.upsert("chat", "message", {"content": "ab"})
+    chats.fail = False
+    buffer.flush_all()
+
+    assert chats.writes == [
+        ("chat", {"message": {"content": "ab", "usage": {"total": 1}}})
+    ]
+
+
+def test_zero_interval_writes_through(chats):
+    buffer = ChatMessageWriteBuffer(flush_interval=0, flush_bytes=1_000_000)
+    buffer.upsert("chat", "message", {"content": "a"})
+    buffer.upsert("chat", "message", {"content": "ab"})
+
+    assert len(chats.writes) == 2
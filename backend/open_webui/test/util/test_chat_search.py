@@ -0,0 +1,166 @@
+import importlib.util
+from contextlib import contextmanager
+from pathlib import Path
+
+import pytest
+from alembic.migration import MigrationContext
+from alembic.operations import Operations
+from sqlalchemy import create_engine, text
+from sqlalchemy.orm import sessionmaker
+
+import open_webui.models.chats as chats_module
+import open_webui.models.folders as folders_module
+from open_webui.models.chats import (
+    Chat,
+    ChatForm,
+    ChatImportForm,
+    ChatSearch,
+    ChatTable,
+)
+from open_webui.models.folders import Folder, FolderForm, Folders
+
+MIGRATION = (
+    Path(chats_module.__file__).parent.parent
+    / "migrations"
+    / "versions"
+    / "d4f1c2b7e9a3_add_chat_search_table.py"
+)
+
+
+def run_migration(engine):
+    spec = importlib.util.spec_from_file_location("chat_search_migration", MIGRATION)
+    migration = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(migration)
+    with engine.begin() as connection:
+        with Operations.context(MigrationContext.configure(connection)):
+            migration.upgrade()
+
+
+def chat(title, *messages):
+    return {
+        "title": title,
+        "history": {
+            "messages": {
+                str(i): {"id": str(i), "content": content}
+                for i, content in enumerate(messages)
+            }
+        },
+    }
+
+
+@pytest.fixture
+def chats(tmp_path, monkeypatch):
+    engine = create_engine(f"sqlite:///{tmp_path / 'webui.db'}")
+    Chat.__table__.create(engine)
+    Folder.__table__.create(engine)
+    session_factory = sessionmaker(bind=engine, expire_on_commit=False)
+
+    # A chat saved before the search index existed
+    with session_factory() as db:
+        db.add(
+            Chat(
+                id="legacy",
+                user_id="u1",
+                title="Old notes",
+                chat={"messages": [{"content": "Kubernetes upgrade plan"}]},
+                created_at=1,
+                updated_at=1,
+            )
+        )
+        db.commit()
+    run_migration(engine)
+
+    @contextmanager
+    def get_db_context(db=None):
+        with session_factory() as session:
+            yield session
+
+    monkeypatch.setattr(chats_module, "get_db_context", get_db_context)
+    monkeypatch.setattr(folders_module, "get_db_context", get_db_context)
+    monkeypatch.setattr(ChatTable, "_has_search_fts", None)
+    chats = ChatTable()
+    chats.engine = engine
+    yield chats
+    engine.dispose()
+
+
+def search(chats, query, user_id="u1"):
+    return sorted(
+        chat.title
+        for chat in chats.get_chats_by_user_id_and_search_text(user_id, query)
+    )
+
+
+def count(chats, query):
+    with chats.engine.connect() as connection:
+        return connection.execute(text(query)).scalar()
+
+
+def test_index_follows_chat_writes(chats):
+    # Backfilled by the migration
+    assert search(chats, "kubernetes") == ["Old notes"]
+
+    created = chats.insert_new_chat("u1", ChatForm(chat=chat("Trip", "Book a ferry")))
+    assert search(chats, "FERRY") == ["Trip"]
+    assert search(chats, "ferry", user_id="u2") == []
+
+    chats.update_chat_by_id(created.id, chat("Trip", "Book a train"))
+    assert search(chats, "ferry") == []
+    assert search(chats, "train") == ["Trip"]
+
+    chats.import_chats("u1", [ChatImportForm(chat=chat("Imported", "Quarterly OKRs"))])
+    assert search(chats, "okrs") == ["Imported"]
+
+    chats.delete_chat_by_id(created.id)
+    assert search(chats, "train") == []
+    assert count(chats, "SELECT count(*) FROM chat_search") == 2
+    assert count(chats, "SELECT count(*) FROM chat_search_fts('train')") == 0
+
+
+def test_fts_matches_the_like_fallback(chats):
+    chats.insert_new_chat("u1", ChatForm(chat=chat("Grocery list", "eggs, milk")))
+    chats.insert_new_chat("u1", ChatForm(chat=chat("Quotes", 'She said "hello"')))
+    chats.insert_new_chat("u1", ChatForm(chat=chat("Code", "SELECT * FROM t")))
+
+    queries = ["gg", "milk", "cery li", '"hello"', "* from", "e", "nothing"]
+    fts = {query: search(chats, query) for query in queries}
+    assert ChatTable._has_search_fts
+
+    ChatTable._has_search_fts = False
+    assert {query: search(chats, query) for query in queries} == fts
+    assert fts["cery li"] == ["Grocery list"]
+    assert fts['"hello"'] == ["Quotes"]
+
+
+def test_search_filters(chats):
+    folder = Folders.insert_new_folder("u1", FolderForm(name="Work Items"))
+    chats.import_chats(
+        "u1",
+        [
+            ChatImportForm(chat=chat("Tagged", "report"), meta={"tags": ["q3"]}),
+            ChatImportForm(chat=chat("Pinned", "report"), pinned=True),
+            ChatImportForm(chat=chat("Filed", "report"), folder_id=folder.id),
+        ],
+    )
+    archived = chats.insert_new_chat("u1", ChatForm(chat=chat("Archived", "report")))
+    chats.toggle_chat_archive_by_id(archived.id)
+
+    assert search(chats, "report") == ["Filed", "Pinned", "Tagged"]
+    assert search(chats, "report tag:q3") == ["Tagged"]
+    assert search(chats, "tag:none report") == ["Filed", "Pinned"]
+    assert search(chats, "report folder:work_items") == ["Filed"]
+    assert search(chats, "report pinned:true") == ["Pinned"]
+    assert search(chats, "report archived:true") == ["Archived"]
+    assert search(chats, "archived:false pinned:false report") == ["Filed", "Tagged"]
+
+
+def test_reindex_chats(chats):
+    chats.insert_new_chat("u1", ChatForm(chat=chat("Trip", "Book a ferry")))
+    # E.g. chats restored from a dump without their index
+    with chats.engine.begin() as connection:
+        connection.execute(ChatSearch.__table__.delete())
+    assert search(chats, "ferry") == []
+
+    assert chats.reindex_chats(batch_size=1) == 2
+    assert search(chats, "ferry") == ["Trip"]
+    assert search(chats, "kubernetes") == ["Old notes"]
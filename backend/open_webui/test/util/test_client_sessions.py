@@ -0,0 +1,61 @@
+import aiohttp
+import pytest
+import pytest_asyncio
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+
+from open_webui.utils.client_sessions import ClientSessionPool
+
+
+@pytest_asyncio.fixture
+async def server():
+    async def handler(request):
+        response = web.json_response(
+            {"peer": request.transport.get_extra_info("peername")}
+        )
+        response.set_cookie("session", "user-a")
+        return response
+
+    app = web.Application()
+    app.router.add_get("/models", handler)
+    server = TestServer(app)
+    await server.start_server()
+    yield server
+    await server.close()
+
+
+@pytest.mark.asyncio
+async def test_requests_reuse_connections(server):
+    pool = ClientSessionPool()
+    url = str(server.make_url("/models"))
+
+    peers = []
+    for _ in range(3):
+        session = pool.get(url, timeout=aiohttp.ClientTimeout(total=5))
+        response = await session.get(url)
+        peers.append((await response.json())["peer"][1])
+        response.release()
+        # Closing the handle keeps the shared session open
+        await session.close()
+
+    assert len(set(peers)) == 1
+    assert pool.stats["sessions"] == 1
+    assert pool.get(url).session is pool.get(f"{url}?page=2").session
+
+    # Cookies set for one user are not sent for the next
+    assert len(pool.get(url).session.cookie_jar) == 0
+    # Concurrent streams do not queue for a connection by default
+    assert pool.get(url).session.connector.limit == 0
+
+    await pool.close()
+    assert pool.get(url).session is not session.session
+    await pool.close()
+
+
+def test_origin():
+    assert ClientSessionPool.get_origin("https://api.example.com/v1/chat") == (
+        "https://api.example.com"
+    )
+    assert ClientSessionPool.get_origin("http://localhost:11434/api") == (
+        "http://localhost:11434"
+    )
@@ -0,0 +1,87 @@
+import random
+
+from open_webui.utils.content_blocks import (
+    ContentBlockSerializer,
+    serialize_content_blocks,
+)
+
+
+def _random_text(rng, words=8):
+    vocabulary = ["alpha", "beta", "<b>", "&amp;", "> quote", "```", "\n", "\r\n", " "]
+    return "".join(rng.choice(vocabulary) for _ in range(words))
+
+
+def _replay(rng, serializer):
+    content_blocks = [{"type": "text", "content": ""}]
+    for step in range(400):
+        choice = rng.random()
+        tail = content_blocks[-1]
+        if choice < 0.4 and tail["type"] in ("text", "reasoning"):
+            tail["content"] = tail["content"] + _random_text(rng, rng.randint(1, 4))
+        elif choice < 0.5:
+            if tail["type"] == "reasoning":
+                tail["duration"] = rng.randint(0, 30)
+            content_blocks.append(
+                {
+                    "type": "reasoning",
+                    "start_tag": "<think>",
+                    "end_tag": "</think>",
+                    "content": "",
+                }
+            )
+        elif choice < 0.6:
+            content_blocks.append({"type": "text", "content": ""})
+        elif choice < 0.65:
+            content_blocks.append(
+                {
+                    "type": "tool_calls",
+                    "content": [
+                        {
+                            "id": f"call_{step}",
+                            "function": {"name": "search", "arguments": "{}"},
+                        }
+                    ],
+                }
+            )
+        elif choice < 0.7 and tail["type"] == "tool_calls":
+            tail["results"] = [{"tool_call_id": f"call_{step}", "content": "ok"}]
+        elif choice < 0.75:
+            content_blocks.append(
+                {
+                    "type": "code_interpreter",
+                    "attributes": {"lang": "python"},
+                    "content": "print(1)",
+                }
+            )
+        elif choice < 0.8 and tail["type"] == "code_interpreter":
+            tail["output"] = {"stdout": "1"}
+        elif choice < 0.85 and len(content_blocks) > 1:
+            content_blocks.pop()
+        elif choice < 0.9 and tail["type"] in ("text", "reasoning"):
+            tail["content"] = tail["content"].strip()
+        elif choice < 0.92:
+            content_blocks = [{"type": "text", "content": _random_text(rng)}]
+
+        pending = content_blocks + [{"type": "tool_calls", "content": []}]
+        for blocks in (content_blocks, pending):
+            for raw in (False, True):
+                assert serializer.serialize(blocks, raw) == serialize_content_blocks(
+                    blocks, raw
+                )
+
+
+def test_incremental_serializer_matches_full_serialization():
+    for seed in range(20):
+        _replay(random.Random(seed), ContentBlockSerializer())
+
+
+def test_incremental_serializer_renders_growing_reasoning():
+    serializer = ContentBlockSerializer()
+    block = {"type": "reasoning", "content": ""}
+    content_blocks = [{"type": "text", "content": "intro"}, block]
+
+    for delta in ["first line", "\n", "> quoted\r", "\nthird <tag>", "\n\n", "end"]:
+        block["content"] += delta
+        assert serializer.serialize(content_blocks) == serialize_content_blocks(
+            content_blocks
+        )
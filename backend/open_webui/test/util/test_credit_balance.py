@@ -0,0 +1,83 @@
+from decimal import Decimal
+
+import pytest
+
+from open_webui.models.credits import CreditBalanceCache
+
+
+@pytest.fixture
+def balances(monkeypatch):
+    cache = CreditBalanceCache(ttl=60, reservation_ttl=60, key_prefix="test")
+    # In process only, with the database load recorded
+    cache._redis_loaded = True
+    cache.loaded = []
+
+    def load(user_id):
+        cache.loaded.append(user_id)
+        return Decimal("1")
+
+    monkeypatch.setattr(cache, "_load", load)
+    return cache
+
+
+def test_balance_is_loaded_once(balances):
+    assert balances.reserve("user", Decimal("0.1"))[0]
+    assert balances.reserve("user", Decimal("0.1"))[0]
+    assert balances.loaded == ["user"]
+    assert balances.stats["misses"] == 1 and balances.stats["hits"] == 1
+
+
+def test_reservations_cannot_overdraw(balances):
+    holds = [balances.reserve("user", Decimal("0.3")) for _ in range(4)]
+    assert [ok for ok, _ in holds] == [True, True, True, False]
+
+    # Settling frees the hold, the charge itself comes from the ledger
+    balances.add("user", Decimal("-0.2"))
+    balances.settle("user", holds[0][1])
+    assert balances.reserve("user", Decimal("0.2"))[0]
+    assert not balances.reserve("user", Decimal("0.01"))[0]
+
+
+def test_minimum_credit(balances):
+    balances.set("user", Decimal("5"))
+    assert not balances.reserve("user", Decimal("0"), minimum_credit=Decimal("6"))[0]
+    assert balances.reserve("user", Decimal("0"), minimum_credit=Decimal("5"))[0]
+    assert balances.loaded == []
+
+    balances.set("user", Decimal("0"))
+    assert not balances.reserve("user", Decimal("0"))[0]
+
+
+def test_expired_reservations_are_dropped(balances):
+    ok, reservation_id = balances.reserve("user", Decimal("1"))
+    assert ok and not balances.reserve("user", Decimal("0.5"))[0]
+
+    # e.g. the request crashed before it was settled
+    amount, _ = balances._reservations["user"][reservation_id]
+    balances._reservations["user"][reservation_id] = (amount, 0)
+    assert balances.reserve("user", Decimal("0.5"))[0]
+
+
+def test_changes_during_a_load_are_not_lost(balances, monkeypatch):
+    balance = [Decimal("1")]
+
+    def load(user_id):
+        loaded = balance[0]
+        if len(balances.loaded) == 0:
+            # A charge is committed and written through while loading
+            with balances.writing(user_id):
+                balance[0] -= Decimal("0.8")
+                balances.add(user_id, Decimal("-0.8"))
+        balances.loaded.append(user_id)
+        return loaded
+
+    monkeypatch.setattr(balances, "_load", load)
+    assert not balances.reserve("user", Decimal("0.5"))[0]
+    assert balances.loaded == ["user", "user"]
+    assert balances._balances["user"][0] == Decimal("0.2")
+
+    # Changes to the cached balance are written through
+    with balances.writing("user"):
+        balances.add("user", Decimal("1"))
+    assert balances.reserve("user", Decimal("0.5"))[0]
+    assert balances.loaded == ["user", "user"]
@@ -0,0 +1,136 @@
+import asyncio
+import base64
+import os
+from io import BytesIO
+
+import pytest
+from PIL import Image
+
+from open_webui.utils.credit import image as image_module
+from open_webui.utils.credit.image import (
+    IMAGE_HEADER_CHUNK,
+    get_image_size,
+    get_image_size_from_data_uri,
+    prefetch_image_sizes,
+)
+from open_webui.utils.credit.utils import ImageURL, calculate_image_token
+
+
+def data_uri(width, height, format="PNG", **kwargs):
+    buffer = BytesIO()
+    Image.new("RGB", (width, height)).save(buffer, format=format, **kwargs)
+    encoded = base64.b64encode(buffer.getvalue()).decode()
+    return f"data:image/{format.lower()};base64,{encoded}"
+
+
+@pytest.mark.parametrize("format", ["PNG", "JPEG", "WEBP", "GIF"])
+def test_data_uri_size(format):
+    assert get_image_size_from_data_uri(data_uri(1200, 700, format)) == (1200, 700)
+
+
+def test_data_uri_is_decoded_in_part(monkeypatch):
+    decoded = []
+    b64decode = base64.b64decode
+
+    def record(data):
+        decoded.append(len(data))
+        return b64decode(data)
+
+    monkeypatch.setattr(image_module.base64, "b64decode", record)
+    noise = Image.frombytes("RGB", (1024, 1024), os.urandom(3 * 1024 * 1024))
+    buffer = BytesIO()
+    noise.save(buffer, format="PNG")
+    url = "data:image/png;base64," + base64.b64encode(buffer.getvalue()).decode()
+
+    assert get_image_size_from_data_uri(url) == (1024, 1024)
+    assert decoded == [(IMAGE_HEADER_CHUNK + 2) // 3 * 4]
+
+    # The dimensions of a JPEG come after its metadata blocks
+    decoded.clear()
+    url = data_uri(640, 480, "JPEG", exif=b"Exif\x00\x00" + b"\x00" * 65000)
+    assert get_image_size_from_data_uri(url) == (640, 480)
+    assert len(decoded) == 2
+
+
+def test_image_token_matches_full_decode():
+    url = data_uri(2048, 1024)
+    image = ImageURL(url=url, detail="high")
+    assert calculate_image_token("gpt-4o", image) == 1783
+    assert calculate_image_token("gpt-4o", ImageURL(url=url, detail="low")) == 85
+
+
+def test_remote_sizes_are_cached(monkeypatch):
+    requests = []
+
+    def fetch(url):
+        requests.append(url)
+        return (800, 600)
+
+    monkeypatch.setattr(image_module, "get_remote_image_size", fetch)
+    url = "https://example.com/cat.png"
+    assert get_image_size(url) == (800, 600)
+    assert get_image_size(url) == (800, 600)
+    assert requests == [url]
+
+
+def test_remote_urls_with_commas_use_the_prefetched_size(monkeypatch):
+    def fetch(url):
+        raise AssertionError("fetched again")
+
+    monkeypatch.setattr(image_module, "get_remote_image_size", fetch)
+    url = "https://example.com/resize/w_320,h_200/cat.png"
+    image_module.IMAGE_SIZES.set(url, (320, 200))
+    assert get_image_size(url) == (320, 200)
+
+
+def test_raw_base64_image_size(monkeypatch):
+    monkeypatch.setattr(image_module, "get_image_size_from_file", lambda id: None)
+    encoded = data_uri(300, 150).split(",", 1)[1]
+    assert get_image_size(encoded) == (300, 150)
+
+
+def test_unreadable_remote_images_are_cached(monkeypatch):
+    requests = []
+
+    def fetch(url):
+        requests.append(url)
+        raise ConnectionError("unreachable")
+
+    monkeypatch.setattr(image_module, "get_remote_image_size", fetch)
+    url = "https://unreachable.example.com/cat.png"
+    image = ImageURL(url=url, detail="high")
+    # Billed as 1024x1024
+    assert calculate_image_token("gpt-4o", image) == 1146
+    assert calculate_image_token("gpt-4o", image) == 1146
+    assert requests == [url]
+
+
+@pytest.mark.asyncio
+async def test_images_being_prefetched_are_not_read_again(monkeypatch):
+    def fetch(url):
+        raise AssertionError("fetched again")
+
+    read = asyncio.Event()
+    release = asyncio.Event()
+
+    async def fetch_async(url):
+        read.set()
+        await release.wait()
+        return (800, 600)
+
+    monkeypatch.setattr(image_module, "get_remote_image_size", fetch)
+    monkeypatch.setattr(image_module, "get_remote_image_size_async", fetch_async)
+    url = "https://example.com/prefetched.png"
+    prefetch_image_sizes(
+        [{"content": [{"type": "image_url", "image_url": {"url": url}}]}]
+    )
+    await read.wait()
+
+    # Billing on the event loop does not wait for the prefetch
+    assert get_image_size(url) is None
+    # A thread waits for it
+    waiting = asyncio.create_task(asyncio.to_thread(get_image_size, url))
+    await asyncio.sleep(0.05)
+    release.set()
+    assert await waiting == (800, 600)
+    assert get_image_size(url) == (800, 600)
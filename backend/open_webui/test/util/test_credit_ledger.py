@@ -0,0 +1,151 @@
+from contextlib import contextmanager
+from decimal import Decimal
+
+import pytest
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+
+import open_webui.config
+import open_webui.models.credits as credits_module
+from open_webui.models.credits import (
+    AddCreditForm,
+    Credit,
+    CreditBalanceCache,
+    CreditLog,
+    CreditLogWriteQueue,
+    CreditModel,
+    CreditsTable,
+    CreditUsageDaily,
+    CreditUsageHourly,
+    SetCreditFormDetail,
+)
+
+
+@pytest.fixture
+def db(tmp_path, monkeypatch):
+    engine = create_engine(f"sqlite:///{tmp_path / 'webui.db'}")
+    for table in (Credit, CreditLog, CreditUsageHourly, CreditUsageDaily):
+        table.__table__.create(engine)
+    session_factory = sessionmaker(bind=engine, expire_on_commit=False)
+
+    @contextmanager
+    def get_db():
+        with session_factory() as session:
+            yield session
+
+    statements = []
+    event.listen(
+        engine,
+        "before_cursor_execute",
+        lambda conn, cursor, statement, *args: statements.append(statement),
+    )
+
+    monkeypatch.setattr(credits_module, "get_db", get_db)
+    monkeypatch.setattr(open_webui.config.CREDIT_DEFAULT_CREDIT, "value", "10")
+    balances = CreditBalanceCache(ttl=60, reservation_ttl=60, key_prefix="test")
+    balances._redis_loaded = True
+    monkeypatch.setattr(credits_module, "CreditBalances", balances)
+    monkeypatch.setattr(
+        credits_module, "CreditLogQueue", CreditLogWriteQueue(0, flush_size=1)
+    )
+    get_db.engine = engine
+    get_db.statements = statements
+    yield get_db
+    engine.dispose()
+
+
+def charge(user_id, amount, model_id="gpt-4o"):
+    return AddCreditForm(
+        user_id=user_id,
+        amount=Decimal(amount),
+        detail=SetCreditFormDetail(
+            api_params={"model": {"id": model_id}},
+            usage={"total_price": -float(amount), "total_tokens": 10},
+        ),
+    )
+
+
+def get_logs(db, user_id):
+    with db() as session:
+        return [
+            credit
+            for (credit,) in session.query(CreditLog.credit)
+            .filter(CreditLog.user_id == user_id)
+            .order_by(CreditLog.created_at, CreditLog.credit.desc())
+        ]
+
+
+def test_add_credit_updates_the_balance_in_place(db):
+    credits = CreditsTable()
+    # The first change creates the row from the default credit
+    assert credits.add_credit_by_user_id(charge("u1", "-1")).credit == Decimal(9)
+
+    db.statements.clear()
+    assert credits.add_credit_by_user_id(charge("u1", "-2.5")).credit == Decimal("6.5")
+    updates = [s for s in db.statements if s.startswith("UPDATE credit ")]
+    assert len(updates) == 1 and "RETURNING" in updates[0]
+    assert not any(s.startswith("SELECT") for s in db.statements)
+
+    assert credits.get_credit_by_user_id("u1").credit == Decimal("6.5")
+    assert get_logs(db, "u1") == [Decimal(9), Decimal("6.5")]
+
+
+def test_add_credit_without_returning(db, monkeypatch):
+    monkeypatch.setattr(db.engine.dialect, "update_returning", False)
+    credits = CreditsTable()
+    credits.add_credit_by_user_id(charge("u1", "-1"))
+    assert credits.add_credit_by_user_id(charge("u1", "-1")).credit == Decimal(8)
+
+
+def test_first_row_created_concurrently(db, monkeypatch):
+    credits = CreditsTable()
+    update_credit = credits._update_credit
+    calls = []
+
+    def racing_update(session, user_id, values):
+        calls.append(user_id)
+        if len(calls) == 1:
+            # Another request creates the row between the UPDATE and INSERT
+            with db() as other:
+                other.add(Credit(**CreditModel(user_id=user_id, credit=5).model_dump()))
+                other.commit()
+            return None
+        return update_credit(session, user_id, values)
+
+    monkeypatch.setattr(credits, "_update_credit", racing_update)
+    assert credits.add_credit_by_user_id(charge("u1", "-1")).credit == Decimal(4)
+    assert len(calls) == 2
+    assert credits.get_credit_by_user_id("u1").credit == Decimal(4)
+    assert get_logs(db, "u1") == [Decimal(4)]
+
+
+def test_queued_logs_are_flushed_and_retried(db, monkeypatch):
+    queue = CreditLogWriteQueue(flush_interval=60, flush_size=3)
+    monkeypatch.setattr(credits_module, "CreditLogQueue", queue)
+    credits = CreditsTable()
+
+    credits.add_credit_by_user_id(charge("u1", "-1"))
+    credits.add_credit_by_user_id(charge("u1", "-1"))
+    # Balances are committed at once, the log entries wait for the flush
+    assert credits.get_credit_by_user_id("u1").credit == Decimal(8)
+    assert get_logs(db, "u1") == []
+
+    add_logs = credits_module.CreditUsage.add_logs
+
+    def fail(session, logs):
+        raise RuntimeError("database is locked")
+
+    monkeypatch.setattr(credits_module.CreditUsage, "add_logs", fail)
+    credits.add_credit_by_user_id(charge("u1", "-1"))
+    # The failed batch is rolled back and kept for the next flush
+    assert queue.stats["flush_errors"] == 1
+    assert get_logs(db, "u1") == []
+
+    monkeypatch.setattr(credits_module.CreditUsage, "add_logs", add_logs)
+    assert queue.flush()
+    assert get_logs(db, "u1") == [Decimal(9), Decimal(8), Decimal(7)]
+    assert queue.stats["written"] == 3
+    assert queue.flush() and queue.stats["flushes"] == 1
+
+    with db() as session:
+        assert session.query(CreditUsageDaily.request_count).scalar() == 3
@@ -0,0 +1,151 @@
+import json
+from types import SimpleNamespace
+
+import pytest
+
+from open_webui.models.models import Models
+from open_webui.utils.credit import usage as usage_module
+from open_webui.utils.credit.usage import CreditDeduct
+from open_webui.utils.credit.utils import ModelPrices, credit_reservation
+
+
+class WordEncoder:
+    def __init__(self):
+        self.calls = []
+
+    def encode(self, text):
+        self.calls.append(text)
+        return text.split()
+
+
+@pytest.fixture
+def encoder(monkeypatch):
+    encoder = WordEncoder()
+    monkeypatch.setattr(Models, "get_model_by_id", lambda id: None)
+    ModelPrices.invalidate()
+    monkeypatch.setattr(
+        usage_module.calculator, "get_encoder", lambda *args, **kwargs: encoder
+    )
+    return encoder
+
+
+def get_credit_deduct():
+    return CreditDeduct(
+        user=SimpleNamespace(id="user", name="user"),
+        model_id="gpt-4o",
+        body={"messages": [{"role": "user", "content": "tell me a story"}]},
+        is_stream=True,
+    )
+
+
+def chunk(content=None, usage=None):
+    data = {"id": "chatcmpl-1", "choices": []}
+    if content is not None:
+        data["choices"] = [{"delta": {"content": content}}]
+    if usage is not None:
+        data["usage"] = usage
+    return f"data: {json.dumps(data)}\n\n".encode()
+
+
+def test_stream_text_is_encoded_once(encoder):
+    credit_deduct = get_credit_deduct()
+    for content in ["once upon", " a time", " there was"]:
+        credit_deduct.run(chunk(content))
+    credit_deduct.run(b"data: [DONE]\n\n")
+
+    assert encoder.calls == []
+    usage = credit_deduct.usage_with_cost
+    assert usage["prompt_tokens"] == 4
+    assert usage["completion_tokens"] == 6
+    assert usage["total_tokens"] == 10
+    assert encoder.calls == ["once upon a time there was", "tell me a story"]
+    assert credit_deduct.remote_id == "chatcmpl-1"
+
+    # Reading the usage again does not count the text twice
+    assert credit_deduct.usage_with_cost["completion_tokens"] == 6
+
+
+def test_provider_usage_skips_encoding(encoder):
+    credit_deduct = get_credit_deduct()
+    credit_deduct.run(chunk("hello"))
+    credit_deduct.run(chunk(usage={"prompt_tokens": 7, "completion_tokens": 3}))
+    credit_deduct.run(chunk(" ignored"))
+
+    usage = credit_deduct.usage_with_cost
+    assert encoder.calls == []
+    assert usage["cost_detail"]["is_calculate"] is False
+    assert (usage["prompt_tokens"], usage["completion_tokens"]) == (7, 3)
+
+
+def test_large_streams_are_counted_at_intervals(encoder, monkeypatch):
+    monkeypatch.setattr(CreditDeduct, "STREAM_FLUSH_CHARS", 10)
+    credit_deduct = get_credit_deduct()
+    for _ in range(4):
+        credit_deduct.run(chunk("one two "))
+
+    assert encoder.calls == ["one two one two ", "one two one two "]
+    assert credit_deduct.usage_with_cost["completion_tokens"] == 8
+
+
+def test_think_tag_is_stripped_from_the_start_only(encoder, monkeypatch):
+    monkeypatch.setattr(CreditDeduct, "STREAM_FLUSH_CHARS", 10)
+    credit_deduct = get_credit_deduct()
+    credit_deduct.run(chunk("<think>so ok "))
+    credit_deduct.run(chunk("think again"))
+    credit_deduct.flush_stream_text()
+
+    assert encoder.calls == ["so ok ", "think again"]
+
+
+def test_custom_fees_are_compiled_once(encoder, monkeypatch):
+    config = json.dumps(
+        [
+            {
+                "name": "search",
+                "path": "$.web_search",
+                "value": True,
+                "exists": False,
+                "cost": 5,
+            },
+            {
+                "name": "tools",
+                "path": "$.tools",
+                "value": None,
+                "exists": True,
+                "cost": 2,
+            },
+            {"name": "broken", "path": "$[", "value": None, "exists": True, "cost": 1},
+        ]
+    )
+    monkeypatch.setattr(usage_module.USAGE_CUSTOM_PRICE_CONFIG, "value", config)
+    usage_module.compile_custom_fees.cache_clear()
+
+    credit_deduct = get_credit_deduct()
+    assert credit_deduct.custom_fees == {}
+    credit_deduct.body = {"web_search": True, "tools": []}
+    assert credit_deduct.build_custom_fees(credit_deduct.body) == {
+        "search": 5,
+        "tools": 2,
+    }
+    assert usage_module.compile_custom_fees.cache_info().misses == 1
+
+
+def test_holds_are_settled_without_metadata(encoder, monkeypatch):
+    settled = []
+    monkeypatch.setattr(
+        usage_module.CreditBalances,
+        "settle",
+        lambda user_id, reservation_id: settled.append(reservation_id),
+    )
+    monkeypatch.setattr(
+        usage_module.Credits, "add_credit_by_user_id", lambda form_data: None
+    )
+
+    token = credit_reservation.set("hold")
+    try:
+        # e.g. the Ollama router popped the metadata off the body
+        with get_credit_deduct() as credit_deduct:
+            credit_deduct.run(chunk("Once upon a time"))
+    finally:
+        credit_reservation.reset(token)
+    assert settled == ["hold"]
@@ -0,0 +1,181 @@
+import random
+from contextlib import contextmanager
+from decimal import Decimal
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+import open_webui.models.credits as credits_module
+from open_webui.models.credits import (
+    USAGE_COLUMNS,
+    CreditLog,
+    CreditLogModel,
+    CreditUsageDaily,
+    CreditUsageHourly,
+    CreditUsageTable,
+    get_credit_log_usage,
+    split_usage_range,
+)
+
+HOUR = 3600
+DAY = 86400
+
+
+def test_split_short_range_reads_logs():
+    assert split_usage_range(100, 200) == [(CreditLog, 100, 200)]
+    assert split_usage_range(200, 100) == []
+
+
+def test_split_range_into_days_and_hours():
+    start = 2 * DAY - 2 * HOUR - 10
+    end = 5 * DAY + 3 * HOUR + 20
+    assert split_usage_range(start, end) == [
+        (CreditLog, start, 2 * DAY - 2 * HOUR),
+        (CreditUsageHourly, 2 * DAY - 2 * HOUR, 2 * DAY),
+        (CreditUsageDaily, 2 * DAY, 5 * DAY),
+        (CreditUsageHourly, 5 * DAY, 5 * DAY + 3 * HOUR),
+        (CreditLog, 5 * DAY + 3 * HOUR, end),
+    ]
+
+
+def test_split_aligned_range_within_a_day():
+    assert split_usage_range(DAY + HOUR, DAY + 4 * HOUR) == [
+        (CreditUsageHourly, DAY + HOUR, DAY + 4 * HOUR)
+    ]
+
+
+def test_credit_log_usage():
+    detail = {
+        "api_params": {"model": {"id": "gpt-4o"}},
+        "usage": {"total_price": 0.5, "prompt_tokens": 3, "total_tokens": 5},
+    }
+    assert get_credit_log_usage(detail) == ("gpt-4o", 3, 0, 5, Decimal("0.5"))
+
+    # Top-ups and balance changes by admins are not requests
+    assert get_credit_log_usage({"desc": "redemption code received"}) is None
+    assert get_credit_log_usage({"usage": {"total_price": 1}}) is None
+
+
+@pytest.fixture
+def db(tmp_path, monkeypatch):
+    engine = create_engine(f"sqlite:///{tmp_path / 'webui.db'}")
+    for table in (CreditLog, CreditUsageHourly, CreditUsageDaily):
+        table.__table__.create(engine)
+    session_factory = sessionmaker(bind=engine, expire_on_commit=False)
+
+    @contextmanager
+    def get_db():
+        with session_factory() as session:
+            yield session
+
+    monkeypatch.setattr(credits_module, "get_db", get_db)
+    get_db.engine = engine
+    yield get_db
+    engine.dispose()
+
+
+def build_logs(count, start, end, seed=0):
+    rng = random.Random(seed)
+    logs = []
+    for _ in range(count):
+        detail = {"desc": "top-up"}
+        if rng.random() < 0.9:
+            detail = {
+                "api_params": {"model": {"id": rng.choice(["gpt-4o", "o3"])}},
+                "usage": {
+                    "total_price": rng.randint(1, 100) / 1000,
+                    "prompt_tokens": rng.randint(1, 500),
+                    "completion_tokens": rng.randint(1, 500),
+                    "total_tokens": rng.randint(1, 1000),
+                },
+            }
+        logs.append(
+            CreditLogModel(
+                user_id=rng.choice(["u1", "u2"]),
+                credit=Decimal(0),
+                detail=detail,
+                created_at=rng.randrange(start, end),
+            )
+        )
+    return logs
+
+
+def add_logs(db, usage, logs):
+    with db() as session:
+        session.bulk_insert_mappings(
+            CreditLog, [log_model.model_dump() for log_model in logs]
+        )
+        usage.add_logs(session, logs)
+        session.commit()
+
+
+def sum_logs(logs, start, end, user_ids=None):
+    totals = {}
+    for log_model in logs:
+        if not start <= log_model.created_at < end:
+            continue
+        if user_ids and log_model.user_id not in user_ids:
+            continue
+        usage = get_credit_log_usage(log_model.detail)
+        if usage is None:
+            continue
+        total = totals.setdefault(
+            (log_model.user_id, usage[0]), [0, 0, 0, Decimal(0), 0]
+        )
+        for i, value in enumerate([*usage[1:], 1]):
+            total[i] += value
+    return totals
+
+
+def get_totals(usage, start, end, user_ids=None):
+    return {
+        (row.user_id, row.model_id): [getattr(row, c) for c in USAGE_COLUMNS]
+        for row in usage.get_usage_by_time(start, end, user_ids)
+    }
+
+
+def test_usage_matches_the_logs_across_rollup_boundaries(db):
+    usage = CreditUsageTable()
+    logs = build_logs(400, DAY - 5 * HOUR, 4 * DAY + 5 * HOUR)
+    # Written in batches, so that the rollup rows are updated in place
+    for i in range(0, len(logs), 50):
+        add_logs(db, usage, logs[i : i + 50])
+
+    ranges = [
+        (DAY - 5 * HOUR, 4 * DAY + 5 * HOUR),
+        (DAY - 2 * HOUR - 17, 3 * DAY + 3 * HOUR + 29),
+        (2 * DAY + HOUR, 2 * DAY + 7 * HOUR),
+        (2 * DAY + 100, 2 * DAY + 200),
+    ]
+    for start, end in ranges:
+        assert get_totals(usage, start, end) == sum_logs(logs, start, end)
+    assert get_totals(usage, *ranges[1], ["u2"]) == sum_logs(logs, *ranges[1], ["u2"])
+
+    with db() as session:
+        assert session.query(CreditUsageDaily).count() <= 5 * 2 * 2
+
+
+def test_upsert_without_on_conflict(db, monkeypatch):
+    usage = CreditUsageTable()
+    monkeypatch.setattr(db.engine.dialect, "name", "mysql")
+    logs = build_logs(60, DAY, DAY + 2 * HOUR)
+    add_logs(db, usage, logs[:30])
+    add_logs(db, usage, logs[30:])
+
+    assert get_totals(usage, DAY, 2 * DAY) == sum_logs(logs, DAY, 2 * DAY)
+
+
+def test_rebuild(db):
+    usage = CreditUsageTable()
+    logs = build_logs(100, 0, 3 * DAY)
+    with db() as session:
+        session.bulk_insert_mappings(
+            CreditLog, [log_model.model_dump() for log_model in logs]
+        )
+        # Rows left from a previous aggregation are replaced
+        usage.add_logs(session, logs[:10])
+        session.commit()
+
+    assert usage.rebuild(batch_size=7) == 100
+    assert get_totals(usage, 0, 3 * DAY) == sum_logs(logs, 0, 3 * DAY)
@@ -0,0 +1,78 @@
+import pytest
+
+from open_webui.retrieval.embedding_cache import (
+    EmbeddingCache,
+    MemoryEmbeddingCache,
+    SQLiteEmbeddingCache,
+)
+
+
+class FakeProvider:
+    def __init__(self):
+        self.calls = []
+
+    async def __call__(self, texts):
+        self.calls.append(list(texts))
+        return [[float(len(text)), 0.5] for text in texts]
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def backend(request, tmp_path):
+    if request.param == "memory":
+        return MemoryEmbeddingCache(max_size=10_000)
+    return SQLiteEmbeddingCache(str(tmp_path / "embeddings.db"), max_size=10_000)
+
+
+@pytest.mark.asyncio
+async def test_only_misses_are_embedded(backend):
+    cache = EmbeddingCache(backend)
+    provider = FakeProvider()
+
+    first = await cache.embed(["a", "bb", "a"], "openai", "m", None, provider)
+    second = await cache.embed(["bb", "ccc", "a"], "openai", "m", None, provider)
+
+    assert first == [[1.0, 0.5], [2.0, 0.5], [1.0, 0.5]]
+    assert second == [[2.0, 0.5], [3.0, 0.5], [1.0, 0.5]]
+    assert provider.calls == [["a", "bb"], ["ccc"]]
+    assert cache.get_stats() == {"hits": 3, "misses": 3, "evictions": 0}
+
+    # Engine, model and prefix are part of the key
+    await cache.embed(["a"], "openai", "other", None, provider)
+    await cache.embed(["a"], "openai", "m", "query: ", provider)
+    assert provider.calls[-2:] == [["a"], ["a"]]
+
+
+@pytest.mark.asyncio
+async def test_failed_provider_results_are_not_cached(backend):
+    cache = EmbeddingCache(backend)
+
+    async def failing(texts):
+        return []
+
+    assert await cache.embed(["a"], "openai", "m", None, failing) == []
+
+    provider = FakeProvider()
+    assert await cache.embed(["a"], "openai", "m", None, provider) == [[1.0, 0.5]]
+    assert provider.calls == [["a"]]
+
+
+@pytest.mark.asyncio
+async def test_size_based_eviction(tmp_path):
+    # Every vector of two floats takes 16 bytes
+    for backend in [
+        MemoryEmbeddingCache(max_size=64),
+        SQLiteEmbeddingCache(str(tmp_path / "embeddings.db"), max_size=64),
+    ]:
+        cache = EmbeddingCache(backend)
+        provider = FakeProvider()
+        for text in ["a", "b", "c", "d"]:
+            await cache.embed([text], "openai", "m", None, provider)
+        # Touch "a" so that "b" is the least recently used entry
+        await cache.embed(["a"], "openai", "m", None, provider)
+        await cache.embed(["e"], "openai", "m", None, provider)
+
+        assert backend.evictions >= 1
+        await cache.embed(["a"], "openai", "m", None, provider)
+        await cache.embed(["b"], "openai", "m", None, provider)
+        assert provider.calls[-1] == ["b"]
+        assert ["a"] not in provider.calls[4:]
@@ -0,0 +1,87 @@
+import asyncio
+import time
+
+import pytest
+
+from open_webui.retrieval.embedding_scheduler import (
+    EmbeddingRateLimitError,
+    EmbeddingScheduler,
+    pack_batches,
+    parse_retry_after,
+)
+
+
+def test_pack_batches_by_items_and_tokens():
+    texts = ["a" * 40, "b" * 40, "c" * 400, "d" * 4, "e" * 4, "f" * 4]
+
+    assert [len(batch) for batch in pack_batches(texts, 4)] == [4, 2]
+    # 11 estimated tokens for the short texts, 101 for the long one
+    assert [len(batch) for batch in pack_batches(texts, 4, max_tokens=30)] == [
+        2,
+        1,
+        3,
+    ]
+    assert sum(pack_batches(texts, 2, max_tokens=30), []) == texts
+
+
+def test_parse_retry_after():
+    assert parse_retry_after("2.5") == 2.5
+    assert parse_retry_after(None) is None
+    assert parse_retry_after("soon") is None
+    # Dates in the past mean no wait
+    assert parse_retry_after("Wed, 21 Oct 2015 07:28:00 GMT") == 0
+
+
+@pytest.mark.asyncio
+async def test_concurrency_limit_per_provider():
+    scheduler = EmbeddingScheduler(concurrency=2)
+    in_flight = {"openai": 0, "ollama": 0}
+    peak = {"openai": 0, "ollama": 0}
+
+    def send(engine):
+        async def embed(batch):
+            in_flight[engine] += 1
+            peak[engine] = max(peak[engine], in_flight[engine])
+            await asyncio.sleep(0.01)
+            in_flight[engine] -= 1
+            return [[1.0] for _ in batch]
+
+        return embed
+
+    batches = [[str(i)] for i in range(8)]
+    results = await asyncio.gather(
+        scheduler.run(("openai", "a"), batches, send("openai")),
+        scheduler.run(("ollama", "b"), batches, send("ollama")),
+    )
+
+    assert results[0] == [[[1.0]]] * 8
+    assert peak == {"openai": 2, "ollama": 2}
+    stats = scheduler.get_stats()[("openai", "a")]
+    assert stats["chunks"] == 8 and stats["requests"] == 8
+    assert stats["chunks_per_second"] > 0
+
+
+@pytest.mark.asyncio
+async def test_rate_limited_requests_wait_for_retry_after():
+    scheduler = EmbeddingScheduler(concurrency=4, max_retries=2)
+    calls = []
+
+    async def embed(batch):
+        calls.append(time.monotonic())
+        if len(calls) == 1:
+            raise EmbeddingRateLimitError(retry_after=0.2)
+        return [[0.0] for _ in batch]
+
+    start = time.monotonic()
+    assert await scheduler.run(("openai", "a"), [["x"], ["y"]], embed) == [
+        [[0.0]],
+        [[0.0]],
+    ]
+    assert time.monotonic() - start >= 0.2
+    assert scheduler.get_totals()["rate_limited"] == 1
+
+    async def always_limited(batch):
+        raise EmbeddingRateLimitError(retry_after=0)
+
+    assert await scheduler.call(("openai", "a"), lambda: always_limited([]), []) is None
+    assert scheduler.get_totals()["retries"] == 3
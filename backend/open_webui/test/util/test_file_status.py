@@ -0,0 +1,98 @@
+import asyncio
+import json
+
+import pytest
+
+import open_webui.utils.file_status as file_status
+from open_webui.utils.file_status import FILE_STATUS_CHANNEL, FileStatusBus
+
+
+@pytest.mark.asyncio
+async def test_events_are_pushed_to_subscribers():
+    bus = FileStatusBus()
+    assert bus.start() is None
+
+    async with bus.subscribe("file") as events, bus.subscribe("other") as others:
+        # Files are processed in the threadpool
+        await asyncio.to_thread(bus.publish, "file", "failed", "no text")
+        event = await asyncio.wait_for(events.get(), timeout=1)
+        assert event == {"status": "failed", "error": "no text"}
+        assert others.empty()
+
+    assert bus._subscribers == {}
+
+
+@pytest.mark.asyncio
+async def test_events_are_relayed_through_redis():
+    published = []
+
+    class FakeRedis:
+        async def publish(self, channel, message):
+            published.append((channel, message))
+
+    bus = FileStatusBus()
+    bus._loop = asyncio.get_running_loop()
+    bus._redis = FakeRedis()
+
+    async with bus.subscribe("file") as events:
+        bus.publish("file", "completed")
+        await asyncio.sleep(0.05)
+        # Delivered once the listener receives it back from Redis
+        assert events.empty()
+        channel, message = published[0]
+        assert channel == FILE_STATUS_CHANNEL
+        payload = json.loads(message)
+        bus._deliver(payload["file_id"], payload["event"])
+        assert events.get_nowait() == {"status": "completed"}
+
+
+def test_publish_before_start_is_ignored():
+    bus = FileStatusBus()
+    bus.publish("file", "completed")
+    assert bus.stats["published"] == 0
+
+
+@pytest.mark.asyncio
+async def test_listener_reconnects(monkeypatch, caplog):
+    monkeypatch.setattr(file_status, "FILE_STATUS_RECONNECT_DELAY", 0)
+    connected = asyncio.Event()
+
+    class FakePubSub:
+        def __init__(self, attempt):
+            self.attempt = attempt
+
+        async def subscribe(self, channel):
+            if self.attempt == 0:
+                raise ConnectionError("Connection refused")
+
+        async def listen(self):
+            if self.attempt == 1:
+                raise ConnectionError("Connection reset by peer")
+                yield
+            yield {"type": "subscribe", "data": 1}
+            yield {
+                "type": "message",
+                "data": json.dumps({"file_id": "file", "event": {"status": "ok"}}),
+            }
+            connected.set()
+            await asyncio.Event().wait()
+
+        async def aclose(self):
+            pass
+
+    class FakeRedis:
+        attempts = 0
+
+        def pubsub(self):
+            self.attempts += 1
+            return FakePubSub(self.attempts - 1)
+
+    bus = FileStatusBus()
+    async with bus.subscribe("file") as events:
+        task = bus.start(FakeRedis())
+        await asyncio.wait_for(connected.wait(), timeout=1)
+        assert events.get_nowait() == {"status": "ok"}
+        task.cancel()
+
+    assert "Connection refused" in caplog.text
+    assert "Connection reset by peer" in caplog.text
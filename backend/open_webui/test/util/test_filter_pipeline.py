@@ -0,0 +1,84 @@
+from types import SimpleNamespace
+
+import pytest
+from pydantic import BaseModel
+
+import open_webui.utils.filter as filter_utils
+from open_webui.utils.filter import FilterPipelineCache, process_filter_functions
+
+
+class Filter:
+    class Valves(BaseModel):
+        priority: int = 0
+        suffix: str = ""
+
+    class UserValves(BaseModel):
+        name: str = ""
+
+    def __init__(self):
+        self.valves = self.Valves()
+
+    def stream(self, event, __user__):
+        event["text"] += f"{self.valves.suffix}{__user__['valves'].name}"
+        return event
+
+
+class FakeFunctions:
+    version = 0
+
+    def __init__(self):
+        self.queries = 0
+        self.valves = {"first": {"priority": 1, "suffix": "a"}, "second": {}}
+
+    def get_functions(self, active_only=False, include_valves=False):
+        self.queries += 1
+        return [
+            SimpleNamespace(id=id, type="filter", is_global=True, valves=valves)
+            for id, valves in self.valves.items()
+        ]
+
+    def get_user_valves_by_id_and_user_id(self, id, user_id):
+        self.queries += 1
+        return {"name": user_id}
+
+
+@pytest.fixture
+def functions(monkeypatch):
+    functions = FakeFunctions()
+    monkeypatch.setattr(filter_utils, "Functions", functions)
+    monkeypatch.setattr(
+        filter_utils, "get_function_module", lambda request, id: Filter()
+    )
+    pipelines = FilterPipelineCache(ttl=60)
+    monkeypatch.setattr(filter_utils, "FilterPipelines", pipelines)
+    return functions
+
+
+@pytest.mark.asyncio
+async def test_stream_chunks_make_no_queries(functions):
+    user = SimpleNamespace(id="u1")
+    filters = filter_utils.get_filter_functions(None, {}, [], user)
+    assert [filter.id for filter in filters] == ["second", "first"]
+    queries = functions.queries
+
+    for _ in range(3):
+        event, _ = await process_filter_functions(
+            None, filters, "stream", {"text": ""}, {"__user__": {"id": "u1"}}
+        )
+        assert event == {"text": "u1au1"}
+    assert functions.queries == queries
+
+    # Resolving the pipeline again for the next request is cached too
+    filter_utils.get_filter_functions(None, {}, [], user)
+    assert functions.queries == queries
+
+
+def test_pipeline_is_recompiled_on_change(functions):
+    filters = filter_utils.get_filter_functions(None, {}, [])
+    assert filters[1].valves.suffix == "a"
+
+    functions.valves["first"] = {"priority": 1, "suffix": "b"}
+    functions.version += 1
+
+    filters = filter_utils.get_filter_functions(None, {}, [])
+    assert filters[1].valves.suffix == "b"
@@ -0,0 +1,72 @@
+import socket
+import threading
+import time
+
+import pytest
+import uvicorn
+from mcp.server.fastmcp import FastMCP
+
+from open_webui.utils.mcp.pool import MCPSessionPool
+
+
+@pytest.fixture(scope="module")
+def server_url():
+    mcp = FastMCP("test")
+
+    @mcp.tool()
+    def add(a: int, b: int) -> int:
+        return a + b
+
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+
+    server = uvicorn.Server(
+        uvicorn.Config(
+            mcp.streamable_http_app(), host="127.0.0.1", port=port, log_level="error"
+        )
+    )
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    while not server.started:
+        time.sleep(0.05)
+    yield f"http://127.0.0.1:{port}/mcp"
+    server.should_exit = True
+    thread.join()
+
+
+@pytest.mark.asyncio
+async def test_sessions_are_reused(server_url):
+    pool = MCPSessionPool()
+    try:
+        client = await pool.get("server", server_url)
+        specs = await client.list_tool_specs()
+        assert [spec["name"] for spec in specs] == ["add"]
+        await client.disconnect()
+
+        # The next request reuses the session and its tool list
+        assert await pool.get("server", server_url) is client
+        assert await client.list_tool_specs() is specs
+        result = await client.call_tool("add", {"a": 1, "b": 2})
+        assert result[0]["text"] == "3"
+        assert pool.stats["connects"] == 1
+
+        # Other credentials get their own session
+        other = await pool.get("server", server_url, {"Authorization": "Bearer x"})
+        assert other is not client
+    finally:
+        await pool.close()
+
+
+@pytest.mark.asyncio
+async def test_lost_sessions_reconnect(server_url):
+    pool = MCPSessionPool()
+    try:
+        client = await pool.get("server", server_url)
+        await client.close()
+
+        result = await client.call_tool("add", {"a": 2, "b": 2})
+        assert result[0]["text"] == "4"
+        assert pool.stats["connects"] == 2
+    finally:
+        await pool.close()
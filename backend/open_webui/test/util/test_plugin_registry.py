@@ -0,0 +1,78 @@
+from types import SimpleNamespace
+
+import pytest
+
+import open_webui.utils.plugin as plugin
+
+
+class FakeFunctions:
+    def __init__(self):
+        self.function = SimpleNamespace(content="v1", updated_at=100)
+        self.content_loads = 0
+
+    def get_function_updated_at_by_id(self, id):
+        return self.function.updated_at
+
+    def get_function_by_id(self, id):
+        self.content_loads += 1
+        return self.function
+
+    def update(self, **fields):
+        self.function = SimpleNamespace(**{**vars(self.function), **fields})
+
+
+@pytest.fixture
+def functions(monkeypatch):
+    functions = FakeFunctions()
+    loads = []
+
+    def load_function_module_by_id(function_id, content=None):
+        loads.append(content)
+        return SimpleNamespace(content=content), "filter", {}
+
+    monkeypatch.setattr(plugin, "Functions", functions)
+    monkeypatch.setattr(
+        plugin, "load_function_module_by_id", load_function_module_by_id
+    )
+    monkeypatch.setattr(plugin.time, "time", lambda: 200)
+    functions.loads = loads
+    return functions
+
+
+def get_module(request):
+    module, _, _ = plugin.get_function_module_from_cache(request, "f")
+    return module
+
+
+def test_module_is_loaded_once_per_version(functions):
+    request = SimpleNamespace(app=SimpleNamespace(state=SimpleNamespace()))
+
+    assert get_module(request).content == "v1"
+    assert get_module(request).content == "v1"
+    assert functions.loads == ["v1"]
+    assert functions.content_loads == 1
+
+    # Valves updates change the version, not the content
+    functions.update(updated_at=150)
+    assert get_module(request).content == "v1"
+    assert functions.loads == ["v1"]
+
+    functions.update(updated_at=160, content="v2")
+    assert get_module(request).content == "v2"
+    assert functions.loads == ["v1", "v2"]
+
+
+def test_updates_within_a_second_are_detected(functions, monkeypatch):
+    request = SimpleNamespace(app=SimpleNamespace(state=SimpleNamespace()))
+    functions.update(updated_at=200)
+
+    assert get_module(request).content == "v1"
+    # Loaded in the same second as the update: the content is checked again
+    functions.update(content="v2")
+    assert get_module(request).content == "v2"
+
+    monkeypatch.setattr(plugin.time, "time", lambda: 201)
+    get_module(request)
+    content_loads = functions.content_loads
+    get_module(request)
+    assert functions.content_loads == content_loads
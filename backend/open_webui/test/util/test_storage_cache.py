@@ -0,0 +1,93 @@
+import os
+import threading
+import time
+
+import pytest
+
+from open_webui.storage.cache import StorageCache
+from open_webui.storage.provider import read_file_range, resolve_range
+
+
+def writer(data: bytes, calls: list, delay: float = 0):
+    def download(path):
+        calls.append(path)
+        time.sleep(delay)
+        with open(path, "wb") as f:
+            f.write(data)
+
+    return download
+
+
+def test_hit_after_download(tmp_path):
+    cache = StorageCache(str(tmp_path), 1024)
+    calls = []
+    path = cache.get("uploads/a.pdf", '"v1"', writer(b"abc", calls))
+    assert path.endswith(".pdf") and open(path, "rb").read() == b"abc"
+    assert cache.get("uploads/a.pdf", '"v1"', writer(b"abc", calls)) == path
+    assert len(calls) == 1
+    assert cache.stats["hits"] == 1 and cache.stats["misses"] == 1
+
+    # A new version replaces the old copy
+    new_path = cache.get("uploads/a.pdf", '"v2"', writer(b"abcd", calls))
+    assert new_path != path and not os.path.exists(path)
+    assert cache.size == 4
+
+
+def test_concurrent_reads_download_once(tmp_path):
+    cache = StorageCache(str(tmp_path), 1024)
+    calls, paths = [], []
+    download = writer(b"x" * 100, calls, delay=0.1)
+
+    threads = [
+        threading.Thread(target=lambda: paths.append(cache.get("k", "e", download)))
+        for _ in range(8)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(calls) == 1 and len(set(paths)) == 1
+
+
+def test_failed_download_leaves_nothing(tmp_path):
+    cache = StorageCache(str(tmp_path), 1024)
+
+    def fail(path):
+        raise RuntimeError("unavailable")
+
+    with pytest.raises(RuntimeError):
+        cache.get("k", "e", fail)
+    assert os.listdir(tmp_path) == [] and cache.get_cached("k", "e") is None
+
+
+def test_least_recently_used_are_evicted(tmp_path):
+    cache = StorageCache(str(tmp_path), 250)
+    calls = []
+    a = cache.get("a", "e", writer(b"a" * 100, calls))
+    cache.get("b", "e", writer(b"b" * 100, calls))
+    assert cache.get_cached("a", "e") == a
+    cache.get("c", "e", writer(b"c" * 100, calls))
+
+    assert cache.get_cached("b", "e") is None
+    assert cache.get_cached("a", "e") and cache.get_cached("c", "e")
+    assert cache.size == 200 and cache.stats["evictions"] == 1
+
+    # Files are found again after a restart, and invalidated by key
+    restarted = StorageCache(str(tmp_path), 250)
+    assert restarted.size == 200
+    restarted.invalidate("a")
+    assert restarted.get_cached("a", "e") is None and len(os.listdir(tmp_path)) == 1
+
+
+def test_resolve_range(tmp_path):
+    assert resolve_range(0, None, 10) == (0, 9)
+    assert resolve_range(2, 4, 10) == (2, 4)
+    assert resolve_range(5, 100, 10) == (5, 9)
+    assert resolve_range(None, 3, 10) == (7, 9)
+    assert resolve_range(None, 30, 10) == (0, 9)
+    assert resolve_range(10, None, 10) is None
+    assert resolve_range(4, 2, 10) is None
+
+    path = tmp_path / "file"
+    path.write_bytes(bytes(range(10)))
+    assert b"".join(read_file_range(str(path), 2, 4)) == bytes([2, 3, 4])
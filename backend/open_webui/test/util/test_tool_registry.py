@@ -0,0 +1,122 @@
+from types import SimpleNamespace
+
+import pytest
+from pydantic import BaseModel
+
+import open_webui.utils.tools as tools_utils
+from open_webui.utils.tools import ToolRegistryCache, get_tools
+
+
+class Tools:
+    class Valves(BaseModel):
+        unit: str = "m"
+
+    class UserValves(BaseModel):
+        name: str = ""
+
+    def __init__(self):
+        self.valves = self.Valves()
+
+    def measure(self, value: int, __user__: dict) -> str:
+        """
+        Measure a value.
+        :param value: The value.
+        """
+        return f"{value}{self.valves.unit} for {__user__['valves'].name}"
+
+
+SPECS = [
+    {
+        "name": "measure",
+        "parameters": {
+            "type": "object",
+            "properties": {"value": {"type": "str"}, "__user__": {}},
+        },
+    }
+]
+
+
+class FakeTools:
+    version = 0
+
+    def __init__(self):
+        self.queries = []
+        self.updated_at = 100
+
+    def get_tools_by_ids(self, ids):
+        self.queries.append("get_tools_by_ids")
+        return [
+            SimpleNamespace(
+                id=id, user_id="u1", access_control=None, updated_at=self.updated_at
+            )
+            for id in ids
+            if id.startswith("tool")
+        ]
+
+    def get_tool_by_id(self, id):
+        self.queries.append("get_tool_by_id")
+        return SimpleNamespace(id=id, updated_at=self.updated_at, specs=SPECS)
+
+    def get_tool_valves_by_id(self, id):
+        self.queries.append("get_tool_valves_by_id")
+        return {"unit": "cm"}
+
+    def get_user_valves_by_id_and_user_id(self, id, user_id):
+        self.queries.append("get_user_valves_by_id_and_user_id")
+        return {"name": user_id}
+
+
+@pytest.fixture
+def tools(monkeypatch):
+    tools = FakeTools()
+    monkeypatch.setattr(tools_utils, "Tools", tools)
+    monkeypatch.setattr(
+        tools_utils.Groups, "get_groups_by_member_id", lambda user_id: []
+    )
+    monkeypatch.setattr(
+        tools_utils,
+        "get_tool_module_from_cache",
+        lambda request, id, updated_at=None: (Tools(), None),
+    )
+    monkeypatch.setattr(tools_utils, "ToolRegistry", ToolRegistryCache(ttl=60))
+    monkeypatch.setattr(tools_utils.time, "time", lambda: 200)
+    return tools
+
+
+async def load(tool_ids):
+    user = SimpleNamespace(id="u1", role="user")
+    return await get_tools(None, tool_ids, user, {"__user__": {"id": "u1"}})
+
+
+@pytest.mark.asyncio
+async def test_tools_are_compiled_once_per_version(tools):
+    tools_dict = await load(["tool_a", "tool_b"])
+    spec = tools_dict["measure"]["spec"]
+    assert spec["parameters"]["properties"] == {"value": {"type": "string"}}
+    assert spec["description"].strip() == "Measure a value."
+    assert await tools_dict["measure"]["callable"](value=3) == "3cm for u1"
+    assert "tool_b_measure" in tools_dict
+
+    # The next turns only run the batched query
+    tools.queries.clear()
+    tools_dict = await load(["tool_a", "tool_b"])
+    assert tools.queries == ["get_tools_by_ids"]
+    assert await tools_dict["measure"]["callable"](value=3) == "3cm for u1"
+
+    tools.updated_at = 150
+    tools.queries.clear()
+    await load(["tool_a"])
+    assert "get_tool_by_id" in tools.queries
+
+
+@pytest.mark.asyncio
+async def test_user_valves_are_dropped_on_change(tools):
+    await load(["tool_a"])
+    tools.queries.clear()
+
+    tools.version += 1
+    await load(["tool_a"])
+    assert tools.queries == [
+        "get_tools_by_ids",
+        "get_user_valves_by_id_and_user_id",
+    ]
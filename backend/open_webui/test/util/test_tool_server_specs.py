@@ -0,0 +1,130 @@
+import asyncio
+import time
+
+import pytest
+import pytest_asyncio
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+
+from open_webui.utils.tools import ToolServerSpecCache
+
+SPEC = {
+    "openapi": "3.1.0",
+    "info": {"title": "Server"},
+    "paths": {
+        "/add": {
+            "post": {
+                "operationId": "add",
+                "summary": "Add numbers",
+                "requestBody": {
+                    "content": {
+                        "application/json": {
+                            "schema": {"$ref": "#/components/schemas/Numbers"}
+                        }
+                    }
+                },
+            }
+        }
+    },
+    "components": {
+        "schemas": {
+            "Numbers": {
+                "type": "object",
+                "properties": {"a": {"type": "integer"}},
+                "required": ["a"],
+            }
+        }
+    },
+}
+
+
+@pytest_asyncio.fixture
+async def server():
+    requests = []
+
+    async def handler(request):
+        requests.append(request.headers.get("If-None-Match"))
+        await asyncio.sleep(0.05)
+        if request.headers.get("If-None-Match") == '"v1"':
+            return web.Response(status=304)
+        return web.json_response(SPEC, headers={"ETag": '"v1"'})
+
+    app = web.Application()
+    app.router.add_get("/openapi.json", handler)
+    server = TestServer(app)
+    await server.start_server()
+    server.requests = requests
+    yield server
+    await server.close()
+
+
+@pytest.mark.asyncio
+async def test_concurrent_requests_share_a_fetch(server):
+    cache = ToolServerSpecCache(ttl=60, stale_ttl=0)
+    url = str(server.make_url("/openapi.json"))
+
+    results = await asyncio.gather(*[cache.get(url) for _ in range(5)])
+    assert server.requests == [None]
+    openapi, specs = results[0]
+    assert all(result[0] is openapi for result in results)
+    assert specs[0]["name"] == "add"
+    assert specs[0]["parameters"]["properties"] == {"a": {"type": "integer"}}
+
+    # Other credentials fetch their own spec
+    await cache.get(url, {"Authorization": "Bearer x"})
+    assert len(server.requests) == 2
+
+
+@pytest.mark.asyncio
+async def test_expired_specs_are_revalidated(server):
+    cache = ToolServerSpecCache(ttl=0, stale_ttl=0)
+    url = str(server.make_url("/openapi.json"))
+
+    openapi, specs = await cache.get(url)
+    assert await cache.get(url) == (openapi, specs)
+    assert server.requests == [None, '"v1"']
+    assert cache.stats["unchanged"] == 1
+
+
+@pytest.mark.asyncio
+async def test_stale_specs_are_served_while_revalidating(server):
+    cache = ToolServerSpecCache(ttl=0, stale_ttl=60)
+    url = str(server.make_url("/openapi.json"))
+
+    openapi, _ = await cache.get(url)
+    # Returned at once, revalidated in the background
+    assert (await asyncio.wait_for(cache.get(url), 0.01))[0] is openapi
+    await asyncio.sleep(0.1)
+    assert server.requests == [None, '"v1"']
+
+
+@pytest.mark.asyncio
+async def test_callers_get_their_own_spec_list(server):
+    cache = ToolServerSpecCache(ttl=60, stale_ttl=0)
+    url = str(server.make_url("/openapi.json"))
+
+    _, specs = await cache.get(url)
+    specs.clear()
+    assert [spec["name"] for spec in (await cache.get(url))[1]] == ["add"]
+
+
+@pytest.mark.asyncio
+async def test_only_specs_in_use_are_refreshed(server):
+    cache = ToolServerSpecCache(ttl=60, stale_ttl=3600)
+    url = str(server.make_url("/openapi.json"))
+    await cache.get(url)
+    await cache.get(url, {"Authorization": "Bearer x"})
+    idle, used = cache._entries.values()
+
+    # Both expire soon, only one was used within the ttl
+    now = time.monotonic()
+    idle.used_at = idle.fetched_at = now - 120
+    used.fetched_at = now - 55
+    await cache.refresh_in_use(margin=10)
+    assert server.requests == [None, None, '"v1"']
+    assert len(cache._entries) == 2
+
+    # Unused for longer than the stale ttl
+    idle.used_at = now - 4000
+    await cache.refresh_in_use(margin=10)
+    assert list(cache._entries.values()) == [used]
@@ -0,0 +1,212 @@
+"""
+Write-behind buffer for messages that are saved while a response streams.
+
+With ENABLE_REALTIME_CHAT_SAVE every delta used to rewrite the whole chat
+JSON blob. Updates are now coalesced per (chat_id, message_id) and written in
+one `Chats.upsert_messages_to_chat_by_id` call per chat when the message has
+been dirty for REALTIME_CHAT_SAVE_FLUSH_INTERVAL seconds, when it has
+accumulated REALTIME_CHAT_SAVE_FLUSH_BYTES, or when the response ends.
+
+Pending updates are only dropped after they were written successfully; a
+failed flush keeps them (newer updates still win) for the next attempt.
+Everything still pending is flushed on application shutdown and at process
+exit.
+"""
+
+import asyncio
+import atexit
+import json
+import logging
+import threading
+import time
+from typing import Optional
+
+from open_webui.env import (
+    REALTIME_CHAT_SAVE_FLUSH_BYTES,
+    REALTIME_CHAT_SAVE_FLUSH_INTERVAL,
+)
+from open_webui.models.chats import Chats
+
+log = logging.getLogger(__name__)
+
+
+def _estimate_size(value) -> int:
+    if isinstance(value, str):
+        return len(value)
+    try:
+        return len(json.dumps(value, ensure_ascii=False, default=str))
+    except Exception:
+        return 0
+
+
+class _PendingMessage:
+    __slots__ = ("updates", "sizes", "dirty_bytes", "dirty_since")
+
+    def __init__(self):
+        self.updates: dict = {}
+        # Size of every field as last seen, used to measure growth between flushes
+        self.sizes: dict[str, int] = {}
+        self.dirty_bytes = 0
+        self.dirty_since: Optional[float] = None
+
+
+class ChatMessageWriteBuffer:
+    def __init__(self, flush_interval: float, flush_bytes: int):
+        self.flush_interval = flush_interval
+        self.flush_bytes = flush_bytes
+
+        self._lock = threading.Lock()
+        self._messages: dict[tuple[str, str], _PendingMessage] = {}
+
+        self.stats = {
+            "updates": 0,
+            "flushes": 0,
+            "flush_errors": 0,
+            "messages_written": 0,
+            "bytes_written": 0,
+        }
+
+    def upsert(self, chat_id: str, message_id: str, message: dict) -> None:
+        if self.flush_interval <= 0:
+            Chats.upsert_message_to_chat_by_id_and_message_id(
+                chat_id, message_id, message
+            )
+            self.stats["updates"] += 1
+            self.stats["flushes"] += 1
+            self.stats["messages_written"] += 1
+            self.stats["bytes_written"] += _estimate_size(message)
+            return
+
+        with self._lock:
+            pending = self._messages.setdefault(
+                (chat_id, message_id), _PendingMessage()
+            )
+            for key, value in message.items():
+                size = _estimate_size(value)
+                previous = pending.sizes.get(key)
+                # Growing fields (streamed content) only count what was added
+                pending.dirty_bytes += (
+                    size - previous
+                    if previous is not None and size >= previous
+                    else size
+                )
+                pending.sizes[key] = size
+            pending.updates.update(message)
+            if pending.dirty_since is None:
+                pending.dirty_since = time.monotonic()
+            self.stats["updates"] += 1
+
+            due = (
+                pending.dirty_bytes >= self.flush_bytes
+                or time.monotonic() - pending.dirty_since >= self.flush_interval
+            )
+
+        if due:
+            self.flush(chat_id)
+
+    def flush(self, chat_id: str, message_id: Optional[str] = None) -> bool:
+        """
+        Write the pending updates of a chat (or of a single message of it).
+        Returns False if the write failed and the updates were kept.
+        """
+        with self._lock:
+            batch = {}
+            for key, pending in self._messages.items():
+                pending_chat_id, pending_message_id = key
+                if pending_chat_id != chat_id or not pending.updates:
+                    continue
+                if message_id is not None and pending_message_id != message_id:
+                    continue
+
+                batch[pending_message_id] = (pending.updates, pending.dirty_bytes)
+                pending.updates = {}
+                pending.dirty_bytes = 0
+                pending.dirty_since = None
+
+        if not batch:
+            return True
+
+        try:
+            Chats.upsert_messages_to_chat_by_id(
+                chat_id,
+                {
+                    pending_message_id: updates
+                    for pending_message_id, (updates, _) in batch.items()
+                },
+            )
+        except Exception as e:
+            log.exception(f"Error flushing buffered messages of chat {chat_id}: {e}")
+            with self._lock:
+                self.stats["flush_errors"] += 1
+                for pending_message_id, (updates, dirty_bytes) in batch.items():
+                    pending = self._messages.setdefault(
+                        (chat_id, pending_message_id), _PendingMessage()
+                    )
+                    # Updates received while the write was in flight are newer
+                    pending.updates = {**updates, **pending.updates}
+                    pending.dirty_bytes += dirty_bytes
+                    if pending.dirty_since is None:
+                        pending.dirty_since = time.monotonic()
+            return False
+
+        with self._lock:
+            self.stats["flushes"] += 1
+            self.stats["messages_written"] += len(batch)
+            self.stats["bytes_written"] += sum(
+                _estimate_size(updates) for updates, _ in batch.values()
+            )
+        return True
+
+    def close(self, chat_id: str, message_id: str) -> bool:
+        """Final flush of a message once its response has ended."""
+        flushed = self.flush(chat_id, message_id)
+        if flushed:
+            with self._lock:
+                pending = self._messages.get((chat_id, message_id))
+                if pending is not None and not pending.updates:
+                    del self._messages[(chat_id, message_id)]
+        return flushed
+
+    def flush_due(self) -> None:
+        now = time.monotonic()
+        with self._lock:
+            chat_ids = {
+                chat_id
+                for (chat_id, _), pending in self._messages.items()
+                if pending.dirty_since is not None
+                and now - pending.dirty_since >= self.flush_interval
+            }
+
+        for chat_id in chat_ids:
+            self.flush(chat_id)
+
+    def flush_all(self) -> None:
+        with self._lock:
+            chat_ids = {
+                chat_id
+                for (chat_id, _), pending in self._messages.items()
+                if pending.updates
+            }
+
+        for chat_id in chat_ids:
+            self.flush(chat_id)
+
+    async def periodic_flush(self) -> None:
+        """Flush messages whose stream went quiet, e.g. while a tool runs."""
+        if self.flush_interval <= 0:
+            return
+
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            try:
+                self.flush_due()
+            except Exception as e:
+                log.exception(f"Error in periodic chat message flush: {e}")
+
+
+ChatMessageBuffer = ChatMessageWriteBuffer(
+    flush_interval=REALTIME_CHAT_SAVE_FLUSH_INTERVAL,
+    flush_bytes=REALTIME_CHAT_SAVE_FLUSH_BYTES,
+)
+
+atexit.register(ChatMessageBuffer.flush_all)
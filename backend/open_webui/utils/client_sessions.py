@@ -0,0 +1,123 @@
+"""
+Shared aiohttp client sessions for upstream model providers.
+
+Opening a session per request meant a new TCP and TLS handshake to the same
+provider for every chat completion, and again for every compatibility
+retry. ClientSessions keeps one session per origin (scheme, host and port)
+with keep-alive connections and cached DNS lookups, shared by the openai,
+ollama and gemini routers.
+
+`ClientSessions.get(url, timeout)` returns a handle with the interface of a
+session used by the routers (`request`, `get`, `post`, `async with`,
+`close`). Closing the handle leaves the shared session open; the sessions
+are closed when the app shuts down.
+
+Connections per origin are not limited unless AIOHTTP_CLIENT_POOL_SIZE is
+set, as every streamed chat holds its connection until the stream ends.
+With a limit, requests beyond it queue for a free connection and the wait
+counts against their timeout.
+"""
+
+import asyncio
+import logging
+from typing import Optional
+
+import aiohttp
+from yarl import URL
+
+from open_webui.env import (
+    AIOHTTP_CLIENT_DNS_CACHE_TTL,
+    AIOHTTP_CLIENT_KEEPALIVE_TIMEOUT,
+    AIOHTTP_CLIENT_POOL_SIZE,
+)
+
+log = logging.getLogger(__name__)
+
+
+class PooledClientSession:
+    def __init__(
+        self, session: aiohttp.ClientSession, timeout: Optional[aiohttp.ClientTimeout]
+    ):
+        self.session = session
+        self.timeout = timeout
+
+    def request(self, method: str, url, **kwargs):
+        if self.timeout is not None:
+            kwargs.setdefault("timeout", self.timeout)
+        return self.session.request(method, url, **kwargs)
+
+    def get(self, url, **kwargs):
+        return self.request("GET", url, **kwargs)
+
+    def post(self, url, **kwargs):
+        return self.request("POST", url, **kwargs)
+
+    def delete(self, url, **kwargs):
+        return self.request("DELETE", url, **kwargs)
+
+    async def close(self) -> None:
+        # The connections stay in the shared pool
+        pass
+
+    async def __aenter__(self) -> "PooledClientSession":
+        return self
+
+    async def __aexit__(self, *args) -> None:
+        pass
+
+
+class ClientSessionPool:
+    def __init__(self):
+        self._sessions: dict[
+            str, tuple[asyncio.AbstractEventLoop, aiohttp.ClientSession]
+        ] = {}
+        self.stats = {"sessions": 0}
+
+    @staticmethod
+    def get_origin(url: str) -> str:
+        try:
+            return str(URL(url).origin())
+        except Exception:
+            return ""
+
+    def _create_session(self) -> aiohttp.ClientSession:
+        connector = aiohttp.TCPConnector(
+            limit=AIOHTTP_CLIENT_POOL_SIZE,
+            keepalive_timeout=AIOHTTP_CLIENT_KEEPALIVE_TIMEOUT,
+            ttl_dns_cache=AIOHTTP_CLIENT_DNS_CACHE_TTL,
+        )
+        self.stats["sessions"] += 1
+        return aiohttp.ClientSession(
+            connector=connector,
+            trust_env=True,
+            # Shared by all users, cookies set by a provider must not be sent
+            # along with the requests of other users
+            cookie_jar=aiohttp.DummyCookieJar(),
+        )
+
+    def get(
+        self, url: str, timeout: Optional[aiohttp.ClientTimeout] = None
+    ) -> PooledClientSession:
+        """
+        Session for requests to the origin of `url`. `timeout` applies to the
+        requests made through the returned handle, aiohttp's default if None.
+        """
+        loop = asyncio.get_running_loop()
+        origin = self.get_origin(url)
+        entry = self._sessions.get(origin)
+        if entry is None or entry[0] is not loop or entry[1].closed:
+            entry = (loop, self._create_session())
+            self._sessions[origin] = entry
+        return PooledClientSession(entry[1], timeout)
+
+    async def close(self) -> None:
+        sessions, self._sessions = self._sessions, {}
+        for loop, session in sessions.values():
+            if loop is asyncio.get_running_loop() and not session.closed:
+                try:
+                    await session.close()
+                except Exception as e:
+                    log.warning(f"Error closing client session: {e}")
+
+
+ClientSessions = ClientSessionPool()
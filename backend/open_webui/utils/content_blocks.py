@@ -0,0 +1,275 @@
+"""
+Serialization of streamed assistant content blocks into message content.
+
+`serialize_content_blocks` renders the full block list from scratch.
+`ContentBlockSerializer` produces byte-identical output, but caches the
+rendered prefix of finished blocks so that, while a response is streaming,
+only the tail block is re-rendered on every delta.
+"""
+
+import html
+import json
+
+
+def split_content_and_whitespace(content):
+    content_stripped = content.rstrip()
+    original_whitespace = (
+        content[len(content_stripped) :] if len(content) > len(content_stripped) else ""
+    )
+    return content_stripped, original_whitespace
+
+
+def is_opening_code_block(content):
+    backtick_segments = content.split("```")
+    # Even number of segments means the last backticks are opening a new block
+    return len(backtick_segments) > 1 and len(backtick_segments) % 2 == 0
+
+
+def render_reasoning_display_content(reasoning):
+    return html.escape(
+        "\n".join(
+            (f"> {line}" if not line.startswith(">") else line)
+            for line in reasoning.splitlines()
+        )
+    )
+
+
+def append_content_block(content, block, raw=False, reasoning_display_content=None):
+    """
+    Append the rendering of a single block to the already serialized `content`.
+
+    Serialization is a left fold over the block list, so the output after
+    block N only depends on the output after block N-1 and block N itself.
+    """
+    if block["type"] == "text":
+        block_content = block["content"].strip()
+        if block_content:
+            content = f"{content}{block_content}\n"
+    elif block["type"] == "tool_calls":
+        attributes = block.get("attributes", {})
+
+        tool_calls = block.get("content", [])
+        results = block.get("results", [])
+
+        if content and not content.endswith("\n"):
+            content += "\n"
+
+        if results:
+
+            tool_calls_display_content = ""
+            for tool_call in tool_calls:
+
+                tool_call_id = tool_call.get("id", "")
+                tool_name = tool_call.get("function", {}).get("name", "")
+                tool_arguments = tool_call.get("function", {}).get("arguments", "")
+
+                tool_result = None
+                tool_result_files = None
+                for result in results:
+                    if tool_call_id == result.get("tool_call_id", ""):
+                        tool_result = result.get("content", None)
+                        tool_result_files = result.get("files", None)
+                        break
+
+                if tool_result is not None:
+                    tool_result_embeds = result.get("embeds", "")
+                    tool_calls_display_content = f'{tool_calls_display_content}<details type="tool_calls" done="true" id="{tool_call_id}" name="{tool_name}" arguments="{html.escape(json.dumps(tool_arguments))}" result="{html.escape(json.dumps(tool_result, ensure_ascii=False))}" files="{html.escape(json.dumps(tool_result_files)) if tool_result_files else ""}" embeds="{html.escape(json.dumps(tool_result_embeds))}">\n<summary>Tool Executed</summary>\n</details>\n'
+                else:
+                    tool_calls_display_content = f'{tool_calls_display_content}<details type="tool_calls" done="false" id="{tool_call_id}" name="{tool_name}" arguments="{html.escape(json.dumps(tool_arguments))}">\n<summary>Executing...</summary>\n</details>\n'
+
+            if not raw:
+                content = f"{content}{tool_calls_display_content}"
+        else:
+            tool_calls_display_content = ""
+
+            for tool_call in tool_calls:
+                tool_call_id = tool_call.get("id", "")
+                tool_name = tool_call.get("function", {}).get("name", "")
+                tool_arguments = tool_call.get("function", {}).get("arguments", "")
+
+                tool_calls_display_content = f'{tool_calls_display_content}\n<details type="tool_calls" done="false" id="{tool_call_id}" name="{tool_name}" arguments="{html.escape(json.dumps(tool_arguments))}">\n<summary>Executing...</summary>\n</details>\n'
+
+            if not raw:
+                content = f"{content}{tool_calls_display_content}"
+
+    elif block["type"] == "reasoning":
+        if reasoning_display_content is None and not raw:
+            reasoning_display_content = render_reasoning_display_content(
+                block["content"]
+            )
+
+        reasoning_duration = block.get("duration", None)
+
+        start_tag = block.get("start_tag", "")
+        end_tag = block.get("end_tag", "")
+
+        if content and not content.endswith("\n"):
+            content += "\n"
+
+        if reasoning_duration is not None:
+            if raw:
+                content = f'{content}{start_tag}{block["content"]}{end_tag}\n'
+            else:
+                content = f'{content}<details type="reasoning" done="true" duration="{reasoning_duration}">\n<summary>Thought for {reasoning_duration} seconds</summary>\n{reasoning_display_content}\n</details>\n'
+        else:
+            if raw:
+                content = f'{content}{start_tag}{block["content"]}{end_tag}\n'
+            else:
+                content = f'{content}<details type="reasoning" done="false">\n<summary>Thinking…</summary>\n{reasoning_display_content}\n</details>\n'
+
+    elif block["type"] == "code_interpreter":
+        attributes = block.get("attributes", {})
+        output = block.get("output", None)
+        lang = attributes.get("lang", "")
+
+        content_stripped, original_whitespace = split_content_and_whitespace(content)
+        if is_opening_code_block(content_stripped):
+            # Remove trailing backticks that would open a new block
+            content = content_stripped.rstrip("`").rstrip() + original_whitespace
+        else:
+            # Keep content as is - either closing backticks or no backticks
+            content = content_stripped + original_whitespace
+
+        if content and not content.endswith("\n"):
+            content += "\n"
+
+        if output:
+            output = html.escape(json.dumps(output))
+
+            if raw:
+                content = f'{content}<code_interpreter type="code" lang="{lang}">\n{block["content"]}\n</code_interpreter>\n```output\n{output}\n```\n'
+            else:
+                content = f'{content}<details type="code_interpreter" done="true" output="{output}">\n<summary>Analyzed</summary>\n```{lang}\n{block["content"]}\n```\n</details>\n'
+        else:
+            if raw:
+                content = f'{content}<code_interpreter type="code" lang="{lang}">\n{block["content"]}\n</code_interpreter>\n'
+            else:
+                content = f'{content}<details type="code_interpreter" done="false">\n<summary>Analyzing...</summary>\n```{lang}\n{block["content"]}\n```\n</details>\n'
+
+    else:
+        block_content = str(block["content"]).strip()
+        if block_content:
+            content = f"{content}{block['type']}: {block_content}\n"
+
+    return content
+
+
+def serialize_content_blocks(content_blocks, raw=False):
+    content = ""
+    for block in content_blocks:
+        content = append_content_block(content, block, raw)
+    return content.strip()
+
+
+class _ReasoningTailRenderer:
+    """
+    Incrementally renders the display content of a growing reasoning block.
+
+    Reasoning text only ever grows by appending, so every line up to the last
+    newline is final. Those lines are quoted and escaped once; each call only
+    processes the text that arrived since the previous call.
+    """
+
+    def __init__(self):
+        self.block = None
+        self.source = None
+        # Length of the source prefix (ending with "\n") already rendered
+        self.rendered_length = 0
+        self.rendered = ""
+
+    def render(self, block):
+        reasoning = block["content"]
+
+        if (
+            block is not self.block
+            or self.source is None
+            or not reasoning.startswith(self.source)
+        ):
+            self.block = block
+            self.rendered_length = 0
+            self.rendered = ""
+
+        self.source = reasoning
+
+        # A prefix that ends with "\n" splits into lines independently of
+        # whatever follows it, and html.escape works per character, so the
+        # rendered prefix can be reused verbatim.
+        last_newline = reasoning.rfind("\n", self.rendered_length)
+        if last_newline != -1:
+            segment = render_reasoning_display_content(
+                reasoning[self.rendered_length : last_newline + 1]
+            )
+            if self.rendered and segment:
+                self.rendered = f"{self.rendered}\n{segment}"
+            elif segment:
+                self.rendered = segment
+            self.rendered_length = last_newline + 1
+
+        tail = render_reasoning_display_content(reasoning[self.rendered_length :])
+        if self.rendered and tail:
+            return f"{self.rendered}\n{tail}"
+        return self.rendered or tail
+
+
+class ContentBlockSerializer:
+    """
+    Incremental, byte-identical replacement for `serialize_content_blocks`.
+
+    Every block except the last one is treated as finished: its rendered
+    output is cached together with a snapshot of the block's top-level values.
+    On the next call the cached prefix is reused as long as the same block
+    objects are still in place and none of their values was reassigned, so
+    only the tail block is rendered again. Nested containers of finished
+    blocks must be replaced rather than mutated in place for a change to be
+    picked up; the streaming loop only ever mutates the tail block.
+    """
+
+    def __init__(self):
+        # raw -> list of (block, snapshot, serialized content up to the block)
+        self._prefixes = {False: [], True: []}
+        self._reasoning_tail = _ReasoningTailRenderer()
+
+    @staticmethod
+    def _snapshot(block):
+        return tuple(block.items())
+
+    @staticmethod
+    def _is_unchanged(block, snapshot):
+        if len(block) != len(snapshot):
+            return False
+        for key, value in snapshot:
+            if key not in block or block[key] is not value:
+                return False
+        return True
+
+    def reset(self):
+        self._prefixes = {False: [], True: []}
+        self._reasoning_tail = _ReasoningTailRenderer()
+
+    def serialize(self, content_blocks, raw=False):
+        prefix = self._prefixes[bool(raw)]
+        frozen_count = max(len(content_blocks) - 1, 0)
+
+        valid = 0
+        for block, snapshot, _ in prefix[:frozen_count]:
+            candidate = content_blocks[valid]
+            if candidate is not block or not self._is_unchanged(block, snapshot):
+                break
+            valid += 1
+        del prefix[valid:]
+
+        content = prefix[-1][2] if prefix else ""
+        for block in content_blocks[valid:frozen_count]:
+            content = append_content_block(content, block, raw)
+            prefix.append((block, self._snapshot(block), content))
+
+        if content_blocks:
+            tail = content_blocks[-1]
+            reasoning_display_content = None
+            if tail["type"] == "reasoning" and not raw:
+                reasoning_display_content = self._reasoning_tail.render(tail)
+            content = append_content_block(
+                content, tail, raw, reasoning_display_content
+            )
+
+        return content.strip()
@@ -0,0 +1,251 @@
+"""
+Image dimensions for billing the image inputs of a prompt.
+
+Only the first bytes of an image are read, enough for PIL to parse its
+header: remote images are requested with a range, data URIs and raw base64
+images are decoded in part and uploaded files are opened without loading
+the pixels. Sizes of remote images and files are cached by URL, as are the
+remote images whose size could not be read, so that they are not requested
+again on every prompt.
+"""
+
+import asyncio
+import base64
+import logging
+import threading
+from collections import OrderedDict
+from io import BytesIO
+from typing import Optional, Tuple
+
+import httpx
+from PIL import Image
+
+log = logging.getLogger(__name__)
+
+# Bytes read per attempt to parse the header, and the most read per image
+IMAGE_HEADER_CHUNK = 64 * 1024
+IMAGE_HEADER_MAX_BYTES = 1024 * 1024
+
+IMAGE_SIZE_CACHE_SIZE = 4096
+
+# Cached for remote images whose size could not be read
+UNKNOWN_IMAGE_SIZE = (0, 0)
+
+# Seconds a thread waits for a prefetch reading the same image
+IMAGE_SIZE_WAIT_TIMEOUT = 10
+
+
+class ImageSizeCache:
+    def __init__(self, max_size: int):
+        self.max_size = max_size
+        self._lock = threading.Lock()
+        self._sizes: OrderedDict[str, Tuple[int, int]] = OrderedDict()
+        self.stats = {"hits": 0, "misses": 0}
+
+    def get(self, key: str) -> Optional[Tuple[int, int]]:
+        with self._lock:
+            size = self._sizes.get(key)
+            if size is None:
+                self.stats["misses"] += 1
+                return None
+            self._sizes.move_to_end(key)
+            self.stats["hits"] += 1
+            return size
+
+    def set(self, key: str, size: Tuple[int, int]) -> None:
+        with self._lock:
+            self._sizes[key] = size
+            self._sizes.move_to_end(key)
+            while len(self._sizes) > self.max_size:
+                self._sizes.popitem(last=False)
+
+
+IMAGE_SIZES = ImageSizeCache(IMAGE_SIZE_CACHE_SIZE)
+
+# Keeps the prefetch tasks referenced until they are done
+_prefetch_tasks: set = set()
+# Remote images being read by a prefetch, set when the size is cached
+_reading: dict[str, threading.Event] = {}
+
+
+def _get_cached_size(url: str) -> Tuple[bool, Optional[Tuple[int, int]]]:
+    """Whether the size of `url` is cached, and the size (None if unknown)."""
+    size = IMAGE_SIZES.get(url)
+    if size is None:
+        return False, None
+    return True, None if size == UNKNOWN_IMAGE_SIZE else size
+
+
+def _in_event_loop() -> bool:
+    try:
+        asyncio.get_running_loop()
+        return True
+    except RuntimeError:
+        return False
+
+
+def get_image_size_from_bytes(data: bytes) -> Optional[Tuple[int, int]]:
+    """Width and height from the start of an image, None if more bytes are needed."""
+    try:
+        # Image.open only parses the header
+        with Image.open(BytesIO(data)) as image:
+            return image.size
+    except Exception:
+        return None
+
+
+def get_image_size_from_data_uri(url: str) -> Optional[Tuple[int, int]]:
+    data = url.split(",", 1)[1] if "," in url else url
+    length = IMAGE_HEADER_CHUNK
+    while True:
+        # Whole base64 quads, so that the prefix decodes on its own
+        prefix = data[: (length + 2) // 3 * 4]
+        try:
+            size = get_image_size_from_bytes(base64.b64decode(prefix))
+        except Exception:
+            return None
+        if size is not None or len(prefix) >= len(data):
+            return size
+        length *= 4
+
+
+def get_image_size_from_file(file_id: str) -> Optional[Tuple[int, int]]:
+    from open_webui.models.files import Files
+    from open_webui.storage.provider import Storage
+
+    file = Files.get_file_by_id(file_id)
+    if not file:
+        return None
+    try:
+        with Image.open(Storage.get_file(file.path)) as image:
+            return image.size
+    except Exception:
+        return None
+
+
+def _read_header_request(url: str) -> dict:
+    return {
+        "method": "GET",
+        "url": url,
+        "headers": {"Range": f"bytes=0-{IMAGE_HEADER_MAX_BYTES - 1}"},
+    }
+
+
+def get_remote_image_size(url: str) -> Optional[Tuple[int, int]]:
+    data = b""
+    next_attempt = IMAGE_HEADER_CHUNK
+    with httpx.Client(trust_env=True, timeout=60) as client:
+        with client.stream(**_read_header_request(url)) as response:
+            response.raise_for_status()
+            # Servers that ignore the range send the whole image, stop early
+            for chunk in response.iter_bytes(IMAGE_HEADER_CHUNK):
+                data += chunk
+                if len(data) >= next_attempt:
+                    size = get_image_size_from_bytes(data)
+                    if size is not None or len(data) >= IMAGE_HEADER_MAX_BYTES:
+                        return size
+                    next_attempt = len(data) + IMAGE_HEADER_CHUNK
+    return get_image_size_from_bytes(data)
+
+
+async def get_remote_image_size_async(url: str) -> Optional[Tuple[int, int]]:
+    data = b""
+    next_attempt = IMAGE_HEADER_CHUNK
+    async with httpx.AsyncClient(trust_env=True, timeout=60) as client:
+        async with client.stream(**_read_header_request(url)) as response:
+            response.raise_for_status()
+            async for chunk in response.aiter_bytes(IMAGE_HEADER_CHUNK):
+                data += chunk
+                if len(data) >= next_attempt:
+                    size = get_image_size_from_bytes(data)
+                    if size is not None or len(data) >= IMAGE_HEADER_MAX_BYTES:
+                        return size
+                    next_attempt = len(data) + IMAGE_HEADER_CHUNK
+    return get_image_size_from_bytes(data)
+
+
+def get_image_size(url: str) -> Optional[Tuple[int, int]]:
+    """
+    Width and height of an image URL, data URI, file id or raw base64 image,
+    None if unknown.
+    """
+    if not url.startswith("http") and "," in url:
+        return get_image_size_from_data_uri(url)
+
+    cached, size = _get_cached_size(url)
+    if cached:
+        return size
+
+    if url.startswith("http"):
+        reading = _reading.get(url)
+        if reading is not None:
+            # The prefetch runs on the event loop, waiting for it there would
+            # block it
+            if _in_event_loop() or not reading.wait(IMAGE_SIZE_WAIT_TIMEOUT):
+                return None
+            return _get_cached_size(url)[1]
+        try:
+            size = get_remote_image_size(url)
+        except Exception as e:
+            log.warning(f"Error reading the size of image {url[:256]}: {e}")
+        IMAGE_SIZES.set(url, size or UNKNOWN_IMAGE_SIZE)
+        return size
+
+    try:
+        size = get_image_size_from_file(url)
+    except Exception as e:
+        log.warning(f"Error reading the size of image {url[:256]}: {e}")
+        return None
+    if size is not None:
+        IMAGE_SIZES.set(url, size)
+        return size
+    # Not a file id, an image in base64 without the data URI prefix
+    return get_image_size_from_data_uri(url)
+
+
+async def get_image_size_async(url: str) -> Optional[Tuple[int, int]]:
+    if not url.startswith("http"):
+        return await asyncio.to_thread(get_image_size, url)
+
+    cached, size = _get_cached_size(url)
+    if cached or url in _reading:
+        return size
+
+    reading = _reading[url] = threading.Event()
+    try:
+        try:
+            size = await get_remote_image_size_async(url)
+        except Exception as e:
+            log.warning(f"Error reading the size of image {url[:256]}: {e}")
+        IMAGE_SIZES.set(url, size or UNKNOWN_IMAGE_SIZE)
+    finally:
+        del _reading[url]
+        reading.set()
+    return size
+
+
+def prefetch_image_sizes(messages: Optional[list]) -> None:
+    """
+    Read the sizes of the remote images in `messages` in the background, so
+    that they are cached when the prompt is billed.
+    """
+    urls = set()
+    for message in messages or []:
+        content = message.get("content") if isinstance(message, dict) else None
+        if not isinstance(content, list):
+            continue
+        for item in content:
+            if not isinstance(item, dict) or item.get("type") != "image_url":
+                continue
+            url = (item.get("image_url") or {}).get("url") or ""
+            if url.startswith("http") and not _get_cached_size(url)[0]:
+                urls.add(url)
+    if not urls:
+        return
+
+    async def prefetch():
+        await asyncio.gather(*[get_image_size_async(url) for url in urls])
+
+    task = asyncio.create_task(prefetch())
+    _prefetch_tasks.add(task)
+    task.add_done_callback(_prefetch_tasks.discard)
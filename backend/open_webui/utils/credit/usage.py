@@ -2,7 +2,8 @@ import json
 import logging
 import time
 from decimal import Decimal
-from typing import List, Union, Tuple
+from functools import lru_cache
+from typing import List, Optional, Union, Tuple
 
 import tiktoken
 from fastapi import HTTPException
@@ -17,8 +18,12 @@ from open_webui.config import (
     USAGE_CUSTOM_PRICE_CONFIG,
 )
 from open_webui.env import GLOBAL_LOG_LEVEL
-from open_webui.models.credits import AddCreditForm, Credits, SetCreditFormDetail
-from open_webui.models.models import Models
+from open_webui.models.credits import (
+    AddCreditForm,
+    CreditBalances,
+    Credits,
+    SetCreditFormDetail,
+)
 from open_webui.models.users import UserModel
 from open_webui.utils.credit.models import (
     MessageContent,
@@ -28,7 +33,8 @@ from open_webui.utils.credit.models import (
     MessageItem,
 )
 from open_webui.utils.credit.utils import (
-    get_model_price,
+    ModelPrices,
+    credit_reservation,
     get_feature_price,
     calculate_image_token,
 )
@@ -37,6 +43,51 @@ logger = logging.getLogger(__name__)
 logger.setLevel(GLOBAL_LOG_LEVEL)
 
 
+@lru_cache(maxsize=8)
+def compile_custom_fees(custom_config_str: str) -> tuple:
+    """
+    Parse USAGE_CUSTOM_PRICE_CONFIG into (name, jsonpath, value, exists, cost)
+    rules. Cached by the config value, so a config update recompiles them.
+    """
+    if not custom_config_str or custom_config_str == "[]":
+        return ()
+    try:
+        custom_configs = json.loads(custom_config_str)
+    except Exception as e:
+        logger.warning("[credit_deduct] Error parse custom price: %s", e)
+        return ()
+    if not isinstance(custom_configs, list):
+        logger.warning("[credit_deduct] custom price config is not a list")
+        return ()
+
+    rules = []
+    for config in custom_configs:
+        if not isinstance(config, dict):
+            logger.warning("[credit_deduct] custom price config has no dict value")
+            continue
+        try:
+            path = config["path"]
+            cost = config["cost"]
+            if not path or cost <= 0:
+                continue
+            rules.append(
+                (
+                    config["name"],
+                    jsonpath_parse(path),
+                    config["value"],
+                    config["exists"],
+                    cost,
+                )
+            )
+        except Exception as e:
+            logger.warning(
+                "[credit_deduct] Error parse custom price config %s: %s",
+                config.get("path"),
+                e,
+            )
+    return tuple(rules)
+
+
 class Calculator:
     """
     Usage Calculator
@@ -65,6 +116,22 @@ class Calculator:
             return self.get_encoder(default_model_for_encoding)
         return self.get_encoder(model_id)
 
+    def calculate_prompt_tokens(
+        self, encoder: Encoding, model_id: str, messages: List[dict]
+    ) -> int:
+        prompt_tokens = 0
+        for message in [MessageItem.model_validate(message) for message in messages]:
+            if isinstance(message.content, str):
+                prompt_tokens += len(encoder.encode(message.content or ""))
+            if isinstance(message.content, list):
+                for item in message.content:
+                    item: MessageContent
+                    if item.type == "text":
+                        prompt_tokens += len(encoder.encode(item.text or ""))
+                    elif item.type == "image_url":
+                        prompt_tokens += calculate_image_token(model_id, item.image_url)
+        return prompt_tokens
+
     def calculate_usage(
         self,
         cached_usage: CompletionUsage,
@@ -94,24 +161,9 @@ class Calculator:
             if cached_usage.prompt_tokens:
                 usage.prompt_tokens = cached_usage.prompt_tokens
             else:
-                for message in [
-                    MessageItem.model_validate(message) for message in messages
-                ]:
-                    if isinstance(message.content, str):
-                        usage.prompt_tokens += len(
-                            encoder.encode(message.content or "")
-                        )
-                    if isinstance(message.content, list):
-                        for item in message.content:
-                            item: MessageContent
-                            if item.type == "text":
-                                usage.prompt_tokens += len(
-                                    encoder.encode(item.text or "")
-                                )
-                            elif item.type == "image_url":
-                                usage.prompt_tokens += calculate_image_token(
-                                    model_id, item.image_url
-                                )
+                usage.prompt_tokens = self.calculate_prompt_tokens(
+                    encoder, model_id, messages
+                )
 
             # completion tokens
             choices = response.choices
@@ -149,8 +201,16 @@ class CreditDeduct:
 
     with CreditDeduct(xxx) as credit_deduct:
         credit_deduct.run(xxx)
+
+    Stream chunks are not tokenized one by one: their delta text is buffered
+    and encoded once when the usage is read (usage_message, add_usage_to_resp,
+    on exit) or when the buffer reaches STREAM_FLUSH_CHARS. If the provider
+    reports usage, the buffered text is dropped without being encoded.
     """
 
+    # Buffered stream text above which completion tokens are counted early
+    STREAM_FLUSH_CHARS = 256 * 1024
+
     def __init__(
         self,
         user: UserModel,
@@ -164,9 +224,12 @@ class CreditDeduct:
         self.remote_id = ""
         self.user = user
         self.model_id = model_id
-        self.model = Models.get_model_by_id(self.model_id)
+        self.model, model_price = ModelPrices.get(
+            self.model_id, is_embedding=is_embedding
+        )
         self.body = body
         self.is_stream = is_stream
+        self.is_embedding = is_embedding
         self.usage = CompletionUsage(
             prompt_tokens=0, completion_tokens=0, total_tokens=0
         )
@@ -181,7 +244,7 @@ class CreditDeduct:
             self._prompt_long_ctx_cache_unit_price,
             self.request_unit_price,
             _,
-        ) = get_model_price(model=self.model, is_embedding=is_embedding)
+        ) = model_price
         self.features = {
             k
             for k, v in (
@@ -191,13 +254,35 @@ class CreditDeduct:
         }
         self.custom_fees = self.build_custom_fees(body)
         self.is_official_usage = False
+        # stream accounting
+        self._stream_started = False
+        self._pending_text: List[str] = []
+        self._pending_chars = 0
+        self._stream_text_flushed = False
 
     def __enter__(self):
         return self
 
     def __exit__(self, exc_type, exc_val, exc_tb):
+        try:
+            self.charge(exc_val)
+        finally:
+            # The hold taken by check_credit_by_user_id, after the charge so
+            # that the cost is covered by one of them at all times
+            CreditBalances.settle(self.user.id, self.reservation_id)
+
+    @property
+    def reservation_id(self) -> Optional[str]:
+        metadata = self.body.get("metadata") or {}
+        if isinstance(metadata, dict) and metadata.get("credit_reservation_id"):
+            return metadata["credit_reservation_id"]
+        # Embeddings of a chat request (e.g. RAG) are not the request itself
+        return None if self.is_embedding else credit_reservation.get()
+
+    def charge(self, exc_val=None) -> None:
         if exc_val or self.is_error:
             return
+        self.finalize_stream_usage()
         Credits.add_credit_by_user_id(
             form_data=AddCreditForm(
                 user_id=self.user.id,
@@ -348,6 +433,7 @@ class CreditDeduct:
 
     @property
     def usage_with_cost(self) -> dict:
+        self.finalize_stream_usage()
         return {
             "total_cost": float(self.total_price),
             "cost_detail": {
@@ -389,54 +475,28 @@ class CreditDeduct:
         # Check if body is a dictionary
         if not isinstance(body, dict):
             return custom_fees
-        # Check config not empty
-        custom_config_str = USAGE_CUSTOM_PRICE_CONFIG.value
-        if not custom_config_str or custom_config_str == "[]":
-            return custom_fees
-        # Parse the custom config string
-        try:
-            # load as json
-            custom_configs = json.loads(custom_config_str)
-            if not isinstance(custom_configs, list):
-                logger.warning("[credit_deduct] custom price config is not a list")
-                return custom_fees
-            # parse config from body
-            for config in custom_configs:
-                if not isinstance(config, dict):
-                    logger.warning(
-                        "[credit_deduct] custom price config has no dict value"
-                    )
+        # Apply the jsonpath rules to the request body
+        for name, jsonpath_expr, value, exists_check, cost in compile_custom_fees(
+            USAGE_CUSTOM_PRICE_CONFIG.value
+        ):
+            try:
+                matches = jsonpath_expr.find(self.body)
+                if not matches:
                     continue
-                # load config
-                path = config["path"]
-                name = config["name"]
-                value = config["value"]
-                exists_check = config["exists"]
-                cost = config["cost"]
-                if not path or cost <= 0:
+                # check exists
+                if exists_check:
+                    custom_fees[name] = cost
                     continue
-                # Apply jsonpath to the request body
-                try:
-                    jsonpath_expr = jsonpath_parse(path)
-                    matches = jsonpath_expr.find(self.body)
-                    if not matches:
-                        continue
-                    # check exists
-                    if exists_check:
+                for match in matches:
+                    if match.value == value:
                         custom_fees[name] = cost
-                        continue
-                    for match in matches:
-                        if match.value == value:
-                            custom_fees[name] = cost
-                            break
-                except Exception as e:
-                    logger.warning(
-                        "[credit_deduct] Error parse custom price config %s: %s",
-                        path,
-                        e,
-                    )
-        except Exception as e:
-            logger.warning("[credit_deduct] Error parse custom price: %s", e)
+                        break
+            except Exception as e:
+                logger.warning(
+                    "[credit_deduct] Error apply custom price config %s: %s",
+                    name,
+                    e,
+                )
         return custom_fees
 
     def run(self, response: Union[dict, bytes, str]) -> None:
@@ -457,29 +517,20 @@ class CreditDeduct:
 
         # stream
         if self.is_stream:
-            _response = self.clean_response(
-                response=response,
-                default_response={
-                    "choices": [{"delta": {"content": self.to_str(response)}}],
-                },
-            )
-            if not _response:
-                return
-            # validate
-            response = ChatCompletionChunk.model_validate(_response)
+            self._run_stream(response)
+            return
 
         # non-stream
-        else:
-            _response = self.clean_response(
-                response=response,
-                default_response={
-                    "choices": [{"message": {"content": self.to_str(response)}}],
-                },
-            )
-            if not _response:
-                return
-            # validate
-            response = ChatCompletion.model_validate(_response)
+        _response = self.clean_response(
+            response=response,
+            default_response={
+                "choices": [{"message": {"content": self.to_str(response)}}],
+            },
+        )
+        if not _response:
+            return
+        # validate
+        response = ChatCompletion.model_validate(_response)
 
         # check for error
         if _response.get("error"):
@@ -508,14 +559,95 @@ class CreditDeduct:
             return
 
         # use calculated usage
-        if self.is_stream:
-            self.usage.prompt_tokens = usage.prompt_tokens
-            self.usage.completion_tokens += usage.completion_tokens
+        self.usage = usage
+
+    def _run_stream(self, response: Union[dict, bytes, str]) -> None:
+        _response = self.clean_response(
+            response=response,
+            default_response={
+                "choices": [{"delta": {"content": self.to_str(response)}}],
+            },
+        )
+        if not _response:
+            return
+
+        # check for error
+        if _response.get("error"):
+            self.is_error = True
+            return
+
+        # record id
+        self.remote_id = _response.get("id", "")
+        self._stream_started = True
+
+        # use provider usage, nothing buffered needs to be encoded
+        usage = _response.get("usage")
+        if usage is not None:
+            self.is_official_usage = True
+            self.usage = CompletionUsage.model_validate(dict(usage))
+            self._pending_text = []
+            self._pending_chars = 0
+            return
+        if self.is_official_usage:
+            return
+
+        # buffer delta text
+        choices = _response.get("choices") or []
+        if not choices:
+            return
+        delta = choices[0].get("delta") or {}
+        content = delta.get("content")
+        if not content:
+            return
+        if not isinstance(content, str):
+            raise TypeError(f"delta content is type of {type(content)}")
+        self._pending_text.append(content)
+        self._pending_chars += len(content)
+        if self._pending_chars >= self.STREAM_FLUSH_CHARS:
+            self.flush_stream_text()
+
+    def _get_encoder(self) -> Encoding:
+        return calculator.get_encoder(
+            model_id=self.model_id,
+            model_prefix_to_remove=USAGE_CALCULATE_MODEL_PREFIX_TO_REMOVE.value,
+            default_model_for_encoding=USAGE_DEFAULT_ENCODING_MODEL.value,
+        )
+
+    def flush_stream_text(self) -> None:
+        """Count the completion tokens of the buffered stream text."""
+        if not self._pending_text:
+            return
+        text = "".join(self._pending_text)
+        self._pending_text = []
+        self._pending_chars = 0
+        if self.is_official_usage:
+            return
+        if not self._stream_text_flushed:
+            # strip <think> to avoid empty token calculation, only the start
+            # of the response can have it
+            text = text.lstrip("<think>")
+            self._stream_text_flushed = True
+        self.usage.completion_tokens += len(self._get_encoder().encode(text))
+        self.usage.total_tokens = (
+            self.usage.prompt_tokens + self.usage.completion_tokens
+        )
+
+    def finalize_stream_usage(self) -> None:
+        """Complete the calculated usage of a stream, prompt tokens included."""
+        if not self.is_stream or not self._stream_started or self.is_official_usage:
+            return
+        try:
+            self.flush_stream_text()
+            # only calculate once
+            if not self.usage.prompt_tokens:
+                self.usage.prompt_tokens = calculator.calculate_prompt_tokens(
+                    self._get_encoder(), self.model_id, self.body.get("messages", [])
+                )
             self.usage.total_tokens = (
                 self.usage.prompt_tokens + self.usage.completion_tokens
             )
-            return
-        self.usage = usage
+        except Exception as e:
+            logger.warning("[credit_deduct_failed] unknown error %s", e)
 
     def clean_response(
         self, response: Union[dict, bytes, str], default_response: dict
@@ -1,11 +1,10 @@
-import base64
 import math
+import threading
+import time
+from contextvars import ContextVar
 from decimal import Decimal
-from io import BytesIO
 from typing import Optional, Union, Tuple
 
-import httpx
-from PIL import Image
 from fastapi import HTTPException
 from pydantic import BaseModel
 
@@ -19,9 +18,11 @@ from open_webui.config import (
     CREDIT_NO_CREDIT_MSG,
     USAGE_CALCULATE_DEFAULT_EMBEDDING_PRICE,
 )
+from open_webui.env import MODEL_PRICE_CACHE_TTL
 from open_webui.models.chats import Chats
-from open_webui.models.credits import Credits
+from open_webui.models.credits import CreditBalances
 from open_webui.models.models import Models, ModelModel
+from open_webui.utils.credit.image import get_image_size
 
 
 def get_model_price(
@@ -85,8 +86,11 @@ def get_model_price(
         base_model = Models.get_model_by_id(model.base_model_id)
         if base_model:
             return get_model_price(base_model)
-    # model price
-    model_price = model.price or {}
+    return get_price_from_config(model.price or {})
+
+
+def get_price_from_config(model_price: dict) -> Tuple[Decimal, ...]:
+    """The price tuple of get_model_price from a model's `price` config."""
     return (
         Decimal(
             model_price.get("prompt_price", USAGE_CALCULATE_DEFAULT_TOKEN_PRICE.value)
@@ -135,6 +139,79 @@ def get_model_price(
     )
 
 
+class ModelPriceTable:
+    """
+    Models and their get_model_price tuples by model id, with the base model
+    prices resolved, so that billing does not load models or build prices
+    per request. Entries are dropped when the models change on this instance
+    (Models.version) or the default prices change, and expire after `ttl`
+    seconds for changes made by other instances.
+    """
+
+    def __init__(self, ttl: int):
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._entries: dict = {}
+        self._version = None
+        self.stats = {"hits": 0, "misses": 0}
+
+    def _defaults(self) -> tuple:
+        return (
+            USAGE_CALCULATE_DEFAULT_TOKEN_PRICE.value,
+            USAGE_CALCULATE_DEFAULT_REQUEST_PRICE.value,
+            USAGE_CALCULATE_DEFAULT_EMBEDDING_PRICE.value,
+        )
+
+    def invalidate(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def get(
+        self, model_id: str, is_embedding: bool = False
+    ) -> Tuple[Optional[ModelModel], Tuple[Decimal, ...]]:
+        """Returns the model (None if unknown) and its price tuple."""
+        now = time.monotonic()
+        defaults = self._defaults()
+        with self._lock:
+            if self._version != Models.version:
+                self._entries.clear()
+                self._version = Models.version
+            entry = self._entries.get((model_id, is_embedding))
+            if entry is not None and entry[0] > now and entry[1] == defaults:
+                self.stats["hits"] += 1
+                return entry[2], entry[3]
+            self.stats["misses"] += 1
+            version = self._version
+
+        model, price = self._load(model_id, is_embedding, set())
+        with self._lock:
+            # Not cached if the models changed while loading
+            if version == Models.version:
+                self._entries[(model_id, is_embedding)] = (
+                    now + self.ttl,
+                    defaults,
+                    model,
+                    price,
+                )
+        return model, price
+
+    def _load(self, model_id: str, is_embedding: bool, seen: set):
+        model = Models.get_model_by_id(model_id) if model_id else None
+        if is_embedding or not model or not model.base_model_id:
+            return model, get_model_price(model, is_embedding=is_embedding)
+
+        # A preset model uses the price of its base model
+        seen.add(model_id)
+        if model.base_model_id not in seen:
+            base_model, base_price = self._load(model.base_model_id, False, seen)
+            if base_model:
+                return model, base_price
+        return model, get_price_from_config(model.price or {})
+
+
+ModelPrices = ModelPriceTable(ttl=MODEL_PRICE_CACHE_TTL)
+
+
 def get_feature_price(features: Union[set, list]) -> Decimal:
     if not features:
         return Decimal(0)
@@ -179,12 +256,74 @@ def is_free_request(model_price: list, form_data: dict) -> bool:
     return is_free_model and is_feature_free
 
 
+def estimate_request_cost(
+    form_data: dict,
+    prompt_price: Decimal,
+    completion_price: Decimal,
+    request_price: Decimal,
+) -> Decimal:
+    """
+    Rough cost of a request before it runs, held against the balance until
+    the actual cost is charged. Only counts text (about 4 characters per
+    token) and the requested max tokens, nothing is tokenized.
+    """
+    chars = 0
+    prompt = form_data.get("messages") or form_data.get("input") or []
+    for item in prompt if isinstance(prompt, list) else [prompt]:
+        if isinstance(item, str):
+            chars += len(item)
+            continue
+        content = item.get("content") if isinstance(item, dict) else None
+        if isinstance(content, str):
+            chars += len(content)
+        elif isinstance(content, list):
+            for part in content:
+                if isinstance(part, dict) and isinstance(part.get("text"), str):
+                    chars += len(part["text"])
+
+    params = form_data.get("params") or {}
+    completion_tokens = (
+        form_data.get("max_completion_tokens")
+        or form_data.get("max_tokens")
+        or params.get("max_completion_tokens")
+        or params.get("max_tokens")
+        or 0
+    )
+    if not isinstance(completion_tokens, int):
+        completion_tokens = 0
+
+    features = (
+        form_data.get("features")
+        or (form_data.get("metadata") or {}).get("features")
+        or {}
+    )
+    return (
+        prompt_price * (chars // 4) / 1000 / 1000
+        + completion_price * completion_tokens / 1000 / 1000
+        + request_price / 1000 / 1000
+        + get_feature_price({k for k, v in features.items() if v})
+    )
+
+
+# Hold of the request being handled, settled by CreditDeduct when the body it
+# bills no longer has its metadata (e.g. popped by the Ollama router)
+credit_reservation: ContextVar[Optional[str]] = ContextVar(
+    "credit_reservation", default=None
+)
+
+
 def check_credit_by_user_id(
     user_id: str, form_data: dict, is_embedding: bool = False
-) -> None:
+) -> Optional[str]:
+    """
+    Check that the user can pay for the request and hold its estimated cost
+    in CreditBalances. Returns the reservation id to settle once the request
+    is charged (CreditDeduct does so for `metadata.credit_reservation_id` or
+    the hold of the current request), or None for free requests.
+    """
     # load model
     model_id = form_data.get("model") or form_data.get("model_id") or ""
-    model = Models.get_model_by_id(model_id)
+    _, model_price = ModelPrices.get(model_id, is_embedding=is_embedding)
     (
         prompt_price,
         completion_price,
@@ -196,7 +335,7 @@ def check_credit_by_user_id(
         prompt_long_ctx_cache_price,
         request_price,
         minimum_credit,
-    ) = get_model_price(model, is_embedding=is_embedding)
+    ) = model_price
     # check for free
     if is_free_request(
         model_price=[
@@ -210,12 +349,18 @@ def check_credit_by_user_id(
         ],
         form_data=form_data,
     ):
-        return
-    # load credit
+        return None
+    # reserve credit
     metadata = form_data.get("metadata") or form_data
-    credit = Credits.init_credit_by_user_id(user_id=user_id)
+    is_reserved, reservation_id = CreditBalances.reserve(
+        user_id=user_id,
+        amount=estimate_request_cost(
+            form_data, prompt_price, completion_price, request_price
+        ),
+        minimum_credit=minimum_credit,
+    )
     # check for credit
-    if credit is None or credit.credit <= 0 or credit.credit < minimum_credit:
+    if not is_reserved:
         if isinstance(metadata, dict) and metadata:
             chat_id = metadata.get("chat_id")
             message_id = metadata.get("message_id") or metadata.get("id")
@@ -226,6 +371,8 @@ def check_credit_by_user_id(
                     {"error": {"content": CREDIT_NO_CREDIT_MSG.value}},
                 )
         raise HTTPException(status_code=403, detail=CREDIT_NO_CREDIT_MSG.value)
+    credit_reservation.set(reservation_id)
+    return reservation_id
 
 
 class ImageURL(BaseModel):
@@ -233,18 +380,16 @@ class ImageURL(BaseModel):
     detail: str
 
 
-def calculate_image_token(model_id: str, image: ImageURL) -> int:
-    if not image or not image.url:
-        return 0
+# Assumed when the size of an image cannot be read
+DEFAULT_IMAGE_SIZE = (1024, 1024)
 
+
+def get_image_token(model_id: str, detail: str, size: Optional[Tuple[int, int]]) -> int:
     base_tokens = 85
 
-    if image.detail == "low":
+    if detail == "low":
         return 85
 
-    if image.detail == "auto" or not image.detail:
-        image.detail = "high"
-
     tile_tokens = 170
 
     if model_id.find("gpt-4o-mini") != -1:
@@ -254,22 +399,7 @@ def calculate_image_token(model_id: str, image: ImageURL) -> int:
     if model_id.find("gemini") != -1 or model_id.find("claude") != -1:
         return 3 * base_tokens
 
-    if image.url.startswith("http"):
-        with httpx.Client(trust_env=True, timeout=60) as client:
-            response = client.get(image.url)
-        response.raise_for_status()
-        image_data = base64.b64encode(response.content).decode("utf-8")
-    else:
-        if "," in image.url:
-            image_data = image.url.split(",", 1)[1]
-        else:
-            from open_webui.utils.files import get_image_base64_from_url
-
-            image_data = get_image_base64_from_url(image.url) or image.url
-
-    image_data = base64.b64decode(image_data.encode("utf-8"))
-    image = Image.open(BytesIO(image_data))
-    width, height = image.size
+    width, height = size or DEFAULT_IMAGE_SIZE
 
     short_side = width
     other_side = height
@@ -291,6 +421,21 @@ def calculate_image_token(model_id: str, image: ImageURL) -> int:
     return math.ceil(tiles * tile_tokens + base_tokens)
 
 
+def _needs_image_size(model_id: str, image: ImageURL) -> bool:
+    return (
+        image.detail != "low"
+        and model_id.find("gemini") == -1
+        and model_id.find("claude") == -1
+    )
+
+
+def calculate_image_token(model_id: str, image: ImageURL) -> int:
+    if not image or not image.url:
+        return 0
+    size = get_image_size(image.url) if _needs_image_size(model_id, image) else None
+    return get_image_token(model_id, image.detail, size)
+
+
 def check_amount(amount: float, amount_control: str) -> bool:
     if not amount_control:
         return True
@@ -0,0 +1,137 @@
+"""
+Push notifications of file processing status.
+
+process_file records the status of a file ("pending", "completed", "failed")
+in its data and publishes the change to FileStatusEvents. Watchers subscribe
+to the bus instead of polling the file row: the SSE stream of
+/files/{id}/process/status and socket clients in the "file:{id}" room. With
+Redis, events are relayed over pub/sub so watchers on every node get them.
+"""
+
+import asyncio
+import json
+import logging
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Optional
+
+from open_webui.env import REDIS_KEY_PREFIX
+
+log = logging.getLogger(__name__)
+
+FILE_STATUS_CHANNEL = f"{REDIS_KEY_PREFIX}:files:status"
+
+# Watchers read the file again when no event arrived for this long, in case
+# an event was lost (e.g. the node processing the file went down)
+FILE_STATUS_POLL_INTERVAL = 30
+
+# Seconds before the Redis listener subscribes again after losing its
+# connection, doubled on every failed attempt
+FILE_STATUS_RECONNECT_DELAY = 1
+FILE_STATUS_RECONNECT_MAX_DELAY = 30
+
+
+class FileStatusBus:
+    def __init__(self):
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._redis = None
+        self._subscribers: dict[str, set[asyncio.Queue]] = {}
+        self.stats = {"published": 0, "delivered": 0}
+
+    def start(self, redis=None) -> Optional[asyncio.Task]:
+        """Bind the bus to the running loop, returns the Redis listener task."""
+        self._loop = asyncio.get_running_loop()
+        self._redis = redis
+        if redis is not None:
+            return asyncio.create_task(self._listen())
+        return None
+
+    async def _listen(self) -> None:
+        delay = FILE_STATUS_RECONNECT_DELAY
+        while True:
+            pubsub = self._redis.pubsub()
+            try:
+                await pubsub.subscribe(FILE_STATUS_CHANNEL)
+                delay = FILE_STATUS_RECONNECT_DELAY
+
+                async for message in pubsub.listen():
+                    if message["type"] != "message":
+                        continue
+                    try:
+                        payload = json.loads(message["data"])
+                        self._deliver(payload["file_id"], payload["event"])
+                    except Exception as e:
+                        log.exception(f"Error handling file status event: {e}")
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                # E.g. Redis restarted or failed over, events published until
+                # we are subscribed again are caught up by the watchers' poll
+                log.warning(
+                    f"File status listener disconnected, reconnecting in {delay}s: {e}"
+                )
+            finally:
+                try:
+                    await pubsub.aclose()
+                except Exception:
+                    pass
+
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, FILE_STATUS_RECONNECT_MAX_DELAY)
+
+    def publish(self, file_id: str, status: str, error: Optional[str] = None) -> None:
+        """
+        Notify the watchers of `file_id` of its new status. Safe to call from
+        the threads that process files.
+        """
+        if self._loop is None or self._loop.is_closed():
+            return
+
+        event = {"status": status}
+        if status == "failed":
+            event["error"] = error
+        self.stats["published"] += 1
+        asyncio.run_coroutine_threadsafe(self._publish(file_id, event), self._loop)
+
+    async def _publish(self, file_id: str, event: dict) -> None:
+        try:
+            # The socket manager relays the emit to the other nodes itself
+            from open_webui.socket.main import sio
+
+            await sio.emit(
+                "file:status", {"file_id": file_id, **event}, room=f"file:{file_id}"
+            )
+        except Exception as e:
+            log.warning(f"Failed to emit file status of {file_id}: {e}")
+
+        if self._redis is not None:
+            try:
+                await self._redis.publish(
+                    FILE_STATUS_CHANNEL,
+                    json.dumps({"file_id": file_id, "event": event}),
+                )
+                return
+            except Exception as e:
+                log.warning(f"Failed to publish file status of {file_id}: {e}")
+        self._deliver(file_id, event)
+
+    def _deliver(self, file_id: str, event: dict) -> None:
+        for queue in self._subscribers.get(file_id, ()):
+            queue.put_nowait(event)
+            self.stats["delivered"] += 1
+
+    @asynccontextmanager
+    async def subscribe(self, file_id: str) -> AsyncIterator[asyncio.Queue]:
+        """Queue of the status events of `file_id` while the context is open."""
+        queue = asyncio.Queue()
+        self._subscribers.setdefault(file_id, set()).add(queue)
+        try:
+            yield queue
+        finally:
+            queues = self._subscribers.get(file_id)
+            if queues is not None:
+                queues.discard(queue)
+                if not queues:
+                    del self._subscribers[file_id]
+
+
+FileStatusEvents = FileStatusBus()
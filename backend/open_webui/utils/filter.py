@@ -1,6 +1,11 @@
+import copy
 import inspect
 import logging
+import threading
+import time
+from typing import Optional
 
+from open_webui.env import FILTER_PIPELINE_CACHE_TTL
 from open_webui.utils.plugin import (
     load_function_module_by_id,
     get_function_module_from_cache,
@@ -9,6 +14,9 @@ from open_webui.models.functions import Functions
 
 log = logging.getLogger(__name__)
 
+# Cached user valves, by function and user
+FILTER_USER_VALVES_CACHE_SIZE = 10000
+
 
 def get_function_module(request, function_id, load_from_db=True):
     """
@@ -20,39 +28,193 @@ def get_function_module(request, function_id, load_from_db=True):
     return function_module
 
 
-def get_sorted_filter_ids(request, model: dict, enabled_filter_ids: list = None):
-    def get_priority(function_id):
-        function = Functions.get_function_by_id(function_id)
-        if function is not None:
+class FilterFunction:
+    """
+    A filter function ready to run: its module, valves and the parameters of
+    its handlers, resolved once per version of the function. `bind` attaches
+    the valves of a user.
+    """
+
+    def __init__(self, id: str, module, valves: Optional[dict]):
+        self.id = id
+        self.module = module
+        self.priority = (valves or {}).get("priority", 0)
+        self.valves = None
+        if hasattr(module, "valves") and hasattr(module, "Valves"):
+            self.valves = module.Valves(**(valves if valves else {}))
+        self.has_user_valves = hasattr(module, "UserValves")
+        self.user_valves = None
+        self._handlers = {}
+
+    def get_handler(self, filter_type: str):
+        """The handler, its parameter names and whether it is async, or None."""
+        if filter_type not in self._handlers:
+            handler = getattr(self.module, filter_type, None)
+            self._handlers[filter_type] = (
+                (
+                    handler,
+                    frozenset(inspect.signature(handler).parameters),
+                    inspect.iscoroutinefunction(handler),
+                )
+                if handler
+                else None
+            )
+        return self._handlers[filter_type]
+
+    def bind(self, user_valves) -> "FilterFunction":
+        bound = copy.copy(self)
+        bound.user_valves = user_valves
+        return bound
+
+
+class FilterPipelineCache:
+    """
+    Compiled filter functions and the sorted filters of each combination of
+    model filters and enabled toggles, so that running filters does not load
+    functions, valves or user valves from the database. Everything is dropped
+    when the functions change on this instance (Functions.version), and
+    entries expire after `ttl` seconds for changes made by other instances.
+    """
+
+    def __init__(self, ttl: int):
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._version = None
+        self._filters: dict = {}
+        self._pipelines: dict = {}
+        self._user_valves: dict = {}
+        self.stats = {"hits": 0, "misses": 0}
+
+    def invalidate(self) -> None:
+        with self._lock:
+            self._version = None
+
+    def _lookup(self, entries: dict, key):
+        """Cached value of `key` and the current version, under the lock."""
+        if self._version != Functions.version:
+            self._filters.clear()
+            self._pipelines.clear()
+            self._user_valves.clear()
+            self._version = Functions.version
+        entry = entries.get(key)
+        if entry is not None and entry[0] > time.monotonic():
+            self.stats["hits"] += 1
+            return entry[1], self._version
+        self.stats["misses"] += 1
+        return None, self._version
+
+    def _store(self, entries: dict, key, value, version) -> None:
+        with self._lock:
+            # Not cached if the functions changed while loading
+            if version == Functions.version == self._version:
+                entries[key] = (time.monotonic() + self.ttl, value)
+
+    def get_filter(
+        self, request, function_id: str, valves: Optional[dict] = None
+    ) -> FilterFunction:
+        with self._lock:
+            filter, version = self._lookup(self._filters, function_id)
+        if filter is not None:
+            return filter
+
+        module = get_function_module(request, function_id)
+        if valves is None:
             valves = Functions.get_function_valves_by_id(function_id)
-            return valves.get("priority", 0) if valves else 0
-        return 0
-
-    filter_ids = [function.id for function in Functions.get_global_filter_functions()]
-    if "info" in model and "meta" in model["info"]:
-        filter_ids.extend(model["info"]["meta"].get("filterIds", []))
-        filter_ids = list(set(filter_ids))
-    active_filter_ids = [
-        function.id
-        for function in Functions.get_functions_by_type("filter", active_only=True)
-    ]
+        filter = FilterFunction(function_id, module, valves)
+        self._store(self._filters, function_id, filter, version)
+        return filter
+
+    def get_pipeline(
+        self, request, model: dict, enabled_filter_ids: list = None
+    ) -> list[FilterFunction]:
+        """The active filters of `model`, sorted by priority."""
+        model_filter_ids = []
+        if "info" in model and "meta" in model["info"]:
+            model_filter_ids = model["info"]["meta"].get("filterIds", []) or []
+        key = (
+            tuple(sorted(set(model_filter_ids))),
+            tuple(sorted(set(enabled_filter_ids or []))),
+        )
 
-    def get_active_status(filter_id):
-        function_module = get_function_module(request, filter_id)
+        with self._lock:
+            filters, version = self._lookup(self._pipelines, key)
+        if filters is not None:
+            return filters
+
+        # One query for all active filters and their valves
+        functions = {
+            function.id: function
+            for function in Functions.get_functions(
+                active_only=True, include_valves=True
+            )
+            if function.type == "filter"
+        }
+        filter_ids = {id for id, function in functions.items() if function.is_global}
+        filter_ids.update(id for id in model_filter_ids if id in functions)
+
+        filters = []
+        for filter_id in filter_ids:
+            filter = self.get_filter(request, filter_id, functions[filter_id].valves)
+            if getattr(filter.module, "toggle", None) and filter_id not in (
+                enabled_filter_ids or []
+            ):
+                continue
+            filters.append(filter)
+        filters.sort(key=lambda filter: filter.priority)
+
+        self._store(self._pipelines, key, filters, version)
+        return filters
+
+    def get_user_valves(self, filter: FilterFunction, user_id: str):
+        key = (filter.id, user_id)
+        with self._lock:
+            user_valves, version = self._lookup(self._user_valves, key)
+        if user_valves is not None:
+            return user_valves
+
+        try:
+            user_valves = filter.module.UserValves(
+                **Functions.get_user_valves_by_id_and_user_id(filter.id, user_id)
+            )
+        except Exception as e:
+            log.exception(f"Failed to get user values: {e}")
+            return None
+
+        self._store(self._user_valves, key, user_valves, version)
+        with self._lock:
+            while len(self._user_valves) > FILTER_USER_VALVES_CACHE_SIZE:
+                self._user_valves.pop(next(iter(self._user_valves)))
+        return user_valves
+
+    def bind_user(self, filter: FilterFunction, user_id: Optional[str]):
+        if not filter.has_user_valves or not user_id:
+            return filter
+        return filter.bind(self.get_user_valves(filter, user_id))
 
-        if getattr(function_module, "toggle", None):
-            return filter_id in (enabled_filter_ids or [])
 
-        return True
+FilterPipelines = FilterPipelineCache(FILTER_PIPELINE_CACHE_TTL)
 
-    active_filter_ids = [
-        filter_id for filter_id in active_filter_ids if get_active_status(filter_id)
+
+def get_filter_functions(
+    request, model: dict, enabled_filter_ids: list = None, user=None
+) -> list[FilterFunction]:
+    """
+    The filters to run for a request to `model`, with the valves of `user`.
+    Resolve them once per request, running them (e.g. on every streamed
+    chunk) then needs no database queries.
+    """
+    user_id = user.get("id") if isinstance(user, dict) else getattr(user, "id", None)
+    return [
+        FilterPipelines.bind_user(filter, user_id)
+        for filter in FilterPipelines.get_pipeline(request, model, enabled_filter_ids)
     ]
 
-    filter_ids = [fid for fid in filter_ids if fid in active_filter_ids]
-    filter_ids.sort(key=get_priority)
 
-    return filter_ids
+def get_sorted_filter_ids(request, model: dict, enabled_filter_ids: list = None):
+    return [
+        filter.id
+        for filter in FilterPipelines.get_pipeline(request, model, enabled_filter_ids)
+    ]
 
 
 async def process_filter_functions(
@@ -62,33 +224,33 @@ async def process_filter_functions(
 
     for function in filter_functions:
         filter = function
-        filter_id = function.id
         if not filter:
             continue
 
-        function_module = get_function_module(
-            request, filter_id, load_from_db=(filter_type != "stream")
-        )
+        if not isinstance(filter, FilterFunction):
+            # Function models, e.g. from Functions.get_function_by_id
+            filter = FilterPipelines.bind_user(
+                FilterPipelines.get_filter(request, function.id),
+                (extra_params.get("__user__") or {}).get("id"),
+            )
+        filter_id = filter.id
+
         # Prepare handler function
-        handler = getattr(function_module, filter_type, None)
+        handler = filter.get_handler(filter_type)
         if not handler:
             continue
+        handler, parameters, is_coroutine = handler
 
         # Check if the function has a file_handler variable
-        if filter_type == "inlet" and hasattr(function_module, "file_handler"):
-            skip_files = function_module.file_handler
+        if filter_type == "inlet" and hasattr(filter.module, "file_handler"):
+            skip_files = filter.module.file_handler
 
         # Apply valves to the function
-        if hasattr(function_module, "valves") and hasattr(function_module, "Valves"):
-            valves = Functions.get_function_valves_by_id(filter_id)
-            function_module.valves = function_module.Valves(
-                **(valves if valves else {})
-            )
+        if filter.valves is not None:
+            filter.module.valves = filter.valves
 
         try:
             # Prepare parameters
-            sig = inspect.signature(handler)
-
             params = {"body": form_data}
             if filter_type == "stream":
                 params = {"event": form_data}
@@ -99,23 +261,18 @@ async def process_filter_functions(
                     **extra_params,
                     "__id__": filter_id,
                 }.items()
-                if k in sig.parameters
+                if k in parameters
             }
 
             # Handle user parameters
-            if "__user__" in sig.parameters:
-                if hasattr(function_module, "UserValves"):
-                    try:
-                        params["__user__"]["valves"] = function_module.UserValves(
-                            **Functions.get_user_valves_by_id_and_user_id(
-                                filter_id, params["__user__"]["id"]
-                            )
-                        )
-                    except Exception as e:
-                        log.exception(f"Failed to get user values: {e}")
+            if "__user__" in params and filter.user_valves is not None:
+                params["__user__"] = {
+                    **params["__user__"],
+                    "valves": filter.user_valves,
+                }
 
             # Execute handler
-            if inspect.iscoroutinefunction(handler):
+            if is_coroutine:
                 form_data = await handler(**params)
             else:
                 form_data = handler(**params)
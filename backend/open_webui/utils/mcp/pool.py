@@ -0,0 +1,260 @@
+"""
+Pooled sessions to MCP servers.
+
+Connecting to an MCP server takes a streamable HTTP handshake and an
+`initialize` round trip, and listing its tools another one. MCPSessions keeps
+the sessions open between chat requests, keyed by server and the headers
+they authenticate with, so that users never share a session. Tool lists are
+cached for MCP_TOOL_SPECS_CACHE_TTL seconds, or until the server sends a
+`tools/list_changed` notification.
+
+Each session is owned by a background task, as the transport has to be
+closed by the task that opened it. Sessions that were lost (e.g. the server
+restarted) are reconnected on their next use; unused sessions are pinged
+every MCP_SESSION_KEEPALIVE_INTERVAL seconds and closed after
+MCP_SESSION_IDLE_TIMEOUT seconds.
+"""
+
+import asyncio
+import hashlib
+import json
+import logging
+import time
+from typing import Optional
+
+import anyio
+from mcp import ClientSession, types
+from mcp.client.streamable_http import streamablehttp_client
+from mcp.shared.exceptions import McpError
+
+from open_webui.env import (
+    MCP_SESSION_IDLE_TIMEOUT,
+    MCP_SESSION_KEEPALIVE_INTERVAL,
+    MCP_TOOL_SPECS_CACHE_TTL,
+)
+from open_webui.utils.mcp.client import MCPClient
+
+log = logging.getLogger(__name__)
+
+# Error of a request to a session the server no longer knows, which was
+# therefore not processed
+MCP_SESSION_TERMINATED = 32600
+
+
+class PooledMCPClient(MCPClient):
+    """
+    MCPClient of a pooled session. Requests reconnect it first when its
+    connection was lost; `disconnect` leaves it open for the next request.
+    """
+
+    def __init__(self, pool: "MCPSessionPool", url: str, headers: Optional[dict]):
+        super().__init__()
+        self.pool = pool
+        self.url = url
+        self.headers = headers
+        self.loop = asyncio.get_running_loop()
+        self.last_used = time.monotonic()
+        self.last_active = self.last_used
+        self.active = 0
+        self._lock = asyncio.Lock()
+        self._task: Optional[asyncio.Task] = None
+        self._closing: Optional[asyncio.Event] = None
+        self._tool_specs: Optional[tuple[float, list]] = None
+
+    async def connect(self) -> None:
+        async with self._lock:
+            if self.session is not None:
+                return
+            await self._stop()
+
+            ready = self.loop.create_future()
+            self._closing = asyncio.Event()
+            self._task = asyncio.create_task(self._run(ready))
+            await ready
+            self.last_active = time.monotonic()
+            self.pool.stats["connects"] += 1
+            self.pool._connected.add(self)
+
+    async def _run(self, ready: asyncio.Future) -> None:
+        try:
+            async with streamablehttp_client(self.url, headers=self.headers) as (
+                read_stream,
+                write_stream,
+                _,
+            ):
+                async with ClientSession(
+                    read_stream, write_stream, message_handler=self._handle_message
+                ) as session:
+                    with anyio.fail_after(10):
+                        await session.initialize()
+                    self.session = session
+                    ready.set_result(None)
+                    await self._closing.wait()
+        except Exception as e:
+            if not ready.done():
+                ready.set_exception(e)
+            else:
+                log.debug(f"MCP session to {self.url} was closed: {e}")
+        finally:
+            self.session = None
+            self._tool_specs = None
+            if not ready.done():
+                ready.cancel()
+
+    async def _handle_message(self, message) -> None:
+        if isinstance(message, types.ServerNotification) and isinstance(
+            message.root, types.ToolListChangedNotification
+        ):
+            self._tool_specs = None
+
+    async def _request(self, method, *args, **kwargs):
+        for attempt in range(2):
+            await self.connect()
+            self.active += 1
+            self.last_used = self.last_active = time.monotonic()
+            try:
+                return await method(*args, **kwargs)
+            except McpError as e:
+                if attempt or e.error.code != MCP_SESSION_TERMINATED:
+                    raise
+                # Reconnect and send the request again
+                await self.close()
+            finally:
+                self.active -= 1
+
+    async def list_tool_specs(self) -> Optional[list]:
+        tool_specs = self._tool_specs
+        if tool_specs is not None and tool_specs[0] > time.monotonic():
+            return tool_specs[1]
+
+        tool_specs = await self._request(super().list_tool_specs)
+        self._tool_specs = (time.monotonic() + MCP_TOOL_SPECS_CACHE_TTL, tool_specs)
+        return tool_specs
+
+    async def call_tool(
+        self, function_name: str, function_args: dict
+    ) -> Optional[dict]:
+        return await self._request(super().call_tool, function_name, function_args)
+
+    async def list_resources(self, cursor: Optional[str] = None) -> Optional[dict]:
+        return await self._request(super().list_resources, cursor=cursor)
+
+    async def read_resource(self, uri: str) -> Optional[dict]:
+        return await self._request(super().read_resource, uri)
+
+    async def ping(self) -> None:
+        """Keep the session alive, closes it if the server does not answer."""
+        session = self.session
+        if session is None:
+            return
+        try:
+            with anyio.fail_after(10):
+                await session.send_ping()
+            self.last_active = time.monotonic()
+        except Exception as e:
+            log.debug(f"MCP session to {self.url} did not answer a ping: {e}")
+            await self.close()
+
+    async def _stop(self) -> None:
+        task, self._task = self._task, None
+        if task is None:
+            return
+        self._closing.set()
+        _, pending = await asyncio.wait({task}, timeout=5)
+        if pending:
+            task.cancel()
+
+    async def close(self) -> None:
+        """Close the session, it reconnects if it is used again."""
+        self.pool._connected.discard(self)
+        await self._stop()
+
+    async def disconnect(self) -> None:
+        # The session stays open for the next requests
+        pass
+
+    async def __aenter__(self) -> "PooledMCPClient":
+        return self
+
+    async def __aexit__(self, *args) -> None:
+        pass
+
+
+class MCPSessionPool:
+    def __init__(self):
+        self._clients: dict[tuple, PooledMCPClient] = {}
+        self._connected: set[PooledMCPClient] = set()
+        self._reaper: Optional[asyncio.Task] = None
+        self.stats = {"connects": 0, "reuses": 0, "evictions": 0}
+
+    @staticmethod
+    def get_key(server_id: str, url: str, headers: Optional[dict]) -> tuple:
+        identity = hashlib.sha256(
+            json.dumps(headers or {}, sort_keys=True).encode("utf-8")
+        ).hexdigest()
+        return (server_id, url, identity)
+
+    async def get(
+        self, server_id: str, url: str, headers: Optional[dict] = None
+    ) -> PooledMCPClient:
+        """Connected client of `server_id` for requests with `headers`."""
+        loop = asyncio.get_running_loop()
+        key = self.get_key(server_id, url, headers)
+
+        client = self._clients.get(key)
+        if client is None or client.loop is not loop:
+            client = PooledMCPClient(self, url, headers)
+            self._clients[key] = client
+        else:
+            self.stats["reuses"] += 1
+
+        if self._reaper is None or self._reaper.done():
+            self._reaper = asyncio.create_task(self._reap())
+
+        try:
+            await client.connect()
+        except Exception:
+            if self._clients.get(key) is client:
+                del self._clients[key]
+            raise
+        return client
+
+    async def _reap(self) -> None:
+        interval = max(1, min(MCP_SESSION_KEEPALIVE_INTERVAL, MCP_SESSION_IDLE_TIMEOUT))
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                await self.evict()
+            except Exception as e:
+                log.warning(f"Error evicting MCP sessions: {e}")
+
+    async def evict(self) -> None:
+        """Close idle sessions and ping the others."""
+        now = time.monotonic()
+        for key, client in list(self._clients.items()):
+            if not client.active and now - client.last_used > MCP_SESSION_IDLE_TIMEOUT:
+                del self._clients[key]
+
+        tracked = set(self._clients.values())
+        for client in list(self._connected):
+            if client.active:
+                continue
+            if client not in tracked:
+                self.stats["evictions"] += 1
+                await client.close()
+            elif now - client.last_active > MCP_SESSION_KEEPALIVE_INTERVAL:
+                await client.ping()
+
+    async def close(self) -> None:
+        if self._reaper is not None:
+            self._reaper.cancel()
+            self._reaper = None
+        self._clients = {}
+        for client in list(self._connected):
+            try:
+                await client.close()
+            except Exception as e:
+                log.warning(f"Error closing MCP session: {e}")
+
+
+MCPSessions = MCPSessionPool()
@@ -1,12 +1,15 @@
+import hashlib
 import os
 import re
 import subprocess
 import sys
+import time
 from importlib import util
 import types
 import tempfile
 import logging
 from importlib.metadata import distributions
+from typing import Optional
 
 from open_webui.env import PIP_OPTIONS, PIP_PACKAGE_INDEX_OPTIONS, OFFLINE_MODE
 from open_webui.models.functions import Functions
@@ -178,9 +181,68 @@ def load_function_module_by_id(function_id: str, content: str | None = None):
         os.unlink(temp_file.name)
 
 
-def get_tool_module_from_cache(request, tool_id, load_from_db=True):
+def get_content_hash(content: str) -> str:
+    return hashlib.sha256(content.encode("utf-8")).hexdigest()
+
+
+def get_module_state(request, name: str) -> dict:
+    if not hasattr(request.app.state, name):
+        setattr(request.app.state, name, {})
+    return getattr(request.app.state, name)
+
+
+def is_module_current(versions: dict, plugin_id: str, updated_at: int) -> bool:
+    """
+    Whether the cached module of `plugin_id` was loaded from its content as of
+    `updated_at`. updated_at has a resolution of a second, so it only tells
+    versions apart once the module was loaded in a later second than the
+    update: until then the content hash has to be compared.
+    """
+    version = versions.get(plugin_id)
+    return (
+        version is not None
+        and version[0] == updated_at
+        and version[2] >= updated_at + 1
+    )
+
+
+def set_module_version(
+    versions: dict, plugin_id: str, updated_at: Optional[int], content: str
+):
+    versions[plugin_id] = (updated_at, get_content_hash(content), time.time())
+
+
+def set_tool_module(request, tool_id, tool_module, content):
+    """Cache a tool module loaded from `content` (e.g. when it is saved)."""
+    get_module_state(request, "TOOLS")[tool_id] = tool_module
+    set_module_version(
+        get_module_state(request, "TOOL_VERSIONS"), tool_id, None, content
+    )
+
+
+def set_function_module(request, function_id, function_module, content):
+    """Cache a function module loaded from `content` (e.g. when it is saved)."""
+    get_module_state(request, "FUNCTIONS")[function_id] = function_module
+    set_module_version(
+        get_module_state(request, "FUNCTION_VERSIONS"), function_id, None, content
+    )
+
+
+def get_tool_module_from_cache(request, tool_id, load_from_db=True, updated_at=None):
+    tools = get_module_state(request, "TOOLS")
+    versions = get_module_state(request, "TOOL_VERSIONS")
+
     if load_from_db:
-        # Always load from the database by default
+        # Check the version of the tool by default (unless the caller already
+        # knows it), so that changes made on any instance are picked up. The
+        # content is only loaded when it changed.
+        if updated_at is None:
+            updated_at = Tools.get_tool_updated_at_by_id(tool_id)
+        if updated_at is None:
+            raise Exception(f"Tool not found: {tool_id}")
+        if tool_id in tools and is_module_current(versions, tool_id, updated_at):
+            return tools[tool_id], None
+
         tool = Tools.get_tool_by_id(tool_id)
         if not tool:
             raise Exception(f"Tool not found: {tool_id}")
@@ -190,41 +252,48 @@ def get_tool_module_from_cache(request, tool_id, load_from_db=True):
         if new_content != content:
             content = new_content
             # Update the tool content in the database
-            Tools.update_tool_by_id(tool_id, {"content": content})
+            tool = Tools.update_tool_by_id(tool_id, {"content": content}) or tool
 
+        version = versions.get(tool_id)
         if (
-            hasattr(request.app.state, "TOOL_CONTENTS")
-            and tool_id in request.app.state.TOOL_CONTENTS
-        ) and (
-            hasattr(request.app.state, "TOOLS") and tool_id in request.app.state.TOOLS
+            tool_id in tools
+            and version is not None
+            and version[1] == get_content_hash(content)
         ):
-            if request.app.state.TOOL_CONTENTS[tool_id] == content:
-                return request.app.state.TOOLS[tool_id], None
+            # Unchanged content (e.g. only the valves were updated)
+            set_module_version(versions, tool_id, tool.updated_at, content)
+            return tools[tool_id], None
 
         tool_module, frontmatter = load_tool_module_by_id(tool_id, content)
+        set_module_version(versions, tool_id, tool.updated_at, content)
     else:
-        if hasattr(request.app.state, "TOOLS") and tool_id in request.app.state.TOOLS:
-            return request.app.state.TOOLS[tool_id], None
+        if tool_id in tools:
+            return tools[tool_id], None
 
         tool_module, frontmatter = load_tool_module_by_id(tool_id)
+        # Unknown version, checked against the content on the next load
+        versions.pop(tool_id, None)
 
-    if not hasattr(request.app.state, "TOOLS"):
-        request.app.state.TOOLS = {}
-
-    if not hasattr(request.app.state, "TOOL_CONTENTS"):
-        request.app.state.TOOL_CONTENTS = {}
-
-    request.app.state.TOOLS[tool_id] = tool_module
-    request.app.state.TOOL_CONTENTS[tool_id] = content
-
+    tools[tool_id] = tool_module
     return tool_module, frontmatter
 
 
 def get_function_module_from_cache(request, function_id, load_from_db=True):
+    functions = get_module_state(request, "FUNCTIONS")
+    versions = get_module_state(request, "FUNCTION_VERSIONS")
+
     if load_from_db:
-        # Always load from the database by default
+        # Check the version of the function by default
         # This is useful for hooks like "inlet" or "outlet" where the content might change
-        # and we want to ensure the latest content is used.
+        # and we want to ensure the latest content is used. The content is only loaded
+        # and executed again when it changed.
+        updated_at = Functions.get_function_updated_at_by_id(function_id)
+        if updated_at is None:
+            raise Exception(f"Function not found: {function_id}")
+        if function_id in functions and is_module_current(
+            versions, function_id, updated_at
+        ):
+            return functions[function_id], None, None
 
         function = Functions.get_function_by_id(function_id)
         if not function:
@@ -235,44 +304,39 @@ def get_function_module_from_cache(request, function_id, load_from_db=True):
         if new_content != content:
             content = new_content
             # Update the function content in the database
-            Functions.update_function_by_id(function_id, {"content": content})
+            function = (
+                Functions.update_function_by_id(function_id, {"content": content})
+                or function
+            )
 
+        version = versions.get(function_id)
         if (
-            hasattr(request.app.state, "FUNCTION_CONTENTS")
-            and function_id in request.app.state.FUNCTION_CONTENTS
-        ) and (
-            hasattr(request.app.state, "FUNCTIONS")
-            and function_id in request.app.state.FUNCTIONS
+            function_id in functions
+            and version is not None
+            and version[1] == get_content_hash(content)
         ):
-            if request.app.state.FUNCTION_CONTENTS[function_id] == content:
-                return request.app.state.FUNCTIONS[function_id], None, None
+            # Unchanged content (e.g. only the valves were updated)
+            set_module_version(versions, function_id, function.updated_at, content)
+            return functions[function_id], None, None
 
         function_module, function_type, frontmatter = load_function_module_by_id(
             function_id, content
         )
+        set_module_version(versions, function_id, function.updated_at, content)
     else:
         # Load from cache (e.g. "stream" hook)
         # This is useful for performance reasons
 
-        if (
-            hasattr(request.app.state, "FUNCTIONS")
-            and function_id in request.app.state.FUNCTIONS
-        ):
-            return request.app.state.FUNCTIONS[function_id], None, None
+        if function_id in functions:
+            return functions[function_id], None, None
 
         function_module, function_type, frontmatter = load_function_module_by_id(
             function_id
         )
+        # Unknown version, checked against the content on the next load
+        versions.pop(function_id, None)
 
-    if not hasattr(request.app.state, "FUNCTIONS"):
-        request.app.state.FUNCTIONS = {}
-
-    if not hasattr(request.app.state, "FUNCTION_CONTENTS"):
-        request.app.state.FUNCTION_CONTENTS = {}
-
-    request.app.state.FUNCTIONS[function_id] = function_module
-    request.app.state.FUNCTION_CONTENTS[function_id] = content
-
+    functions[function_id] = function_module
     return function_module, function_type, frontmatter
 
 
@@ -8,6 +8,19 @@ Metrics collected:
 
 * http.server.requests (counter)
 * http.server.duration (histogram, milliseconds)
+* webui.chat.save.flushes (counter, buffered realtime chat save flushes)
+* webui.chat.save.bytes (counter, bytes written by buffered chat saves)
+* webui.config.cache.hits (counter, config reads served from the local snapshot)
+* webui.config.cache.invalidations (counter, snapshot reloads after remote changes)
+* webui.rag.embedding_cache.hits (counter, texts whose embedding was cached)
+* webui.rag.embedding_cache.misses (counter, texts sent to the embedding provider)
+* webui.rag.embedding_cache.evictions (counter, cached embeddings evicted for size)
+* webui.rag.embedding.chunks (counter, chunks embedded by remote providers)
+* webui.rag.embedding.tokens (counter, estimated tokens embedded by remote providers)
+* webui.rag.embedding.rate_limited (counter, embedding requests rejected with 429)
+* webui.storage.cache.hits (counter, remote files served from the local cache)
+* webui.storage.cache.misses (counter, remote files downloaded to the local cache)
+* webui.storage.cache.evictions (counter, cached files removed for size)
 
 Attributes used: http.method, http.route, http.status_code
 
@@ -46,6 +59,10 @@ from open_webui.env import (
     OTEL_METRICS_EXPORTER_OTLP_INSECURE,
 )
 from open_webui.models.users import Users
+from open_webui.retrieval.embedding_cache import EMBEDDING_CACHE
+from open_webui.retrieval.embedding_scheduler import EMBEDDING_SCHEDULER
+from open_webui.storage.cache import STORAGE_CACHE
+from open_webui.utils.chat_buffer import ChatMessageBuffer
 
 _EXPORT_INTERVAL_MILLIS = 10_000  # 10 seconds
 
@@ -101,6 +118,45 @@ def _build_meter_provider(resource: Resource) -> MeterProvider:
         View(
             instrument_name="webui.users.active.today",
         ),
+        View(
+            instrument_name="webui.chat.save.flushes",
+        ),
+        View(
+            instrument_name="webui.chat.save.bytes",
+        ),
+        View(
+            instrument_name="webui.config.cache.hits",
+        ),
+        View(
+            instrument_name="webui.config.cache.invalidations",
+        ),
+        View(
+            instrument_name="webui.rag.embedding_cache.hits",
+        ),
+        View(
+            instrument_name="webui.rag.embedding_cache.misses",
+        ),
+        View(
+            instrument_name="webui.rag.embedding_cache.evictions",
+        ),
+        View(
+            instrument_name="webui.rag.embedding.chunks",
+        ),
+        View(
+            instrument_name="webui.rag.embedding.tokens",
+        ),
+        View(
+            instrument_name="webui.rag.embedding.rate_limited",
+        ),
+        View(
+            instrument_name="webui.storage.cache.hits",
+        ),
+        View(
+            instrument_name="webui.storage.cache.misses",
+        ),
+        View(
+            instrument_name="webui.storage.cache.evictions",
+        ),
     ]
 
     provider = MeterProvider(
@@ -176,6 +232,176 @@ def setup_metrics(app: FastAPI, resource: Resource) -> None:
         callbacks=[observe_users_active_today],
     )
 
+    def observe_chat_save_flushes(
+        options: metrics.CallbackOptions,
+    ) -> Sequence[metrics.Observation]:
+        return [metrics.Observation(value=ChatMessageBuffer.stats["flushes"])]
+
+    meter.create_observable_counter(
+        name="webui.chat.save.flushes",
+        description="Number of buffered realtime chat save flushes",
+        unit="1",
+        callbacks=[observe_chat_save_flushes],
+    )
+
+    def observe_chat_save_bytes(
+        options: metrics.CallbackOptions,
+    ) -> Sequence[metrics.Observation]:
+        return [metrics.Observation(value=ChatMessageBuffer.stats["bytes_written"])]
+
+    meter.create_observable_counter(
+        name="webui.chat.save.bytes",
+        description="Bytes of message updates written by buffered chat saves",
+        unit="By",
+        callbacks=[observe_chat_save_bytes],
+    )
+
+    def observe_config_cache_hits(
+        options: metrics.CallbackOptions,
+    ) -> Sequence[metrics.Observation]:
+        return [metrics.Observation(value=app.state.config.get_stats()["hits"])]
+
+    meter.create_observable_counter(
+        name="webui.config.cache.hits",
+        description="Config reads served from the local snapshot",
+        unit="1",
+        callbacks=[observe_config_cache_hits],
+    )
+
+    def observe_config_cache_invalidations(
+        options: metrics.CallbackOptions,
+    ) -> Sequence[metrics.Observation]:
+        return [
+            metrics.Observation(value=app.state.config.get_stats()["invalidations"])
+        ]
+
+    meter.create_observable_counter(
+        name="webui.config.cache.invalidations",
+        description="Config snapshot reloads triggered by changes on other nodes",
+        unit="1",
+        callbacks=[observe_config_cache_invalidations],
+    )
+
+    if EMBEDDING_CACHE is not None:
+
+        def observe_embedding_cache_hits(
+            options: metrics.CallbackOptions,
+        ) -> Sequence[metrics.Observation]:
+            return [metrics.Observation(value=EMBEDDING_CACHE.get_stats()["hits"])]
+
+        meter.create_observable_counter(
+            name="webui.rag.embedding_cache.hits",
+            description="Texts whose embedding was served from the embedding cache",
+            unit="1",
+            callbacks=[observe_embedding_cache_hits],
+        )
+
+        def observe_embedding_cache_misses(
+            options: metrics.CallbackOptions,
+        ) -> Sequence[metrics.Observation]:
+            return [metrics.Observation(value=EMBEDDING_CACHE.get_stats()["misses"])]
+
+        meter.create_observable_counter(
+            name="webui.rag.embedding_cache.misses",
+            description="Texts sent to the embedding provider after a cache miss",
+            unit="1",
+            callbacks=[observe_embedding_cache_misses],
+        )
+
+        def observe_embedding_cache_evictions(
+            options: metrics.CallbackOptions,
+        ) -> Sequence[metrics.Observation]:
+            return [metrics.Observation(value=EMBEDDING_CACHE.get_stats()["evictions"])]
+
+        meter.create_observable_counter(
+            name="webui.rag.embedding_cache.evictions",
+            description="Cached embeddings evicted to stay within the size limit",
+            unit="1",
+            callbacks=[observe_embedding_cache_evictions],
+        )
+
+    def observe_embedding_chunks(
+        options: metrics.CallbackOptions,
+    ) -> Sequence[metrics.Observation]:
+        return [
+            metrics.Observation(value=EMBEDDING_SCHEDULER.get_totals().get("chunks", 0))
+        ]
+
+    meter.create_observable_counter(
+        name="webui.rag.embedding.chunks",
+        description="Chunks embedded by remote embedding providers",
+        unit="1",
+        callbacks=[observe_embedding_chunks],
+    )
+
+    def observe_embedding_tokens(
+        options: metrics.CallbackOptions,
+    ) -> Sequence[metrics.Observation]:
+        return [
+            metrics.Observation(value=EMBEDDING_SCHEDULER.get_totals().get("tokens", 0))
+        ]
+
+    meter.create_observable_counter(
+        name="webui.rag.embedding.tokens",
+        description="Estimated tokens embedded by remote embedding providers",
+        unit="1",
+        callbacks=[observe_embedding_tokens],
+    )
+
+    def observe_embedding_rate_limited(
+        options: metrics.CallbackOptions,
+    ) -> Sequence[metrics.Observation]:
+        return [
+            metrics.Observation(
+                value=EMBEDDING_SCHEDULER.get_totals().get("rate_limited", 0)
+            )
+        ]
+
+    meter.create_observable_counter(
+        name="webui.rag.embedding.rate_limited",
+        description="Embedding requests rejected by the provider with HTTP 429",
+        unit="1",
+        callbacks=[observe_embedding_rate_limited],
+    )
+
+    if STORAGE_CACHE is not None:
+
+        def observe_storage_cache_hits(
+            options: metrics.CallbackOptions,
+        ) -> Sequence[metrics.Observation]:
+            return [metrics.Observation(value=STORAGE_CACHE.stats["hits"])]
+
+        meter.create_observable_counter(
+            name="webui.storage.cache.hits",
+            description="Remote files served from the local storage cache",
+            unit="1",
+            callbacks=[observe_storage_cache_hits],
+        )
+
+        def observe_storage_cache_misses(
+            options: metrics.CallbackOptions,
+        ) -> Sequence[metrics.Observation]:
+            return [metrics.Observation(value=STORAGE_CACHE.stats["misses"])]
+
+        meter.create_observable_counter(
+            name="webui.storage.cache.misses",
+            description="Remote files downloaded to the local storage cache",
+            unit="1",
+            callbacks=[observe_storage_cache_misses],
+        )
+
+        def observe_storage_cache_evictions(
+            options: metrics.CallbackOptions,
+        ) -> Sequence[metrics.Observation]:
+            return [metrics.Observation(value=STORAGE_CACHE.stats["evictions"])]
+
+        meter.create_observable_counter(
+            name="webui.storage.cache.evictions",
+            description="Cached files removed to stay within the size limit",
+            unit="1",
+            callbacks=[observe_storage_cache_evictions],
+        )
+
     # FastAPI middleware
     @app.middleware("http")
     async def _metrics_middleware(request: Request, call_next):
@@ -1,7 +1,10 @@
+import hashlib
 import inspect
 import logging
 import re
 import inspect
+import threading
+import time
 import aiohttp
 import asyncio
 import yaml
@@ -38,13 +41,16 @@ from open_webui.utils.misc import is_string_allowed
 from open_webui.models.tools import Tools
 from open_webui.models.users import UserModel
 from open_webui.models.groups import Groups
-from open_webui.utils.plugin import load_tool_module_by_id
+from open_webui.utils.plugin import get_tool_module_from_cache
 from open_webui.utils.access_control import has_access
 from open_webui.config import BYPASS_ADMIN_ACCESS_CONTROL
 from open_webui.env import (
     AIOHTTP_CLIENT_TIMEOUT,
     AIOHTTP_CLIENT_TIMEOUT_TOOL_SERVER_DATA,
     AIOHTTP_CLIENT_SESSION_TOOL_SERVER_SSL,
+    TOOL_USER_VALVES_CACHE_TTL,
+    TOOL_SERVER_SPEC_CACHE_TTL,
+    TOOL_SERVER_SPEC_STALE_TTL,
 )
 from open_webui.tools.builtin import (
     search_web,
@@ -78,6 +84,9 @@ import copy
 
 log = logging.getLogger(__name__)
 
+# Converted OpenAPI specs provided as JSON in tool server connections
+TOOL_SERVER_INLINE_SPEC_CACHE_SIZE = 100
+
 
 def get_async_tool_function_and_apply_extra_params(
     function: Callable, extra_params: dict
@@ -148,6 +157,125 @@ def has_tool_server_access(
     return has_access(user.id, "read", access_control, user_group_ids)
 
 
+class CompiledTool:
+    """
+    A tool as of a version (its updated_at): its module, bound valves and
+    specs normalized for the model, with descriptions from the docstrings.
+    """
+
+    def __init__(self, tool, module, valves: Optional[dict]):
+        self.id = tool.id
+        self.updated_at = tool.updated_at
+        self.compiled_at = time.time()
+        self.module = module
+
+        self.valves = None
+        if hasattr(module, "valves") and hasattr(module, "Valves"):
+            self.valves = module.Valves(**(valves or {}))
+        self.has_user_valves = hasattr(module, "UserValves")
+        self.metadata = {
+            "file_handler": hasattr(module, "file_handler") and module.file_handler,
+            "citation": hasattr(module, "citation") and module.citation,
+        }
+
+        self.specs = []
+        for spec in copy.deepcopy(tool.specs):
+            # TODO: Fix hack for OpenAI API
+            # Some times breaks OpenAI but others don't. Leaving the comment
+            for val in spec.get("parameters", {}).get("properties", {}).values():
+                if val.get("type") == "str":
+                    val["type"] = "string"
+
+            # Remove internal reserved parameters (e.g. __id__, __user__)
+            spec["parameters"]["properties"] = {
+                key: val
+                for key, val in spec["parameters"]["properties"].items()
+                if not key.startswith("__")
+            }
+
+            # TODO: Support Pydantic models as parameters
+            function_name = spec["name"]
+            doc = getattr(module, function_name).__doc__
+            if doc and doc.strip() != "":
+                s = re.split(":(param|return)", doc, 1)
+                spec["description"] = s[0]
+            else:
+                spec["description"] = function_name
+
+            self.specs.append(spec)
+
+    def is_current(self, updated_at: int) -> bool:
+        # updated_at has a resolution of a second, it only tells versions
+        # apart once the tool was compiled in a later second than the update
+        return self.updated_at == updated_at and self.compiled_at >= updated_at + 1
+
+
+class ToolRegistryCache:
+    """
+    Compiled tools by id, and the user valves of each tool and user. Tools
+    are compiled again when their version changes. User valves are dropped
+    when tools change on this instance (Tools.version), and expire after
+    `ttl` seconds for changes made by other instances.
+    """
+
+    def __init__(self, ttl: int):
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._tools: dict[str, CompiledTool] = {}
+        self._version = None
+        self._user_valves: dict = {}
+        self.stats = {"hits": 0, "misses": 0}
+
+    def get(self, request, tool) -> CompiledTool:
+        """The compiled `tool`, with the version of a Tools query."""
+        compiled = self._tools.get(tool.id)
+        if compiled is not None and compiled.is_current(tool.updated_at):
+            self.stats["hits"] += 1
+            return compiled
+        self.stats["misses"] += 1
+
+        module, _ = get_tool_module_from_cache(
+            request, tool.id, updated_at=tool.updated_at
+        )
+        full_tool = Tools.get_tool_by_id(tool.id)
+        if full_tool is None:
+            raise Exception(f"Tool not found: {tool.id}")
+        compiled = CompiledTool(full_tool, module, Tools.get_tool_valves_by_id(tool.id))
+        self._tools[tool.id] = compiled
+        return compiled
+
+    def get_user_valves(self, compiled: CompiledTool, user_id: str):
+        key = (compiled.id, user_id)
+        with self._lock:
+            if self._version != Tools.version:
+                self._user_valves.clear()
+                self._version = Tools.version
+            version = self._version
+            entry = self._user_valves.get(key)
+        if (
+            entry is not None
+            and entry[0] > time.monotonic()
+            and entry[1] == compiled.updated_at
+        ):
+            return entry[2]
+
+        user_valves = compiled.module.UserValves(  # type: ignore
+            **Tools.get_user_valves_by_id_and_user_id(compiled.id, user_id)
+        )
+        with self._lock:
+            # Not cached if the tools changed while loading
+            if version == Tools.version == self._version:
+                self._user_valves[key] = (
+                    time.monotonic() + self.ttl,
+                    compiled.updated_at,
+                    user_valves,
+                )
+        return user_valves
+
+
+ToolRegistry = ToolRegistryCache(TOOL_USER_VALVES_CACHE_TTL)
+
+
 async def get_tools(
     request: Request, tool_ids: list[str], user: UserModel, extra_params: dict
 ) -> dict[str, dict]:
@@ -157,8 +285,11 @@ async def get_tools(
     # Get user's group memberships for access control checks
     user_group_ids = {group.id for group in Groups.get_groups_by_member_id(user.id)}
 
+    # Local tools are loaded in one query, and compiled again when they changed
+    tools = {tool.id: tool for tool in Tools.get_tools_by_ids(tool_ids)}
+
     for tool_id in tool_ids:
-        tool = Tools.get_tool_by_id(tool_id)
+        tool = tools.get(tool_id)
         if tool:
             # Check access control for local tools
             if (
@@ -169,38 +300,20 @@ async def get_tools(
                 log.warning(f"Access denied to tool {tool_id} for user {user.id}")
                 continue
 
-            module = request.app.state.TOOLS.get(tool_id, None)
-            if module is None:
-                module, _ = load_tool_module_by_id(tool_id)
-                request.app.state.TOOLS[tool_id] = module
+            compiled = ToolRegistry.get(request, tool)
+            module = compiled.module
 
             __user__ = {
                 **extra_params["__user__"],
             }
 
             # Set valves for the tool
-            if hasattr(module, "valves") and hasattr(module, "Valves"):
-                valves = Tools.get_tool_valves_by_id(tool_id) or {}
-                module.valves = module.Valves(**valves)
-            if hasattr(module, "UserValves"):
-                __user__["valves"] = module.UserValves(  # type: ignore
-                    **Tools.get_user_valves_by_id_and_user_id(tool_id, user.id)
-                )
-
-            for spec in tool.specs:
-                # TODO: Fix hack for OpenAI API
-                # Some times breaks OpenAI but others don't. Leaving the comment
-                for val in spec.get("parameters", {}).get("properties", {}).values():
-                    if val.get("type") == "str":
-                        val["type"] = "string"
-
-                # Remove internal reserved parameters (e.g. __id__, __user__)
-                spec["parameters"]["properties"] = {
-                    key: val
-                    for key, val in spec["parameters"]["properties"].items()
-                    if not key.startswith("__")
-                }
+            if compiled.valves is not None:
+                module.valves = compiled.valves
+            if compiled.has_user_valves:
+                __user__["valves"] = ToolRegistry.get_user_valves(compiled, user.id)
 
+            for spec in compiled.specs:
                 # convert to function that takes only model params and inserts custom params
                 function_name = spec["name"]
                 tool_function = getattr(module, function_name)
@@ -213,23 +326,12 @@ async def get_tools(
                     },
                 )
 
-                # TODO: Support Pydantic models as parameters
-                if callable.__doc__ and callable.__doc__.strip() != "":
-                    s = re.split(":(param|return)", callable.__doc__, 1)
-                    spec["description"] = s[0]
-                else:
-                    spec["description"] = function_name
-
                 tool_dict = {
                     "tool_id": tool_id,
                     "callable": callable,
-                    "spec": spec,
+                    "spec": {**spec},
                     # Misc info
-                    "metadata": {
-                        "file_handler": hasattr(module, "file_handler")
-                        and module.file_handler,
-                        "citation": hasattr(module, "citation") and module.citation,
-                    },
+                    "metadata": {**compiled.metadata},
                 }
 
                 # Handle function name collisions
@@ -755,7 +857,17 @@ async def get_tool_servers(request: Request):
     return tool_servers
 
 
-async def get_tool_server_data(url: str, headers: Optional[dict]) -> Dict[str, Any]:
+async def fetch_tool_server_data(
+    url: str,
+    headers: Optional[dict],
+    etag: Optional[str] = None,
+    last_modified: Optional[str] = None,
+) -> Optional[Tuple[Dict[str, Any], Optional[str], Optional[str]]]:
+    """
+    Fetch the OpenAPI spec of a tool server, with its ETag and Last-Modified
+    headers. Given those of a previous response, returns None when the spec
+    did not change.
+    """
     _headers = {
         "Accept": "application/json",
         "Content-Type": "application/json",
@@ -763,6 +875,10 @@ async def get_tool_server_data(url: str, headers: Optional[dict]) -> Dict[str, A
 
     if headers:
         _headers.update(headers)
+    if etag:
+        _headers["If-None-Match"] = etag
+    if last_modified:
+        _headers["If-Modified-Since"] = last_modified
 
     error = None
     try:
@@ -771,6 +887,9 @@ async def get_tool_server_data(url: str, headers: Optional[dict]) -> Dict[str, A
             async with session.get(
                 url, headers=_headers, ssl=AIOHTTP_CLIENT_SESSION_TOOL_SERVER_SSL
             ) as response:
+                if response.status == 304 and (etag or last_modified):
+                    return None
+
                 if response.status != 200:
                     error_body = await response.json()
                     raise Exception(error_body)
@@ -792,6 +911,9 @@ async def get_tool_server_data(url: str, headers: Optional[dict]) -> Dict[str, A
                     except Exception as e:
                         raise e
 
+                etag = response.headers.get("ETag")
+                last_modified = response.headers.get("Last-Modified")
+
     except Exception as err:
         log.exception(f"Could not fetch tool server spec from {url}")
         if isinstance(err, dict) and "detail" in err:
@@ -801,9 +923,152 @@ async def get_tool_server_data(url: str, headers: Optional[dict]) -> Dict[str, A
         raise Exception(error)
 
     log.debug(f"Fetched data: {res}")
+    return res, etag, last_modified
+
+
+async def get_tool_server_data(url: str, headers: Optional[dict]) -> Dict[str, Any]:
+    res, _, _ = await fetch_tool_server_data(url, headers)
     return res
 
 
+class CachedToolServerSpec:
+    def __init__(self, url: str, headers: Optional[dict]):
+        self.url = url
+        self.headers = headers
+        self.openapi: Optional[dict] = None
+        self.specs: Optional[list] = None
+        self.etag: Optional[str] = None
+        self.last_modified: Optional[str] = None
+        self.fetched_at = 0.0
+        self.used_at = time.monotonic()
+        self.refresh: Optional[asyncio.Task] = None
+
+
+class ToolServerSpecCache:
+    """
+    OpenAPI specs of tool servers and the tool payloads converted from them,
+    by spec URL and the headers they are fetched with.
+
+    Specs are used for `ttl` seconds, then revalidated with the server
+    (If-None-Match / If-Modified-Since, so that an unchanged spec is neither
+    downloaded nor converted again). Until they are `stale_ttl` seconds old,
+    stale specs are served while they are revalidated in the background.
+    Concurrent requests for a spec share a single fetch, and
+    `periodic_refresh` revalidates the specs used within `ttl` ahead of
+    requests.
+    """
+
+    def __init__(self, ttl: int, stale_ttl: int):
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self._entries: dict[tuple, CachedToolServerSpec] = {}
+        self._inline: dict[str, tuple[dict, list]] = {}
+        self.stats = {"hits": 0, "stale": 0, "misses": 0, "fetches": 0, "unchanged": 0}
+
+    @staticmethod
+    def get_key(url: str, headers: Optional[dict]) -> tuple:
+        identity = hashlib.sha256(
+            json.dumps(headers or {}, sort_keys=True).encode("utf-8")
+        ).hexdigest()
+        return (url, identity)
+
+    async def get(self, url: str, headers: Optional[dict] = None) -> tuple[dict, list]:
+        """The OpenAPI spec at `url` and a copy of the list of its tool payloads."""
+        key = self.get_key(url, headers)
+        entry = self._entries.get(key)
+        if entry is None:
+            entry = CachedToolServerSpec(url, headers)
+            self._entries[key] = entry
+
+        now = time.monotonic()
+        entry.used_at = now
+        if entry.openapi is not None:
+            age = now - entry.fetched_at
+            if age < self.ttl:
+                self.stats["hits"] += 1
+                return entry.openapi, list(entry.specs)
+            if age < self.stale_ttl:
+                self.stats["stale"] += 1
+                self._refresh(entry)
+                return entry.openapi, list(entry.specs)
+
+        self.stats["misses"] += 1
+        await asyncio.shield(self._refresh(entry))
+        return entry.openapi, list(entry.specs)
+
+    def get_inline(self, spec: str) -> tuple[dict, list]:
+        """An OpenAPI spec provided as JSON and its tool payloads."""
+        key = hashlib.sha256(spec.encode("utf-8")).hexdigest()
+        if key not in self._inline:
+            openapi = json.loads(spec)
+            if len(self._inline) >= TOOL_SERVER_INLINE_SPEC_CACHE_SIZE:
+                self._inline.pop(next(iter(self._inline)))
+            self._inline[key] = (openapi, convert_openapi_to_tool_payload(openapi))
+        openapi, specs = self._inline[key]
+        return openapi, list(specs)
+
+    def clear(self) -> None:
+        self._entries = {}
+        self._inline = {}
+
+    def _refresh(self, entry: CachedToolServerSpec) -> asyncio.Task:
+        if entry.refresh is None or entry.refresh.done():
+            entry.refresh = asyncio.create_task(self._revalidate(entry))
+            # Failures are raised to the requests waiting for the spec, if any
+            entry.refresh.add_done_callback(
+                lambda task: task.cancelled() or task.exception()
+            )
+        return entry.refresh
+
+    async def _revalidate(self, entry: CachedToolServerSpec) -> None:
+        cached = entry.openapi is not None
+        result = await fetch_tool_server_data(
+            entry.url,
+            entry.headers,
+            etag=entry.etag if cached else None,
+            last_modified=entry.last_modified if cached else None,
+        )
+        entry.fetched_at = time.monotonic()
+        if result is None:
+            self.stats["unchanged"] += 1
+            return
+
+        openapi, etag, last_modified = result
+        entry.specs = convert_openapi_to_tool_payload(openapi)
+        entry.openapi = openapi
+        entry.etag = etag
+        entry.last_modified = last_modified
+        self.stats["fetches"] += 1
+
+    async def refresh_in_use(self, margin: float) -> None:
+        """
+        Revalidate the specs used within `ttl` that expire within `margin`
+        seconds, drop the specs unused for longer than they can be served.
+        """
+        now = time.monotonic()
+        for key, entry in list(self._entries.items()):
+            unused = now - entry.used_at
+            if unused > max(self.ttl, self.stale_ttl):
+                del self._entries[key]
+            elif unused <= self.ttl and now - entry.fetched_at >= self.ttl - margin:
+                try:
+                    await asyncio.shield(self._refresh(entry))
+                except Exception as e:
+                    log.debug(f"Error refreshing tool server spec {entry.url}: {e}")
+
+    async def periodic_refresh(self) -> None:
+        """Revalidate the specs in use before they expire."""
+        interval = max(1, self.ttl // 2)
+        while True:
+            await asyncio.sleep(interval)
+            await self.refresh_in_use(interval)
+
+
+ToolServerSpecs = ToolServerSpecCache(
+    TOOL_SERVER_SPEC_CACHE_TTL, TOOL_SERVER_SPEC_STALE_TTL
+)
+
+
 async def get_tool_servers_data(servers: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
     # Prepare list of enabled servers along with their original index
 
@@ -839,7 +1104,7 @@ async def get_tool_servers_data(servers: List[Dict[str, Any]]) -> List[Dict[str,
                 openapi_path = server.get("path", "openapi.json")
                 spec_url = get_tool_server_url(server_url, openapi_path)
                 # Fetch from URL
-                task = get_tool_server_data(
+                task = ToolServerSpecs.get(
                     spec_url,
                     {"Authorization": f"Bearer {token}"} if token else None,
                 )
@@ -847,11 +1112,11 @@ async def get_tool_servers_data(servers: List[Dict[str, Any]]) -> List[Dict[str,
                 # Use provided JSON spec
                 spec_json = None
                 try:
-                    spec_json = json.loads(server.get("spec", ""))
+                    spec_json = ToolServerSpecs.get_inline(server.get("spec", ""))
                 except Exception as e:
                     log.error(f"Error parsing JSON spec for tool server {id}: {e}")
 
-                if spec_json:
+                if spec_json and spec_json[0]:
                     task = asyncio.sleep(
                         0,
                         result=spec_json,
@@ -871,10 +1136,16 @@ async def get_tool_servers_data(servers: List[Dict[str, Any]]) -> List[Dict[str,
             log.error(f"Failed to connect to {url} OpenAPI tool server")
             continue
 
+        # The cached spec is shared, the server info is set on a copy
+        openapi, specs = response
+        openapi = {**openapi}
+        if isinstance(openapi.get("info"), dict):
+            openapi["info"] = {**openapi["info"]}
+
         response = {
-            "openapi": response,
-            "info": response.get("info", {}),
-            "specs": convert_openapi_to_tool_payload(response),
+            "openapi": openapi,
+            "info": openapi.get("info", {}),
+            "specs": specs,
         }
 
         openapi_data = response.get("openapi", {})